@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 基准测试
+===================================
+
+职责：
+1. 提供数据源 / 搜索 / LLM 的录制数据替身（benchmarks.fakes）
+2. 离线驱动完整分析流水线并报告耗时、吞吐与内存（benchmarks.run_pipeline）
+"""
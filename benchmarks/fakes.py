@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 离线基准测试替身
+===================================
+
+职责：
+1. 回放录制的数据源 / 搜索 / LLM 响应，不访问任何外部网络
+2. 按可配置的延迟分布与错误率模拟上游行为
+3. 组装可注入 StockAnalysisPipeline 的共享组件容器
+
+替身只替换最外层的 I/O：
+- FakeFetcher 继承 BaseFetcher，日线仍经过标准化/清洗/指标计算
+- FakeSearchProvider 继承 BaseSearchProvider，Key 轮询与错误记录照常执行
+- FakeLLMAnalyzer 继承 GeminiAnalyzer，Prompt 构建、LLM 调度与响应解析照常执行
+"""
+
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from data_provider.base import BaseFetcher, DataFetcherManager, DataFetchError
+from data_provider.realtime_types import ChipDistribution, RealtimeSource, UnifiedRealtimeQuote
+from src.analyzer import GeminiAnalyzer
+from src.async_llm import request_slot
+from src.core.components import PipelineComponents
+from src.llm_scheduler import estimate_tokens, get_llm_scheduler
+from src.search_service import BaseSearchProvider, SearchResponse, SearchResult, SearchService
+from src.tracing import trace_span
+
+FIXTURE_DIR = Path(__file__).parent / "fixtures"
+DEFAULT_FIXTURE = FIXTURE_DIR / "recorded_600519.json"
+
+
+@dataclass
+class LatencyProfile:
+    """
+    上游延迟与错误分布
+
+    延迟服从对数正态分布（中位数 median，离散度 sigma），
+    以 error_rate 的概率抛出异常。
+    """
+    median: float = 0.0
+    sigma: float = 0.5
+    error_rate: float = 0.0
+
+    def scaled(self, factor: float) -> 'LatencyProfile':
+        return LatencyProfile(self.median * factor, self.sigma, self.error_rate)
+
+
+# 按真实环境量级设定的默认分布（秒）
+DEFAULT_LATENCIES: Dict[str, LatencyProfile] = {
+    'daily': LatencyProfile(median=0.8, sigma=0.6, error_rate=0.02),
+    'realtime': LatencyProfile(median=0.3, sigma=0.5, error_rate=0.02),
+    'chip': LatencyProfile(median=1.0, sigma=0.7, error_rate=0.05),
+    'search': LatencyProfile(median=1.2, sigma=0.5, error_rate=0.03),
+    'llm': LatencyProfile(median=12.0, sigma=0.4, error_rate=0.01),
+}
+
+
+class UpstreamSimulator:
+    """按 LatencyProfile 休眠并随机注入错误（线程安全、可复现）"""
+
+    def __init__(self, latencies: Dict[str, LatencyProfile], seed: int = 42):
+        self.latencies = latencies
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _sample(self, kind: str) -> Tuple[float, bool]:
+        profile = self.latencies.get(kind) or LatencyProfile()
+        with self._lock:
+            delay = self._random.lognormvariate(0, profile.sigma) * profile.median if profile.median > 0 else 0.0
+            failed = self._random.random() < profile.error_rate
+        return delay, failed
+
+    def call(self, kind: str) -> None:
+        delay, failed = self._sample(kind)
+        if delay > 0:
+            time.sleep(delay)
+        if failed:
+            raise DataFetchError(f"[benchmark] 模拟 {kind} 上游错误")
+
+    async def call_async(self, kind: str) -> None:
+        """call 的协程版本（异步 LLM 模式）"""
+        delay, failed = self._sample(kind)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if failed:
+            raise DataFetchError(f"[benchmark] 模拟 {kind} 上游错误")
+
+
+class FixtureStore:
+    """录制的响应数据，按股票代码改写代码/名称与价格后回放"""
+
+    def __init__(self, path: Path = DEFAULT_FIXTURE):
+        with open(path, encoding='utf-8') as f:
+            self.data: Dict[str, Any] = json.load(f)
+        self.code = self.data['code']
+        self.name = self.data['name']
+
+    @staticmethod
+    def stock_name(code: str) -> str:
+        return f"基准{code}"
+
+    @staticmethod
+    def price_factor(code: str) -> float:
+        """同一代码总是得到相同的价格缩放系数"""
+        return 0.02 + (int(code) % 997) / 997 * 0.2 if code.isdigit() else 0.1
+
+    def daily_frame(self, code: str) -> pd.DataFrame:
+        """日线回放：价格按代码缩放，日期平移到截至今天"""
+        df = pd.DataFrame(self.data['daily'])
+        factor = self.price_factor(code)
+        for column in ('open', 'high', 'low', 'close'):
+            df[column] = (df[column] * factor).round(2)
+        df['amount'] = df['amount'] * factor
+        offset = date.today() - date.fromisoformat(df['date'].iloc[-1])
+        df['date'] = [(date.fromisoformat(d) + offset).isoformat() for d in df['date']]
+        return df
+
+    def realtime_quote(self, code: str) -> UnifiedRealtimeQuote:
+        factor = self.price_factor(code)
+        fields = dict(self.data['realtime'])
+        for key in ('price', 'change_amount', 'open_price', 'high', 'low', 'pre_close', 'high_52w', 'low_52w'):
+            if fields.get(key) is not None:
+                fields[key] = round(fields[key] * factor, 2)
+        return UnifiedRealtimeQuote(code=code, name=self.stock_name(code), source=RealtimeSource.FALLBACK, **fields)
+
+    def chip_distribution(self, code: str) -> ChipDistribution:
+        factor = self.price_factor(code)
+        fields = dict(self.data['chip'])
+        for key in ('avg_cost', 'cost_90_low', 'cost_90_high', 'cost_70_low', 'cost_70_high'):
+            fields[key] = round(fields[key] * factor, 2)
+        return ChipDistribution(code=code, date=date.today().isoformat(), source="benchmark", **fields)
+
+    def search_results(self, query: str) -> List[SearchResult]:
+        return [SearchResult(**item) for item in self.data['search']]
+
+    def llm_response(self, code: str) -> str:
+        return (
+            self.data['llm_response']
+            .replace(self.code, code)
+            .replace(self.name, self.stock_name(code))
+        )
+
+    def llm_batch_response(self, codes: List[str]) -> str:
+        """批量请求的响应：每只股票一条录制结果组成的 JSON 数组"""
+        entries = []
+        for code in codes:
+            entry = json.loads(self.llm_response(code).replace('```json', '').replace('```', ''))
+            entries.append({'code': code, **entry})
+        return "```json\n" + json.dumps(entries, ensure_ascii=False, indent=2) + "\n```"
+
+
+class FakeFetcher(BaseFetcher):
+    """回放录制日线的数据源"""
+
+    name = "BenchmarkFetcher"
+    priority = 0
+
+    def __init__(self, fixtures: FixtureStore, upstream: UpstreamSimulator):
+        self.fixtures = fixtures
+        self.upstream = upstream
+
+    def _fetch_raw_data(self, stock_code: str, start_date: str, end_date: str) -> pd.DataFrame:
+        self.upstream.call('daily')
+        return self.fixtures.daily_frame(stock_code)
+
+    def _normalize_data(self, df: pd.DataFrame, stock_code: str) -> pd.DataFrame:
+        df = df.copy()
+        df['code'] = stock_code
+        return df
+
+
+class FakeFetcherManager(DataFetcherManager):
+    """
+    只使用 FakeFetcher 的数据源管理器
+
+    日线走基类的故障切换逻辑；实时行情与筹码替换掉按数据源名称分派的实现，
+    外层的追踪 span 与调用方式保持不变。
+    """
+
+    def __init__(self, fetcher: FakeFetcher):
+        super().__init__(fetchers=[fetcher])
+        self.fetcher = fetcher
+        self._stock_name_cache: Dict[str, str] = {}
+
+    def prefetch_realtime_quotes(self, stock_codes: List[str]) -> int:
+        return 0
+
+    def _get_realtime_quote(self, stock_code: str):
+        try:
+            self.fetcher.upstream.call('realtime')
+        except DataFetchError:
+            return None
+        quote = self.fetcher.fixtures.realtime_quote(stock_code)
+        self._stock_name_cache[stock_code] = quote.name
+        return quote
+
+    def _get_chip_distribution(self, stock_code: str):
+        try:
+            self.fetcher.upstream.call('chip')
+        except DataFetchError:
+            return None
+        return self.fetcher.fixtures.chip_distribution(stock_code)
+
+    def get_stock_name(self, stock_code: str) -> Optional[str]:
+        return self.fetcher.fixtures.stock_name(stock_code)
+
+
+class FakeSearchProvider(BaseSearchProvider):
+    """回放录制搜索结果的搜索引擎"""
+
+    def __init__(self, fixtures: FixtureStore, upstream: UpstreamSimulator, keys: int = 2):
+        super().__init__([f"bench-key-{i}" for i in range(keys)], "Benchmark")
+        self.fixtures = fixtures
+        self.upstream = upstream
+
+    def _do_search(self, query: str, api_key: str, max_results: int, days: int = 7) -> SearchResponse:
+        self.upstream.call('search')
+        return SearchResponse(
+            query=query,
+            results=self.fixtures.search_results(query)[:max_results],
+            provider=self.name,
+        )
+
+
+class FakeLLMAnalyzer(GeminiAnalyzer):
+    """回放录制响应的 AI 分析器（经过真实的 LLM 调度与响应解析）"""
+
+    MODEL_NAME = "benchmark-llm"
+
+    def __init__(self, fixtures: FixtureStore, upstream: UpstreamSimulator):
+        self.fixtures = fixtures
+        self.upstream = upstream
+        super().__init__(api_key="benchmark-offline-key")
+
+    def _init_model(self) -> None:
+        # 不创建真实客户端，只标记为可用
+        self._gemini_client = self
+        self._current_model_name = self.MODEL_NAME
+
+    def _call_api_uncached(self, prompt: str, generation_config: dict) -> str:
+        scheduler = get_llm_scheduler()
+        ticket = scheduler.acquire("benchmark", self.MODEL_NAME, estimate_tokens(self.SYSTEM_PROMPT, prompt))
+        with trace_span("llm.request", source=f"benchmark:{self.MODEL_NAME}"):
+            self.upstream.call('llm')
+        response = self._respond(prompt)
+        scheduler.settle(ticket, estimate_tokens(self.SYSTEM_PROMPT, prompt, response))
+        return response
+
+    async def _call_api_uncached_async(self, prompt: str, generation_config: dict) -> str:
+        scheduler = get_llm_scheduler()
+        ticket = await scheduler.acquire_async("benchmark", self.MODEL_NAME, estimate_tokens(self.SYSTEM_PROMPT, prompt))
+        async with request_slot():
+            with trace_span("llm.request", source=f"benchmark:{self.MODEL_NAME}"):
+                await self.upstream.call_async('llm')
+        response = self._respond(prompt)
+        scheduler.settle(ticket, estimate_tokens(self.SYSTEM_PROMPT, prompt, response))
+        return response
+
+    def _respond(self, prompt: str) -> str:
+        batch_codes = _extract_batch_codes(prompt)
+        if batch_codes:
+            return self.fixtures.llm_batch_response(batch_codes)
+        return self.fixtures.llm_response(_extract_code(prompt))
+
+
+def _extract_code(prompt: str) -> str:
+    """从 Prompt 的基础信息（完整版表格 / 精简版标题）中取回股票代码"""
+    match = re.search(r"股票代码 (?:\| )?\*\*([^*]+)\*\*", prompt)
+    return match.group(1) if match else ""
+
+
+def _extract_batch_codes(prompt: str) -> List[str]:
+    """从批量 Prompt 的各股票段落标题中取回股票代码"""
+    return re.findall(r"^## 股票 \d+：(\S+) ", prompt, flags=re.MULTILINE)
+
+
+def build_fake_components(
+    latencies: Optional[Dict[str, LatencyProfile]] = None,
+    search: bool = True,
+    seed: int = 42,
+    fixture_path: Path = DEFAULT_FIXTURE,
+) -> PipelineComponents:
+    """
+    组装离线共享组件容器
+
+    Args:
+        latencies: 各上游的延迟分布（缺省使用 DEFAULT_LATENCIES）
+        search: 是否启用搜索（关闭后跳过情报搜索阶段）
+        seed: 随机种子（延迟与错误可复现）
+    """
+    fixtures = FixtureStore(fixture_path)
+    upstream = UpstreamSimulator(latencies if latencies is not None else DEFAULT_LATENCIES, seed=seed)
+    search_service = SearchService()
+    if search:
+        search_service._providers = [FakeSearchProvider(fixtures, upstream)]
+
+    components = PipelineComponents()
+    components._components.update({
+        'fetcher_manager': FakeFetcherManager(FakeFetcher(fixtures, upstream)),
+        'analyzer': FakeLLMAnalyzer(fixtures, upstream),
+        'search_service': search_service,
+    })
+    return components
+
+
+def synthetic_codes(count: int, start: int = 600000) -> List[str]:
+    """生成 count 个 6 位 A 股代码（跳过录制样本本身）"""
+    return [f"{start + i:06d}" for i in range(count)]
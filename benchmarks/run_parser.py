@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - LLM 响应解析基准测试
+===================================
+
+职责：
+1. 以录制的 LLM 响应为语料，派生出模型常见的输出形态（裸 JSON、代码块、夹杂说明文字、
+   尾随逗号、注释、Python 布尔值、被截断、评分为字符串、纯文本等）
+2. 对比旧解析路径（总是正则修复 + json_repair）与快路径（严格解析优先、结构校验、失败才修复）
+3. 报告每种形态的单次解析耗时与恢复率（解析出对象且核心字段正确）
+
+用法：
+    python -m benchmarks.run_parser
+    python -m benchmarks.run_parser --repeat 500 --json-out parser.json
+    python -m benchmarks.run_parser --corpus data/stock_analysis.db   # 使用本地 LLM 响应缓存中的真实响应
+    python -m benchmarks.run_parser --corpus responses.jsonl          # 每行 {"name": ..., "text": ...}
+"""
+
+import argparse
+import copy
+import json
+import logging
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.response_parser import DASHBOARD_SCHEMA, parse_json_response, repair_json_text, validate_fields  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+FIXTURES_DIR = PROJECT_ROOT / 'benchmarks' / 'fixtures'
+
+
+def legacy_parse(text: str) -> Optional[Dict[str, Any]]:
+    """旧实现：去掉全部代码块标记，截取首尾大括号之间的内容，总是修复后再解析"""
+    cleaned = text.replace('```json', '').replace('```', '')
+    start = cleaned.find('{')
+    end = cleaned.rfind('}') + 1
+    if start < 0 or end <= start:
+        return None
+    try:
+        return json.loads(repair_json_text(cleaned[start:end]))
+    except json.JSONDecodeError:
+        return None
+
+
+def fast_parse(text: str) -> Optional[Dict[str, Any]]:
+    """新实现：严格解析优先，失败才修复，并按仪表盘结构纠正字段"""
+    outcome = parse_json_response(text)
+    if outcome.data is None:
+        return None
+    validate_fields(outcome.data, DASHBOARD_SCHEMA, fix=True)
+    return outcome.data
+
+
+def _variants(text: str) -> Dict[str, str]:
+    """由一条录制响应派生出模型常见的输出形态"""
+    data = parse_json_response(text).data
+    native = json.dumps(data, ensure_ascii=False, indent=2)
+    lines = native.split('\n')
+    score_line = next(i for i, line in enumerate(lines) if '"sentiment_score"' in line)
+    commented = lines[:score_line] + ['  // 综合技术面与消息面给出的评分'] + lines[score_line:]
+    return {
+        'native_json': native,
+        'fenced': text,
+        'prose_wrapped': f"以下是分析结果：\n\n{text}\n\n以上分析仅供参考，不构成投资建议。",
+        'prose_with_braces': f"根据 {{技术面}} 与 {{消息面}} 数据，结果如下：\n{text}",
+        'trailing_commas': native.replace('\n  }', ',\n  }').replace('\n}', ',\n}'),
+        'comments': '\n'.join(commented),
+        'python_bools': native.replace('true', 'True').replace('false', 'False'),
+        'string_score': native.replace(
+            f'"sentiment_score": {data["sentiment_score"]}', f'"sentiment_score": "{data["sentiment_score"]}"'
+        ),
+        'truncated': native[:int(len(native) * 0.85)],
+        'text_only': "该股均线多头排列，量能平稳，建议持有观望，跌破 MA20 止损。",
+    }
+
+
+def builtin_corpus() -> List[Dict[str, Any]]:
+    """录制的夹具响应及其派生形态；expected 为原始响应中的核心字段"""
+    corpus = []
+    for path in sorted(FIXTURES_DIR.glob('*.json')):
+        with open(path, encoding='utf-8') as f:
+            recorded = json.load(f)
+        text = recorded.get('llm_response')
+        if not text:
+            continue
+        truth = parse_json_response(text).data
+        expected = {key: truth[key] for key in ('sentiment_score', 'operation_advice')}
+        for kind, variant in _variants(text).items():
+            corpus.append({
+                'name': f"{path.stem}:{kind}",
+                'text': variant,
+                'expected': None if kind == 'text_only' else expected,
+            })
+    return corpus
+
+
+def load_corpus(path: str) -> List[Dict[str, Any]]:
+    """读取外部语料：SQLite 数据库（llm_response_cache 表）或 JSONL 文件"""
+    if path.endswith('.db'):
+        with sqlite3.connect(path) as conn:
+            rows = conn.execute("SELECT cache_key, response FROM llm_response_cache").fetchall()
+        return [{'name': key[:12], 'text': text, 'expected': None} for key, text in rows]
+    corpus = []
+    with open(path, encoding='utf-8') as f:
+        for index, line in enumerate(f):
+            if line.strip():
+                item = json.loads(line)
+                corpus.append({'name': item.get('name', str(index)), 'text': item['text'],
+                               'expected': item.get('expected')})
+    return corpus
+
+
+def _recovered(data: Optional[Dict[str, Any]], expected: Optional[Dict[str, Any]]) -> bool:
+    """解析出对象、核心字段可用，且与期望值一致（如有）"""
+    if not isinstance(data, dict):
+        return False
+    checked = copy.deepcopy(data)
+    if validate_fields(checked, DASHBOARD_SCHEMA, fix=True):
+        return False
+    return not expected or all(checked.get(key) == value for key, value in expected.items())
+
+
+def _measure(parse: Callable[[str], Any], text: str, repeat: int) -> Dict[str, Any]:
+    data = parse(text)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        parse(text)
+    return {'us': (time.perf_counter() - started) / repeat * 1e6, 'data': data}
+
+
+def run(corpus: List[Dict[str, Any]], repeat: int) -> Dict[str, Any]:
+    """逐条测量两种实现的耗时与恢复情况"""
+    rows = []
+    for item in corpus:
+        row = {'name': item['name'], 'chars': len(item['text'])}
+        for label, parse in (('legacy', legacy_parse), ('fast', fast_parse)):
+            measured = _measure(parse, item['text'], repeat)
+            row[f'{label}_us'] = round(measured['us'], 1)
+            row[f'{label}_ok'] = _recovered(measured['data'], item['expected'])
+        row['stage'] = parse_json_response(item['text']).stage
+        rows.append(row)
+
+    count = len(rows) or 1
+    summary = {
+        label: {
+            'mean_us': round(sum(r[f'{label}_us'] for r in rows) / count, 1),
+            'recovery_rate': round(sum(r[f'{label}_ok'] for r in rows) / count, 3),
+        }
+        for label in ('legacy', 'fast')
+    }
+    summary['strict_ratio'] = round(sum(r['stage'] == 'strict' for r in rows) / count, 3)
+    return {'responses': len(rows), 'repeat': repeat, 'rows': rows, 'summary': summary}
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """渲染为 Markdown 表格"""
+    lines = [
+        "| 响应 | 字符数 | 旧实现(µs) | 快路径(µs) | 快路径阶段 | 旧实现恢复 | 快路径恢复 |",
+        "|------|------:|-----------:|-----------:|-----------|:---------:|:---------:|",
+    ]
+    mark = {True: '✓', False: '✗'}
+    for r in report['rows']:
+        lines.append(
+            f"| {r['name']} | {r['chars']} | {r['legacy_us']:.1f} | {r['fast_us']:.1f} | {r['stage']} | "
+            f"{mark[r['legacy_ok']]} | {mark[r['fast_ok']]} |"
+        )
+    s = report['summary']
+    speedup = s['legacy']['mean_us'] / s['fast']['mean_us'] if s['fast']['mean_us'] else 0.0
+    lines += [
+        "",
+        f"共 {report['responses']} 条响应，每条重复 {report['repeat']} 次；严格解析直接成功 {s['strict_ratio']:.0%}",
+        f"旧实现：平均 {s['legacy']['mean_us']:.1f} µs，恢复率 {s['legacy']['recovery_rate']:.0%}",
+        f"快路径：平均 {s['fast']['mean_us']:.1f} µs，恢复率 {s['fast']['recovery_rate']:.0%}（{speedup:.1f}x）",
+    ]
+    return "\n".join(lines)
+
+
+def parse_arguments(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='LLM 响应解析基准测试（速度与恢复率）')
+    parser.add_argument('--corpus', type=str, default=None,
+                        help='外部语料：SQLite 数据库（读取 llm_response_cache）或 JSONL 文件；默认使用录制夹具')
+    parser.add_argument('--repeat', type=int, default=200, help='每条响应的重复解析次数')
+    parser.add_argument('--json-out', type=str, default=None, help='将结果写入 JSON 文件')
+    parser.add_argument('--quiet', action='store_true', help='不输出表格')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_arguments(argv)
+    # 修复路径会打印 json_repair 的告警，基准测试只关心结果
+    logging.basicConfig(level=logging.ERROR)
+
+    corpus = load_corpus(args.corpus) if args.corpus else builtin_corpus()
+    if not corpus:
+        logger.error("语料为空")
+        return 1
+    report = run(corpus, args.repeat)
+
+    if args.json_out:
+        with open(args.json_out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if not args.quiet:
+        print(format_report(report))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
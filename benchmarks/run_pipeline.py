@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 全流程离线基准测试
+===================================
+
+职责：
+1. 用录制数据替身驱动 StockAnalysisPipeline.run，不访问任何外部服务
+2. 按 10/100/1000 只股票等规模分别运行，报告墙钟耗时、吞吐、峰值内存
+3. 基于追踪 span 汇总各阶段延迟（p50/p95）与关键路径占比
+
+用法：
+    python -m benchmarks.run_pipeline --sizes 10 100 1000
+    python -m benchmarks.run_pipeline --sizes 100 --latency-scale 0.1 --json-out bench.json
+    python -m benchmarks.run_pipeline --sizes 10 --no-search --error-rate 0
+
+每个规模默认在独立子进程中运行，保证峰值内存（ru_maxrss）互不影响。
+"""
+
+import argparse
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+logger = logging.getLogger(__name__)
+
+
+def _peak_rss_mb() -> float:
+    """当前进程的峰值常驻内存（MB）"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def _configure_environment(workdir: str, args: argparse.Namespace) -> None:
+    """在加载配置前设置基准测试专用的环境变量"""
+    os.environ['DATABASE_PATH'] = os.path.join(workdir, 'benchmark.db')
+    os.environ['PROFILE_DIR'] = os.path.join(workdir, 'profiles')
+    os.environ['TRACING_ENABLED'] = 'true'
+    os.environ['REPORT_TYPE'] = args.report_type
+    os.environ['SINGLE_STOCK_NOTIFY'] = 'false'
+    # 录制回放不受真实配额约束：LLM 调度器不限速
+    os.environ['LLM_DEFAULT_RPM'] = str(args.llm_rpm)
+    os.environ['LLM_DEFAULT_TPM'] = '0'
+    os.environ['LLM_ASYNC_ENABLED'] = 'true' if args.llm_async else 'false'
+    for name, value in (
+        ('PIPELINE_FETCH_WORKERS', args.fetch_workers),
+        ('PIPELINE_SEARCH_WORKERS', args.search_workers),
+        ('PIPELINE_LLM_WORKERS', args.llm_workers),
+        ('LLM_ASYNC_CONCURRENCY', args.llm_concurrency),
+        ('LLM_BATCH_SIZE', args.llm_batch),
+        ('LLM_PROMPT_TOKEN_BUDGET', args.prompt_budget),
+    ):
+        if value is not None:
+            os.environ[name] = str(value)
+
+
+def run_once(size: int, args: argparse.Namespace) -> Dict[str, Any]:
+    """在当前进程中运行一次指定规模的基准测试"""
+    with tempfile.TemporaryDirectory(prefix='stock_bench_') as workdir:
+        _configure_environment(workdir, args)
+
+        from benchmarks.fakes import DEFAULT_LATENCIES, build_fake_components, synthetic_codes
+        from src.config import Config
+        from src.core.job_scheduler import reset_job_scheduler
+        from src.core.pipeline import StockAnalysisPipeline
+        from src.llm_scheduler import reset_llm_scheduler
+        from src.storage import DatabaseManager
+        from src.tracing import build_run_profile, get_tracer, reset_tracer
+
+        Config._instance = None
+        DatabaseManager.reset_instance()
+        reset_llm_scheduler()
+        reset_job_scheduler()
+        reset_tracer()
+
+        latencies = {}
+        for kind, profile in DEFAULT_LATENCIES.items():
+            scaled = profile.scaled(args.latency_scale)
+            if args.error_rate is not None:
+                scaled.error_rate = args.error_rate
+            latencies[kind] = scaled
+
+        components = build_fake_components(latencies=latencies, search=not args.no_search, seed=args.seed)
+        pipeline = StockAnalysisPipeline(components=components, query_source='benchmark')
+        codes = synthetic_codes(size)
+
+        started = time.time()
+        results = pipeline.run(stock_codes=codes, send_notification=False)
+        finished = time.time()
+
+        profile = build_run_profile(get_tracer().spans(since=started), started, finished, codes)
+        wall = finished - started
+        report = {
+            'size': size,
+            'completed': len(results),
+            'failed': size - len(results),
+            'wall_seconds': round(wall, 3),
+            'throughput_per_min': round(len(results) / wall * 60, 2) if wall > 0 else 0.0,
+            'peak_rss_mb': round(_peak_rss_mb(), 1),
+            'stages': profile.get('stages', {}),
+            'prompts': profile.get('prompts', {}),
+        }
+        DatabaseManager.reset_instance()
+        return report
+
+
+def _run_isolated(size: int, argv: List[str]) -> Optional[Dict[str, Any]]:
+    """在独立子进程中运行单个规模，返回其 JSON 报告"""
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+        out_path = f.name
+    try:
+        cmd = [sys.executable, '-m', 'benchmarks.run_pipeline', *argv,
+               '--sizes', str(size), '--in-process', '--json-out', out_path, '--quiet']
+        completed = subprocess.run(cmd, cwd=str(PROJECT_ROOT))
+        if completed.returncode != 0:
+            logger.error(f"规模 {size} 的基准测试子进程失败 (exit={completed.returncode})")
+            return None
+        with open(out_path, encoding='utf-8') as f:
+            return json.load(f)[0]
+    finally:
+        os.unlink(out_path)
+
+
+def format_report(reports: List[Dict[str, Any]]) -> str:
+    """渲染为 Markdown 表格"""
+    lines = [
+        "| 股票数 | 完成 | 墙钟(秒) | 吞吐(只/分钟) | 峰值内存(MB) |",
+        "|-------:|-----:|---------:|--------------:|-------------:|",
+    ]
+    for r in reports:
+        lines.append(
+            f"| {r['size']} | {r['completed']} | {r['wall_seconds']:.2f} | "
+            f"{r['throughput_per_min']:.1f} | {r['peak_rss_mb']:.1f} |"
+        )
+
+    stage_names = sorted({name for r in reports for name in r['stages']})
+    if stage_names:
+        lines += ["", "| 阶段 | " + " | ".join(f"{r['size']} 只 p50/p95(秒)" for r in reports) + " |",
+                  "|------|" + "|".join("---:" for _ in reports) + "|"]
+        for name in stage_names:
+            cells = []
+            for r in reports:
+                stage = r['stages'].get(name)
+                cells.append(f"{stage['p50']:.3f} / {stage['p95']:.3f}" if stage else "-")
+            lines.append(f"| {name} | " + " | ".join(cells) + " |")
+
+    if any(r.get('prompts') for r in reports):
+        lines += ["", "| 股票数 | 提示词 tokens（合计） | 精简前 | 节省 | 单次 P50 |",
+                  "|-------:|------:|------:|-----:|------:|"]
+        for r in reports:
+            p = r.get('prompts')
+            if p:
+                lines.append(
+                    f"| {r['size']} | {p['tokens']} | {p['raw_tokens']} | {p['saved_ratio']:.0%} | {p['p50']} |"
+                )
+    return "\n".join(lines)
+
+
+def parse_arguments(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='分析流水线离线基准测试（录制数据回放）')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000], help='股票数量规模')
+    parser.add_argument('--latency-scale', type=float, default=1.0,
+                        help='上游延迟缩放系数（0 表示无延迟，仅测框架开销）')
+    parser.add_argument('--error-rate', type=float, default=None, help='统一覆盖各上游的错误率')
+    parser.add_argument('--no-search', action='store_true', help='禁用情报搜索阶段')
+    parser.add_argument('--report-type', choices=['simple', 'full'], default='simple', help='报告类型')
+    parser.add_argument('--llm-rpm', type=int, default=0, help='LLM 调度器每分钟请求上限（0 表示不限）')
+    parser.add_argument('--fetch-workers', type=int, default=None, help='数据获取阶段线程数')
+    parser.add_argument('--search-workers', type=int, default=None, help='情报搜索阶段线程数')
+    parser.add_argument('--llm-workers', type=int, default=None, help='AI 分析阶段线程数')
+    parser.add_argument('--llm-async', action='store_true', help='使用异步 LLM 客户端（事件循环并发请求）')
+    parser.add_argument('--llm-concurrency', type=int, default=None, help='异步模式下同时进行中的 LLM 请求上限')
+    parser.add_argument('--llm-batch', type=int, default=None, help='精简报告批量模式：每次 LLM 请求打包的股票数')
+    parser.add_argument('--prompt-budget', type=int, default=None, help='单股提示词 Token 预算（0 表示不限）')
+    parser.add_argument('--seed', type=int, default=42, help='延迟/错误随机种子')
+    parser.add_argument('--json-out', type=str, default=None, help='将结果写入 JSON 文件')
+    parser.add_argument('--in-process', action='store_true', help='所有规模在当前进程中运行')
+    parser.add_argument('--quiet', action='store_true', help='只输出警告及以上日志')
+    return parser.parse_args(argv)
+
+
+def _passthrough_argv(argv: List[str]) -> List[str]:
+    """去掉由父进程逐个规模重新指定的参数"""
+    result, skip = [], False
+    for arg in argv:
+        if skip:
+            if arg.startswith('--'):
+                skip = False
+            else:
+                continue
+        if arg in ('--sizes', '--json-out'):
+            skip = True
+            continue
+        if arg in ('--in-process', '--quiet'):
+            continue
+        result.append(arg)
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    args = parse_arguments(argv)
+    logging.basicConfig(
+        level=logging.WARNING if args.quiet else logging.INFO,
+        format='%(asctime)s | %(levelname)-8s | %(name)s | %(message)s',
+    )
+
+    reports: List[Dict[str, Any]] = []
+    for size in args.sizes:
+        if args.in_process:
+            report = run_once(size, args)
+        else:
+            report = _run_isolated(size, _passthrough_argv(argv))
+        if report is not None:
+            reports.append(report)
+
+    if args.json_out:
+        with open(args.json_out, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
+    if not args.quiet:
+        print(format_report(reports))
+    return 0 if len(reports) == len(args.sizes) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
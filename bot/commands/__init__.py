@@ -13,6 +13,7 @@ from bot.commands.status import StatusCommand
 from bot.commands.analyze import AnalyzeCommand
 from bot.commands.market import MarketCommand
 from bot.commands.batch import BatchCommand
+from bot.commands.screen import ScreenCommand
 
 # 所有可用命令（用于自动注册）
 ALL_COMMANDS = [
@@ -21,6 +22,7 @@ ALL_COMMANDS = [
     AnalyzeCommand,
     MarketCommand,
     BatchCommand,
+    ScreenCommand,
 ]
 
 __all__ = [
@@ -30,5 +32,6 @@ __all__ = [
     'AnalyzeCommand',
     'MarketCommand',
     'BatchCommand',
+    'ScreenCommand',
     'ALL_COMMANDS',
 ]
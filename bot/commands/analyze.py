@@ -90,12 +90,18 @@ class AnalyzeCommand(BotCommand):
             
             if result.get("success"):
                 task_id = result.get("task_id", "")
+                if result.get("reused"):
+                    title, footer = "已复用最近的分析结果", "结果将直接推送到当前会话。"
+                elif result.get("coalesced"):
+                    title, footer = "已合并到进行中的相同分析", "分析完成后将自动推送结果。"
+                else:
+                    title, footer = "分析任务已提交", "分析完成后将自动推送结果。"
                 return BotResponse.markdown_response(
-                    f"✅ **分析任务已提交**\n\n"
+                    f"✅ **{title}**\n\n"
                     f"• 股票代码: `{code}`\n"
                     f"• 报告类型: {ReportType.from_str(report_type).display_name}\n"
                     f"• 任务 ID: `{task_id[:20]}...`\n\n"
-                    f"分析完成后将自动推送结果。"
+                    f"{footer}"
                 )
             else:
                 error = result.get("error", "未知错误")
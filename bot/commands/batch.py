@@ -101,6 +101,7 @@ class BatchCommand(BotCommand):
         try:
             from src.config import get_config
             from main import StockAnalysisPipeline
+            from src.enums import JobPriority
             
             config = get_config()
             
@@ -109,7 +110,9 @@ class BatchCommand(BotCommand):
                 config=config,
                 source_message=message,
                 query_id=uuid.uuid4().hex,
-                query_source="bot"
+                query_source="bot",
+                # 批量优先级：每只股票的各阶段在股票边界处让出给交互式分析
+                priority=JobPriority.BATCH
             )
             
             # 执行分析（会自动推送汇总报告）
@@ -100,6 +100,8 @@ class HelpCommand(BotCommand):
             f"• {prefix}market - 查看大盘复盘",
             "",
             f"• {prefix}batch - 批量分析自选股",
+            "",
+            f"• {prefix}screen 10 - 全市场技术面选股前 10 只",
         ])
         
         return "\n".join(lines)
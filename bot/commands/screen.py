@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+全市场选股命令
+===================================
+
+对全市场 A 股做技术面评分并返回候选池，可选将候选池交给 AI 分析。
+"""
+
+import logging
+import threading
+from typing import List, Optional
+
+from bot.commands.base import BotCommand
+from bot.models import BotMessage, BotResponse
+
+logger = logging.getLogger(__name__)
+
+# 触发 AI 分析的参数
+_ANALYZE_ARGS = {"analyze", "ai", "分析"}
+
+
+class ScreenCommand(BotCommand):
+    """
+    全市场选股命令
+
+    用法：
+        /screen             - 返回评分最高的候选池（默认 SCREENER_TOP_N 只）
+        /screen 10          - 只返回前 10 只
+        /screen 5 analyze   - 返回前 5 只并交给 AI 分析，完成后推送汇总报告
+    """
+
+    @property
+    def name(self) -> str:
+        return "screen"
+
+    @property
+    def aliases(self) -> List[str]:
+        return ["sc", "选股"]
+
+    @property
+    def description(self) -> str:
+        return "全市场技术面选股"
+
+    @property
+    def usage(self) -> str:
+        return "/screen [数量] [analyze]"
+
+    def validate_args(self, args: List[str]) -> Optional[str]:
+        """验证参数"""
+        for arg in args:
+            if arg.lower() in _ANALYZE_ARGS:
+                continue
+            if not arg.isdigit() or int(arg) <= 0:
+                return f"无效的参数: {arg}"
+        return None
+
+    def execute(self, message: BotMessage, args: List[str]) -> BotResponse:
+        """执行选股命令"""
+        from src.screener import MarketScreener
+
+        top_n = next((int(arg) for arg in args if arg.isdigit()), None)
+        analyze = any(arg.lower() in _ANALYZE_ARGS for arg in args)
+
+        try:
+            screener = MarketScreener()
+            result = screener.screen(top_n=top_n)
+        except Exception as e:
+            logger.error(f"[ScreenCommand] 选股失败: {e}")
+            return BotResponse.error_response(f"选股失败: {str(e)[:100]}")
+
+        text = result.to_markdown()
+        if analyze and result.codes:
+            thread = threading.Thread(
+                target=self._run_analysis,
+                args=(screener, result, message),
+                daemon=True
+            )
+            thread.start()
+            count = screener.analyze_limit(len(result.codes))
+            text += f"\n\n✅ 已将候选池前 {count} 只交给 AI 分析，完成后将自动推送汇总报告。"
+
+        return BotResponse.markdown_response(text)
+
+    @staticmethod
+    def _run_analysis(screener, result, message: BotMessage) -> None:
+        """后台对候选池执行 AI 分析"""
+        try:
+            results = screener.analyze_top(result, source_message=message)
+            logger.info(f"[ScreenCommand] 候选池分析完成，成功 {len(results)} 只")
+        except Exception as e:
+            logger.error(f"[ScreenCommand] 候选池分析失败: {e}")
+            logger.exception(e)
@@ -40,7 +40,7 @@ from tenacity import (
     before_sleep_log,
 )
 
-from .base import BaseFetcher, DataFetchError, RateLimitError, STANDARD_COLUMNS
+from .base import BaseFetcher, DataFetchError, RateLimitError, STANDARD_COLUMNS, normalize_snapshot
 from .realtime_types import (
     UnifiedRealtimeQuote, ChipDistribution, RealtimeSource,
     get_realtime_circuit_breaker, get_chip_circuit_breaker,
@@ -726,6 +726,74 @@ class AkshareFetcher(BaseFetcher):
             else:
                 return self._get_stock_realtime_quote_em(stock_code)
     
+    def _load_spot_em(self, max_age: Optional[float] = None) -> pd.DataFrame:
+        """
+        获取东财全市场 A 股行情表（ak.stock_zh_a_spot_em，带缓存）
+
+        失败时缓存空表，避免同一轮任务对同一接口反复请求
+
+        Args:
+            max_age: 可接受的缓存最大年龄（秒），默认为缓存有效期
+        """
+        import akshare as ak
+        circuit_breaker = get_realtime_circuit_breaker()
+        source_key = "akshare_em"
+
+        # 检查缓存
+        current_time = time.time()
+        ttl = _realtime_cache['ttl'] if max_age is None else min(max_age, _realtime_cache['ttl'])
+        if (_realtime_cache['data'] is not None and 
+            current_time - _realtime_cache['timestamp'] < ttl):
+            df = _realtime_cache['data']
+            cache_age = int(current_time - _realtime_cache['timestamp'])
+            logger.debug(f"[缓存命中] A股实时行情(东财) - 缓存年龄 {cache_age}s/{_realtime_cache['ttl']}s")
+        else:
+            # 触发全量刷新
+            logger.info(f"[缓存未命中] 触发全量刷新 A股实时行情(东财)")
+            last_error: Optional[Exception] = None
+            df = None
+            for attempt in range(1, 3):
+                try:
+                    # 防封禁策略
+                    self._set_random_user_agent()
+                    self._enforce_rate_limit()
+
+                    logger.info(f"[API调用] ak.stock_zh_a_spot_em() 获取A股实时行情... (attempt {attempt}/2)")
+                    import time as _time
+                    api_start = _time.time()
+
+                    df = ak.stock_zh_a_spot_em()
+
+                    api_elapsed = _time.time() - api_start
+                    logger.info(f"[API返回] ak.stock_zh_a_spot_em 成功: 返回 {len(df)} 只股票, 耗时 {api_elapsed:.2f}s")
+                    circuit_breaker.record_success(source_key)
+                    break
+                except Exception as e:
+                    last_error = e
+                    logger.warning(f"[API错误] ak.stock_zh_a_spot_em 获取失败 (attempt {attempt}/2): {e}")
+                    time.sleep(min(2 ** attempt, 5))
+
+            # 更新缓存：成功缓存数据；失败也缓存空数据，避免同一轮任务对同一接口反复请求
+            if df is None:
+                logger.error(f"[API错误] ak.stock_zh_a_spot_em 最终失败: {last_error}")
+                circuit_breaker.record_failure(source_key, str(last_error))
+                df = pd.DataFrame()
+            _realtime_cache['data'] = df
+            _realtime_cache['timestamp'] = current_time
+            logger.info(f"[缓存更新] A股实时行情(东财) 缓存已刷新，TTL={_realtime_cache['ttl']}s")
+        return df
+
+    def get_realtime_snapshot(self, max_age: Optional[float] = None) -> Optional[pd.DataFrame]:
+        """全市场 A 股实时行情快照（东方财富）"""
+        df = self._load_spot_em(max_age=max_age)
+        if df is None or df.empty:
+            return None
+        # 东方财富行情接口的成交量单位即为「手」，无需换算
+        return normalize_snapshot(df, {
+            '代码': 'code', '名称': 'name', '最新价': 'price', '今开': 'open', '最高': 'high',
+            '最低': 'low', '成交量': 'volume', '成交额': 'amount', '涨跌幅': 'change_pct',
+        })
+
     def _get_stock_realtime_quote_em(self, stock_code: str) -> Optional[UnifiedRealtimeQuote]:
         """
         获取普通 A 股实时行情数据（东方财富数据源）
@@ -734,52 +802,11 @@ class AkshareFetcher(BaseFetcher):
         优点：数据最全，含量比、换手率、市盈率、市净率、总市值、流通市值等
         缺点：全量拉取，数据量大，容易超时/限流
         """
-        import akshare as ak
         circuit_breaker = get_realtime_circuit_breaker()
         source_key = "akshare_em"
         
         try:
-            # 检查缓存
-            current_time = time.time()
-            if (_realtime_cache['data'] is not None and 
-                current_time - _realtime_cache['timestamp'] < _realtime_cache['ttl']):
-                df = _realtime_cache['data']
-                cache_age = int(current_time - _realtime_cache['timestamp'])
-                logger.debug(f"[缓存命中] A股实时行情(东财) - 缓存年龄 {cache_age}s/{_realtime_cache['ttl']}s")
-            else:
-                # 触发全量刷新
-                logger.info(f"[缓存未命中] 触发全量刷新 A股实时行情(东财)")
-                last_error: Optional[Exception] = None
-                df = None
-                for attempt in range(1, 3):
-                    try:
-                        # 防封禁策略
-                        self._set_random_user_agent()
-                        self._enforce_rate_limit()
-
-                        logger.info(f"[API调用] ak.stock_zh_a_spot_em() 获取A股实时行情... (attempt {attempt}/2)")
-                        import time as _time
-                        api_start = _time.time()
-
-                        df = ak.stock_zh_a_spot_em()
-
-                        api_elapsed = _time.time() - api_start
-                        logger.info(f"[API返回] ak.stock_zh_a_spot_em 成功: 返回 {len(df)} 只股票, 耗时 {api_elapsed:.2f}s")
-                        circuit_breaker.record_success(source_key)
-                        break
-                    except Exception as e:
-                        last_error = e
-                        logger.warning(f"[API错误] ak.stock_zh_a_spot_em 获取失败 (attempt {attempt}/2): {e}")
-                        time.sleep(min(2 ** attempt, 5))
-
-                # 更新缓存：成功缓存数据；失败也缓存空数据，避免同一轮任务对同一接口反复请求
-                if df is None:
-                    logger.error(f"[API错误] ak.stock_zh_a_spot_em 最终失败: {last_error}")
-                    circuit_breaker.record_failure(source_key, str(last_error))
-                    df = pd.DataFrame()
-                _realtime_cache['data'] = df
-                _realtime_cache['timestamp'] = current_time
-                logger.info(f"[缓存更新] A股实时行情(东财) 缓存已刷新，TTL={_realtime_cache['ttl']}s")
+            df = self._load_spot_em()
 
             if df is None or df.empty:
                 logger.warning(f"[实时行情] A股实时行情数据为空，跳过 {stock_code}")
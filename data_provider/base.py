@@ -37,6 +37,33 @@ logger = logging.getLogger(__name__)
 # === 标准化列名定义 ===
 STANDARD_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume', 'amount', 'pct_chg']
 
+# 全市场实时快照列名（volume 单位为手，amount 单位为元）
+SNAPSHOT_COLUMNS = ['code', 'name', 'price', 'open', 'high', 'low', 'volume', 'amount', 'change_pct']
+
+
+def normalize_snapshot(df: pd.DataFrame, column_mapping: Dict[str, str], volume_scale: float = 1.0) -> pd.DataFrame:
+    """
+    将数据源返回的全市场行情表转换为 SNAPSHOT_COLUMNS 格式
+
+    Args:
+        df: 原始行情表
+        column_mapping: {原始列名: 标准列名}，同一标准列可给出多个候选原始列名
+        volume_scale: 原始成交量换算为「手」的系数（数据源以股计时为 0.01）
+    """
+    renamed = df.rename(columns={k: v for k, v in column_mapping.items() if k in df.columns})
+    renamed = renamed.loc[:, ~renamed.columns.duplicated()]
+    snapshot = pd.DataFrame({
+        column: renamed[column] if column in renamed.columns else np.nan
+        for column in SNAPSHOT_COLUMNS
+    })
+    snapshot['code'] = snapshot['code'].astype(str).str.strip()
+    snapshot['name'] = snapshot['name'].fillna('').astype(str)
+    for column in SNAPSHOT_COLUMNS[2:]:
+        snapshot[column] = pd.to_numeric(snapshot[column], errors='coerce')
+    if volume_scale != 1.0:
+        snapshot['volume'] = snapshot['volume'] * volume_scale
+    return snapshot.reset_index(drop=True)
+
 
 class DataFetchError(Exception):
     """数据获取异常基类"""
@@ -111,6 +138,20 @@ class BaseFetcher(ABC):
         """
         return None
 
+    def get_realtime_snapshot(self, max_age: Optional[float] = None) -> Optional[pd.DataFrame]:
+        """
+        获取全市场 A 股实时行情快照（一次请求拉取全部股票）
+
+        Args:
+            max_age: 可接受的缓存最大年龄（秒），默认使用数据源自身的缓存有效期；
+                     盘中轮询时传入较小值以获取最新行情
+
+        Returns:
+            DataFrame，列为 SNAPSHOT_COLUMNS（code, name, price, open, high, low,
+            volume（手）, amount（元）, change_pct）；不支持全量接口的数据源返回 None
+        """
+        return None
+
     def get_market_stats(self) -> Optional[Dict[str, Any]]:
         """
         获取市场涨跌统计
@@ -381,17 +422,20 @@ class DataFetcherManager:
         Raises:
             DataFetchError: 所有数据源都失败时抛出
         """
+        from src.tracing import trace_span
+
         errors = []
         
         for fetcher in self._fetchers:
             try:
                 logger.info(f"尝试使用 [{fetcher.name}] 获取 {stock_code}...")
-                df = fetcher.get_daily_data(
-                    stock_code=stock_code,
-                    start_date=start_date,
-                    end_date=end_date,
-                    days=days
-                )
+                with trace_span("fetch.daily", code=stock_code, source=fetcher.name):
+                    df = fetcher.get_daily_data(
+                        stock_code=stock_code,
+                        start_date=start_date,
+                        end_date=end_date,
+                        days=days
+                    )
                 
                 if df is not None and not df.empty:
                     logger.info(f"[{fetcher.name}] 成功获取 {stock_code}")
@@ -505,9 +549,19 @@ class DataFetcherManager:
         Returns:
             UnifiedRealtimeQuote 对象，所有数据源都失败则返回 None
         """
+        from src.tracing import trace_span, annotate_span
+
+        with trace_span("fetch.realtime", code=stock_code):
+            quote = self._get_realtime_quote(stock_code)
+            annotate_span(hit=quote is not None)
+            return quote
+
+    def _get_realtime_quote(self, stock_code: str):
+        """get_realtime_quote 的实现（按配置优先级逐个数据源尝试）"""
         from .realtime_types import get_realtime_circuit_breaker
         from .akshare_fetcher import _is_us_code
         from src.config import get_config
+        from src.tracing import annotate_span
         
         config = get_config()
         
@@ -525,6 +579,7 @@ class DataFetcherManager:
                             quote = fetcher.get_realtime_quote(stock_code)
                             if quote is not None:
                                 logger.info(f"[实时行情] 美股 {stock_code} 成功获取 (来源: yfinance)")
+                                annotate_span(source="yfinance")
                                 return quote
                         except Exception as e:
                             logger.warning(f"[实时行情] 美股 {stock_code} 获取失败: {e}")
@@ -585,6 +640,7 @@ class DataFetcherManager:
                 
                 if quote is not None and quote.has_basic_data():
                     logger.info(f"[实时行情] {stock_code} 成功获取 (来源: {source})")
+                    annotate_span(source=source)
                     return quote
                     
             except Exception as e:
@@ -617,8 +673,16 @@ class DataFetcherManager:
         Returns:
             ChipDistribution 对象，失败则返回 None
         """
+        from src.tracing import trace_span
+
+        with trace_span("fetch.chip", code=stock_code):
+            return self._get_chip_distribution(stock_code)
+
+    def _get_chip_distribution(self, stock_code: str):
+        """get_chip_distribution 的实现（熔断 + 多数据源降级）"""
         from .realtime_types import get_chip_circuit_breaker
         from src.config import get_config
+        from src.tracing import annotate_span
 
         config = get_config()
 
@@ -650,6 +714,7 @@ class DataFetcherManager:
                             if chip is not None:
                                 circuit_breaker.record_success(source_key)
                                 logger.info(f"[筹码分布] {stock_code} 成功获取 (来源: {fetcher_name})")
+                                annotate_span(source=fetcher_name)
                                 return chip
                         break
             except Exception as e:
@@ -782,6 +847,23 @@ class DataFetcherManager:
                 continue
         return []
 
+    def get_realtime_snapshot(self, max_age: Optional[float] = None) -> Optional[pd.DataFrame]:
+        """获取全市场实时行情快照（自动切换数据源）"""
+        from src.tracing import trace_span, annotate_span
+
+        with trace_span("fetch.snapshot"):
+            for fetcher in self._fetchers:
+                try:
+                    snapshot = fetcher.get_realtime_snapshot(max_age=max_age)
+                    if snapshot is not None and not snapshot.empty:
+                        logger.info(f"[{fetcher.name}] 获取全市场行情快照成功: {len(snapshot)} 只")
+                        annotate_span(source=fetcher.name, rows=len(snapshot))
+                        return snapshot
+                except Exception as e:
+                    logger.warning(f"[{fetcher.name}] 获取全市场行情快照失败: {e}")
+                    continue
+        return None
+
     def get_market_stats(self) -> Dict[str, Any]:
         """获取市场涨跌统计（自动切换数据源）"""
         for fetcher in self._fetchers:
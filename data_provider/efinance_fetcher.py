@@ -39,7 +39,7 @@ from tenacity import (
     before_sleep_log,
 )
 
-from .base import BaseFetcher, DataFetchError, RateLimitError, STANDARD_COLUMNS
+from .base import BaseFetcher, DataFetchError, RateLimitError, STANDARD_COLUMNS, normalize_snapshot
 from .realtime_types import (
     UnifiedRealtimeQuote, RealtimeSource,
     get_realtime_circuit_breaker,
@@ -441,6 +441,62 @@ class EfinanceFetcher(BaseFetcher):
         
         return df
     
+    def _load_realtime_quotes(self, max_age: Optional[float] = None) -> pd.DataFrame:
+        """获取全市场实时行情表（ef.stock.get_realtime_quotes，带缓存；max_age 为可接受的缓存最大年龄）"""
+        import efinance as ef
+        circuit_breaker = get_realtime_circuit_breaker()
+        source_key = "efinance"
+
+        # 检查缓存
+        current_time = time.time()
+        ttl = _realtime_cache['ttl'] if max_age is None else min(max_age, _realtime_cache['ttl'])
+        if (_realtime_cache['data'] is not None and 
+            current_time - _realtime_cache['timestamp'] < ttl):
+            df = _realtime_cache['data']
+            cache_age = int(current_time - _realtime_cache['timestamp'])
+            logger.debug(f"[缓存命中] 实时行情(efinance) - 缓存年龄 {cache_age}s/{_realtime_cache['ttl']}s")
+        else:
+            # 触发全量刷新
+            logger.info(f"[缓存未命中] 触发全量刷新 实时行情(efinance)")
+            # 防封禁策略
+            self._set_random_user_agent()
+            self._enforce_rate_limit()
+            
+            logger.info(f"[API调用] ef.stock.get_realtime_quotes() 获取实时行情...")
+            import time as _time
+            api_start = _time.time()
+            
+            # efinance 的实时行情 API
+            df = ef.stock.get_realtime_quotes()
+            
+            api_elapsed = _time.time() - api_start
+            logger.info(f"[API返回] ef.stock.get_realtime_quotes 成功: 返回 {len(df)} 只股票, 耗时 {api_elapsed:.2f}s")
+            circuit_breaker.record_success(source_key)
+            
+            # 更新缓存
+            _realtime_cache['data'] = df
+            _realtime_cache['timestamp'] = current_time
+            logger.info(f"[缓存更新] 实时行情(efinance) 缓存已刷新，TTL={_realtime_cache['ttl']}s")
+        return df
+
+    def get_realtime_snapshot(self, max_age: Optional[float] = None) -> Optional[pd.DataFrame]:
+        """全市场 A 股实时行情快照（efinance）"""
+        circuit_breaker = get_realtime_circuit_breaker()
+        if not circuit_breaker.is_available("efinance"):
+            return None
+        try:
+            df = self._load_realtime_quotes(max_age=max_age)
+        except Exception as e:
+            circuit_breaker.record_failure("efinance", str(e))
+            raise
+        if df is None or df.empty:
+            return None
+        # 东方财富行情接口的成交量单位即为「手」，无需换算
+        return normalize_snapshot(df, {
+            '股票代码': 'code', '股票名称': 'name', '最新价': 'price', '开盘': 'open', '最高': 'high',
+            '最低': 'low', '成交量': 'volume', '成交额': 'amount', '涨跌幅': 'change_pct', 'pct_chg': 'change_pct',
+        })
+
     def get_realtime_quote(self, stock_code: str) -> Optional[EfinanceRealtimeQuote]:
         """
         获取实时行情数据
@@ -453,7 +509,6 @@ class EfinanceFetcher(BaseFetcher):
         Returns:
             UnifiedRealtimeQuote 对象，获取失败返回 None
         """
-        import efinance as ef
         circuit_breaker = get_realtime_circuit_breaker()
         source_key = "efinance"
         
@@ -463,35 +518,7 @@ class EfinanceFetcher(BaseFetcher):
             return None
         
         try:
-            # 检查缓存
-            current_time = time.time()
-            if (_realtime_cache['data'] is not None and 
-                current_time - _realtime_cache['timestamp'] < _realtime_cache['ttl']):
-                df = _realtime_cache['data']
-                cache_age = int(current_time - _realtime_cache['timestamp'])
-                logger.debug(f"[缓存命中] 实时行情(efinance) - 缓存年龄 {cache_age}s/{_realtime_cache['ttl']}s")
-            else:
-                # 触发全量刷新
-                logger.info(f"[缓存未命中] 触发全量刷新 实时行情(efinance)")
-                # 防封禁策略
-                self._set_random_user_agent()
-                self._enforce_rate_limit()
-                
-                logger.info(f"[API调用] ef.stock.get_realtime_quotes() 获取实时行情...")
-                import time as _time
-                api_start = _time.time()
-                
-                # efinance 的实时行情 API
-                df = ef.stock.get_realtime_quotes()
-                
-                api_elapsed = _time.time() - api_start
-                logger.info(f"[API返回] ef.stock.get_realtime_quotes 成功: 返回 {len(df)} 只股票, 耗时 {api_elapsed:.2f}s")
-                circuit_breaker.record_success(source_key)
-                
-                # 更新缓存
-                _realtime_cache['data'] = df
-                _realtime_cache['timestamp'] = current_time
-                logger.info(f"[缓存更新] 实时行情(efinance) 缓存已刷新，TTL={_realtime_cache['ttl']}s")
+            df = self._load_realtime_quotes()
             
             # 查找指定股票
             # efinance 返回的列名可能是 '股票代码' 或 'code'
@@ -49,6 +49,8 @@ from src.feishu_doc import FeishuDocManager
 from src.config import get_config, Config
 from src.notification import NotificationService
 from src.core.pipeline import StockAnalysisPipeline
+from src.storage import get_db
+from src.enums import JobPriority
 from src.core.market_review import run_market_review
 from src.search_service import SearchService
 from src.analyzer import GeminiAnalyzer
@@ -138,6 +140,12 @@ def parse_arguments() -> argparse.Namespace:
   python main.py --single-notify    # 启用单股推送模式（每分析完一只立即推送）
   python main.py --schedule         # 启用定时任务模式
   python main.py --market-review    # 仅运行大盘复盘
+  python main.py --resume           # 断点续跑今日最近一次中断的运行
+  python main.py --no-llm-cache     # 不复用 AI 响应缓存，强制重新调用接口
+  python main.py --screen 20        # 全市场技术面选股，输出前 20 只
+  python main.py --screen --screen-analyze  # 选股后将候选池交给 AI 分析
+  python main.py --screen-backfill  # 补齐全市场历史日线（首次选股前运行）
+  python main.py --intraday         # 盘中监控自选股，信号变化时推送
         '''
     )
     
@@ -213,6 +221,49 @@ def parse_arguments() -> argparse.Namespace:
         action='store_true',
         help='不保存分析上下文快照'
     )
+
+    parser.add_argument(
+        '--no-llm-cache',
+        action='store_true',
+        help='不复用 LLM 响应缓存，强制重新调用 AI 接口'
+    )
+
+    parser.add_argument(
+        '--resume',
+        nargs='?',
+        const='latest',
+        default=None,
+        metavar='QUERY_ID',
+        help='断点续跑：复用指定（默认今日最近一次）运行的 query_id，跳过已完成分析的股票'
+    )
+
+    parser.add_argument(
+        '--screen',
+        nargs='?',
+        const=0,
+        default=None,
+        type=int,
+        metavar='N',
+        help='全市场技术面选股，输出评分前 N 只（默认 SCREENER_TOP_N）'
+    )
+
+    parser.add_argument(
+        '--screen-analyze',
+        action='store_true',
+        help='选股后将候选池交给 AI 分析（配合 --screen 使用）'
+    )
+
+    parser.add_argument(
+        '--screen-backfill',
+        action='store_true',
+        help='补齐全市场历史日线，供 --screen 使用'
+    )
+
+    parser.add_argument(
+        '--intraday',
+        action='store_true',
+        help='盘中信号模式：交易时段内轮询实时行情，增量计算指标并推送信号变化'
+    )
     
     return parser.parse_args()
 
@@ -220,12 +271,13 @@ def parse_arguments() -> argparse.Namespace:
 def run_full_analysis(
     config: Config,
     args: argparse.Namespace,
-    stock_codes: Optional[List[str]] = None
+    stock_codes: Optional[List[str]] = None,
+    priority: JobPriority = JobPriority.BATCH
 ):
     """
     执行完整的分析流程（个股 + 大盘复盘）
     
-    这是定时任务调用的主函数
+    这是定时任务调用的主函数，定时任务以 SCHEDULED 优先级运行
     """
     try:
         # 命令行参数 --single-notify 覆盖配置（#55）
@@ -237,27 +289,32 @@ def run_full_analysis(
         if getattr(args, 'no_context_snapshot', False):
             save_context_snapshot = False
         query_id = uuid.uuid4().hex
+        resume_from = getattr(args, 'resume', None)
+        if resume_from:
+            resumed_query_id = get_db().get_latest_run_query_id() if resume_from == 'latest' else resume_from
+            if resumed_query_id:
+                query_id = resumed_query_id
+                logger.info(f"断点续跑，复用运行 ID: {query_id}")
+            else:
+                logger.warning("未找到今日可续跑的运行记录，将重新开始完整分析")
         pipeline = StockAnalysisPipeline(
             config=config,
             max_workers=args.workers,
             query_id=query_id,
             query_source="cli",
-            save_context_snapshot=save_context_snapshot
+            save_context_snapshot=save_context_snapshot,
+            priority=priority,
+            use_llm_cache=not getattr(args, 'no_llm_cache', False)
         )
         
         # 1. 运行个股分析
         results = pipeline.run(
             stock_codes=stock_codes,
             dry_run=args.dry_run,
-            send_notification=not args.no_notify
+            send_notification=not args.no_notify,
+            resume=bool(resume_from)
         )
 
-        # Issue #128: 分析间隔 - 在个股分析和大盘分析之间添加延迟
-        analysis_delay = getattr(config, 'analysis_delay', 0)
-        if analysis_delay > 0 and config.market_review_enabled and not args.no_market_review:
-            logger.info(f"等待 {analysis_delay} 秒后执行大盘复盘（避免API限流）...")
-            time.sleep(analysis_delay)
-
         # 2. 运行大盘复盘（如果启用且不是仅个股模式）
         market_report = ""
         if config.market_review_enabled and not args.no_market_review:
@@ -413,6 +470,30 @@ def main() -> int:
         return 0
 
     try:
+        # 独立模式: 全市场选股
+        if args.screen_backfill or args.screen is not None:
+            from src.screener import MarketScreener, run_screen
+
+            if args.screen_backfill:
+                logger.info("模式: 补齐全市场历史日线")
+                MarketScreener(config=config).backfill(workers=args.workers)
+            if args.screen is not None:
+                logger.info("模式: 全市场技术面选股")
+                run_screen(
+                    top_n=args.screen or None,
+                    analyze=args.screen_analyze and not args.dry_run,
+                    send_notification=not args.no_notify,
+                )
+            return 0
+
+        # 独立模式: 盘中信号监控
+        if args.intraday:
+            from src.intraday import IntradayMonitor
+
+            logger.info("模式: 盘中信号监控")
+            IntradayMonitor(codes=stock_codes).run(send_notification=not args.no_notify)
+            return 0
+
         # 模式1: 仅大盘复盘
         if args.market_review:
             logger.info("模式: 仅大盘复盘")
@@ -453,7 +534,7 @@ def main() -> int:
             from src.scheduler import run_with_schedule
             
             def scheduled_task():
-                run_full_analysis(config, args, stock_codes)
+                run_full_analysis(config, args, stock_codes, priority=JobPriority.SCHEDULED)
             
             run_with_schedule(
                 task=scheduled_task,
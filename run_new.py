@@ -44,6 +44,7 @@ from dotenv import load_dotenv
 # 导入pipeline模块
 from src.core.pipeline import StockAnalysisPipeline
 from src.enums import ReportType
+from src.intraday import IntradayEngine
 from src.analyzer import STOCK_NAME_MAP
 from src.auth import register, login
 from src.usage_tracker import record_usage
@@ -161,6 +162,17 @@ def _calc_rsi(close: pd.Series, period=14) -> pd.Series:
     rs = avg_gain / avg_loss.replace(0, 1e-10)
     return 100 - (100 / (1 + rs))
 
+def _market_minute_state() -> dict:
+    """
+    大盘 5 分钟线的增量指标状态（跨调用保留）
+
+    Streamlit 每个会话在独立线程中运行脚本，状态保存在 st.session_state 中按会话隔离，
+    避免多个会话并发修改同一个 IntradayEngine。
+    """
+    if "market_minute" not in st.session_state:
+        st.session_state.market_minute = {"engine": IntradayEngine(bar_minutes=5), "last": None}
+    return st.session_state.market_minute
+
 def check_market_trend():
     """
     根据市场环境判断大盘状态，并给出推荐指标与操作逻辑：
@@ -176,11 +188,16 @@ def check_market_trend():
             df_min = ak.stock_zh_a_minute(symbol="sh000001", period='5', adjust='qfq')
             if df_min.empty:
                 return "无法获取大盘数据"
-            df_min['ma5'] = df_min['close'].rolling(5).mean()
-            df_min['ma20'] = df_min['close'].rolling(20).mean()
-            last = df_min.iloc[-1]
-            direction = "UP" if (last['ma5'] > last['ma20'] and last['close'] > last['ma20']) else "DOWN/震荡"
-            return f"大盘趋势：{direction} (收盘:{last['close']}, MA20:{last['ma20']:.2f}) [数据不足，仅分钟级]"
+            # 分钟级指标增量更新：只把上次之后的新 K 线写入状态
+            state = _market_minute_state()
+            bars = df_min.assign(code="sh000001", close=df_min['close'].astype(float))
+            if state["last"] is not None:
+                bars = bars[bars['day'] > state["last"]]
+            state["engine"].update_bars(bars[['code', 'day', 'close']], time_column='day')
+            state["last"] = df_min['day'].iloc[-1]
+            last = state["engine"].indicators(["sh000001"]).iloc[0]
+            direction = "UP" if (last['ma5'] > last['ma20'] and last['price'] > last['ma20']) else "DOWN/震荡"
+            return f"大盘趋势：{direction} (收盘:{last['price']}, MA20:{last['ma20']:.2f}) [数据不足，仅分钟级]"
 
         df = df.sort_values('date').reset_index(drop=True)
         close = df['close']
@@ -448,27 +465,21 @@ def run_analysis_steps_streaming(stock_code: str, stream_holder: dict):
     yield "### 📉 趋势分析\n"
     trend_info = "无历史行情，未做趋势分析"
     try:
-        context_for_trend = pipeline.db.get_analysis_context(code)
-        if context_for_trend and context_for_trend.get("raw_data"):
-            raw_data = context_for_trend["raw_data"]
-            if isinstance(raw_data, list) and len(raw_data) > 0:
-                df_trend = pd.DataFrame(raw_data)
-                trend_result = pipeline.trend_analyzer.analyze(df_trend, code)
-                trend_info = f"趋势状态 {trend_result.trend_status.value}，买入信号 {trend_result.buy_signal.value}，评分 {trend_result.signal_score}"
-                if trend_result.signal_reasons:
-                    trend_info += "；理由：" + "；".join(trend_result.signal_reasons[:3])
-                if trend_result.risk_factors:
-                    trend_info += "；风险：" + "；".join(trend_result.risk_factors[:2])
-                stream_holder["trend_info"] = trend_info
-                yield f"**{trend_result.trend_status.value}**，买入信号 **{trend_result.buy_signal.value}**，评分 **{trend_result.signal_score}**\n"
-                if trend_result.signal_reasons:
-                    yield "理由：" + "；".join(trend_result.signal_reasons[:3]) + "\n"
-                if trend_result.risk_factors:
-                    yield "风险：" + "；".join(trend_result.risk_factors[:2]) + "\n"
-                yield "\n"
-            else:
-                stream_holder["trend_info"] = trend_info
-                yield "历史数据为空，未做趋势分析\n\n"
+        # 读穿透趋势缓存：同一根 K 线已由定时任务/Web/Bot 分析过时直接复用
+        trend_result = pipeline.trend_cache.get(code, pipeline.trend_analyzer)
+        if trend_result:
+            trend_info = f"趋势状态 {trend_result.trend_status.value}，买入信号 {trend_result.buy_signal.value}，评分 {trend_result.signal_score}"
+            if trend_result.signal_reasons:
+                trend_info += "；理由：" + "；".join(trend_result.signal_reasons[:3])
+            if trend_result.risk_factors:
+                trend_info += "；风险：" + "；".join(trend_result.risk_factors[:2])
+            stream_holder["trend_info"] = trend_info
+            yield f"**{trend_result.trend_status.value}**，买入信号 **{trend_result.buy_signal.value}**，评分 **{trend_result.signal_score}**\n"
+            if trend_result.signal_reasons:
+                yield "理由：" + "；".join(trend_result.signal_reasons[:3]) + "\n"
+            if trend_result.risk_factors:
+                yield "风险：" + "；".join(trend_result.risk_factors[:2]) + "\n"
+            yield "\n"
         else:
             stream_holder["trend_info"] = trend_info
             yield f"{trend_info}\n\n"
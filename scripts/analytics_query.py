@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分析型查询脚本。
+增量导出日线/分析历史/新闻情报为 Parquet，并执行只读 SQL。
+
+示例：
+    python scripts/analytics_query.py --export
+    python scripts/analytics_query.py "SELECT code, COUNT(*) AS n FROM analysis_history GROUP BY code"
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# 确保项目根目录在 path 中
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+from src.analytics import get_analytics_engine, DUCKDB_AVAILABLE
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分析型 SQL 查询")
+    parser.add_argument("sql", nargs="?", help="只读 SQL（表：stock_daily / analysis_history / news_intel）")
+    parser.add_argument("--export", action="store_true", help="查询前先增量导出")
+    parser.add_argument("--limit", type=int, default=50, help="最多打印的行数")
+    args = parser.parse_args()
+
+    engine = get_analytics_engine()
+
+    if args.export or not args.sql:
+        exported = engine.export()
+        for name, count in exported.items():
+            print(f"导出 {name}: {count} 行")
+
+    if not args.sql:
+        return
+
+    print(f"查询引擎: {'duckdb' if DUCKDB_AVAILABLE else 'sqlite'}")
+    df = engine.query(args.sql)
+    print(df.head(args.limit).to_string(index=False))
+    print(f"\n共 {len(df)} 行")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+趋势信号回测脚本。
+基于本地日线回测 StockTrendAnalyzer 的评分与买入信号，支持参数网格并行扫描。
+
+示例：
+    python scripts/backtest.py --days 1825
+    python scripts/backtest.py --stop-loss 5 --take-profit 10
+    python scripts/backtest.py --grid hold_days=5,10,20 --grid BIAS_THRESHOLD=3,5,8 --workers 4
+"""
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+# 确保项目根目录在 path 中
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+from src.backtest import BacktestParams, Backtester, expand_grid, load_bars, run_sweep
+
+
+def _parse_value(text: str):
+    """网格取值：整数 / 浮点 / 字符串"""
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            continue
+    return text
+
+
+def _parse_grid(items):
+    grid = {}
+    for item in items:
+        name, _, values = item.partition("=")
+        if not values:
+            raise SystemExit(f"无效的网格参数: {item}（格式 NAME=v1,v2）")
+        grid[name.strip()] = [_parse_value(v.strip()) for v in values.split(",") if v.strip()]
+    return grid
+
+
+def main():
+    parser = argparse.ArgumentParser(description="趋势信号回测")
+    parser.add_argument("--days", type=int, default=365 * 5, help="回测区间（自然日，默认 5 年）")
+    parser.add_argument("--codes", type=str, help="股票代码，逗号分隔（默认本地全部）")
+    parser.add_argument("--hold-days", type=int, default=10, help="最长持有 K 线数")
+    parser.add_argument("--stop-loss", type=float, default=0.0, help="止损百分比（0 为不设）")
+    parser.add_argument("--take-profit", type=float, default=0.0, help="止盈百分比（0 为不设）")
+    parser.add_argument("--cost", type=float, default=0.15, help="往返交易成本百分比")
+    parser.add_argument("--grid", action="append", default=[], metavar="NAME=v1,v2",
+                        help="参数网格，可重复；NAME 为回测参数或分析器大写参数（如 BIAS_THRESHOLD）")
+    parser.add_argument("--workers", type=int, default=None, help="参数扫描进程数（默认 CPU 核数）")
+    parser.add_argument("--top", type=int, default=5, help="参数扫描时打印前 N 组的完整报告")
+    parser.add_argument("--json-out", type=str, help="将结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    codes = [c.strip() for c in args.codes.split(",") if c.strip()] if args.codes else None
+    bars = load_bars(days=args.days, codes=codes)
+    if bars.empty:
+        print("本地无日线数据，请先运行 python main.py --screen-backfill 补齐历史数据")
+        return
+    print(f"日线 {len(bars)} 行，{bars['code'].nunique()} 只股票，"
+          f"{bars['date'].min().date()} ~ {bars['date'].max().date()}")
+
+    base = BacktestParams(
+        hold_days=args.hold_days,
+        stop_loss_pct=args.stop_loss,
+        take_profit_pct=args.take_profit,
+        cost_pct=args.cost,
+    )
+    if args.grid:
+        reports = run_sweep(bars, expand_grid(_parse_grid(args.grid), base), workers=args.workers)
+        print("\n| # | 参数 | 笔数 | 胜率 | 平均收益 | 净值回撤 |")
+        print("|---|------|------|------|----------|----------|")
+        for i, report in enumerate(reports, 1):
+            s = report.summary
+            print(f"| {i} | {report.params.label()} | {s['trades']} | {s['hit_rate']:.1%} | "
+                  f"{s['avg_return']:+.2%} | {s['curve_drawdown']:.1%} |")
+        for report in reports[:args.top]:
+            print("\n" + report.to_markdown())
+    else:
+        reports = [Backtester(bars).run(base)]
+        print("\n" + reports[0].to_markdown())
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump([r.to_dict() for r in reports], f, ensure_ascii=False, indent=2, default=str)
+        print(f"结果已写入 {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
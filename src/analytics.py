@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 分析型查询引擎
+===================================
+
+职责：
+1. 将 StockDaily / AnalysisHistory / NewsIntel 增量导出为列式文件（Parquet）
+2. 基于嵌入式引擎对导出数据执行只读 SQL（优先 DuckDB，未安装时回退内存 SQLite）
+3. 为 CLI（scripts/analytics_query.py）与 Web（/analytics/query）提供统一入口
+
+设计说明：
+- 每张表维护一个水位（最大 id + 最近更新时间），每次只导出新增/更新的行，
+  以新的分片文件追加，不改写历史分片
+- 同一 id 在多个分片中出现时，以导出序号（_export_seq）最大的一条为准
+- 查询完全基于导出文件，不占用 OLTP 数据库连接
+- 载入导出分片后的查询连接会被缓存复用，export() 或分片文件变化（如其他进程导出）
+  时失效重建，避免每次查询都重新读取全部 Parquet
+"""
+
+import json
+import logging
+import re
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy import select, or_
+
+from src.config import get_config
+from src.storage import (
+    DatabaseManager,
+    StockDaily,
+    AnalysisHistory,
+    NewsIntel,
+    get_db,
+)
+
+logger = logging.getLogger(__name__)
+
+try:
+    import duckdb  # type: ignore
+    DUCKDB_AVAILABLE = True
+except ImportError:  # pragma: no cover - 取决于运行环境
+    duckdb = None
+    DUCKDB_AVAILABLE = False
+
+
+# 导出序号列，用于同一 id 多版本去重
+EXPORT_SEQ_COLUMN = "_export_seq"
+
+# 只读 SQL 校验：仅允许单条 SELECT / WITH 语句
+_READONLY_SQL_PATTERN = re.compile(r"^\s*(select|with)\b", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class ExportTable:
+    """导出表定义"""
+    name: str
+    model: Any
+    # 用于识别“更新过的旧行”的时间列；为 None 表示只追加
+    updated_column: Optional[str] = None
+
+
+EXPORT_TABLES: Dict[str, ExportTable] = {
+    "stock_daily": ExportTable("stock_daily", StockDaily, "updated_at"),
+    "analysis_history": ExportTable("analysis_history", AnalysisHistory, None),
+    "news_intel": ExportTable("news_intel", NewsIntel, "fetched_at"),
+}
+
+
+class AnalyticsEngine:
+    """
+    分析型查询引擎
+
+    用法：
+        engine = get_analytics_engine()
+        engine.export()  # 增量导出
+        df = engine.query("SELECT code, COUNT(*) FROM stock_daily GROUP BY code")
+    """
+
+    STATE_FILE = "_state.json"
+
+    def __init__(
+        self,
+        db: Optional[DatabaseManager] = None,
+        export_dir: Optional[str] = None,
+    ):
+        self.db = db or get_db()
+        config = get_config()
+        self.export_dir = Path(export_dir or config.analytics_dir)
+        self.export_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # 查询连接缓存：(分片文件签名, 连接)；连接非线程安全，查询时持有 _query_lock
+        self._query_lock = threading.Lock()
+        self._query_conn: Any = None
+        self._query_key: Optional[Tuple] = None
+
+    # === 增量导出 ===
+
+    def export(self, tables: Optional[List[str]] = None) -> Dict[str, int]:
+        """
+        增量导出指定表（默认全部）
+
+        Returns:
+            每张表本次导出的行数
+        """
+        names = tables or list(EXPORT_TABLES.keys())
+        exported: Dict[str, int] = {}
+        with self._lock:
+            state = self._load_state()
+            for name in names:
+                spec = EXPORT_TABLES.get(name)
+                if spec is None:
+                    raise ValueError(f"未知的导出表: {name}")
+                exported[name] = self._export_table(spec, state)
+            self._save_state(state)
+        if any(exported.values()):
+            self.invalidate()
+        return exported
+
+    def _export_table(self, spec: ExportTable, state: Dict[str, Any]) -> int:
+        table_state = state.setdefault(spec.name, {"last_id": 0, "last_updated": None, "seq": 0})
+        last_id = int(table_state.get("last_id") or 0)
+        last_updated = table_state.get("last_updated")
+
+        model = spec.model
+        condition = model.id > last_id
+        if spec.updated_column and last_updated:
+            updated_col = getattr(model, spec.updated_column)
+            condition = or_(condition, updated_col > datetime.fromisoformat(last_updated))
+
+        stmt = select(model.__table__).where(condition).order_by(model.id)
+        with self.db.get_connection() as conn:
+            df = pd.read_sql_query(stmt, conn)
+
+        if df.empty:
+            return 0
+
+        seq = int(table_state.get("seq") or 0) + 1
+        df[EXPORT_SEQ_COLUMN] = seq
+
+        table_dir = self.export_dir / spec.name
+        table_dir.mkdir(parents=True, exist_ok=True)
+        df.to_parquet(table_dir / f"part-{seq:06d}.parquet", index=False)
+
+        table_state["seq"] = seq
+        table_state["last_id"] = max(last_id, int(df["id"].max()))
+        if spec.updated_column and spec.updated_column in df.columns:
+            newest = pd.to_datetime(df[spec.updated_column]).max()
+            if pd.notna(newest):
+                newest_iso = newest.to_pydatetime().isoformat()
+                if not last_updated or newest_iso > last_updated:
+                    table_state["last_updated"] = newest_iso
+
+        logger.info(f"[Analytics] {spec.name} 增量导出 {len(df)} 行 (分片 {seq})")
+        return len(df)
+
+    def _load_state(self) -> Dict[str, Any]:
+        path = self.export_dir / self.STATE_FILE
+        if not path.exists():
+            return {}
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning(f"[Analytics] 导出水位文件损坏，将全量重新导出: {e}")
+            return {}
+
+    def _save_state(self, state: Dict[str, Any]) -> None:
+        path = self.export_dir / self.STATE_FILE
+        path.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    def _table_files(self, name: str) -> List[Path]:
+        table_dir = self.export_dir / name
+        if not table_dir.exists():
+            return []
+        return sorted(table_dir.glob("part-*.parquet"))
+
+    # === 查询 ===
+
+    @staticmethod
+    def validate_sql(sql: str) -> str:
+        """仅允许单条只读 SELECT/WITH 语句"""
+        text = (sql or "").strip().rstrip(";").strip()
+        if not text:
+            raise ValueError("SQL 不能为空")
+        if ";" in text:
+            raise ValueError("仅支持单条 SQL 语句")
+        if not _READONLY_SQL_PATTERN.match(text):
+            raise ValueError("仅支持 SELECT / WITH 只读查询")
+        return text
+
+    def query(self, sql: str, refresh: bool = False) -> pd.DataFrame:
+        """
+        执行只读 SQL，表名即导出表名（stock_daily / analysis_history / news_intel）
+
+        Args:
+            sql: SELECT / WITH 查询
+            refresh: 查询前是否先做一次增量导出
+        """
+        text = self.validate_sql(sql)
+        if refresh:
+            self.export()
+        with self._query_lock:
+            conn = self._get_query_conn()
+            if DUCKDB_AVAILABLE:
+                return conn.execute(text).fetchdf()
+            return pd.read_sql_query(text, conn)
+
+    def invalidate(self) -> None:
+        """丢弃缓存的查询连接，下次查询时重新载入导出分片"""
+        with self._query_lock:
+            self._close_query_conn()
+
+    def _get_query_conn(self) -> Any:
+        """获取缓存的查询连接（分片文件有变化时重建），调用方需持有 _query_lock"""
+        key = tuple((name, tuple(f.name for f in self._table_files(name))) for name in EXPORT_TABLES)
+        if self._query_conn is None or key != self._query_key:
+            self._close_query_conn()
+            self._query_conn = self._connect_duckdb() if DUCKDB_AVAILABLE else self._connect_sqlite()
+            self._query_key = key
+        return self._query_conn
+
+    def _close_query_conn(self) -> None:
+        if self._query_conn is not None:
+            try:
+                self._query_conn.close()
+            except Exception as e:
+                logger.debug(f"[Analytics] 关闭查询连接失败: {e}")
+        self._query_conn = None
+        self._query_key = None
+
+    def query_records(self, sql: str, refresh: bool = False, limit: int = 1000) -> Dict[str, Any]:
+        """执行查询并返回可 JSON 序列化的结果（limit 至少为 1）"""
+        limit = max(1, limit)
+        df = self.query(sql, refresh=refresh)
+        truncated = len(df) > limit
+        if truncated:
+            df = df.head(limit)
+        records = json.loads(df.to_json(orient="records", date_format="iso", force_ascii=False))
+        return {
+            "columns": list(df.columns),
+            "records": records,
+            "count": len(records),
+            "truncated": truncated,
+            "engine": "duckdb" if DUCKDB_AVAILABLE else "sqlite",
+        }
+
+    def _connect_duckdb(self) -> Any:
+        conn = duckdb.connect(database=":memory:")
+        try:
+            # 先把导出分片载入内存表，再关闭外部访问：用户 SQL 无法通过
+            # read_csv / read_text / read_parquet('http://...') 读取任意文件或访问网络
+            for name in EXPORT_TABLES:
+                files = self._table_files(name)
+                if not files:
+                    continue
+                file_list = ", ".join(f"'{f.as_posix()}'" for f in files)
+                conn.execute(
+                    f"CREATE TABLE {name} AS "
+                    f"SELECT * EXCLUDE ({EXPORT_SEQ_COLUMN}) FROM read_parquet([{file_list}]) "
+                    f"QUALIFY row_number() OVER (PARTITION BY id ORDER BY {EXPORT_SEQ_COLUMN} DESC) = 1"
+                )
+            conn.execute("SET enable_external_access = false")
+            # 锁定配置，防止用户 SQL 重新打开外部访问
+            conn.execute("SET lock_configuration = true")
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    def _connect_sqlite(self) -> sqlite3.Connection:
+        # 连接在多个请求线程间复用（由 _query_lock 串行化）
+        conn = sqlite3.connect(":memory:", check_same_thread=False)
+        try:
+            for name in EXPORT_TABLES:
+                df = self.load_table(name)
+                if df is not None:
+                    df.to_sql(name, conn, index=False)
+            conn.execute("PRAGMA query_only = ON")
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    def load_table(self, name: str) -> Optional[pd.DataFrame]:
+        """读取导出表（已按 id 去重为最新版本）"""
+        files = self._table_files(name)
+        if not files:
+            return None
+        df = pd.concat([pd.read_parquet(f) for f in files], ignore_index=True)
+        df = (
+            df.sort_values(EXPORT_SEQ_COLUMN)
+            .drop_duplicates(subset="id", keep="last")
+            .drop(columns=[EXPORT_SEQ_COLUMN])
+            .reset_index(drop=True)
+        )
+        return df
+
+
+# === 便捷函数 ===
+
+_analytics_engine: Optional[AnalyticsEngine] = None
+
+
+def get_analytics_engine() -> AnalyticsEngine:
+    """获取分析型查询引擎单例"""
+    global _analytics_engine
+    if _analytics_engine is None:
+        _analytics_engine = AnalyticsEngine()
+    return _analytics_engine
+
+
+def reset_analytics_engine() -> None:
+    """重置分析型查询引擎单例（主要用于测试）"""
+    global _analytics_engine
+    if _analytics_engine is not None:
+        _analytics_engine.invalidate()
+    _analytics_engine = None
@@ -10,12 +10,15 @@ A股自选股智能分析系统 - AI分析层
 3. 结合技术面和消息面生成分析报告
 """
 
+import asyncio
+import hashlib
 import json
 import logging
+import threading
 import time
-from dataclasses import dataclass
-from typing import Optional, Dict, Any, List
-from json_repair import repair_json
+from contextlib import closing, nullcontext
+from dataclasses import dataclass, fields
+from typing import Optional, Dict, Any, Callable, ContextManager, Iterator, List, Tuple
 
 from tenacity import (
     retry,
@@ -25,7 +28,24 @@ from tenacity import (
     before_sleep_log,
 )
 
+from src.async_llm import request_slot, thread_slot
 from src.config import get_config
+from src.context_cache import CachedPrefix, expire_timestamp, get_context_cache, is_cache_error, prefix_key
+from src.enums import ReportType
+from src.llm_router import TIER_FAST, TIER_STRONG, CircuitOpenError, LLMRoute, get_llm_router
+from src.llm_scheduler import get_llm_scheduler, estimate_tokens
+from src.prompt_builder import (
+    PRIORITY_NEWS, PRIORITY_REQUIRED, PRIORITY_TECHNICAL, PromptBuilder, PromptReport, count_tokens,
+)
+from src.response_parser import (
+    DASHBOARD_SCHEMA,
+    STAGE_STRICT,
+    parse_json_response,
+    repair_json_text,
+    validate_fields,
+)
+from src.stream_parser import IncrementalJsonParser
+from src.tracing import annotate_span, trace_span
 
 logger = logging.getLogger(__name__)
 
@@ -148,6 +168,17 @@ def get_stock_name_multi_source(
     return f'股票{stock_code}'
 
 
+def _retry_delay(base_delay: float, attempt: int) -> float:
+    """第 attempt 次重试前的指数退避等待（最大 60 秒）"""
+    return min(base_delay * (2 ** (attempt - 1)), 60)
+
+
+def _is_rate_limit(error_str: str) -> bool:
+    """是否为 429 限流 / 配额错误"""
+    lowered = error_str.lower()
+    return '429' in error_str or 'quota' in lowered or 'rate' in lowered
+
+
 @dataclass
 class AnalysisResult:
     """
@@ -198,6 +229,7 @@ class AnalysisResult:
     # ========== 元数据 ==========
     raw_response: Optional[str] = None  # 原始响应（调试用）
     search_performed: bool = False  # 是否执行了联网搜索
+    cache_hit: bool = False  # 是否命中 LLM 响应缓存（未实际调用 API）
     data_sources: str = ""  # 数据来源说明
     success: bool = True
     error_message: Optional[str] = None
@@ -231,10 +263,17 @@ class AnalysisResult:
             'risk_warning': self.risk_warning,
             'buy_reason': self.buy_reason,
             'search_performed': self.search_performed,
+            'cache_hit': self.cache_hit,
             'success': self.success,
             'error_message': self.error_message,
         }
     
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'AnalysisResult':
+        """从字典（to_dict / 分析历史 raw_result）还原分析结果，忽略未知字段"""
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
     def get_core_conclusion(self) -> str:
         """获取核心结论（一句话）"""
         if self.dashboard and 'core_conclusion' in self.dashboard:
@@ -485,6 +524,9 @@ class GeminiAnalyzer:
 4. **检查清单可视化**：用 ✅⚠️❌ 明确显示每项检查结果
 5. **风险优先级**：舆情中的风险点要醒目标出"""
 
+    # 批量模式下每只股票的舆情节选长度（字符）
+    BATCH_NEWS_CHARS = 600
+
     def __init__(self, api_key: Optional[str] = None):
         """
         初始化 AI 分析器
@@ -499,10 +541,14 @@ class GeminiAnalyzer:
         # google-genai 新版 SDK：使用 Client 实例而不是全局 configure + GenerativeModel
         self._gemini_client = None  # type: ignore[assignment]
         self._current_model_name = None  # 当前使用的模型名称
-        self._fallback_model_name = None  # 备选模型名称
-        self._using_fallback = False  # 是否正在使用备选模型
+        self._fallback_model_name = None  # 备选模型名称（限流时按单次调用切换，不改变默认模型）
         self._use_openai = False  # 是否使用 OpenAI 兼容 API
         self._openai_client = None  # OpenAI 客户端
+        self._openai_init_lock = threading.Lock()  # 多线程按需创建 OpenAI 客户端时只创建一次
+        self._call_state = threading.local()  # 当前线程最近一次调用是否命中响应缓存
+        self._openai_client_kwargs: Dict[str, Any] = {}
+        self._async_openai_client = None  # 异步 OpenAI 客户端（异步模式下懒加载）
+        self._openai_json_mode = True  # 服务端拒绝 response_format 后关闭
         
         # 检查 Gemini API Key 是否有效（过滤占位符）
         gemini_key_valid = self._api_key and not self._api_key.startswith('your_') and len(self._api_key) > 10
@@ -533,6 +579,27 @@ class GeminiAnalyzer:
         - 通义千问
         - Moonshot 等
         """
+        if self._create_openai_client():
+            self._current_model_name = get_config().openai_model
+            self._use_openai = True
+
+    def _create_openai_client(self) -> bool:
+        """
+        创建 OpenAI 兼容客户端（线程安全，只创建一次）
+
+        不改变当前默认 provider / 模型，供路由可用性检查等按需初始化使用。
+
+        Returns:
+            客户端是否可用
+        """
+        with self._openai_init_lock:
+            if self._openai_client is not None:
+                return True
+            self._build_openai_client()
+            return self._openai_client is not None
+
+    def _build_openai_client(self) -> None:
+        """按配置创建 OpenAI 兼容客户端（调用方持有 _openai_init_lock）"""
         config = get_config()
         
         # 检查 OpenAI API Key 是否有效（过滤占位符）
@@ -559,9 +626,8 @@ class GeminiAnalyzer:
             if config.openai_base_url and config.openai_base_url.startswith('http'):
                 client_kwargs["base_url"] = config.openai_base_url
             
+            self._openai_client_kwargs = client_kwargs  # 异步客户端按需用相同参数创建
             self._openai_client = OpenAI(**client_kwargs)
-            self._current_model_name = config.openai_model
-            self._use_openai = True
             logger.info(f"OpenAI 兼容 API 初始化成功 (base_url: {config.openai_base_url}, model: {config.openai_model})")
         except ImportError as e:
             # 依赖缺失（如 socksio）
@@ -612,45 +678,132 @@ class GeminiAnalyzer:
             # 记录当前模型信息，真正调用时通过 models.generate_content 传入
             self._current_model_name = model_name
             self._fallback_model_name = fallback_model
-            self._using_fallback = False
             logger.info(f"Gemini 客户端初始化成功 (模型: {model_name}, 备选: {fallback_model})")
             
         except Exception as e:
             logger.error(f"Gemini 客户端初始化失败: {e}")
             self._gemini_client = None
     
-    def _switch_to_fallback_model(self) -> bool:
+    def _fallback_model(self, model_name: Optional[str]) -> Optional[str]:
         """
-        切换到备选模型
-        
+        本次调用可切换的备选模型
+
+        只返回模型名，由调用方在本次调用内使用；分析器是进程级共享实例，
+        一次限流不应让之后所有分析都改用备选模型。
+
         Returns:
-            是否成功切换
+            备选模型名；无可用备选（未初始化 Gemini、已是备选模型）时为 None
         """
-        try:
-            config = get_config()
-            fallback_model = self._fallback_model_name or config.gemini_model_fallback
-            
-            # 如果客户端尚未初始化，尝试重新初始化
-            if not self._gemini_client:
-                self._init_model()
-            
-            if not self._gemini_client:
-                logger.error("[LLM] 无法切换备选模型：Gemini 客户端未初始化")
-                return False
-            
-            logger.warning(f"[LLM] 切换到备选模型: {fallback_model}")
-            self._current_model_name = fallback_model
-            self._using_fallback = True
-            logger.info(f"[LLM] 备选模型 {fallback_model} 启用成功")
-            return True
-        except Exception as e:
-            logger.error(f"[LLM] 切换备选模型失败: {e}")
-            return False
+        fallback_model = self._fallback_model_name or get_config().gemini_model_fallback
+        if not self._gemini_client or not fallback_model or fallback_model == model_name:
+            return None
+        return fallback_model
     
     def is_available(self) -> bool:
         """检查分析器是否可用"""
         return self._gemini_client is not None or self._openai_client is not None
     
+    def _gemini_generate_config(self, generation_config: dict, model: Optional[str] = None) -> Any:
+        """构建 google-genai 的生成配置（同步/异步调用共用），model 默认为当前模型"""
+        # 使用 google-genai 新版 SDK 的客户端调用
+        if not self._gemini_client:
+            raise RuntimeError("Gemini 客户端未初始化")
+
+        try:
+            from google.genai import types as genai_types
+        except ImportError:
+            # 明确提示未安装新版 SDK
+            raise ImportError("未安装 google-genai，请运行: pip install google-genai>=0.1.0")
+
+        cached_content = self._context_cache_handle(model or self._current_model_name)
+        return genai_types.GenerateContentConfig(
+            temperature=generation_config.get("temperature"),
+            max_output_tokens=generation_config.get("max_output_tokens"),
+            # 引用缓存句柄时系统提示词已在 provider 侧，请求中不能再携带
+            system_instruction=None if cached_content else self.SYSTEM_PROMPT,
+            cached_content=cached_content,
+            response_mime_type="application/json" if generation_config.get("json_mode") else None,
+        )
+
+    def _context_cache_handle(self, model: Optional[str]) -> Optional[str]:
+        """系统提示词在 Gemini 侧的缓存句柄：每个模型创建一次，临近过期时续期（未开启或创建失败时为 None）"""
+        if not get_config().llm_context_cache_enabled or not model:
+            return None
+        from google.genai import types as genai_types
+        client = self._gemini_client
+
+        def create(ttl: float) -> CachedPrefix:
+            cached = client.caches.create(
+                model=model,
+                config=genai_types.CreateCachedContentConfig(
+                    system_instruction=self.SYSTEM_PROMPT,
+                    ttl=f"{int(ttl)}s",
+                    display_name="stock-analysis-system-prompt",
+                ),
+            )
+            return CachedPrefix(cached.name, expire_timestamp(getattr(cached, 'expire_time', None), ttl))
+
+        def extend(name: str, ttl: float) -> float:
+            cached = client.caches.update(
+                name=name, config=genai_types.UpdateCachedContentConfig(ttl=f"{int(ttl)}s")
+            )
+            return expire_timestamp(getattr(cached, 'expire_time', None), ttl)
+
+        return get_context_cache().handle(prefix_key("gemini", model, self.SYSTEM_PROMPT), create, extend)
+
+    def _check_context_cache_error(self, error_str: str) -> None:
+        """provider 报告缓存句柄失效（过期、被删除）时丢弃句柄，重试时重建"""
+        if get_config().llm_context_cache_enabled and is_cache_error(error_str):
+            logger.warning(f"[上下文缓存] 句柄失效，将重建: {error_str[:100]}")
+            get_context_cache().invalidate()
+
+    @staticmethod
+    def _annotate_cached_tokens(response: Any) -> None:
+        """记录命中 provider 侧缓存的输入 token 数（运行剖析据此统计缓存收益）"""
+        cached = getattr(getattr(response, 'usage_metadata', None), 'cached_content_token_count', None)
+        if cached:
+            annotate_span(cached_tokens=cached)
+
+    def _openai_response_format(self, generation_config: dict) -> Dict[str, Any]:
+        """OpenAI 兼容接口的原生 JSON 模式参数（服务端不支持时为空）"""
+        if generation_config.get("json_mode") and self._openai_json_mode:
+            return {"response_format": {"type": "json_object"}}
+        return {}
+
+    def _check_response_format_error(self, error_str: str) -> None:
+        """服务端不支持 response_format 时关闭 JSON 模式，后续重试与请求不再携带"""
+        if self._openai_json_mode and 'response_format' in error_str:
+            self._openai_json_mode = False
+            logger.warning("[OpenAI] 服务端不支持 response_format，已关闭原生 JSON 模式")
+
+    def _handle_gemini_error(self, error_str: str, attempt: int, max_retries: int, model_name: str) -> str:
+        """
+        记录 Gemini 调用失败，限流过半时本次调用改用备选模型
+
+        Returns:
+            下一次尝试使用的模型
+        """
+        self._check_context_cache_error(error_str)
+        # 检查是否是 429 限流错误
+        if _is_rate_limit(error_str):
+            logger.warning(f"[Gemini] API 限流 (429)，第 {attempt + 1}/{max_retries} 次尝试: {error_str[:100]}")
+            
+            # 如果已经重试了一半次数且还没切换过备选模型，尝试切换
+            if attempt >= max_retries // 2 and model_name == self._current_model_name:
+                fallback_model = self._fallback_model(model_name)
+                if fallback_model:
+                    logger.warning(f"[Gemini] 本次调用切换到备选模型 {fallback_model}，继续重试")
+                    return fallback_model
+                logger.warning("[Gemini] 无可用备选模型，继续使用当前模型重试")
+        else:
+            # 非限流错误，记录并继续重试
+            logger.warning(f"[Gemini] API 调用失败，第 {attempt + 1}/{max_retries} 次尝试: {error_str[:100]}")
+        return model_name
+
+    def _openai_model_name(self) -> str:
+        """OpenAI 兼容接口的模型：默认 provider 为 OpenAI 时为当前模型，作为 Gemini 的回退时为 OPENAI_MODEL"""
+        return self._current_model_name if self._use_openai else get_config().openai_model
+
     def _call_openai_api(self, prompt: str, generation_config: dict) -> str:
         """
         调用 OpenAI 兼容 API
@@ -663,27 +816,37 @@ class GeminiAnalyzer:
             响应文本
         """
         config = get_config()
+        model_name = self._openai_model_name()
         max_retries = config.gemini_max_retries
         base_delay = config.gemini_retry_delay
         
         for attempt in range(max_retries):
             try:
                 if attempt > 0:
-                    delay = base_delay * (2 ** (attempt - 1))
-                    delay = min(delay, 60)
+                    delay = _retry_delay(base_delay, attempt)
                     logger.info(f"[OpenAI] 第 {attempt + 1} 次重试，等待 {delay:.1f} 秒...")
                     time.sleep(delay)
                 
                 config = get_config()
-                response = self._openai_client.chat.completions.create(
-                    model=self._current_model_name,
-                    messages=[
-                        {"role": "system", "content": self.SYSTEM_PROMPT},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=generation_config.get('temperature', config.openai_temperature),
-                    max_tokens=generation_config.get('max_output_tokens', 8192),
+                # 全局调度：按 RPM/TPM 预算放行，替代固定 sleep
+                scheduler = get_llm_scheduler()
+                ticket = scheduler.acquire(
+                    "openai",
+                    model_name,
+                    estimate_tokens(self.SYSTEM_PROMPT, prompt) + generation_config.get('max_output_tokens', 8192),
                 )
+                with trace_span("llm.request", source=f"openai:{model_name}"):
+                    response = self._openai_client.chat.completions.create(
+                        model=model_name,
+                        messages=[
+                            {"role": "system", "content": self.SYSTEM_PROMPT},
+                            {"role": "user", "content": prompt}
+                        ],
+                        temperature=generation_config.get('temperature', config.openai_temperature),
+                        max_tokens=generation_config.get('max_output_tokens', 8192),
+                        **self._openai_response_format(generation_config),
+                    )
+                scheduler.settle(ticket, getattr(getattr(response, 'usage', None), 'total_tokens', None))
                 
                 if response and response.choices and response.choices[0].message.content:
                     return response.choices[0].message.content
@@ -692,9 +855,8 @@ class GeminiAnalyzer:
                     
             except Exception as e:
                 error_str = str(e)
-                is_rate_limit = '429' in error_str or 'rate' in error_str.lower() or 'quota' in error_str.lower()
-                
-                if is_rate_limit:
+                self._check_response_format_error(error_str)
+                if _is_rate_limit(error_str):
                     logger.warning(f"[OpenAI] API 限流，第 {attempt + 1}/{max_retries} 次尝试: {error_str[:100]}")
                 else:
                     logger.warning(f"[OpenAI] API 调用失败，第 {attempt + 1}/{max_retries} 次尝试: {error_str[:100]}")
@@ -704,7 +866,107 @@ class GeminiAnalyzer:
         
         raise Exception("OpenAI API 调用失败，已达最大重试次数")
     
-    def _call_api_with_retry(self, prompt: str, generation_config: dict) -> str:
+    def _response_cache_key(self, prompt: str, generation_config: dict) -> str:
+        """响应缓存键：(provider:模型, 系统提示词, 提示词, 生成参数) 的 SHA-256"""
+        provider = "openai" if self._use_openai else "gemini"
+        payload = json.dumps(
+            {
+                'model': f"{provider}:{self._current_model_name}",
+                'system': self.SYSTEM_PROMPT,
+                'prompt': prompt,
+                'generation_config': generation_config,
+            },
+            ensure_ascii=False,
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _last_call_cache_hit(self) -> bool:
+        """当前线程最近一次 _call_api_with_retry 是否命中响应缓存"""
+        return getattr(self._call_state, 'cache_hit', False)
+
+    def _cache_lookup(
+        self, prompt: str, generation_config: dict, use_cache: bool
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """
+        查询响应缓存
+
+        Returns:
+            (缓存键, 缓存的响应)；缓存关闭时缓存键为 None，未命中或绕过时响应为 None
+        """
+        config = get_config()
+        if not config.llm_cache_enabled:
+            return None, None
+        cache_key = self._response_cache_key(prompt, generation_config)
+        if not use_cache:
+            return cache_key, None
+
+        from src.storage import get_db
+        try:
+            cached = get_db().get_llm_response(cache_key, config.llm_cache_ttl)
+        except Exception as e:
+            logger.warning(f"[LLM缓存] 读取失败: {e}")
+            return cache_key, None
+        if cached is not None:
+            logger.info(f"[LLM缓存] 命中 {cache_key[:12]}，跳过 API 调用 (模型: {self._current_model_name})")
+        return cache_key, cached
+
+    def _cache_store(
+        self, cache_key: Optional[str], response_text: str, check: Optional[Callable[[str], bool]] = None
+    ) -> None:
+        """
+        写入响应缓存（缓存关闭时 cache_key 为 None，直接跳过）
+
+        check 为调用方的解析校验：未通过的响应（无法解析、缺少必填字段）不写入，
+        否则同一请求在有效期内会一直命中这条坏响应。
+        """
+        if not cache_key:
+            return
+        if check is not None and not check(response_text):
+            logger.warning(f"[LLM缓存] 响应未通过解析校验，不写入缓存 {cache_key[:12]}")
+            return
+        from src.storage import get_db
+        try:
+            get_db().save_llm_response(
+                cache_key, str(self._current_model_name), response_text, get_config().llm_cache_max_entries
+            )
+        except Exception as e:
+            logger.warning(f"[LLM缓存] 写入失败: {e}")
+
+    def _call_api_with_retry(
+        self,
+        prompt: str,
+        generation_config: dict,
+        use_cache: bool = True,
+        check: Optional[Callable[[str], bool]] = None,
+    ) -> str:
+        """
+        调用 AI API（先查响应缓存），未命中时带重试和模型切换调用
+
+        缓存按请求内容寻址，同一请求在有效期内只调用一次 API；
+        缓存读写失败只记录日志，不影响正常调用。
+
+        Args:
+            prompt: 提示词
+            generation_config: 生成配置
+            use_cache: 是否使用响应缓存（False 时强制调用 API，结果仍写入缓存）
+            check: 写入缓存前的解析校验（见 _cache_store）
+
+        Returns:
+            响应文本
+        """
+        self._call_state.cache_hit = False
+        cache_key, cached = self._cache_lookup(prompt, generation_config, use_cache)
+        if cached is not None:
+            self._call_state.cache_hit = True
+            return cached
+
+        response_text = self._call_api_uncached(prompt, generation_config)
+        self._cache_store(cache_key, response_text, check)
+        return response_text
+
+    def _call_api_uncached(self, prompt: str, generation_config: dict) -> str:
         """
         调用 AI API，带有重试和模型切换机制
         
@@ -722,6 +984,10 @@ class GeminiAnalyzer:
         Returns:
             响应文本
         """
+        # 启用多模型路由时由路由器选择模型、熔断与对冲
+        if get_config().llm_router_enabled:
+            return self._call_api_routed(prompt, generation_config)
+
         # 如果已经在使用 OpenAI 模式，直接调用 OpenAI
         if self._use_openai:
             return self._call_openai_api(prompt, generation_config)
@@ -731,37 +997,36 @@ class GeminiAnalyzer:
         base_delay = config.gemini_retry_delay
         
         last_error = None
-        tried_fallback = getattr(self, '_using_fallback', False)
+        # 限流时的备选模型只在本次调用内生效
+        model_name = self._current_model_name
         
         for attempt in range(max_retries):
             try:
                 # 请求前增加延时（防止请求过快触发限流）
                 if attempt > 0:
-                    delay = base_delay * (2 ** (attempt - 1))  # 指数退避: 5, 10, 20, 40...
-                    delay = min(delay, 60)  # 最大60秒
+                    delay = _retry_delay(base_delay, attempt)  # 指数退避: 5, 10, 20, 40...
                     logger.info(f"[Gemini] 第 {attempt + 1} 次重试，等待 {delay:.1f} 秒...")
                     time.sleep(delay)
                 
-                # 使用 google-genai 新版 SDK 的客户端调用
-                if not self._gemini_client:
-                    raise RuntimeError("Gemini 客户端未初始化")
-
-                try:
-                    from google.genai import types as genai_types
-                except ImportError:
-                    # 明确提示未安装新版 SDK
-                    raise ImportError("未安装 google-genai，请运行: pip install google-genai>=0.1.0")
-
-                gen_config = genai_types.GenerateContentConfig(
-                    temperature=generation_config.get("temperature"),
-                    max_output_tokens=generation_config.get("max_output_tokens"),
-                    system_instruction=self.SYSTEM_PROMPT,
+                gen_config = self._gemini_generate_config(generation_config, model_name)
+
+                # 全局调度：按 RPM/TPM 预算放行，替代固定 sleep
+                scheduler = get_llm_scheduler()
+                ticket = scheduler.acquire(
+                    "gemini",
+                    model_name,
+                    estimate_tokens(self.SYSTEM_PROMPT, prompt) + (generation_config.get("max_output_tokens") or 0),
                 )
-
-                response = self._gemini_client.models.generate_content(
-                    model=self._current_model_name,
-                    contents=prompt,
-                    config=gen_config,
+                with trace_span("llm.request", source=f"gemini:{model_name}"):
+                    response = self._gemini_client.models.generate_content(
+                        model=model_name,
+                        contents=prompt,
+                        config=gen_config,
+                    )
+                    self._annotate_cached_tokens(response)
+                scheduler.settle(
+                    ticket,
+                    getattr(getattr(response, 'usage_metadata', None), 'total_token_count', None),
                 )
                 
                 if response and response.text:
@@ -773,22 +1038,7 @@ class GeminiAnalyzer:
                 last_error = e
                 error_str = str(e)
                 
-                # 检查是否是 429 限流错误
-                is_rate_limit = '429' in error_str or 'quota' in error_str.lower() or 'rate' in error_str.lower()
-                
-                if is_rate_limit:
-                    logger.warning(f"[Gemini] API 限流 (429)，第 {attempt + 1}/{max_retries} 次尝试: {error_str[:100]}")
-                    
-                    # 如果已经重试了一半次数且还没切换过备选模型，尝试切换
-                    if attempt >= max_retries // 2 and not tried_fallback:
-                        if self._switch_to_fallback_model():
-                            tried_fallback = True
-                            logger.info("[Gemini] 已切换到备选模型，继续重试")
-                        else:
-                            logger.warning("[Gemini] 切换备选模型失败，继续使用当前模型重试")
-                else:
-                    # 非限流错误，记录并继续重试
-                    logger.warning(f"[Gemini] API 调用失败，第 {attempt + 1}/{max_retries} 次尝试: {error_str[:100]}")
+                model_name = self._handle_gemini_error(error_str, attempt, max_retries, model_name)
         
         # Gemini 所有重试都失败，尝试 OpenAI 兼容 API
         if self._openai_client:
@@ -801,7 +1051,7 @@ class GeminiAnalyzer:
         elif config.openai_api_key and config.openai_base_url:
             # 尝试懒加载初始化 OpenAI
             logger.warning("[Gemini] 所有重试失败，尝试初始化 OpenAI 兼容 API")
-            self._init_openai_fallback()
+            self._create_openai_client()
             if self._openai_client:
                 try:
                     return self._call_openai_api(prompt, generation_config)
@@ -811,11 +1061,362 @@ class GeminiAnalyzer:
         
         # 所有方式都失败
         raise last_error or Exception("所有 AI API 调用失败，已达最大重试次数")
+
+    # === 多模型路由（src/llm_router.py）===
+
+    @staticmethod
+    def _model_tier(report_type: Optional[ReportType]) -> Optional[str]:
+        """报告类型对应的模型档位：精简报告用 fast 档，完整报告用 strong 档"""
+        if report_type == ReportType.SIMPLE:
+            return TIER_FAST
+        if report_type == ReportType.FULL:
+            return TIER_STRONG
+        return None
+
+    def _route_available(self, route: LLMRoute) -> bool:
+        """路由对应的客户端是否可用（OpenAI 客户端按需创建，不改变当前默认 provider/模型）"""
+        if route.provider == "gemini":
+            return self._gemini_client is not None
+        if route.provider == "openai":
+            if self._openai_client is None and get_config().openai_api_key:
+                return self._create_openai_client()
+            return self._openai_client is not None
+        return False
+
+    def _call_api_routed(
+        self, prompt: str, generation_config: dict, slot: Optional[Callable[[], ContextManager[None]]] = None
+    ) -> str:
+        """
+        经路由器调用：按 generation_config 中的 model_tier 选择档位
+
+        Args:
+            slot: 每次实际请求时进入的并发名额（异步路径传入 thread_slot()）
+        """
+        return get_llm_router().call(
+            lambda route: self._request_route(route, prompt, generation_config, slot),
+            tier=generation_config.get("model_tier"),
+            available=self._route_available,
+        )
+
+    def _request_route(
+        self,
+        route: LLMRoute,
+        prompt: str,
+        generation_config: dict,
+        slot: Optional[Callable[[], ContextManager[None]]] = None,
+    ) -> str:
+        """向指定 provider/模型发出一次请求（不重试，重试与切换由路由器负责）"""
+        max_tokens = generation_config.get("max_output_tokens") or 8192
+        scheduler = get_llm_scheduler()
+        ticket = scheduler.acquire(
+            route.provider, route.model, estimate_tokens(self.SYSTEM_PROMPT, prompt) + max_tokens
+        )
+        # 按 RPM/TPM 排队之后才占用并发名额
+        with slot() if slot else nullcontext(), trace_span("llm.request", source=route.key):
+            if route.provider == "openai":
+                try:
+                    response = self._openai_client.chat.completions.create(
+                        model=route.model,
+                        messages=[
+                            {"role": "system", "content": self.SYSTEM_PROMPT},
+                            {"role": "user", "content": prompt}
+                        ],
+                        temperature=generation_config.get('temperature', get_config().openai_temperature),
+                        max_tokens=max_tokens,
+                        **self._openai_response_format(generation_config),
+                    )
+                except Exception as e:
+                    self._check_response_format_error(str(e))
+                    raise
+                used_tokens = getattr(getattr(response, 'usage', None), 'total_tokens', None)
+                text = response.choices[0].message.content if response and response.choices else None
+            else:
+                try:
+                    response = self._gemini_client.models.generate_content(
+                        model=route.model,
+                        contents=prompt,
+                        config=self._gemini_generate_config(generation_config, route.model),
+                    )
+                except Exception as e:
+                    self._check_context_cache_error(str(e))
+                    raise
+                self._annotate_cached_tokens(response)
+                used_tokens = getattr(getattr(response, 'usage_metadata', None), 'total_token_count', None)
+                text = response.text if response else None
+        scheduler.settle(ticket, used_tokens)
+        if not text:
+            raise ValueError(f"{route.key} 返回空响应")
+        return text
+
+    # === 流式调用（边生成边产出文本块）===
+
+    def _call_api_stream(
+        self,
+        prompt: str,
+        generation_config: dict,
+        use_cache: bool = True,
+        check: Optional[Callable[[str], bool]] = None,
+    ) -> Iterator[str]:
+        """
+        _call_api_with_retry 的流式版本，逐块产出响应文本
+
+        缓存命中时一次性产出完整响应；流式请求在产出首块前失败时，
+        退回非流式调用（带重试、备选模型与 OpenAI 兜底），结果作为一整块产出。
+        完整响应结束且通过 check 校验后写入响应缓存。
+        """
+        self._call_state.cache_hit = False
+        cache_key, cached = self._cache_lookup(prompt, generation_config, use_cache)
+        if cached is not None:
+            self._call_state.cache_hit = True
+            yield cached
+            return
+
+        chunks: List[str] = []
+        try:
+            for text in self._open_stream(prompt, generation_config):
+                chunks.append(text)
+                yield text
+        except Exception as e:
+            if chunks:
+                raise
+            logger.warning(f"[LLM流式] 流式请求失败，改为非流式调用: {str(e)[:100]}")
+            chunks.append(self._call_api_uncached(prompt, generation_config))
+            yield chunks[0]
+        if not chunks:
+            raise ValueError("流式响应为空")
+        self._cache_store(cache_key, "".join(chunks), check)
+
+    def _open_stream(self, prompt: str, generation_config: dict) -> Iterator[str]:
+        """发起一次流式请求（当前 provider，启用路由时为路由器的首选路由），逐块产出非空文本"""
+        config = get_config()
+        provider = "openai" if self._use_openai else "gemini"
+        model_name = self._current_model_name
+        route: Optional[LLMRoute] = None
+        probe = False
+        if config.llm_router_enabled:
+            # 流式请求只发往首选路由，失败时由非流式路径换路由重试
+            routes = get_llm_router().select(generation_config.get("model_tier"), self._route_available)
+            if routes:
+                route = routes[0]
+                provider, model_name = route.provider, route.model
+                probe = get_llm_router().admit(route)
+                if probe is None:
+                    raise CircuitOpenError(f"{route.key} 熔断中，试探请求尚未返回")
+        max_tokens = generation_config.get("max_output_tokens") or 0
+        scheduler = get_llm_scheduler()
+        ticket = scheduler.acquire(
+            provider, model_name, estimate_tokens(self.SYSTEM_PROMPT, prompt) + max_tokens
+        )
+        started = time.monotonic()
+        used_tokens = None
+        try:
+            with trace_span("llm.request", source=f"{provider}:{model_name}", stream=True):
+                if provider == "openai":
+                    stream = self._openai_client.chat.completions.create(
+                        model=model_name,
+                        messages=[
+                            {"role": "system", "content": self.SYSTEM_PROMPT},
+                            {"role": "user", "content": prompt}
+                        ],
+                        temperature=generation_config.get('temperature', config.openai_temperature),
+                        max_tokens=max_tokens or 8192,
+                        stream=True,
+                        **self._openai_response_format(generation_config),
+                    )
+                    for event in stream:
+                        text = event.choices[0].delta.content if event.choices else None
+                        if text:
+                            yield text
+                else:
+                    stream = self._gemini_client.models.generate_content_stream(
+                        model=model_name,
+                        contents=prompt,
+                        config=self._gemini_generate_config(generation_config, model_name),
+                    )
+                    for chunk in stream:
+                        usage = getattr(chunk, 'usage_metadata', None)
+                        used_tokens = getattr(usage, 'total_token_count', None) or used_tokens
+                        if chunk.text:
+                            yield chunk.text
+            if route is not None:
+                get_llm_router().record_success(route, time.monotonic() - started)
+        except Exception as e:
+            self._check_response_format_error(str(e))
+            self._check_context_cache_error(str(e))
+            if route is not None:
+                get_llm_router().record_failure(route, e, probe=probe)
+            raise
+        except GeneratorExit:
+            if probe:
+                get_llm_router().release_probe(route)
+            raise
+        finally:
+            scheduler.settle(ticket, used_tokens)
+
+    # === 异步调用（在 src/async_llm.py 的事件循环线程中运行）===
+
+    def _get_async_openai_client(self):
+        """按同步客户端的参数懒加载异步 OpenAI 客户端"""
+        if self._async_openai_client is None:
+            from openai import AsyncOpenAI
+            self._async_openai_client = AsyncOpenAI(**self._openai_client_kwargs)
+        return self._async_openai_client
+
+    async def _call_api_async(
+        self,
+        prompt: str,
+        generation_config: dict,
+        use_cache: bool = True,
+        check: Optional[Callable[[str], bool]] = None,
+    ) -> Tuple[str, bool]:
+        """
+        _call_api_with_retry 的协程版本
+
+        Returns:
+            (响应文本, 是否命中响应缓存)
+        """
+        cache_key, cached = await asyncio.to_thread(self._cache_lookup, prompt, generation_config, use_cache)
+        if cached is not None:
+            return cached, True
+
+        response_text = await self._call_api_uncached_async(prompt, generation_config)
+        await asyncio.to_thread(self._cache_store, cache_key, response_text, check)
+        return response_text, False
+
+    async def _call_openai_api_async(self, prompt: str, generation_config: dict) -> str:
+        """_call_openai_api 的协程版本（重试次数与退避相同）"""
+        config = get_config()
+        model_name = self._openai_model_name()
+        max_retries = config.gemini_max_retries
+        base_delay = config.gemini_retry_delay
+        client = self._get_async_openai_client()
+
+        for attempt in range(max_retries):
+            try:
+                if attempt > 0:
+                    delay = _retry_delay(base_delay, attempt)
+                    logger.info(f"[OpenAI] 第 {attempt + 1} 次重试，等待 {delay:.1f} 秒...")
+                    await asyncio.sleep(delay)
+
+                scheduler = get_llm_scheduler()
+                ticket = await scheduler.acquire_async(
+                    "openai",
+                    model_name,
+                    estimate_tokens(self.SYSTEM_PROMPT, prompt) + generation_config.get('max_output_tokens', 8192),
+                )
+                async with request_slot():
+                    with trace_span("llm.request", source=f"openai:{model_name}"):
+                        response = await client.chat.completions.create(
+                            model=model_name,
+                            messages=[
+                                {"role": "system", "content": self.SYSTEM_PROMPT},
+                                {"role": "user", "content": prompt}
+                            ],
+                            temperature=generation_config.get('temperature', config.openai_temperature),
+                            max_tokens=generation_config.get('max_output_tokens', 8192),
+                            **self._openai_response_format(generation_config),
+                        )
+                scheduler.settle(ticket, getattr(getattr(response, 'usage', None), 'total_tokens', None))
+
+                if response and response.choices and response.choices[0].message.content:
+                    return response.choices[0].message.content
+                raise ValueError("OpenAI API 返回空响应")
+
+            except Exception as e:
+                error_str = str(e)
+                self._check_response_format_error(error_str)
+                if _is_rate_limit(error_str):
+                    logger.warning(f"[OpenAI] API 限流，第 {attempt + 1}/{max_retries} 次尝试: {error_str[:100]}")
+                else:
+                    logger.warning(f"[OpenAI] API 调用失败，第 {attempt + 1}/{max_retries} 次尝试: {error_str[:100]}")
+
+                if attempt == max_retries - 1:
+                    raise
+
+        raise Exception("OpenAI API 调用失败，已达最大重试次数")
+
+    async def _call_api_uncached_async(self, prompt: str, generation_config: dict) -> str:
+        """
+        _call_api_uncached 的协程版本
+
+        重试、限流时切换备选模型、Gemini 失败后回退 OpenAI 的规则与同步版本一致；
+        等待（退避/RPM 排队）期间让出事件循环，只有实际请求占用并发名额。
+        """
+        if get_config().llm_router_enabled:
+            # 路由器的对冲/熔断基于线程实现：在线程中执行，每次实际请求占用一个异步并发名额
+            return await asyncio.to_thread(self._call_api_routed, prompt, generation_config, thread_slot())
+
+        if self._use_openai:
+            return await self._call_openai_api_async(prompt, generation_config)
+
+        config = get_config()
+        max_retries = config.gemini_max_retries
+        base_delay = config.gemini_retry_delay
+
+        last_error = None
+        # 限流时的备选模型只在本次调用内生效
+        model_name = self._current_model_name
+
+        for attempt in range(max_retries):
+            try:
+                if attempt > 0:
+                    delay = _retry_delay(base_delay, attempt)
+                    logger.info(f"[Gemini] 第 {attempt + 1} 次重试，等待 {delay:.1f} 秒...")
+                    await asyncio.sleep(delay)
+
+                if config.llm_context_cache_enabled:
+                    # 创建/续期缓存句柄是阻塞调用，不占用事件循环
+                    gen_config = await asyncio.to_thread(self._gemini_generate_config, generation_config, model_name)
+                else:
+                    gen_config = self._gemini_generate_config(generation_config, model_name)
+
+                scheduler = get_llm_scheduler()
+                ticket = await scheduler.acquire_async(
+                    "gemini",
+                    model_name,
+                    estimate_tokens(self.SYSTEM_PROMPT, prompt) + (generation_config.get("max_output_tokens") or 0),
+                )
+                async with request_slot():
+                    with trace_span("llm.request", source=f"gemini:{model_name}"):
+                        response = await self._gemini_client.aio.models.generate_content(
+                            model=model_name,
+                            contents=prompt,
+                            config=gen_config,
+                        )
+                        self._annotate_cached_tokens(response)
+                scheduler.settle(
+                    ticket,
+                    getattr(getattr(response, 'usage_metadata', None), 'total_token_count', None),
+                )
+
+                if response and response.text:
+                    return response.text
+                raise ValueError("Gemini 返回空响应")
+
+            except Exception as e:
+                last_error = e
+                model_name = self._handle_gemini_error(str(e), attempt, max_retries, model_name)
+
+        # Gemini 所有重试都失败，尝试 OpenAI 兼容 API（必要时懒加载初始化）
+        if not self._openai_client and config.openai_api_key and config.openai_base_url:
+            logger.warning("[Gemini] 所有重试失败，尝试初始化 OpenAI 兼容 API")
+            self._create_openai_client()
+        if self._openai_client:
+            logger.warning("[Gemini] 所有重试失败，切换到 OpenAI 兼容 API")
+            try:
+                return await self._call_openai_api_async(prompt, generation_config)
+            except Exception as openai_error:
+                logger.error(f"[OpenAI] 备选 API 也失败: {openai_error}")
+                raise last_error or openai_error
+
+        raise last_error or Exception("所有 AI API 调用失败，已达最大重试次数")
     
     def analyze(
         self, 
         context: Dict[str, Any],
-        news_context: Optional[str] = None
+        news_context: Optional[str] = None,
+        use_cache: bool = True,
+        report_type: Optional[ReportType] = None
     ) -> AnalysisResult:
         """
         分析单只股票
@@ -829,128 +1430,404 @@ class GeminiAnalyzer:
         Args:
             context: 从 storage.get_analysis_context() 获取的上下文数据
             news_context: 预先搜索的新闻内容（可选）
+            use_cache: 是否使用 LLM 响应缓存（False 时强制重新调用 API）
+            report_type: 报告类型（精简报告使用精简提示词）
             
         Returns:
             AnalysisResult 对象
         """
-        code = context.get('code', 'Unknown')
-        config = get_config()
-        
-        # 请求前增加延时（防止连续请求触发限流）
-        request_delay = config.gemini_request_delay
-        if request_delay > 0:
-            logger.debug(f"[LLM] 请求前等待 {request_delay:.1f} 秒...")
-            time.sleep(request_delay)
-        
-        # 优先从上下文获取股票名称（由 main.py 传入）
-        name = context.get('stock_name')
-        if not name or name.startswith('股票'):
-            # 备选：从 realtime 中获取
-            if 'realtime' in context and context['realtime'].get('name'):
-                name = context['realtime']['name']
-            else:
-                # 最后从映射表获取
-                name = STOCK_NAME_MAP.get(code, f'股票{code}')
+        code, name = self._resolve_name(context)
         
         # 如果模型不可用，返回默认结果
         if not self.is_available():
-            return AnalysisResult(
-                code=code,
-                name=name,
-                sentiment_score=50,
-                trend_prediction='震荡',
-                operation_advice='持有',
-                confidence_level='低',
-                analysis_summary='AI 分析功能未启用（未配置 API Key）',
-                risk_warning='请配置 Gemini API Key 后重试',
-                success=False,
-                error_message='Gemini API Key 未配置',
-            )
+            return self._unavailable_result(code, name)
         
         try:
-            # 格式化输入（包含技术面数据和新闻）
-            prompt = self._format_prompt(context, name, news_context)
-            
-            # 获取模型名称
-            model_name = getattr(self, '_current_model_name', None)
-            if not model_name:
-                model_name = getattr(self._model, '_model_name', 'unknown')
-                if hasattr(self._model, 'model_name'):
-                    model_name = self._model.model_name
+            prompt, generation_config, api_provider = self._prepare_request(
+                context, code, name, news_context, report_type
+            )
             
-            logger.info(f"========== AI 分析 {name}({code}) ==========")
-            logger.info(f"[LLM配置] 模型: {model_name}")
-            logger.info(f"[LLM配置] Prompt 长度: {len(prompt)} 字符")
-            logger.info(f"[LLM配置] 是否包含新闻: {'是' if news_context else '否'}")
+            # 使用带重试的 API 调用
+            start_time = time.time()
+            response_text = self._call_api_with_retry(
+                prompt, generation_config, use_cache=use_cache, check=self._is_usable_response
+            )
+            return self._finish_analysis(
+                response_text, code, name, news_context, api_provider,
+                time.time() - start_time, self._last_call_cache_hit(),
+            )
             
-            # 记录完整 prompt 到日志（INFO级别记录摘要，DEBUG记录完整）
-            prompt_preview = prompt[:500] + "..." if len(prompt) > 500 else prompt
-            logger.info(f"[LLM Prompt 预览]\n{prompt_preview}")
-            logger.debug(f"=== 完整 Prompt ({len(prompt)}字符) ===\n{prompt}\n=== End Prompt ===")
+        except Exception as e:
+            return self._failed_result(code, name, e)
 
-            # 设置生成配置（从配置文件读取温度参数）
-            config = get_config()
+    async def analyze_async(
+        self,
+        context: Dict[str, Any],
+        news_context: Optional[str] = None,
+        use_cache: bool = True,
+        report_type: Optional[ReportType] = None
+    ) -> AnalysisResult:
+        """
+        analyze 的协程版本（使用异步 Gemini / OpenAI 客户端）
+
+        需在事件循环中运行，通常通过 get_async_llm_runner().submit() 提交；
+        多个请求并发进行，同时进行中的数量由 LLM_ASYNC_CONCURRENCY 限制。
+        """
+        code, name = self._resolve_name(context)
+        if not self.is_available():
+            return self._unavailable_result(code, name)
+
+        try:
+            prompt, generation_config, api_provider = self._prepare_request(
+                context, code, name, news_context, report_type
+            )
+            start_time = time.time()
+            response_text, cache_hit = await self._call_api_async(
+                prompt, generation_config, use_cache=use_cache, check=self._is_usable_response
+            )
+            return self._finish_analysis(
+                response_text, code, name, news_context, api_provider,
+                time.time() - start_time, cache_hit,
+            )
+
+        except Exception as e:
+            return self._failed_result(code, name, e)
+
+    def analyze_stream(
+        self,
+        context: Dict[str, Any],
+        news_context: Optional[str] = None,
+        use_cache: bool = True,
+        report_type: Optional[ReportType] = None,
+        on_partial: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> AnalysisResult:
+        """
+        流式分析单只股票：边接收响应边增量解析，字段完成时立即回调
+
+        on_partial 在每批新字段完成时调用，参数为：
+            {
+                "code": "600519", "name": "贵州茅台",
+                "fields": {"sentiment_score": 72, ...},      # 本次新完成的字段（点号路径）
+                "partial": {"sentiment_score": 72, ...},     # 至今已完成字段的嵌套快照
+                "elapsed": 1.8,                              # 距请求开始的秒数
+            }
+        回调异常只记录日志，不影响分析；最终结果与 analyze() 相同。
+        流在中途断开时改为非流式重新请求。
+        """
+        code, name = self._resolve_name(context)
+        if not self.is_available():
+            return self._unavailable_result(code, name)
+
+        try:
+            prompt, generation_config, api_provider = self._prepare_request(
+                context, code, name, news_context, report_type
+            )
+            start_time = time.time()
+            parser = IncrementalJsonParser(max_depth=2)
+            first_field_at: Optional[float] = None
+            chunks: List[str] = []
+            try:
+                stream_iter = self._call_api_stream(
+                    prompt, generation_config, use_cache=use_cache, check=self._is_usable_response
+                )
+                with closing(stream_iter) as stream:
+                    for chunk in stream:
+                        chunks.append(chunk)
+                        completed = parser.feed(chunk)
+                        if not completed:
+                            continue
+                        elapsed = time.time() - start_time
+                        if first_field_at is None:
+                            first_field_at = elapsed
+                            logger.info(f"[LLM流式] {name}({code}) 首个字段 {elapsed:.2f}s 完成")
+                        self._emit_partial(on_partial, code, name, parser, completed, elapsed)
+                response_text = "".join(chunks)
+            except Exception as e:
+                if not chunks:
+                    raise
+                logger.warning(f"[LLM流式] {name}({code}) 流式响应中断，改为非流式请求: {str(e)[:100]}")
+                response_text = self._call_api_with_retry(
+                    prompt, generation_config, use_cache=False, check=self._is_usable_response
+                )
+
+            if first_field_at is not None:
+                annotate_span(first_field_seconds=round(first_field_at, 3))
+            return self._finish_analysis(
+                response_text, code, name, news_context, api_provider,
+                time.time() - start_time, self._last_call_cache_hit(),
+            )
+
+        except Exception as e:
+            return self._failed_result(code, name, e)
+
+    @staticmethod
+    def _emit_partial(
+        on_partial: Optional[Callable[[Dict[str, Any]], None]],
+        code: str,
+        name: str,
+        parser: IncrementalJsonParser,
+        completed: List[Tuple[Tuple[Any, ...], Any]],
+        elapsed: float,
+    ) -> None:
+        """把新完成的字段推送给调用方（数组元素随数组整体推送）"""
+        fields = {
+            ".".join(path): value for path, value in completed
+            if all(isinstance(part, str) for part in path)
+        }
+        if on_partial is None or not fields:
+            return
+        try:
+            on_partial({
+                "code": code,
+                "name": name,
+                "fields": fields,
+                "partial": parser.snapshot(),
+                "elapsed": round(elapsed, 3),
+            })
+        except Exception as e:
+            logger.warning(f"[LLM流式] {name}({code}) 部分结果回调失败: {e}")
+
+    def analyze_batch(
+        self,
+        items: List[Tuple[Dict[str, Any], Optional[str]]],
+        use_cache: bool = True
+    ) -> List[AnalysisResult]:
+        """
+        多只股票合并为一次请求分析（精简报告批量模式）
+
+        各股票以精简上下文打包进同一个提示词，系统提示词只发送一次；
+        要求模型返回 JSON 数组，逐条校验后拆分为 AnalysisResult。
+        整批请求失败或某只股票的条目缺失/校验不通过时，该股票改为单股 analyze()。
+
+        Args:
+            items: [(上下文, 新闻内容), ...]
+            use_cache: 是否使用 LLM 响应缓存
+
+        Returns:
+            与 items 顺序一致的 AnalysisResult 列表
+        """
+        if len(items) <= 1 or not self.is_available():
+            return [
+                self.analyze(context, news, use_cache=use_cache, report_type=ReportType.SIMPLE)
+                for context, news in items
+            ]
+
+        resolved = [self._resolve_name(context) for context, _ in items]
+        results: Dict[int, AnalysisResult] = {}
+        try:
+            prompt = self._format_batch_prompt(items, resolved)
+            # 批量响应是 JSON 数组，OpenAI 的 json_object 模式只允许对象，因此不开启原生 JSON 模式
             generation_config = {
-                "temperature": config.gemini_temperature,
+                "temperature": get_config().gemini_temperature,
                 "max_output_tokens": 8192,
             }
+            if get_config().llm_router_enabled:
+                generation_config["model_tier"] = TIER_FAST
+            logger.info(
+                f"[LLM批量] {len(items)} 只股票合并为一次请求: "
+                f"{', '.join(code for code, _ in resolved)}，Prompt 长度 {len(prompt)} 字符"
+            )
 
-            # 根据实际使用的 API 显示日志
-            api_provider = "OpenAI" if self._use_openai else "Gemini"
-            logger.info(f"[LLM调用] 开始调用 {api_provider} API...")
-            
-            # 使用带重试的 API 调用
+            codes = [code for code, _ in resolved]
             start_time = time.time()
-            response_text = self._call_api_with_retry(prompt, generation_config)
-            elapsed = time.time() - start_time
+            response_text = self._call_api_with_retry(
+                prompt, generation_config, use_cache=use_cache,
+                check=lambda text: self._is_complete_batch(text, codes),
+            )
+            cache_hit = self._last_call_cache_hit()
+            entries = self._parse_batch_response(response_text, codes)
+            logger.info(
+                f"[LLM批量] 响应耗时 {time.time() - start_time:.2f}s，"
+                f"有效条目 {len(entries)}/{len(items)}{'（缓存）' if cache_hit else ''}"
+            )
 
-            # 记录响应信息
-            logger.info(f"[LLM返回] {api_provider} API 响应成功, 耗时 {elapsed:.2f}s, 响应长度 {len(response_text)} 字符")
-            
-            # 记录响应预览（INFO级别）和完整响应（DEBUG级别）
-            response_preview = response_text[:300] + "..." if len(response_text) > 300 else response_text
-            logger.info(f"[LLM返回 预览]\n{response_preview}")
-            logger.debug(f"=== {api_provider} 完整响应 ({len(response_text)}字符) ===\n{response_text}\n=== End Response ===")
-            
-            # 解析响应
-            result = self._parse_response(response_text, code, name)
-            result.raw_response = response_text
-            result.search_performed = bool(news_context)
-            
-            logger.info(f"[LLM解析] {name}({code}) 分析完成: {result.trend_prediction}, 评分 {result.sentiment_score}")
-            
-            return result
-            
+            for index, ((_, news), (code, name)) in enumerate(zip(items, resolved)):
+                data = entries.get(code)
+                if data is None:
+                    continue
+                result = self._build_result(data, code, name)
+                result.raw_response = json.dumps(data, ensure_ascii=False)
+                result.search_performed = bool(news)
+                result.cache_hit = cache_hit
+                results[index] = result
         except Exception as e:
-            logger.error(f"AI 分析 {name}({code}) 失败: {e}")
-            return AnalysisResult(
-                code=code,
-                name=name,
-                sentiment_score=50,
-                trend_prediction='震荡',
-                operation_advice='持有',
-                confidence_level='低',
-                analysis_summary=f'分析过程出错: {str(e)[:100]}',
-                risk_warning='分析失败，请稍后重试或手动分析',
-                success=False,
-                error_message=str(e),
-            )
+            logger.warning(f"[LLM批量] 批量请求失败，全部改为单股分析: {e}")
+
+        missing = [index for index in range(len(items)) if index not in results]
+        if missing:
+            logger.warning(f"[LLM批量] {len(missing)} 只股票未得到有效结果，改为单股分析")
+        for index in missing:
+            context, news = items[index]
+            results[index] = self.analyze(context, news, use_cache=use_cache, report_type=ReportType.SIMPLE)
+        return [results[index] for index in range(len(items))]
+
+    def _resolve_name(self, context: Dict[str, Any]) -> Tuple[str, str]:
+        """从上下文确定股票代码与名称"""
+        code = context.get('code', 'Unknown')
+        
+        # 优先从上下文获取股票名称（由 main.py 传入）
+        name = context.get('stock_name')
+        if not name or name.startswith('股票'):
+            # 备选：从 realtime 中获取
+            if 'realtime' in context and context['realtime'].get('name'):
+                name = context['realtime']['name']
+            else:
+                # 最后从映射表获取
+                name = STOCK_NAME_MAP.get(code, f'股票{code}')
+        return code, name
+
+    @staticmethod
+    def _unavailable_result(code: str, name: str) -> AnalysisResult:
+        """未配置任何 AI API 时的默认结果"""
+        return AnalysisResult(
+            code=code,
+            name=name,
+            sentiment_score=50,
+            trend_prediction='震荡',
+            operation_advice='持有',
+            confidence_level='低',
+            analysis_summary='AI 分析功能未启用（未配置 API Key）',
+            risk_warning='请配置 Gemini API Key 后重试',
+            success=False,
+            error_message='Gemini API Key 未配置',
+        )
+
+    @staticmethod
+    def _failed_result(code: str, name: str, error: Exception) -> AnalysisResult:
+        """分析过程出错时的默认结果"""
+        logger.error(f"AI 分析 {name}({code}) 失败: {error}")
+        return AnalysisResult(
+            code=code,
+            name=name,
+            sentiment_score=50,
+            trend_prediction='震荡',
+            operation_advice='持有',
+            confidence_level='低',
+            analysis_summary=f'分析过程出错: {str(error)[:100]}',
+            risk_warning='分析失败，请稍后重试或手动分析',
+            success=False,
+            error_message=str(error),
+        )
+
+    def _prepare_request(
+        self,
+        context: Dict[str, Any],
+        code: str,
+        name: str,
+        news_context: Optional[str],
+        report_type: Optional[ReportType] = None,
+    ) -> Tuple[str, Dict[str, Any], str]:
+        """
+        构建提示词与生成配置
+
+        Returns:
+            (提示词, 生成配置, API 提供方名称)
+        """
+        config = get_config()
+        
+        # 格式化输入（包含技术面数据和新闻）；精简报告使用精简提示词
+        compact = report_type == ReportType.SIMPLE and config.llm_prompt_compact_simple
+        prompt, prompt_report = self._build_prompt(context, name, news_context, compact=compact)
+        
+        # 获取模型名称
+        model_name = getattr(self, '_current_model_name', None)
+        if not model_name:
+            model_name = getattr(self._model, '_model_name', 'unknown')
+            if hasattr(self._model, 'model_name'):
+                model_name = self._model.model_name
+        
+        logger.info(f"========== AI 分析 {name}({code}) ==========")
+        logger.info(f"[LLM配置] 模型: {model_name}")
+        logger.info(f"[LLM配置] Prompt 长度: {len(prompt)} 字符")
+        logger.info(prompt_report.summary())
+        # 记录到当前 span（stage.llm），运行剖析据此汇总提示词大小与节省比例
+        annotate_span(prompt_tokens=prompt_report.tokens, prompt_raw_tokens=prompt_report.raw_tokens)
+        logger.info(f"[LLM配置] 是否包含新闻: {'是' if news_context else '否'}")
+        
+        # 记录完整 prompt 到日志（INFO级别记录摘要，DEBUG记录完整）
+        prompt_preview = prompt[:500] + "..." if len(prompt) > 500 else prompt
+        logger.info(f"[LLM Prompt 预览]\n{prompt_preview}")
+        logger.debug(f"=== 完整 Prompt ({len(prompt)}字符) ===\n{prompt}\n=== End Prompt ===")
+
+        # 设置生成配置（从配置文件读取温度参数）
+        generation_config = {
+            "temperature": config.gemini_temperature,
+            "max_output_tokens": 8192,
+        }
+        if config.llm_json_mode:
+            # 原生 JSON 模式：响应可直接走严格解析的快路径
+            generation_config["json_mode"] = True
+        if config.llm_router_enabled:
+            # 模型档位随请求传给路由器（同时区分响应缓存）
+            generation_config["model_tier"] = self._model_tier(report_type)
+
+        # 根据实际使用的 API 显示日志
+        api_provider = "OpenAI" if self._use_openai else "Gemini"
+        logger.info(f"[LLM调用] 开始调用 {api_provider} API...")
+        return prompt, generation_config, api_provider
+
+    def _finish_analysis(
+        self,
+        response_text: str,
+        code: str,
+        name: str,
+        news_context: Optional[str],
+        api_provider: str,
+        elapsed: float,
+        cache_hit: bool,
+    ) -> AnalysisResult:
+        """记录响应并解析为 AnalysisResult"""
+        # 记录响应信息
+        if cache_hit:
+            api_provider = f"{api_provider}(缓存)"
+        logger.info(f"[LLM返回] {api_provider} API 响应成功, 耗时 {elapsed:.2f}s, 响应长度 {len(response_text)} 字符")
+        
+        # 记录响应预览（INFO级别）和完整响应（DEBUG级别）
+        response_preview = response_text[:300] + "..." if len(response_text) > 300 else response_text
+        logger.info(f"[LLM返回 预览]\n{response_preview}")
+        logger.debug(f"=== {api_provider} 完整响应 ({len(response_text)}字符) ===\n{response_text}\n=== End Response ===")
+        
+        # 解析响应
+        result = self._parse_response(response_text, code, name)
+        result.raw_response = response_text
+        result.search_performed = bool(news_context)
+        result.cache_hit = cache_hit
+        
+        logger.info(f"[LLM解析] {name}({code}) 分析完成: {result.trend_prediction}, 评分 {result.sentiment_score}")
+        return result
     
     def _format_prompt(
         self, 
         context: Dict[str, Any], 
         name: str,
-        news_context: Optional[str] = None
+        news_context: Optional[str] = None,
+        compact: bool = False
     ) -> str:
+        """格式化分析提示词（见 _build_prompt）"""
+        return self._build_prompt(context, name, news_context, compact)[0]
+
+    def _build_prompt(
+        self,
+        context: Dict[str, Any],
+        name: str,
+        news_context: Optional[str] = None,
+        compact: bool = False
+    ) -> Tuple[str, PromptReport]:
         """
-        格式化分析提示词（决策仪表盘 v2.0）
+        构建分析提示词（决策仪表盘 v2.0）
         
-        包含：技术指标、实时行情（量比/换手率）、筹码分布、趋势分析、新闻
+        包含：技术指标、实时行情（量比/换手率）、筹码分布、趋势分析、新闻。
+        各部分作为独立段落交给 PromptBuilder：情报按维度拆分并去重，
+        超出 LLM_PROMPT_TOKEN_BUDGET 时按 技术面 > 风险新闻 > 其他新闻 > 行业 的优先级裁剪。
         
         Args:
             context: 技术面数据上下文（包含增强数据）
             name: 股票名称（默认值，可能被上下文覆盖）
             news_context: 预先搜索的新闻内容
+            compact: 精简模式（精简报告使用）：技术面改为要点列表，情报每个维度最多 2 条
+            
+        Returns:
+            (提示词, 大小报告)
         """
         code = context.get('code', 'Unknown')
         
@@ -960,9 +1837,19 @@ class GeminiAnalyzer:
             stock_name = STOCK_NAME_MAP.get(code, f'股票{code}')
             
         today = context.get('today', {})
+        builder = PromptBuilder(get_config().llm_prompt_token_budget)
+        compact_sections = self._compact_sections(context, stock_name) if compact else {}
+
+        def add(section: str, text: str, priority: int) -> None:
+            # 精简模式下使用要点列表，原始表格的长度计入“精简前”
+            short = compact_sections.get(section)
+            if short is not None:
+                builder.add(section, short, priority, raw_tokens=count_tokens(text))
+            else:
+                builder.add(section, text, priority)
         
         # ========== 构建决策仪表盘格式的输入 ==========
-        prompt = f"""# 决策仪表盘分析请求
+        add("header", f"""# 决策仪表盘分析请求
 
 ## 📊 股票基础信息
 | 项目 | 数据 |
@@ -974,7 +1861,9 @@ class GeminiAnalyzer:
 ---
 
 ## 📈 技术面数据
+""", PRIORITY_REQUIRED)
 
+        add("technical", f"""
 ### 今日行情
 | 指标 | 数值 |
 |------|------|
@@ -993,12 +1882,12 @@ class GeminiAnalyzer:
 | MA10 | {today.get('ma10', 'N/A')} | 中短期趋势线 |
 | MA20 | {today.get('ma20', 'N/A')} | 中期趋势线 |
 | 均线形态 | {context.get('ma_status', '未知')} | 多头/空头/缠绕 |
-"""
+""", PRIORITY_TECHNICAL)
         
         # 添加实时行情数据（量比、换手率等）
         if 'realtime' in context:
             rt = context['realtime']
-            prompt += f"""
+            add("realtime", f"""
 ### 实时行情增强数据
 | 指标 | 数值 | 解读 |
 |------|------|------|
@@ -1010,13 +1899,13 @@ class GeminiAnalyzer:
 | 总市值 | {self._format_amount(rt.get('total_mv'))} | |
 | 流通市值 | {self._format_amount(rt.get('circ_mv'))} | |
 | 60日涨跌幅 | {rt.get('change_60d', 'N/A')}% | 中期表现 |
-"""
+""", PRIORITY_TECHNICAL + 2)
         
         # 添加筹码分布数据
         if 'chip' in context:
             chip = context['chip']
             profit_ratio = chip.get('profit_ratio', 0)
-            prompt += f"""
+            add("chip", f"""
 ### 筹码分布数据（效率指标）
 | 指标 | 数值 | 健康标准 |
 |------|------|----------|
@@ -1025,13 +1914,13 @@ class GeminiAnalyzer:
 | 90%筹码集中度 | {chip.get('concentration_90', 0):.2%} | <15%为集中 |
 | 70%筹码集中度 | {chip.get('concentration_70', 0):.2%} | |
 | 筹码状态 | {chip.get('chip_status', '未知')} | |
-"""
+""", PRIORITY_TECHNICAL + 3)
         
         # 添加趋势分析结果（基于交易理念的预判）
         if 'trend_analysis' in context:
             trend = context['trend_analysis']
             bias_warning = "🚨 超过5%，严禁追高！" if trend.get('bias_ma5', 0) > 5 else "✅ 安全范围"
-            prompt += f"""
+            add("trend", f"""
 ### 趋势分析预判（基于交易理念）
 | 指标 | 数值 | 判定 |
 |------|------|------|
@@ -1050,50 +1939,60 @@ class GeminiAnalyzer:
 
 **风险因素**：
 {chr(10).join('- ' + r for r in trend.get('risk_factors', ['无'])) if trend.get('risk_factors') else '- 无'}
-"""
+""", PRIORITY_TECHNICAL + 1)
         
         # 添加昨日对比数据
         if 'yesterday' in context:
             volume_change = context.get('volume_change_ratio', 'N/A')
-            prompt += f"""
+            add("yesterday", f"""
 ### 量价变化
 - 成交量较昨日变化：{volume_change}倍
 - 价格较昨日变化：{context.get('price_change_ratio', 'N/A')}%
-"""
+""", PRIORITY_TECHNICAL + 4)
         
-        # 添加新闻搜索结果（重点区域）
-        prompt += """
+        # 添加新闻搜索结果（重点区域）：按维度拆分、去重后分别计入预算
+        if news_context:
+            builder.add("news.header", f"""
 ---
 
 ## 📰 舆情情报
-"""
-        if news_context:
-            prompt += f"""
+
 以下是 **{stock_name}({code})** 近7日的新闻搜索结果，请重点提取：
 1. 🚨 **风险警报**：减持、处罚、利空
 2. 🎯 **利好催化**：业绩、合同、政策
 3. 📊 **业绩预期**：年报预告、业绩快报
 
 ```
-{news_context}
-```
-"""
+""", PRIORITY_REQUIRED, group="news", fallback="""
+---
+
+## 📰 舆情情报
+
+新闻搜索结果因长度限制已省略。请主要依据技术面数据进行分析。
+""")
+            if not builder.add_intel(news_context, compact=compact, group="news"):
+                builder.add("news", news_context + "\n", PRIORITY_NEWS, group="news")
+            builder.add("news.footer", "```\n", PRIORITY_REQUIRED, group="news")
         else:
-            prompt += """
+            builder.add("news.header", """
+---
+
+## 📰 舆情情报
+
 未搜索到该股票近期的相关新闻。请主要依据技术面数据进行分析。
-"""
+""", PRIORITY_REQUIRED)
 
         # 注入缺失数据警告
         if context.get('data_missing'):
-            prompt += """
+            builder.add("data_missing", """
 ⚠️ **数据缺失警告**
 由于接口限制，当前无法获取完整的实时行情和技术指标数据。
 请 **忽略上述表格中的 N/A 数据**，重点依据 **【📰 舆情情报】** 中的新闻进行基本面和情绪面分析。
 在回答技术面问题（如均线、乖离率）时，请直接说明“数据缺失，无法判断”，**严禁编造数据**。
-"""
+""", PRIORITY_REQUIRED)
         
         # 明确的输出要求
-        prompt += f"""
+        builder.add("task", f"""
 ---
 
 ## ✅ 分析任务
@@ -1117,10 +2016,144 @@ class GeminiAnalyzer:
 - **具体狙击点位**：买入价、止损价、目标价（精确到分）
 - **检查清单**：每项用 ✅/⚠️/❌ 标记
 
-请输出完整的 JSON 格式决策仪表盘。"""
+请输出完整的 JSON 格式决策仪表盘。""", PRIORITY_REQUIRED)
         
-        return prompt
-    
+        return builder.build()
+
+    def _compact_sections(self, context: Dict[str, Any], stock_name: str) -> Dict[str, str]:
+        """精简模式的各段落（要点列表），键与 _build_prompt 的段落名一致"""
+        code = context.get('code', 'Unknown')
+        today = context.get('today', {})
+        sections = {
+            'header': (
+                f"# 决策仪表盘分析请求（精简）\n\n"
+                f"## 📊 {stock_name} | 股票代码 **{code}** | 分析日期 {context.get('date', '未知')}\n\n"
+                f"## 📈 技术面要点\n"
+            ),
+            'technical': (
+                f"- 今日行情：收盘 {today.get('close', 'N/A')} 元，涨跌幅 {today.get('pct_chg', 'N/A')}%，"
+                f"成交额 {self._format_amount(today.get('amount'))}\n"
+                f"- 均线：MA5 {today.get('ma5', 'N/A')} / MA10 {today.get('ma10', 'N/A')} / "
+                f"MA20 {today.get('ma20', 'N/A')}（{context.get('ma_status', '未知')}）\n"
+            ),
+        }
+        if 'realtime' in context:
+            rt = context['realtime']
+            sections['realtime'] = (
+                f"- 实时：现价 {rt.get('price', 'N/A')} 元，量比 {rt.get('volume_ratio', 'N/A')}，"
+                f"换手率 {rt.get('turnover_rate', 'N/A')}%，市盈率 {rt.get('pe_ratio', 'N/A')}\n"
+            )
+        if 'chip' in context:
+            chip = context['chip']
+            sections['chip'] = (
+                f"- 筹码：获利比例 {chip.get('profit_ratio', 0):.1%}，平均成本 {chip.get('avg_cost', 'N/A')} 元，"
+                f"90%集中度 {chip.get('concentration_90', 0):.2%}\n"
+            )
+        if 'trend_analysis' in context:
+            trend = context['trend_analysis']
+            text = (
+                f"- 趋势：{trend.get('trend_status', '未知')}，{trend.get('ma_alignment', '未知')}，"
+                f"乖离率(MA5) {trend.get('bias_ma5', 0):+.2f}%，量能 {trend.get('volume_status', '未知')}，"
+                f"系统信号 {trend.get('buy_signal', '未知')}（{trend.get('signal_score', 0)}/100）\n"
+            )
+            if trend.get('signal_reasons'):
+                text += f"- 买入理由：{'；'.join(trend['signal_reasons'])}\n"
+            if trend.get('risk_factors'):
+                text += f"- 风险因素：{'；'.join(trend['risk_factors'])}\n"
+            sections['trend'] = text
+        if 'yesterday' in context:
+            sections['yesterday'] = (
+                f"- 量价变化：成交量较昨日 {context.get('volume_change_ratio', 'N/A')} 倍，"
+                f"价格 {context.get('price_change_ratio', 'N/A')}%\n"
+            )
+        return sections
+
+    def _format_batch_prompt(
+        self,
+        items: List[Tuple[Dict[str, Any], Optional[str]]],
+        resolved: List[Tuple[str, str]],
+    ) -> str:
+        """格式化多股批量分析提示词（每只股票一段精简上下文 + JSON 数组输出要求）"""
+        sections = [
+            self._format_compact_context(context, name, news, index)
+            for index, ((context, news), (_, name)) in enumerate(zip(items, resolved), 1)
+        ]
+        codes = '、'.join(code for code, _ in resolved)
+        return f"""# 批量决策分析请求（精简报告）
+
+本次请求包含 **{len(items)}** 只股票（{codes}）。请逐只独立分析，不要混用不同股票的数据。
+
+{chr(10).join(sections)}
+---
+
+## ✅ 输出要求
+
+本次为批量请求，**不要**输出单个 JSON 对象，而是严格输出一个 JSON 数组（不要附加其他文字）。
+数组共 {len(items)} 个元素，每个元素对应上面的一只股票，字段如下（交易理念与评分标准同系统提示）：
+
+```json
+[
+    {{
+        "code": "股票代码（必须与上方完全一致）",
+        "stock_name": "股票中文名称",
+        "sentiment_score": 0-100整数,
+        "trend_prediction": "强烈看多/看多/震荡/看空/强烈看空",
+        "operation_advice": "买入/加仓/持有/减仓/卖出/观望",
+        "decision_type": "buy/hold/sell",
+        "confidence_level": "高/中/低",
+        "dashboard": {{
+            "core_conclusion": {{
+                "one_sentence": "一句话核心结论（30字以内）",
+                "signal_type": "🟢买入信号/🟡持有观望/🔴卖出信号/⚠️风险警告",
+                "position_advice": {{"no_position": "空仓者建议", "has_position": "持仓者建议"}}
+            }},
+            "intelligence": {{
+                "risk_alerts": ["风险点"],
+                "positive_catalysts": ["利好"],
+                "sentiment_summary": "舆情情绪一句话总结"
+            }},
+            "battle_plan": {{
+                "sniper_points": {{"ideal_buy": "理想买入点", "stop_loss": "止损位", "take_profit": "目标位"}}
+            }}
+        }},
+        "analysis_summary": "50字综合分析摘要",
+        "risk_warning": "风险提示",
+        "buy_reason": "操作理由"
+    }}
+]
+```"""
+
+    def _format_compact_context(
+        self,
+        context: Dict[str, Any],
+        name: str,
+        news_context: Optional[str],
+        index: int,
+    ) -> str:
+        """单只股票的精简上下文（批量模式使用，只保留决策所需的关键字段）"""
+        code = context.get('code', 'Unknown')
+        sections = self._compact_sections(context, name)
+        text = f"## 股票 {index}：{code} {name}\n- 分析日期：{context.get('date', '未知')}\n"
+        text += "".join(sections[key] for key in ('technical', 'realtime', 'chip', 'trend') if key in sections)
+        if news_context:
+            text += f"- 舆情（节选）：\n```\n{self._compact_news(news_context)}\n```\n"
+        else:
+            text += "- 舆情：未搜索到近期相关新闻\n"
+        if context.get('data_missing'):
+            text += "- ⚠️ 行情数据缺失：技术面问题请回答“数据缺失，无法判断”，严禁编造数据\n"
+        return text
+
+    def _compact_news(self, news_context: str) -> str:
+        """去重、每个维度最多 2 条后的情报节选（不超过 BATCH_NEWS_CHARS 字符）"""
+        builder = PromptBuilder()
+        if builder.add_intel(news_context, compact=True):
+            news = builder.build()[0].strip()
+        else:
+            news = news_context.strip()
+        if len(news) > self.BATCH_NEWS_CHARS:
+            news = news[:self.BATCH_NEWS_CHARS] + '…'
+        return news
+
     def _format_volume(self, volume: Optional[float]) -> str:
         """格式化成交量显示"""
         if volume is None:
@@ -1152,115 +2185,93 @@ class GeminiAnalyzer:
         """
         解析 Gemini 响应（决策仪表盘版）
         
-        尝试从响应中提取 JSON 格式的分析结果，包含 dashboard 字段
+        先严格解析提取出的 JSON，失败才修复；按仪表盘结构校验并纠正字段。
         如果解析失败，尝试智能提取或返回默认结果
         """
-        try:
-            # 清理响应文本：移除 markdown 代码块标记
-            cleaned_text = response_text
-            if '```json' in cleaned_text:
-                cleaned_text = cleaned_text.replace('```json', '').replace('```', '')
-            elif '```' in cleaned_text:
-                cleaned_text = cleaned_text.replace('```', '')
-            
-            # 尝试找到 JSON 内容
-            json_start = cleaned_text.find('{')
-            json_end = cleaned_text.rfind('}') + 1
-            
-            if json_start >= 0 and json_end > json_start:
-                json_str = cleaned_text[json_start:json_end]
-                
-                # 尝试修复常见的 JSON 问题
-                json_str = self._fix_json_string(json_str)
-                
-                data = json.loads(json_str)
-                
-                # 提取 dashboard 数据
-                dashboard = data.get('dashboard', None)
-
-                # 优先使用 AI 返回的股票名称（如果原名称无效或包含代码）
-                ai_stock_name = data.get('stock_name')
-                if ai_stock_name and (name.startswith('股票') or name == code or 'Unknown' in name):
-                    name = ai_stock_name
-
-                # 解析所有字段，使用默认值防止缺失
-                # 解析 decision_type，如果没有则根据 operation_advice 推断
-                decision_type = data.get('decision_type', '')
-                if not decision_type:
-                    op = data.get('operation_advice', '持有')
-                    if op in ['买入', '加仓', '强烈买入']:
-                        decision_type = 'buy'
-                    elif op in ['卖出', '减仓', '强烈卖出']:
-                        decision_type = 'sell'
-                    else:
-                        decision_type = 'hold'
-                
-                return AnalysisResult(
-                    code=code,
-                    name=name,
-                    # 核心指标
-                    sentiment_score=int(data.get('sentiment_score', 50)),
-                    trend_prediction=data.get('trend_prediction', '震荡'),
-                    operation_advice=data.get('operation_advice', '持有'),
-                    decision_type=decision_type,
-                    confidence_level=data.get('confidence_level', '中'),
-                    # 决策仪表盘
-                    dashboard=dashboard,
-                    # 走势分析
-                    trend_analysis=data.get('trend_analysis', ''),
-                    short_term_outlook=data.get('short_term_outlook', ''),
-                    medium_term_outlook=data.get('medium_term_outlook', ''),
-                    # 技术面
-                    technical_analysis=data.get('technical_analysis', ''),
-                    ma_analysis=data.get('ma_analysis', ''),
-                    volume_analysis=data.get('volume_analysis', ''),
-                    pattern_analysis=data.get('pattern_analysis', ''),
-                    # 基本面
-                    fundamental_analysis=data.get('fundamental_analysis', ''),
-                    sector_position=data.get('sector_position', ''),
-                    company_highlights=data.get('company_highlights', ''),
-                    # 情绪面/消息面
-                    news_summary=data.get('news_summary', ''),
-                    market_sentiment=data.get('market_sentiment', ''),
-                    hot_topics=data.get('hot_topics', ''),
-                    # 综合
-                    analysis_summary=data.get('analysis_summary', '分析完成'),
-                    key_points=data.get('key_points', ''),
-                    risk_warning=data.get('risk_warning', ''),
-                    buy_reason=data.get('buy_reason', ''),
-                    # 元数据
-                    search_performed=data.get('search_performed', False),
-                    data_sources=data.get('data_sources', '技术面数据'),
-                    success=True,
-                )
-            else:
-                # 没有找到 JSON，尝试从纯文本中提取信息
-                logger.warning(f"无法从响应中提取 JSON，使用原始文本分析")
-                return self._parse_text_response(response_text, code, name)
-                
-        except json.JSONDecodeError as e:
-            logger.warning(f"JSON 解析失败: {e}，尝试从文本提取")
+        outcome = parse_json_response(response_text)
+        if outcome.data is None:
+            # 严格解析与修复都失败，尝试从纯文本中提取信息
+            logger.warning(f"JSON 解析失败: {outcome.error}，尝试从文本提取")
             return self._parse_text_response(response_text, code, name)
-    
+
+        if outcome.stage != STAGE_STRICT:
+            logger.info(f"[LLM] {name}({code}) 响应不是合法 JSON，已修复后解析")
+        problems = validate_fields(outcome.data, DASHBOARD_SCHEMA, fix=True)
+        if problems:
+            logger.warning(f"[LLM] {name}({code}) 响应不符合仪表盘结构: {'; '.join(problems)}")
+        annotate_span(parse_stage=outcome.stage)
+        return self._build_result(outcome.data, code, name)
+
+    @staticmethod
+    def _is_usable_response(response_text: str) -> bool:
+        """响应能否解析为符合仪表盘结构的 JSON（严格解析或修复后），决定是否写入响应缓存"""
+        outcome = parse_json_response(response_text)
+        return outcome.data is not None and not validate_fields(outcome.data, DASHBOARD_SCHEMA, fix=True)
+
+    def _build_result(self, data: Dict[str, Any], code: str, name: str) -> AnalysisResult:
+        """由解析出的 JSON 对象构建 AnalysisResult（缺失字段使用默认值）"""
+        # 提取 dashboard 数据
+        dashboard = data.get('dashboard', None)
+
+        # 优先使用 AI 返回的股票名称（如果原名称无效或包含代码）
+        ai_stock_name = data.get('stock_name')
+        if ai_stock_name and (name.startswith('股票') or name == code or 'Unknown' in name):
+            name = ai_stock_name
+
+        # 解析所有字段，使用默认值防止缺失
+        # 解析 decision_type，如果没有则根据 operation_advice 推断
+        decision_type = data.get('decision_type', '')
+        if not decision_type:
+            op = data.get('operation_advice', '持有')
+            if op in ['买入', '加仓', '强烈买入']:
+                decision_type = 'buy'
+            elif op in ['卖出', '减仓', '强烈卖出']:
+                decision_type = 'sell'
+            else:
+                decision_type = 'hold'
+        
+        return AnalysisResult(
+            code=code,
+            name=name,
+            # 核心指标
+            sentiment_score=int(data.get('sentiment_score', 50)),
+            trend_prediction=data.get('trend_prediction', '震荡'),
+            operation_advice=data.get('operation_advice', '持有'),
+            decision_type=decision_type,
+            confidence_level=data.get('confidence_level', '中'),
+            # 决策仪表盘
+            dashboard=dashboard,
+            # 走势分析
+            trend_analysis=data.get('trend_analysis', ''),
+            short_term_outlook=data.get('short_term_outlook', ''),
+            medium_term_outlook=data.get('medium_term_outlook', ''),
+            # 技术面
+            technical_analysis=data.get('technical_analysis', ''),
+            ma_analysis=data.get('ma_analysis', ''),
+            volume_analysis=data.get('volume_analysis', ''),
+            pattern_analysis=data.get('pattern_analysis', ''),
+            # 基本面
+            fundamental_analysis=data.get('fundamental_analysis', ''),
+            sector_position=data.get('sector_position', ''),
+            company_highlights=data.get('company_highlights', ''),
+            # 情绪面/消息面
+            news_summary=data.get('news_summary', ''),
+            market_sentiment=data.get('market_sentiment', ''),
+            hot_topics=data.get('hot_topics', ''),
+            # 综合
+            analysis_summary=data.get('analysis_summary', '分析完成'),
+            key_points=data.get('key_points', ''),
+            risk_warning=data.get('risk_warning', ''),
+            buy_reason=data.get('buy_reason', ''),
+            # 元数据
+            search_performed=data.get('search_performed', False),
+            data_sources=data.get('data_sources', '技术面数据'),
+            success=True,
+        )
+
     def _fix_json_string(self, json_str: str) -> str:
         """修复常见的 JSON 格式问题"""
-        import re
-        
-        # 移除注释
-        json_str = re.sub(r'//.*?\n', '\n', json_str)
-        json_str = re.sub(r'/\*.*?\*/', '', json_str, flags=re.DOTALL)
-        
-        # 修复尾随逗号
-        json_str = re.sub(r',\s*}', '}', json_str)
-        json_str = re.sub(r',\s*]', ']', json_str)
-        
-        # 确保布尔值是小写
-        json_str = json_str.replace('True', 'true').replace('False', 'false')
-        
-        # fix by json-repair
-        json_str = repair_json(json_str)
-        
-        return json_str
+        return repair_json_text(json_str)
     
     def _parse_text_response(
         self, 
@@ -1314,34 +2325,78 @@ class GeminiAnalyzer:
             success=True,
         )
     
+    def _parse_batch_response(self, response_text: str, codes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        解析批量响应中的 JSON 数组
+
+        Returns:
+            {股票代码: 通过校验的条目}；无法解析出数组时抛出 ValueError
+        """
+        outcome = parse_json_response(response_text, expect=list)
+        if outcome.data is None:
+            raise ValueError(f"批量响应中未解析出 JSON 数组: {outcome.error}")
+        data = outcome.data
+
+        expected = set(codes)
+        entries: Dict[str, Dict[str, Any]] = {}
+        for entry in data:
+            problem = self._validate_batch_entry(entry, expected)
+            if problem:
+                logger.warning(f"[LLM批量] 丢弃无效条目: {problem}")
+                continue
+            code = self._normalize_code(entry['code'])
+            if code in entries:
+                logger.warning(f"[LLM批量] 股票 {code} 重复返回，使用第一条")
+                continue
+            entries[code] = entry
+        return entries
+
+    def _is_complete_batch(self, response_text: str, codes: List[str]) -> bool:
+        """批量响应是否每只股票都有通过校验的条目（不完整的响应不写入缓存，下次重新请求）"""
+        try:
+            return len(self._parse_batch_response(response_text, codes)) == len(codes)
+        except ValueError:
+            return False
+
+    @staticmethod
+    def _normalize_code(code: Any) -> str:
+        """统一股票代码格式（模型可能把 000001 输出为数字 1）"""
+        text = str(code).strip()
+        return text.zfill(6) if text.isdigit() and len(text) < 6 else text
+
+    def _validate_batch_entry(self, entry: Any, expected: set) -> Optional[str]:
+        """校验批量响应中的单条结果，通过返回 None，否则返回原因"""
+        if not isinstance(entry, dict):
+            return f"条目不是 JSON 对象: {str(entry)[:50]}"
+        if 'code' not in entry:
+            return "缺少 code 字段"
+        code = self._normalize_code(entry['code'])
+        if code not in expected:
+            return f"股票代码 {code} 不在本批次中"
+        # 通过校验的条目同时完成字段纠正（如 "72" -> 72）
+        problems = validate_fields(entry, DASHBOARD_SCHEMA, fix=True)
+        if problems:
+            return f"{code} {problems[0]}"
+        return None
+
     def batch_analyze(
         self, 
         contexts: List[Dict[str, Any]],
-        delay_between: float = 2.0
+        delay_between: Optional[float] = None
     ) -> List[AnalysisResult]:
         """
         批量分析多只股票
         
-        注意：为避免 API 速率限制，每次分析之间会有延迟
+        请求速率由全局 LLM 调度器按 RPM/TPM 控制，不再在每次分析之间固定等待。
         
         Args:
             contexts: 上下文数据列表
-            delay_between: 每次分析之间的延迟（秒）
+            delay_between: 已废弃，保留参数仅为兼容旧调用
             
         Returns:
             AnalysisResult 列表
         """
-        results = []
-        
-        for i, context in enumerate(contexts):
-            if i > 0:
-                logger.debug(f"等待 {delay_between} 秒后继续...")
-                time.sleep(delay_between)
-            
-            result = self.analyze(context)
-            results.append(result)
-        
-        return results
+        return [self.analyze(context) for context in contexts]
 
 
 # 便捷函数
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 异步 LLM 运行器
+===================================
+
+职责：
+1. 在独立的事件循环线程中运行 LLM 协程（异步 Gemini / OpenAI 客户端）
+2. 以并发上限（信号量）约束同时进行中的请求，速率仍由 LLM 调度器控制
+3. 为线程代码（流水线各阶段、Web/Bot 单股分析）提供提交协程、获取 Future 的桥接
+4. 为事件循环配置按并发上限确定大小的默认线程池（asyncio.to_thread 使用），
+   启用路由时整次分析在线程中执行，不再与缓存读写争用 min(32, CPU+4) 的默认线程池
+
+用法：
+    future = get_async_llm_runner().submit(analyzer.analyze_async(context))
+    result = future.result()
+"""
+
+import asyncio
+import logging
+import threading
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, ContextManager, Coroutine, Optional
+
+from src.config import get_config
+
+logger = logging.getLogger(__name__)
+
+# 每个事件循环一个并发信号量（asyncio.Semaphore 绑定到首次使用它的事件循环）
+_slots: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]' = weakref.WeakKeyDictionary()
+_slots_lock = threading.Lock()
+
+
+def request_slot() -> asyncio.Semaphore:
+    """
+    当前事件循环的 LLM 请求并发信号量（容量为 LLM_ASYNC_CONCURRENCY）
+
+    只包裹真正的 API 请求：按 RPM/TPM 排队等待时不占用并发名额。
+    """
+    loop = asyncio.get_running_loop()
+    with _slots_lock:
+        semaphore = _slots.get(loop)
+        if semaphore is None:
+            semaphore = _slots[loop] = asyncio.Semaphore(max(1, get_config().llm_async_concurrency))
+    return semaphore
+
+
+def thread_slot() -> Callable[[], ContextManager[None]]:
+    """
+    供 asyncio.to_thread 中的同步代码占用当前事件循环的并发名额
+
+    须在事件循环中调用（绑定当前循环的信号量）；返回的上下文管理器在工作线程中进入，
+    阻塞等待名额，退出时归还。用于只包裹线程内真正的 API 请求，排队等待预算时不占名额。
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = request_slot()
+
+    @contextmanager
+    def hold():
+        asyncio.run_coroutine_threadsafe(semaphore.acquire(), loop).result()
+        try:
+            yield
+        finally:
+            loop.call_soon_threadsafe(semaphore.release)
+
+    return hold
+
+
+class AsyncLLMRunner:
+    """
+    独立事件循环线程（懒启动，守护线程）
+
+    协程在该线程上并发执行，提交方线程只阻塞在 Future 上，
+    因此 LLM 并发度由 request_slot() 决定，而不是调用方的线程数。
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def executor_workers() -> int:
+        """
+        事件循环默认线程池大小
+
+        启用路由时每个挂起的分析在 to_thread 中占用一个线程（含 RPM 排队时间），
+        流水线最多同时挂起 2 × LLM_ASYNC_CONCURRENCY 个分析；另留 4 个线程给缓存读写等短任务。
+        """
+        return max(1, get_config().llm_async_concurrency) * 2 + 4
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        if self.running:
+            return self._loop
+        with self._lock:
+            if not self.running:
+                loop = asyncio.new_event_loop()
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.executor_workers(), thread_name_prefix="llm-loop-worker"
+                )
+                loop.set_default_executor(self._executor)
+                ready = threading.Event()
+
+                def serve() -> None:
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                self._loop = loop
+                self._thread = threading.Thread(target=serve, name="llm-event-loop", daemon=True)
+                self._thread.start()
+                ready.wait()
+                logger.info("[异步LLM] 事件循环线程已启动")
+        return self._loop
+
+    def submit(self, coro: Coroutine[Any, Any, Any]) -> Future:
+        """提交协程到事件循环线程，返回 concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_started())
+
+    def run(self, coro: Coroutine[Any, Any, Any], timeout: Optional[float] = None) -> Any:
+        """提交协程并阻塞等待结果"""
+        return self.submit(coro).result(timeout)
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """停止事件循环（未完成的协程被取消）"""
+        with self._lock:
+            loop, thread, executor = self._loop, self._thread, self._executor
+            self._loop = self._thread = self._executor = None
+        if loop is None or thread is None:
+            return
+
+        async def cancel_pending() -> None:
+            current = asyncio.current_task()
+            tasks = [t for t in asyncio.all_tasks() if t is not current]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        try:
+            asyncio.run_coroutine_threadsafe(cancel_pending(), loop).result(timeout)
+        except Exception as e:
+            logger.warning(f"[异步LLM] 取消未完成请求失败: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        loop.close()
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+# === 便捷函数 ===
+
+_runner: Optional[AsyncLLMRunner] = None
+_runner_lock = threading.Lock()
+
+
+def get_async_llm_runner() -> AsyncLLMRunner:
+    """获取进程级异步 LLM 运行器"""
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                _runner = AsyncLLMRunner()
+    return _runner
+
+
+def reset_async_llm_runner() -> None:
+    """停止并重置运行器（主要用于测试）"""
+    global _runner
+    with _runner_lock:
+        runner, _runner = _runner, None
+    if runner is not None:
+        runner.shutdown()
@@ -0,0 +1,389 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 趋势信号回测
+===================================
+
+职责：
+1. 用 StockTrendAnalyzer.score_history 一次性算出每个 (code, date) 的历史评分
+2. 向量化模拟「次日开盘买入、止损/止盈/到期卖出」，按买入信号与评分分桶统计
+   胜率、收益与回撤
+3. 参数网格（分析器阈值/评分表 + 交易规则）按进程并行扫描
+
+说明：
+- 每个信号日视为一笔独立交易（信号事件研究），不考虑资金占用与仓位冲突
+- 分桶净值曲线按「资金分 hold_days 份滚动投入」近似，用于比较各桶回撤
+"""
+
+import itertools
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field, fields
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.stock_analyzer import BuySignal, StockTrendAnalyzer
+
+logger = logging.getLogger(__name__)
+
+# 回测需要的日线字段
+BAR_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+# 评分分桶边界
+SCORE_BINS = (0, 30, 45, 60, 75, 101)
+
+# 分桶统计输出列
+BUCKET_COLUMNS = [
+    'bucket', 'trades', 'hit_rate', 'avg_return', 'median_return',
+    'avg_drawdown', 'worst_return', 'curve_drawdown', 'avg_days',
+]
+
+
+@dataclass
+class BacktestParams:
+    """
+    交易规则参数
+
+    分析器参数（如 BIAS_THRESHOLD、BUY_SCORE、TREND_SCORES）通过 analyzer_params
+    覆盖到 StockTrendAnalyzer 实例上，其余字段为进出场规则。
+    """
+    hold_days: int = 10                 # 最长持有 K 线数（到期收盘卖出）
+    stop_loss_pct: float = 0.0          # 止损（%，0 表示不设）
+    take_profit_pct: float = 0.0        # 止盈（%，0 表示不设）
+    cost_pct: float = 0.15              # 往返交易成本（%，佣金 + 印花税）
+    entry_signals: Tuple[str, ...] = (BuySignal.STRONG_BUY.value, BuySignal.BUY.value)  # 汇总指标统计的信号
+    analyzer_params: Dict[str, Any] = field(default_factory=dict)
+
+    def label(self) -> str:
+        """参数组合的简短描述"""
+        parts = [f"{k}={v}" for k, v in sorted(self.analyzer_params.items())]
+        parts += [f"hold_days={self.hold_days}"]
+        if self.stop_loss_pct:
+            parts.append(f"stop_loss={self.stop_loss_pct}%")
+        if self.take_profit_pct:
+            parts.append(f"take_profit={self.take_profit_pct}%")
+        return ", ".join(parts)
+
+
+@dataclass
+class BacktestReport:
+    """单组参数的回测结果"""
+    params: BacktestParams
+    signals: pd.DataFrame               # 按买入信号分桶
+    scores: pd.DataFrame                # 按评分区间分桶
+    summary: Dict[str, Any]             # entry_signals 合并后的汇总指标
+    elapsed: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'params': asdict(self.params),
+            'summary': self.summary,
+            'signals': self.signals.round(4).to_dict(orient='records'),
+            'scores': self.scores.round(4).to_dict(orient='records'),
+            'elapsed': round(self.elapsed, 3),
+        }
+
+    def to_markdown(self) -> str:
+        """渲染为 Markdown 报告"""
+        lines = [
+            f"### 回测：{self.params.label()}",
+            "",
+            f"> {'/'.join(self.params.entry_signals)}：{self.summary['trades']} 笔，"
+            f"胜率 {self.summary['hit_rate']:.1%}，平均收益 {self.summary['avg_return']:+.2%}，"
+            f"净值回撤 {self.summary['curve_drawdown']:.1%}",
+            "",
+        ]
+        for title, frame in (("买入信号", self.signals), ("评分区间", self.scores)):
+            lines += [
+                f"| {title} | 笔数 | 胜率 | 平均收益 | 收益中位数 | 平均最大浮亏 | 最差 | 净值回撤 | 平均持有 |",
+                "|------|------|------|----------|------------|--------------|------|----------|----------|",
+            ]
+            for row in frame.itertuples(index=False):
+                lines.append(
+                    f"| {row.bucket} | {row.trades} | {row.hit_rate:.1%} | {row.avg_return:+.2%} | "
+                    f"{row.median_return:+.2%} | {row.avg_drawdown:.2%} | {row.worst_return:+.2%} | "
+                    f"{row.curve_drawdown:.1%} | {row.avg_days:.1f} |"
+                )
+            lines.append("")
+        return "\n".join(lines)
+
+
+def load_bars(
+    days: int = 365 * 5,
+    end_date: Optional[date] = None,
+    codes: Optional[Sequence[str]] = None,
+    db=None,
+) -> pd.DataFrame:
+    """
+    从本地数据库批量读取回测区间的日线
+
+    Returns:
+        长表 DataFrame [code, date, open, high, low, close, volume]
+    """
+    from src.storage import get_db
+
+    end_date = end_date or date.today()
+    db = db or get_db()
+    return db.get_daily_bars(end_date - timedelta(days=days), end_date, codes=codes, columns=BAR_COLUMNS)
+
+
+def expand_grid(grid: Dict[str, Sequence[Any]], base: Optional[BacktestParams] = None) -> List[BacktestParams]:
+    """
+    参数网格展开
+
+    Args:
+        grid: {参数名: 候选值列表}；参数名为 BacktestParams 字段或 StockTrendAnalyzer 的大写类属性
+        base: 基础参数（默认 BacktestParams()）
+
+    Returns:
+        所有组合的 BacktestParams 列表
+    """
+    base = base or BacktestParams()
+    trade_fields = {f.name for f in fields(BacktestParams)} - {'analyzer_params'}
+    for name in grid:
+        if name not in trade_fields and not (name.isupper() and hasattr(StockTrendAnalyzer, name)):
+            raise ValueError(f"未知的回测参数: {name}")
+
+    names = list(grid)
+    combos = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        trade = {k: v for k, v in zip(names, values) if k in trade_fields}
+        analyzer = dict(base.analyzer_params)
+        analyzer.update({k: v for k, v in zip(names, values) if k not in trade_fields})
+        combos.append(BacktestParams(**{**asdict(base), **trade, 'analyzer_params': analyzer}))
+    return combos
+
+
+class Backtester:
+    """
+    趋势信号回测器
+
+    Args:
+        bars: load_bars() 返回的长表日线
+    """
+
+    def __init__(self, bars: pd.DataFrame):
+        bars = bars.sort_values(['code', 'date'], kind='stable').reset_index(drop=True)
+        self.bars = bars
+        self.panel = bars.pivot(index='date', columns='code', values=list(StockTrendAnalyzer.PANEL_FIELDS))
+        self._date_pos = self.panel.index.get_indexer(bars['date'])
+        self._code_pos = self.panel['close'].columns.get_indexer(bars['code'])
+        self._history_cache: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def score_history(self, analyzer_params: Optional[Dict[str, Any]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        计算（并按分析器参数缓存）与长表逐行对应的历史评分与买入信号
+
+        Returns:
+            (signal_score, buy_signal) 两个与 self.bars 等长的数组
+        """
+        analyzer_params = analyzer_params or {}
+        key = repr(sorted(analyzer_params.items()))
+        if key not in self._history_cache:
+            analyzer = StockTrendAnalyzer()
+            for name, value in analyzer_params.items():
+                setattr(analyzer, name, value)
+            history = analyzer.score_history(self.panel)
+            scores = history['signal_score'].to_numpy()[self._date_pos, self._code_pos]
+            signals = history['buy_signal'].to_numpy()[self._date_pos, self._code_pos]
+            self._history_cache[key] = (scores, signals)
+        return self._history_cache[key]
+
+    def run(self, params: Optional[BacktestParams] = None) -> BacktestReport:
+        """执行单组参数回测"""
+        started = time.time()
+        params = params or BacktestParams()
+        scores, signals = self.score_history(params.analyzer_params)
+        trades = self.simulate(scores, params)
+        trades['signal'] = signals[trades['row']]
+        trades['score_bucket'] = pd.cut(
+            trades['score'], SCORE_BINS, right=False,
+            labels=[f"{lo}-{hi - 1}" for lo, hi in zip(SCORE_BINS[:-1], SCORE_BINS[1:])],
+        ).astype(str)
+
+        signal_order = [s.value for s in BuySignal]
+        by_signal = self._bucket_stats(trades, 'signal', params.hold_days)
+        by_signal = by_signal.set_index('bucket').reindex(
+            [s for s in signal_order if s in set(by_signal['bucket'])]
+        ).reset_index()
+        by_score = self._bucket_stats(trades, 'score_bucket', params.hold_days)
+
+        entry = trades[trades['signal'].isin(params.entry_signals)].assign(bucket='entry')
+        summary = self._bucket_stats(entry, 'bucket', params.hold_days)
+        summary = summary.iloc[0].drop('bucket').to_dict() if not summary.empty else {
+            name: 0 for name in BUCKET_COLUMNS[1:]
+        }
+        summary['trades'] = int(summary['trades'])
+        return BacktestReport(
+            params=params,
+            signals=by_signal,
+            scores=by_score,
+            summary=summary,
+            elapsed=time.time() - started,
+        )
+
+    def simulate(self, scores: np.ndarray, params: BacktestParams) -> pd.DataFrame:
+        """
+        向量化模拟每个信号日的交易
+
+        规则：信号日次日开盘买入；持有期内先判断止损（跳空低开按开盘价成交）、
+        再判断止盈；到期按收盘价卖出。持有期内停牌日不计入（按该股自身的 K 线序列推进）。
+        后续 K 线不足 hold_days 根的信号不计入。
+
+        Returns:
+            交易明细 DataFrame [row, score, return, drawdown, days, entry_date]
+        """
+        hold = int(params.hold_days)
+        code = self._code_pos
+        o, h, l, c = (self.bars[name].to_numpy(dtype=float) for name in ('open', 'high', 'low', 'close'))
+        n = len(code)
+
+        rows = np.flatnonzero(~np.isnan(scores))
+        rows = rows[rows + hold < n]
+        rows = rows[code[rows + hold] == code[rows]]
+        entry = o[rows + 1]
+        keep = entry > 0
+        rows, entry = rows[keep], entry[keep]
+
+        stop = entry * (1 - params.stop_loss_pct / 100) if params.stop_loss_pct else None
+        target = entry * (1 + params.take_profit_pct / 100) if params.take_profit_pct else None
+        exit_price = np.full(len(rows), np.nan)
+        days = np.zeros(len(rows), dtype=int)
+        lowest = entry.copy()
+        for k in range(1, hold + 1):
+            j = rows + k
+            active = np.isnan(exit_price)
+            low = l[j]
+            if stop is not None:
+                hit = active & (low <= stop)
+                exit_price = np.where(hit, np.minimum(stop, o[j]), exit_price)
+                days = np.where(hit, k, days)
+                # 止损当日的浮亏以成交价计
+                low = np.where(hit, exit_price, low)
+            lowest = np.where(active, np.fmin(lowest, low), lowest)
+            active &= np.isnan(exit_price)
+            if target is not None:
+                hit = active & (h[j] >= target)
+                exit_price = np.where(hit, np.maximum(target, o[j]), exit_price)
+                days = np.where(hit, k, days)
+        expired = np.isnan(exit_price)
+        exit_price = np.where(expired, c[rows + hold], exit_price)
+        days = np.where(expired, hold, days)
+
+        return pd.DataFrame({
+            'row': rows,
+            'score': scores[rows],
+            'return': exit_price / entry - 1 - params.cost_pct / 100,
+            'drawdown': np.minimum(lowest / entry - 1, 0),
+            'days': days,
+            'entry_date': self.bars['date'].to_numpy()[rows + 1],
+        })
+
+    @staticmethod
+    def _bucket_stats(trades: pd.DataFrame, by: str, hold_days: int) -> pd.DataFrame:
+        """分桶统计：胜率、收益分布、单笔最大浮亏与近似净值回撤"""
+        if trades.empty:
+            return pd.DataFrame(columns=BUCKET_COLUMNS)
+        grouped = trades.groupby(by, observed=True)
+        # 逐组计算净值回撤（不依赖 pandas 2.2 才有的 apply(include_groups=...)）
+        curve_drawdown = pd.Series(
+            [_curve_drawdown(group, hold_days) for _, group in grouped], index=grouped.size().index
+        )
+        stats = pd.DataFrame({
+            'trades': grouped.size(),
+            'hit_rate': grouped['return'].apply(lambda r: (r > 0).mean()),
+            'avg_return': grouped['return'].mean(),
+            'median_return': grouped['return'].median(),
+            'avg_drawdown': grouped['drawdown'].mean(),
+            'worst_return': grouped['return'].min(),
+            'curve_drawdown': curve_drawdown,
+            'avg_days': grouped['days'].mean(),
+        })
+        stats.index.name = 'bucket'
+        return stats.reset_index()[BUCKET_COLUMNS]
+
+
+def _curve_drawdown(trades: pd.DataFrame, hold_days: int) -> float:
+    """资金分 hold_days 份滚动投入时的净值最大回撤（每日收益取当日入场交易的平均收益）"""
+    daily = trades.groupby('entry_date')['return'].mean().sort_index() / max(hold_days, 1)
+    curve = (1 + daily).cumprod()
+    return float((curve / curve.cummax() - 1).min())
+
+
+# === 进程并行参数扫描 ===
+
+_worker_backtester: Optional[Backtester] = None
+
+
+def _init_worker(bars: pd.DataFrame) -> None:
+    """子进程初始化：每个进程只接收并构建一次面板"""
+    global _worker_backtester
+    _worker_backtester = Backtester(bars)
+
+
+def _split_groups(groups: List[List[BacktestParams]], workers: int) -> List[List[BacktestParams]]:
+    """
+    把按分析器参数划分的组拆成至少 workers 个任务
+
+    只扫描交易参数（持有天数、止损止盈）时只有一组分析器参数，不拆分就只能用一个进程；
+    拆分后同一组分析器参数的历史评分在每个进程中各算一次。
+    """
+    if len(groups) >= workers:
+        return groups
+    pieces = -(-workers // len(groups))
+    tasks = []
+    for group in groups:
+        size = max(1, len(group) // pieces)
+        tasks.extend(group[i:i + size] for i in range(0, len(group), size))
+    return tasks
+
+
+def _run_group(group: List[BacktestParams]) -> List[BacktestReport]:
+    """子进程任务：同一组分析器参数只计算一次历史评分"""
+    return [_worker_backtester.run(params) for params in group]
+
+
+def run_sweep(
+    bars: pd.DataFrame,
+    param_grid: List[BacktestParams],
+    workers: Optional[int] = None,
+    sort_by: str = 'avg_return',
+) -> List[BacktestReport]:
+    """
+    并行参数扫描
+
+    相同 analyzer_params 的组合分到同一任务，历史评分只算一次；
+    组数少于进程数时（如只扫描交易参数）把大组拆开，保证每个进程都有任务。
+
+    Args:
+        bars: load_bars() 返回的长表日线
+        param_grid: expand_grid() 的结果
+        workers: 进程数（默认 CPU 核数）
+        sort_by: 排序依据的汇总指标
+
+    Returns:
+        按 summary[sort_by] 降序排列的 BacktestReport 列表
+    """
+    groups: Dict[str, List[BacktestParams]] = {}
+    for params in param_grid:
+        groups.setdefault(repr(sorted(params.analyzer_params.items())), []).append(params)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(param_grid)))
+    tasks = _split_groups(list(groups.values()), workers)
+    workers = min(workers, len(tasks))
+    logger.info(
+        f"[回测] {len(param_grid)} 组参数，{len(groups)} 组分析器参数，{len(tasks)} 个任务，{workers} 个进程"
+    )
+
+    if workers == 1:
+        backtester = Backtester(bars)
+        reports = [backtester.run(params) for group in groups.values() for params in group]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(bars,)) as pool:
+            reports = [report for chunk in pool.map(_run_group, tasks) for report in chunk]
+
+    return sorted(reports, key=lambda r: r.summary.get(sort_by, 0), reverse=True)
@@ -53,7 +53,7 @@ class Config:
     gemini_temperature: float = 0.7  # 温度参数（0.0-2.0，控制输出随机性，默认0.7）
 
     # Gemini API 请求配置（防止 429 限流）
-    gemini_request_delay: float = 2.0  # 请求间隔（秒）
+    gemini_request_delay: float = 2.0  # 已废弃：仅在未配置 LLM_DEFAULT_RPM 时换算为默认 RPM
     gemini_max_retries: int = 5  # 最大重试次数
     gemini_retry_delay: float = 5.0  # 重试基础延时（秒）
 
@@ -62,6 +62,45 @@ class Config:
     openai_base_url: Optional[str] = None  # 如: https://api.openai.com/v1
     openai_model: str = "gpt-4o-mini"  # OpenAI 兼容模型名称
     openai_temperature: float = 0.7  # OpenAI 温度参数（0.0-2.0，默认0.7）
+
+    # === LLM 全局调度（src/llm_scheduler.py，按 provider/model 令牌桶限流）===
+    llm_default_rpm: int = 30  # 默认每分钟请求数，0 表示不限
+    llm_default_tpm: int = 0  # 默认每分钟 Token 数，0 表示不限
+    llm_burst: int = 1  # 空闲时允许连续放行的请求数
+    llm_rate_limits: str = ""  # 单独配置，如 "gemini=15/1000000,openai:gpt-4o-mini=60"
+
+    # LLM 响应缓存（按请求内容哈希持久化，重跑任务时相同请求直接复用）
+    llm_cache_enabled: bool = True
+    llm_cache_ttl: int = 43200  # 秒
+    llm_cache_max_entries: int = 2000
+
+    # 异步 LLM 客户端：在独立事件循环线程中并发请求（受 RPM/TPM 预算与并发上限约束）
+    llm_async_enabled: bool = False
+    llm_async_concurrency: int = 8
+
+    # 精简报告批量分析：每次请求打包多只股票（<=1 表示关闭）
+    llm_batch_size: int = 0
+    llm_batch_wait: float = 2.0  # 凑批最长等待秒数
+
+    # 提示词预算：单股提示词的 Token 上限（0 表示不限），超出时按 技术面 > 风险新闻 > 其他新闻 > 行业 裁剪
+    llm_prompt_token_budget: int = 0
+    llm_prompt_compact_simple: bool = True  # 精简报告使用精简提示词（技术面要点列表、情报每维度 2 条）
+
+    # 流式输出：Web / Bot 发起的单股分析边生成边推送已完成的字段（评分、操作建议优先）
+    llm_stream_enabled: bool = True
+
+    # 原生 JSON 模式：Gemini response_mime_type=application/json，OpenAI 兼容接口 response_format=json_object
+    llm_json_mode: bool = True
+
+    # 上下文缓存：系统提示词在 provider 侧缓存一次（Gemini cachedContents），单股请求只引用句柄
+    llm_context_cache_enabled: bool = False
+    llm_context_cache_ttl: float = 3600.0  # 句柄有效期（秒），临近过期自动续期
+
+    # 多模型路由：按实时延迟/健康选择 provider:model，429 熔断、可选对冲，精简报告优先 fast 档
+    llm_router_enabled: bool = False
+    llm_routes: str = ""  # 如 "gemini:gemini-3-flash-preview:strong,gemini:gemini-2.5-flash:fast"
+    llm_hedge_enabled: bool = False  # 首选路由超过 P95 未返回时向次选路由对冲请求
+    llm_circuit_cooldown: float = 30.0  # 熔断基础冷却秒数
     
     # === 搜索引擎配置（支持多 Key 负载均衡）===
     bocha_api_keys: List[str] = field(default_factory=list)  # Bocha API Keys
@@ -116,9 +155,6 @@ class Config:
     # Server酱3 推送配置
     serverchan3_sendkey: Optional[str] = None  # Server酱3 SendKey
 
-    # 分析间隔时间（秒）- 用于避免API限流
-    analysis_delay: float = 0.0  # 个股分析与大盘分析之间的延迟
-
     # 消息长度限制（字节）- 超长自动分批发送
     feishu_max_bytes: int = 20000  # 飞书限制约 20KB，默认 20000 字节
     wechat_max_bytes: int = 4000   # 企业微信限制 4096 字节，默认 4000 字节
@@ -129,6 +165,17 @@ class Config:
 
     # 是否保存分析上下文快照（用于历史回溯）
     save_context_snapshot: bool = True
+
+    # 热点查询缓存（has_today_data / get_latest_data），容量为 0 表示关闭
+    db_cache_size: int = 2048
+    db_cache_ttl: int = 300  # 秒
+
+    # 趋势分析结果持久缓存（按 代码 + 最新 K 线日期 + 分析器参数 缓存），回看 K 线数
+    trend_cache_enabled: bool = True
+    trend_cache_lookback: int = 120
+
+    # 分析型查询导出目录（Parquet 列式文件，供 src/analytics.py 使用）
+    analytics_dir: str = "./data/analytics"
     
     # === 日志配置 ===
     log_dir: str = "./logs"  # 日志文件目录
@@ -136,6 +183,54 @@ class Config:
     
     # === 系统配置 ===
     max_workers: int = 3  # 低并发防封禁
+
+    # === 单股分析阶段并发配置 ===
+    # 实时行情/筹码/上下文/情报搜索并发执行，每类阶段线程池大小
+    stage_max_workers: int = 4
+    # 各阶段超时（秒），超时后降级为空结果继续分析
+    stage_timeout_realtime: float = 15.0
+    stage_timeout_chip: float = 20.0
+    stage_timeout_context: float = 10.0
+    stage_timeout_intel: float = 60.0
+
+    # === 批量分析分阶段流水线配置 ===
+    # 数据获取/情报搜索/AI 分析/持久化推送各阶段线程数，数据获取为 0 时沿用 max_workers
+    pipeline_fetch_workers: int = 0
+    pipeline_search_workers: int = 2
+    pipeline_llm_workers: int = 3
+    pipeline_notify_workers: int = 1
+    # 阶段间队列长度（背压），0 表示不限
+    pipeline_queue_size: int = 10
+
+    # === 重复分析请求合并 ===
+    # 同一交易日相同 (股票代码, 报告类型) 的 Web/Bot 请求合并执行，成功结果缓存秒数（0 表示只合并进行中的任务）
+    analysis_coalesce_ttl: int = 300
+
+    # === 优先级任务调度 ===
+    # 交互式（Web/Bot 单股） > 定时 > 批量，共享总槽位，各类有并发上限
+    # 批量/定时上限小于总槽位，保证批量满载时交互式请求仍可立即执行
+    job_total_slots: int = 8
+    job_interactive_slots: int = 4
+    job_scheduled_slots: int = 6
+    job_batch_slots: int = 6
+
+    # === 链路追踪与运行剖析 ===
+    # 记录各环节耗时 span，批量运行结束后写出剖析报告（JSON + Markdown）
+    tracing_enabled: bool = True
+    profile_dir: str = "./reports/profiles"
+
+    # === 全市场选股配置 ===
+    # 候选池数量、日线回看日历天数（需覆盖 60 个交易日以上）、是否排除 ST
+    screener_top_n: int = 20
+    screener_lookback_days: int = 150
+    screener_exclude_st: bool = True
+
+    # === 盘中信号配置 ===
+    # 快照轮询间隔（秒）、合成 K 线周期（分钟）、推送的信号类型（trend/macd/rsi/vwap）
+    intraday_poll_seconds: int = 30
+    intraday_bar_minutes: int = 1
+    intraday_signal_kinds: List[str] = field(default_factory=lambda: ['trend', 'macd', 'rsi'])
+
     debug: bool = False
     http_proxy: Optional[str] = None  # HTTP 代理 (例如: http://127.0.0.1:10809)
     https_proxy: Optional[str] = None # HTTPS 代理
@@ -315,6 +410,14 @@ class Config:
         else:
             # 未显式配置时，根据消息类型选择默认字节数
             wechat_max_bytes = 2048 if wechat_msg_type_lower == 'text' else 4000
+
+        # LLM 默认 RPM：未显式配置时由旧的 GEMINI_REQUEST_DELAY（请求间隔）换算，保持兼容
+        gemini_request_delay = float(os.getenv('GEMINI_REQUEST_DELAY', '2.0'))
+        llm_default_rpm_env = os.getenv('LLM_DEFAULT_RPM')
+        if llm_default_rpm_env not in (None, ''):
+            llm_default_rpm = int(llm_default_rpm_env)
+        else:
+            llm_default_rpm = int(60 / gemini_request_delay) if gemini_request_delay > 0 else 0
         
         return cls(
             stock_list=stock_list,
@@ -326,13 +429,34 @@ class Config:
             gemini_model=os.getenv('GEMINI_MODEL', 'gemini-3-flash-preview'),
             gemini_model_fallback=os.getenv('GEMINI_MODEL_FALLBACK', 'gemini-2.5-flash'),
             gemini_temperature=float(os.getenv('GEMINI_TEMPERATURE', '0.7')),
-            gemini_request_delay=float(os.getenv('GEMINI_REQUEST_DELAY', '2.0')),
+            gemini_request_delay=gemini_request_delay,
             gemini_max_retries=int(os.getenv('GEMINI_MAX_RETRIES', '5')),
             gemini_retry_delay=float(os.getenv('GEMINI_RETRY_DELAY', '5.0')),
             openai_api_key=os.getenv('OPENAI_API_KEY'),
             openai_base_url=os.getenv('OPENAI_BASE_URL'),
             openai_model=os.getenv('OPENAI_MODEL', 'gpt-4o-mini'),
             openai_temperature=float(os.getenv('OPENAI_TEMPERATURE', '0.7')),
+            llm_default_rpm=llm_default_rpm,
+            llm_default_tpm=int(os.getenv('LLM_DEFAULT_TPM', '0')),
+            llm_burst=int(os.getenv('LLM_BURST', '1')),
+            llm_rate_limits=os.getenv('LLM_RATE_LIMITS', ''),
+            llm_cache_enabled=os.getenv('LLM_CACHE_ENABLED', 'true').lower() == 'true',
+            llm_cache_ttl=int(os.getenv('LLM_CACHE_TTL', '43200')),
+            llm_cache_max_entries=int(os.getenv('LLM_CACHE_MAX_ENTRIES', '2000')),
+            llm_async_enabled=os.getenv('LLM_ASYNC_ENABLED', 'false').lower() == 'true',
+            llm_async_concurrency=int(os.getenv('LLM_ASYNC_CONCURRENCY', '8')),
+            llm_batch_size=int(os.getenv('LLM_BATCH_SIZE', '0')),
+            llm_batch_wait=float(os.getenv('LLM_BATCH_WAIT', '2.0')),
+            llm_prompt_token_budget=int(os.getenv('LLM_PROMPT_TOKEN_BUDGET', '0')),
+            llm_prompt_compact_simple=os.getenv('LLM_PROMPT_COMPACT_SIMPLE', 'true').lower() == 'true',
+            llm_stream_enabled=os.getenv('LLM_STREAM_ENABLED', 'true').lower() == 'true',
+            llm_json_mode=os.getenv('LLM_JSON_MODE', 'true').lower() == 'true',
+            llm_context_cache_enabled=os.getenv('LLM_CONTEXT_CACHE_ENABLED', 'false').lower() == 'true',
+            llm_context_cache_ttl=float(os.getenv('LLM_CONTEXT_CACHE_TTL', '3600')),
+            llm_router_enabled=os.getenv('LLM_ROUTER_ENABLED', 'false').lower() == 'true',
+            llm_routes=os.getenv('LLM_ROUTES', ''),
+            llm_hedge_enabled=os.getenv('LLM_HEDGE_ENABLED', 'false').lower() == 'true',
+            llm_circuit_cooldown=float(os.getenv('LLM_CIRCUIT_COOLDOWN', '30')),
             bocha_api_keys=bocha_api_keys,
             tavily_api_keys=tavily_api_keys,
             serpapi_keys=serpapi_keys,
@@ -357,15 +481,44 @@ class Config:
             astrbot_token=os.getenv('ASTRBOT_TOKEN'),
             single_stock_notify=os.getenv('SINGLE_STOCK_NOTIFY', 'false').lower() == 'true',
             report_type=os.getenv('REPORT_TYPE', 'simple').lower(),
-            analysis_delay=float(os.getenv('ANALYSIS_DELAY', '0')),
             feishu_max_bytes=int(os.getenv('FEISHU_MAX_BYTES', '20000')),
             wechat_max_bytes=wechat_max_bytes,
             wechat_msg_type=wechat_msg_type_lower,
             database_path=os.getenv('DATABASE_PATH', './data/stock_analysis.db'),
             save_context_snapshot=os.getenv('SAVE_CONTEXT_SNAPSHOT', 'true').lower() == 'true',
+            db_cache_size=int(os.getenv('DB_CACHE_SIZE', '2048')),
+            db_cache_ttl=int(os.getenv('DB_CACHE_TTL', '300')),
+            trend_cache_enabled=os.getenv('TREND_CACHE_ENABLED', 'true').lower() == 'true',
+            trend_cache_lookback=int(os.getenv('TREND_CACHE_LOOKBACK', '120')),
+            analytics_dir=os.getenv('ANALYTICS_DIR', './data/analytics'),
             log_dir=os.getenv('LOG_DIR', './logs'),
             log_level=os.getenv('LOG_LEVEL', 'INFO'),
             max_workers=int(os.getenv('MAX_WORKERS', '3')),
+            stage_max_workers=int(os.getenv('STAGE_MAX_WORKERS', '4')),
+            stage_timeout_realtime=float(os.getenv('STAGE_TIMEOUT_REALTIME', '15')),
+            stage_timeout_chip=float(os.getenv('STAGE_TIMEOUT_CHIP', '20')),
+            stage_timeout_context=float(os.getenv('STAGE_TIMEOUT_CONTEXT', '10')),
+            stage_timeout_intel=float(os.getenv('STAGE_TIMEOUT_INTEL', '60')),
+            pipeline_fetch_workers=int(os.getenv('PIPELINE_FETCH_WORKERS', '0')),
+            pipeline_search_workers=int(os.getenv('PIPELINE_SEARCH_WORKERS', '2')),
+            pipeline_llm_workers=int(os.getenv('PIPELINE_LLM_WORKERS', '3')),
+            pipeline_notify_workers=int(os.getenv('PIPELINE_NOTIFY_WORKERS', '1')),
+            pipeline_queue_size=int(os.getenv('PIPELINE_QUEUE_SIZE', '10')),
+            analysis_coalesce_ttl=int(os.getenv('ANALYSIS_COALESCE_TTL', '300')),
+            job_total_slots=int(os.getenv('JOB_TOTAL_SLOTS', '8')),
+            job_interactive_slots=int(os.getenv('JOB_INTERACTIVE_SLOTS', '4')),
+            job_scheduled_slots=int(os.getenv('JOB_SCHEDULED_SLOTS', '6')),
+            job_batch_slots=int(os.getenv('JOB_BATCH_SLOTS', '6')),
+            tracing_enabled=os.getenv('TRACING_ENABLED', 'true').lower() == 'true',
+            profile_dir=os.getenv('PROFILE_DIR', './reports/profiles'),
+            screener_top_n=int(os.getenv('SCREENER_TOP_N', '20')),
+            screener_lookback_days=int(os.getenv('SCREENER_LOOKBACK_DAYS', '150')),
+            screener_exclude_st=os.getenv('SCREENER_EXCLUDE_ST', 'true').lower() == 'true',
+            intraday_poll_seconds=int(os.getenv('INTRADAY_POLL_SECONDS', '30')),
+            intraday_bar_minutes=int(os.getenv('INTRADAY_BAR_MINUTES', '1')),
+            intraday_signal_kinds=[
+                k.strip() for k in os.getenv('INTRADAY_SIGNAL_KINDS', 'trend,macd,rsi').split(',') if k.strip()
+            ],
             debug=os.getenv('DEBUG', 'false').lower() == 'true',
             http_proxy=os.getenv('HTTP_PROXY'),
             https_proxy=os.getenv('HTTPS_PROXY'),
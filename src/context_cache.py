@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - LLM 上下文缓存（provider 侧前缀缓存）
+===================================
+
+职责：
+1. 为固定的系统提示词在 provider 侧创建缓存内容句柄（如 Gemini cachedContents），每个模型只创建一次
+2. 单股请求引用句柄，不再重复发送、重复处理数 KB 的交易规则（缓存部分按折扣计费）
+3. 句柄临近过期时续期（续期失败则重建）；provider 报告句柄失效时丢弃，下次请求重建
+4. 创建失败（如提示词低于模型的最小缓存长度）时一段时间内不再尝试，请求照常携带完整系统提示词
+
+缓存与 provider 无关：创建/续期由调用方以回调传入，句柄以 "provider:模型:前缀哈希" 为键，
+因此提示词变更后自动使用新句柄。OpenAI 兼容接口的前缀缓存由服务端自动完成，无需句柄。
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from src.config import get_config
+
+logger = logging.getLogger(__name__)
+
+# 创建失败后的重试间隔上限（秒）
+FAILURE_BACKOFF = 300.0
+
+
+@dataclass
+class CachedPrefix:
+    """provider 侧的缓存句柄"""
+    name: str
+    expire_at: float  # time.time() 时间戳
+
+
+def expire_timestamp(expire_time: Any, ttl: float) -> float:
+    """provider 返回的过期时间（datetime / 时间戳 / 缺失）转为时间戳"""
+    if isinstance(expire_time, datetime):
+        return expire_time.timestamp()
+    if isinstance(expire_time, (int, float)):
+        return float(expire_time)
+    return time.time() + ttl
+
+
+def prefix_key(provider: str, model: str, prefix: str) -> str:
+    """句柄键：provider:模型:前缀哈希"""
+    digest = hashlib.sha256(prefix.encode('utf-8')).hexdigest()[:16]
+    return f"{provider}:{model}:{digest}"
+
+
+def is_cache_error(error_str: str) -> bool:
+    """provider 报告缓存句柄不存在或已过期"""
+    text = error_str.lower()
+    return 'cachedcontent' in text or 'cached content' in text or 'cached_content' in text
+
+
+class ContextCache:
+    """
+    缓存句柄管理器（线程安全）
+
+    并发请求同一个键时只有一个线程创建句柄，其余线程等待后直接复用。
+    """
+
+    def __init__(self, ttl: float = 3600.0, refresh_margin: float = 60.0):
+        self.ttl = max(60.0, ttl)
+        # 剩余有效期不足 refresh_margin 时续期，避免请求途中过期
+        self.refresh_margin = min(refresh_margin, self.ttl / 2)
+        self._entries: Dict[str, CachedPrefix] = {}
+        self._failed_until: Dict[str, float] = {}
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.refreshed = 0
+        self.references = 0
+        self.failures = 0
+
+    def handle(
+        self,
+        key: str,
+        create: Callable[[float], CachedPrefix],
+        extend: Optional[Callable[[str, float], float]] = None,
+    ) -> Optional[str]:
+        """
+        获取 key 对应的句柄名，不存在或临近过期时创建/续期
+
+        Args:
+            create: create(ttl) -> CachedPrefix
+            extend: extend(句柄名, ttl) -> 新的过期时间戳；未提供时过期即重建
+
+        Returns:
+            句柄名；创建失败时返回 None（调用方改为携带完整提示词）
+        """
+        entry = self._fresh(key)
+        if entry is None:
+            if self._recently_failed(key):
+                return None
+            with self._lock_for(key):
+                # 等锁期间其他线程可能已创建成功或刚刚失败
+                entry = self._fresh(key)
+                if entry is None and not self._recently_failed(key):
+                    entry = self._renew(key, create, extend)
+            if entry is None:
+                return None
+        with self._lock:
+            self.references += 1
+        return entry.name
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """丢弃指定句柄（None 表示全部），下次请求时重建"""
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if name is None or entry.name == name:
+                    del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            return {
+                'handles': {key: round(entry.expire_at - now, 1) for key, entry in self._entries.items()},
+                'created': self.created,
+                'refreshed': self.refreshed,
+                'references': self.references,
+                'failures': self.failures,
+            }
+
+    # === 内部实现 ===
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _fresh(self, key: str) -> Optional[CachedPrefix]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expire_at - time.time() > self.refresh_margin:
+            return entry
+        return None
+
+    def _recently_failed(self, key: str) -> bool:
+        return self._failed_until.get(key, 0) > time.time()
+
+    def _renew(
+        self,
+        key: str,
+        create: Callable[[float], CachedPrefix],
+        extend: Optional[Callable[[str, float], float]],
+    ) -> Optional[CachedPrefix]:
+        entry = self._entries.get(key)
+        if entry is not None and extend is not None and entry.expire_at > time.time():
+            try:
+                entry = CachedPrefix(entry.name, extend(entry.name, self.ttl))
+                with self._lock:
+                    self._entries[key] = entry
+                    self.refreshed += 1
+                logger.info(f"[上下文缓存] 已续期 {key}")
+                return entry
+            except Exception as e:
+                logger.warning(f"[上下文缓存] 续期 {key} 失败，改为重建: {e}")
+
+        try:
+            entry = create(self.ttl)
+        except Exception as e:
+            with self._lock:
+                self._entries.pop(key, None)
+                self._failed_until[key] = time.time() + min(self.ttl, FAILURE_BACKOFF)
+                self.failures += 1
+            logger.warning(f"[上下文缓存] 创建 {key} 失败，暂时改为完整发送系统提示词: {str(e)[:200]}")
+            return None
+        with self._lock:
+            self._entries[key] = entry
+            self._failed_until.pop(key, None)
+            self.created += 1
+        logger.info(f"[上下文缓存] 已创建 {key} -> {entry.name}")
+        return entry
+
+
+# === 便捷函数 ===
+
+_cache: Optional[ContextCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_context_cache() -> ContextCache:
+    """获取进程级上下文缓存"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ContextCache(ttl=get_config().llm_context_cache_ttl)
+    return _cache
+
+
+def reset_context_cache() -> None:
+    """重置上下文缓存（主要用于测试）"""
+    global _cache
+    _cache = None
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 凑批执行器
+===================================
+
+职责：
+1. 把逐个到达的任务攒成批次（满 batch_size 个或等待 max_wait 秒后发出）
+2. 在后台线程中调用批处理函数，按顺序把结果分发回每个任务的 Future
+3. 限制同时执行的批次数
+
+与 StagedExecutor 的异步阶段（max_inflight）配合使用：
+    batcher = Batcher(analyze_many, batch_size=5, max_wait=2.0)
+    Stage("llm", batcher.submit, workers=1, max_inflight=10)
+"""
+
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Batcher:
+    """
+    凑批执行器
+
+    batch_func 接收任务列表，返回等长的结果列表；
+    抛出异常或返回长度不符时，该批次所有 Future 均以异常结束。
+    """
+
+    def __init__(
+        self,
+        batch_func: Callable[[List[Any]], Sequence[Any]],
+        batch_size: int,
+        max_wait: float = 2.0,
+        workers: int = 1,
+        name: str = "batch",
+    ):
+        self.batch_func = batch_func
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max(0.0, max_wait)
+        self.name = name
+        self._slots = threading.Semaphore(max(1, workers))
+        self._pending: List[Tuple[Any, Future]] = []
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+        self.batches = 0
+
+    def submit(self, item: Any) -> Future:
+        """加入当前批次，返回该任务结果的 Future"""
+        future: Future = Future()
+        with self._lock:
+            self._pending.append((item, future))
+            batch = self._take_locked() if len(self._pending) >= self.batch_size else None
+            if batch is None and self._timer is None:
+                self._timer = threading.Timer(self.max_wait, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if batch:
+            self._dispatch(batch)
+        return future
+
+    def flush(self) -> None:
+        """立即发出当前不足一批的任务"""
+        with self._lock:
+            batch = self._take_locked()
+        if batch:
+            self._dispatch(batch)
+
+    def _take_locked(self) -> List[Tuple[Any, Future]]:
+        batch, self._pending = self._pending, []
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _dispatch(self, batch: List[Tuple[Any, Future]]) -> None:
+        self.batches += 1
+        threading.Thread(
+            target=self._run, args=(batch,), name=f"{self.name}-{self.batches}", daemon=True
+        ).start()
+
+    def _run(self, batch: List[Tuple[Any, Future]]) -> None:
+        with self._slots:
+            try:
+                outputs = list(self.batch_func([item for item, _ in batch]))
+                if len(outputs) != len(batch):
+                    raise ValueError(f"批处理返回 {len(outputs)} 个结果，期望 {len(batch)} 个")
+            except Exception as e:
+                logger.warning(f"[{self.name}] 批次执行失败（{len(batch)} 个任务）: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                return
+        for (_, future), output in zip(batch, outputs):
+            future.set_result(output)
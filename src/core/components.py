@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 共享组件容器
+===================================
+
+职责：
+1. 进程内只构建一次重量级组件（数据源管理器、AI 分析器、搜索服务、趋势分析器及其结果缓存）
+2. 为每个 StockAnalysisPipeline 提供共享的、线程安全的实例
+3. 保留预热缓存、Key 轮询状态与 HTTP 连接，降低 Web/Bot 单次请求的初始化耗时
+
+通知服务（NotificationService）与请求来源（source_message）绑定，
+构建成本低，仍由每个流水线单独创建。
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from src.config import get_config, Config
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineComponents:
+    """
+    共享组件容器（单例，组件懒加载）
+
+    用法：
+        components = get_components()
+        manager = components.fetcher_manager
+    """
+
+    _instance: Optional['PipelineComponents'] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, config: Optional[Config] = None):
+        self.config = config or get_config()
+        self._components: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def get_instance(cls) -> 'PipelineComponents':
+        """获取单例实例"""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    @classmethod
+    def reset_instance(cls) -> None:
+        """重置单例（配置变更或测试时使用）"""
+        with cls._instance_lock:
+            cls._instance = None
+
+    def _get_or_create(self, name: str, factory: Callable[[], Any]) -> Any:
+        component = self._components.get(name)
+        if component is None:
+            with self._lock:
+                component = self._components.get(name)
+                if component is None:
+                    component = factory()
+                    self._components[name] = component
+                    logger.info(f"[组件容器] 已初始化共享组件: {name}")
+        return component
+
+    @property
+    def fetcher_manager(self):
+        """数据源管理器（含全部数据源与实时行情/名称缓存）"""
+        from data_provider import DataFetcherManager
+        return self._get_or_create('fetcher_manager', DataFetcherManager)
+
+    @property
+    def analyzer(self):
+        """AI 分析器（Gemini / OpenAI 兼容客户端）"""
+        from src.analyzer import GeminiAnalyzer
+        return self._get_or_create('analyzer', GeminiAnalyzer)
+
+    @property
+    def search_service(self):
+        """搜索服务（多 Key 轮询状态共享）"""
+        from src.search_service import SearchService
+        return self._get_or_create('search_service', lambda: SearchService(
+            bocha_keys=self.config.bocha_api_keys,
+            tavily_keys=self.config.tavily_api_keys,
+            serpapi_keys=self.config.serpapi_keys,
+        ))
+
+    @property
+    def trend_analyzer(self):
+        """趋势分析器（无状态）"""
+        from src.stock_analyzer import StockTrendAnalyzer
+        return self._get_or_create('trend_analyzer', StockTrendAnalyzer)
+
+    @property
+    def trend_cache(self):
+        """趋势分析结果缓存（按最新 K 线持久缓存）"""
+        from src.trend_cache import TrendCache
+        return self._get_or_create('trend_cache', TrendCache)
+
+
+def get_components() -> PipelineComponents:
+    """获取共享组件容器的快捷方式"""
+    return PipelineComponents.get_instance()
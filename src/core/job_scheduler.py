@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 优先级任务调度器
+===================================
+
+职责：
+1. 进程内统一分配分析执行槽位（Web/Bot 单股分析、定时任务、批量任务共享）
+2. 按优先级分配：交互式 > 定时 > 批量，每类有独立的并发上限
+3. 同一优先级内按用户/会话轮转，避免单个用户的大批量任务独占
+4. 批量任务按单只股票的阶段申请槽位，股票边界处让出给高优先级任务
+
+示例：
+    scheduler = get_job_scheduler()
+
+    # 在当前线程中占用槽位执行
+    with scheduler.slot(JobPriority.BATCH, owner="chat_123"):
+        ...
+
+    # 提交到调度器线程执行
+    future = scheduler.submit(JobPriority.INTERACTIVE, "web", fn, *args)
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, Optional
+
+from src.config import get_config
+from src.enums import JobPriority
+
+logger = logging.getLogger(__name__)
+
+
+class _Waiter:
+    """等待槽位的请求"""
+
+    __slots__ = ('event', 'enqueued_at')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.enqueued_at = time.monotonic()
+
+
+class JobScheduler:
+    """
+    优先级 + 公平分享的槽位调度器
+
+    槽位空闲时按优先级从高到低选择有等待者且未达到该类上限的队列，
+    同一优先级内按 owner 轮转。低优先级类别的上限小于总槽位数，
+    即使批量任务满载，交互式请求仍有空闲槽位可立即执行。
+
+    Args:
+        total_slots: 总槽位数
+        class_limits: 各优先级的并发上限（缺省为 total_slots）
+    """
+
+    def __init__(self, total_slots: int, class_limits: Optional[Dict[JobPriority, int]] = None):
+        self.total_slots = max(1, total_slots)
+        self.class_limits = {
+            priority: max(1, min(self.total_slots, (class_limits or {}).get(priority, self.total_slots)))
+            for priority in JobPriority
+        }
+        self._lock = threading.Lock()
+        self._running: Dict[JobPriority, int] = {priority: 0 for priority in JobPriority}
+        # 每个优先级：owner -> 等待队列（OrderedDict 顺序即轮转顺序）
+        self._waiting: Dict[JobPriority, 'OrderedDict[str, Deque[_Waiter]]'] = {
+            priority: OrderedDict() for priority in JobPriority
+        }
+        self._granted: Dict[JobPriority, int] = {priority: 0 for priority in JobPriority}
+        self._recent_waits: Dict[JobPriority, Deque[float]] = {
+            priority: deque(maxlen=1000) for priority in JobPriority
+        }
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    @classmethod
+    def from_config(cls) -> 'JobScheduler':
+        config = get_config()
+        return cls(
+            total_slots=getattr(config, 'job_total_slots', 8),
+            class_limits={
+                JobPriority.INTERACTIVE: getattr(config, 'job_interactive_slots', 4),
+                JobPriority.SCHEDULED: getattr(config, 'job_scheduled_slots', 6),
+                JobPriority.BATCH: getattr(config, 'job_batch_slots', 6),
+            },
+        )
+
+    def acquire(self, priority: JobPriority, owner: str = "default") -> None:
+        """阻塞直到获得一个执行槽位"""
+        waiter = _Waiter()
+        with self._lock:
+            self._waiting[priority].setdefault(owner, deque()).append(waiter)
+            self._dispatch()
+        waiter.event.wait()
+        with self._lock:
+            self._recent_waits[priority].append(time.monotonic() - waiter.enqueued_at)
+
+    def release(self, priority: JobPriority) -> None:
+        """归还槽位，并唤醒下一个等待者"""
+        with self._lock:
+            self._running[priority] = max(0, self._running[priority] - 1)
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, priority: JobPriority, owner: str = "default") -> Iterator[None]:
+        """占用一个槽位执行代码块"""
+        self.acquire(priority, owner)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    def call(self, priority: JobPriority, owner: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        在当前线程中占用槽位执行 fn
+
+        fn 返回 Future（如提交到异步 LLM 运行器或批处理器）时，槽位保持到该 Future 完成才归还，
+        使槽位统计反映真正进行中的工作。
+        """
+        self.acquire(priority, owner)
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException:
+            self.release(priority)
+            raise
+        if isinstance(result, Future):
+            result.add_done_callback(lambda _: self.release(priority))
+        else:
+            self.release(priority)
+        return result
+
+    def submit(
+        self,
+        priority: JobPriority,
+        owner: str,
+        fn: Callable[..., Any],
+        *args: Any,
+        **kwargs: Any,
+    ) -> Future:
+        """在调度器线程中占用槽位执行 fn，返回 Future"""
+        def run() -> Any:
+            with self.slot(priority, owner):
+                return fn(*args, **kwargs)
+
+        return self._get_pool().submit(run)
+
+    def executor(self, priority: JobPriority, owner: str = "default") -> Executor:
+        """返回按指定优先级/owner 提交任务的 Executor 适配器"""
+        return _PriorityExecutor(self, priority, owner)
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        # 等待槽位的线程只是阻塞，线程数需大于槽位数，避免线程池本身退化为 FIFO 队列
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.total_slots * 4,
+                        thread_name_prefix="job_",
+                    )
+        return self._pool
+
+    def _dispatch(self) -> None:
+        """在持有锁的情况下，把空闲槽位分配给等待者"""
+        while sum(self._running.values()) < self.total_slots:
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            waiter.event.set()
+
+    def _next_waiter(self) -> Optional[_Waiter]:
+        for priority in sorted(JobPriority, key=lambda p: p.rank):
+            if self._running[priority] >= self.class_limits[priority]:
+                continue
+            queues = self._waiting[priority]
+            if not queues:
+                continue
+            # 轮转：取队首 owner 的第一个等待者，然后把该 owner 移到队尾
+            owner, waiters = next(iter(queues.items()))
+            waiter = waiters.popleft()
+            if waiters:
+                queues.move_to_end(owner)
+            else:
+                del queues[owner]
+            self._running[priority] += 1
+            self._granted[priority] += 1
+            return waiter
+        return None
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """各优先级的运行数、等待数、累计放行数与等待耗时"""
+        result = {}
+        with self._lock:
+            for priority in JobPriority:
+                waits = sorted(self._recent_waits[priority])
+                result[priority.value] = {
+                    'limit': self.class_limits[priority],
+                    'running': self._running[priority],
+                    'waiting': sum(len(q) for q in self._waiting[priority].values()),
+                    'granted': self._granted[priority],
+                    'p95_wait': round(waits[int(0.95 * (len(waits) - 1))], 3) if waits else 0.0,
+                    'max_wait': round(waits[-1], 3) if waits else 0.0,
+                }
+        return result
+
+
+class _PriorityExecutor(Executor):
+    """把 submit 转发到 JobScheduler 的 Executor 适配器"""
+
+    def __init__(self, scheduler: JobScheduler, priority: JobPriority, owner: str):
+        self._scheduler = scheduler
+        self._priority = priority
+        self._owner = owner
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        return self._scheduler.submit(self._priority, self._owner, fn, *args, **kwargs)
+
+
+def owner_of(source_message: Any) -> str:
+    """由请求来源推导公平分享的 owner（优先会话，其次用户）"""
+    if source_message is None:
+        return "web"
+    platform = getattr(source_message, 'platform', '') or ''
+    chat_id = getattr(source_message, 'chat_id', '') or getattr(source_message, 'user_id', '') or ''
+    return f"{platform}:{chat_id}" if chat_id else (platform or "default")
+
+
+# === 便捷函数 ===
+
+_scheduler: Optional[JobScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_job_scheduler() -> JobScheduler:
+    """获取进程级任务调度器"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = JobScheduler.from_config()
+    return _scheduler
+
+
+def reset_job_scheduler() -> None:
+    """重置调度器（主要用于测试）"""
+    global _scheduler
+    _scheduler = None
@@ -11,27 +11,76 @@ A股自选股智能分析系统 - 核心分析流水线
 4. 提供股票分析的核心功能
 """
 
+import itertools
 import logging
+import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import closing
+from dataclasses import dataclass
 from datetime import date
-from typing import List, Dict, Any, Optional, Tuple
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 from src.config import get_config, Config
 from src.storage import get_db
-from data_provider import DataFetcherManager
 from data_provider.realtime_types import ChipDistribution
-from src.analyzer import GeminiAnalyzer, AnalysisResult, STOCK_NAME_MAP
-from src.notification import NotificationService, NotificationChannel
-from src.search_service import SearchService
-from src.enums import ReportType
-from src.stock_analyzer import StockTrendAnalyzer, TrendAnalysisResult
+from src.analyzer import AnalysisResult, STOCK_NAME_MAP
+from src.async_llm import get_async_llm_runner
+from src.notification import DashboardBuilder, NotificationService, NotificationChannel
+from src.enums import JobPriority, ReportType
+from src.stock_analyzer import TrendAnalysisResult
+from src.core.components import PipelineComponents, get_components
+from src.core.batcher import Batcher
+from src.core.job_scheduler import get_job_scheduler, owner_of
+from src.core.staged_executor import Stage, StagedExecutor
+from src.llm_scheduler import get_llm_scheduler
+from src.tracing import build_run_profile, get_tracer, trace_span, traced, write_run_profile
 from bot.models import BotMessage
 
 
 logger = logging.getLogger(__name__)
 
 
+# === 单股分析阶段线程池（进程内共享，按阶段类型隔离）===
+# quote: 实时行情 / 筹码分布；db: 上下文加载与趋势分析；search: 情报搜索
+# 按类型隔离可避免情报搜索等待实时行情时占满同一线程池造成死锁
+# 超过截止时间的阶段任务若仍在排队会被取消；已开始的无法中断，会继续占用线程直到返回，
+# 数据源本身的请求超时（而不是阶段超时）决定了一个线程最长被占用多久
+_stage_executors: Dict[str, ThreadPoolExecutor] = {}
+_stage_executors_lock = threading.Lock()
+
+
+def _get_stage_executor(kind: str) -> ThreadPoolExecutor:
+    """获取（懒创建）指定类型的阶段线程池"""
+    with _stage_executors_lock:
+        executor = _stage_executors.get(kind)
+        if executor is None:
+            workers = max(1, getattr(get_config(), 'stage_max_workers', 4))
+            if kind == 'quote':
+                # 每只股票同时有实时行情、筹码两个任务
+                workers *= 2
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"stage-{kind}")
+            _stage_executors[kind] = executor
+        return executor
+
+
+@dataclass
+class StockWorkItem:
+    """单只股票在分析流程中的工作单元（在各阶段之间传递）"""
+    code: str
+    report_type: ReportType = ReportType.SIMPLE
+    stock_name: str = ''
+    data_ok: bool = False
+    realtime_quote: Any = None
+    chip_data: Optional[ChipDistribution] = None
+    context: Optional[Dict[str, Any]] = None
+    trend_result: Optional[TrendAnalysisResult] = None
+    news_context: Optional[str] = None
+    enhanced_context: Optional[Dict[str, Any]] = None
+    result: Optional[AnalysisResult] = None
+
+
 class StockAnalysisPipeline:
     """
     股票分析主流程调度器
@@ -49,7 +98,11 @@ class StockAnalysisPipeline:
         source_message: Optional[BotMessage] = None,
         query_id: Optional[str] = None,
         query_source: Optional[str] = None,
-        save_context_snapshot: Optional[bool] = None
+        save_context_snapshot: Optional[bool] = None,
+        components: Optional[PipelineComponents] = None,
+        priority: JobPriority = JobPriority.BATCH,
+        use_llm_cache: bool = True,
+        on_partial: Optional[Callable[[Dict[str, Any]], None]] = None
     ):
         """
         初始化调度器
@@ -57,31 +110,40 @@ class StockAnalysisPipeline:
         Args:
             config: 配置对象（可选，默认使用全局配置）
             max_workers: 最大并发线程数（可选，默认从配置读取）
+            components: 共享组件容器（可选，默认使用进程级容器）
+            priority: run() 批量分析各阶段向任务调度器申请槽位的优先级
+            use_llm_cache: 是否复用 LLM 响应缓存（False 时强制重新调用 API）
+            on_partial: 流式分析的部分结果回调（设置后单股分析改用流式 LLM 调用，
+                        参数格式见 GeminiAnalyzer.analyze_stream）
         """
         self.config = config or get_config()
         self.max_workers = max_workers or self.config.max_workers
         self.source_message = source_message
         self.query_id = query_id
         self.query_source = self._resolve_query_source(query_source)
+        # 断点续跑时未完成股票的运行日志 {code: 阶段状态}，用于跳过已完成的阶段
+        self._resume_journal: Dict[str, Dict[str, Any]] = {}
+        # 任务调度：优先级与公平分享的 owner（Bot 会话 / 请求来源）
+        self.priority = priority
+        self.job_owner = owner_of(source_message) if source_message is not None else self.query_source
         self.save_context_snapshot = (
             self.config.save_context_snapshot if save_context_snapshot is None else save_context_snapshot
         )
+        self.use_llm_cache = use_llm_cache
+        self.on_partial = on_partial
         
-        # 初始化各模块
+        # 初始化各模块：重量级组件从进程级容器获取（只构建一次，跨请求共享）
+        components = components or get_components()
         self.db = get_db()
-        self.fetcher_manager = DataFetcherManager()
+        self.fetcher_manager = components.fetcher_manager
         # 不再单独创建 akshare_fetcher，统一使用 fetcher_manager 获取增强数据
-        self.trend_analyzer = StockTrendAnalyzer()  # 趋势分析器
-        self.analyzer = GeminiAnalyzer()
+        self.trend_analyzer = components.trend_analyzer  # 趋势分析器
+        self.trend_cache = components.trend_cache  # 趋势分析结果缓存（按最新 K 线）
+        self.analyzer = components.analyzer
+        self.search_service = components.search_service
+        # 通知服务与请求来源绑定，每个流水线单独创建
         self.notifier = NotificationService(source_message=source_message)
         
-        # 初始化搜索服务
-        self.search_service = SearchService(
-            bocha_keys=self.config.bocha_api_keys,
-            tavily_keys=self.config.tavily_api_keys,
-            serpapi_keys=self.config.serpapi_keys,
-        )
-        
         logger.info(f"调度器初始化完成，最大并发数: {self.max_workers}")
         logger.info("已启用趋势分析器 (MA5>MA10>MA20 多头判断)")
         # 打印实时行情/筹码配置状态
@@ -98,6 +160,7 @@ class StockAnalysisPipeline:
         else:
             logger.warning("搜索服务未启用（未配置 API Key）")
     
+    @traced("stage.fetch", code_param='code')
     def fetch_and_save_stock_data(
         self, 
         code: str,
@@ -148,13 +211,15 @@ class StockAnalysisPipeline:
         """
         分析单只股票（增强版：含量比、换手率、筹码分析、多维度情报）
         
-        流程：
-        1. 获取实时行情（量比、换手率）- 通过 DataFetcherManager 自动故障切换
-        2. 获取筹码分布 - 通过 DataFetcherManager 带熔断保护
-        3. 进行趋势分析（基于交易理念）
-        4. 多维度情报搜索（最新消息+风险排查+业绩预期）
-        5. 从数据库获取分析上下文
-        6. 调用 AI 进行综合分析
+        流程（依赖图）：
+            实时行情 ─┐
+            筹码分布 ─┼─> 增强上下文 -> AI 分析 -> 保存历史
+            上下文/趋势 ┤
+            情报搜索 ─┘（股票名称未知时等待实时行情提供名称）
+        
+        前四个阶段互不依赖，分别提交到有界线程池并发执行，
+        每个阶段的超时是从提交时刻起算的截止时间（而不是从上一个阶段返回后起算），
+        因此单只股票的等待不超过最长的阶段超时；超时或失败时降级为空结果继续分析。
         
         Args:
             code: 股票代码
@@ -164,152 +229,327 @@ class StockAnalysisPipeline:
             AnalysisResult 或 None（如果分析失败）
         """
         try:
-            # 获取股票名称（优先从实时行情获取真实名称）
-            stock_name = STOCK_NAME_MAP.get(code, '')
-            
-            # Step 1: 获取实时行情（量比、换手率等）- 使用统一入口，自动故障切换
-            realtime_quote = None
-            try:
-                realtime_quote = self.fetcher_manager.get_realtime_quote(code)
-                if realtime_quote:
-                    # 使用实时行情返回的真实股票名称
-                    if realtime_quote.name:
-                        stock_name = realtime_quote.name
-                    # 兼容不同数据源的字段（有些数据源可能没有 volume_ratio）
-                    volume_ratio = getattr(realtime_quote, 'volume_ratio', None)
-                    turnover_rate = getattr(realtime_quote, 'turnover_rate', None)
-                    logger.info(f"[{code}] {stock_name} 实时行情: 价格={realtime_quote.price}, "
-                              f"量比={volume_ratio}, 换手率={turnover_rate}% "
-                              f"(来源: {realtime_quote.source.value if hasattr(realtime_quote, 'source') else 'unknown'})")
-                else:
-                    logger.info(f"[{code}] 实时行情获取失败或已禁用，将使用历史数据进行分析")
-            except Exception as e:
-                logger.warning(f"[{code}] 获取实时行情失败: {e}")
-            
-            # 如果还是没有名称，使用代码作为名称
-            if not stock_name:
-                stock_name = f'股票{code}'
-            
-            # Step 2: 获取筹码分布 - 使用统一入口，带熔断保护
-            chip_data = None
-            try:
-                chip_data = self.fetcher_manager.get_chip_distribution(code)
-                if chip_data:
-                    logger.info(f"[{code}] 筹码分布: 获利比例={chip_data.profit_ratio:.1%}, "
-                              f"90%集中度={chip_data.concentration_90:.2%}")
-                else:
-                    logger.debug(f"[{code}] 筹码分布获取失败或已禁用")
-            except Exception as e:
-                logger.warning(f"[{code}] 获取筹码分布失败: {e}")
-            
-            # Step 3: 趋势分析（基于交易理念）
-            trend_result: Optional[TrendAnalysisResult] = None
-            try:
-                # 获取历史数据进行趋势分析
-                context = self.db.get_analysis_context(code)
-                if context and 'raw_data' in context:
-                    import pandas as pd
-                    raw_data = context['raw_data']
-                    if isinstance(raw_data, list) and len(raw_data) > 0:
-                        df = pd.DataFrame(raw_data)
-                        trend_result = self.trend_analyzer.analyze(df, code)
-                        logger.info(f"[{code}] 趋势分析: {trend_result.trend_status.value}, "
-                                  f"买入信号={trend_result.buy_signal.value}, 评分={trend_result.signal_score}")
-            except Exception as e:
-                logger.warning(f"[{code}] 趋势分析失败: {e}")
-            
-            # Step 4: 多维度情报搜索（最新消息+风险排查+业绩预期）
-            news_context = None
-            if self.search_service.is_available:
-                logger.info(f"[{code}] 开始多维度情报搜索...")
-                
-                # 使用多维度搜索（最多5次搜索）
-                intel_results = self.search_service.search_comprehensive_intel(
-                    stock_code=code,
-                    stock_name=stock_name,
-                    max_searches=5
-                )
-                
-                # 格式化情报报告
-                if intel_results:
-                    news_context = self.search_service.format_intel_report(intel_results, stock_name)
-                    total_results = sum(
-                        len(r.results) for r in intel_results.values() if r.success
-                    )
-                    logger.info(f"[{code}] 情报搜索完成: 共 {total_results} 条结果")
-                    logger.debug(f"[{code}] 情报搜索结果:\n{news_context}")
-
-                    # 保存新闻情报到数据库（用于后续复盘与查询）
-                    try:
-                        query_context = self._build_query_context()
-                        for dim_name, response in intel_results.items():
-                            if response and response.success and response.results:
-                                self.db.save_news_intel(
-                                    code=code,
-                                    name=stock_name,
-                                    dimension=dim_name,
-                                    query=response.query,
-                                    response=response,
-                                    query_context=query_context
-                                )
-                    except Exception as e:
-                        logger.warning(f"[{code}] 保存新闻情报失败: {e}")
-            else:
-                logger.info(f"[{code}] 搜索服务不可用，跳过情报搜索")
-            
-            # Step 5: 获取分析上下文（技术面数据）
-            context = self.db.get_analysis_context(code)
-            
-            if context is None:
-                logger.warning(f"[{code}] 无法获取历史行情数据，将仅基于新闻和实时行情分析")
-                from datetime import date
-                context = {
-                    'code': code,
-                    'stock_name': stock_name,
-                    'date': date.today().isoformat(),
-                    'data_missing': True,
-                    'today': {},
-                    'yesterday': {}
-                }
-            
-            # Step 6: 增强上下文数据（添加实时行情、筹码、趋势分析结果、股票名称）
-            enhanced_context = self._enhance_context(
-                context, 
-                realtime_quote, 
-                chip_data, 
-                trend_result,
-                stock_name  # 传入股票名称
+            item = StockWorkItem(code=code, report_type=report_type)
+            deadlines = self._stage_deadlines()
+
+            # Step 1-4: 并发执行独立 I/O 阶段
+            realtime_future = _get_stage_executor('quote').submit(self._fetch_realtime_stage, code)
+            intel_future = _get_stage_executor('search').submit(
+                self._search_intel_after_name, code, realtime_future, deadlines['realtime']
             )
-            
-            # Step 7: 调用 AI 分析（传入增强的上下文和新闻）
-            result = self.analyzer.analyze(enhanced_context, news_context=news_context)
+            self._gather_market_data(item, realtime_future, deadlines)
+            item.news_context = self._await_stage(code, '情报搜索', intel_future, deadlines['intel'])
 
-            # Step 8: 保存分析历史记录
-            if result:
-                try:
-                    context_snapshot = self._build_context_snapshot(
-                        enhanced_context=enhanced_context,
-                        news_content=news_context,
-                        realtime_quote=realtime_quote,
-                        chip_data=chip_data
-                    )
-                    self.db.save_analysis_history(
-                        result=result,
-                        query_id=self.query_id or "",
-                        report_type=report_type.value,
-                        news_content=news_context,
-                        context_snapshot=context_snapshot,
-                        save_snapshot=self.save_context_snapshot
-                    )
-                except Exception as e:
-                    logger.warning(f"[{code}] 保存分析历史失败: {e}")
+            # Step 5-7: 构建上下文并调用 AI 分析
+            if self._run_llm(item) is None:
+                return None
 
-            return result
+            # Step 8: 保存分析历史记录
+            self._persist_result(item)
+            return item.result
             
         except Exception as e:
             logger.error(f"[{code}] 分析失败: {e}")
             logger.exception(f"[{code}] 详细错误信息:")
             return None
+
+    def _gather_market_data(
+        self,
+        item: 'StockWorkItem',
+        realtime_future: Optional[Future] = None,
+        deadlines: Optional[Dict[str, float]] = None,
+    ) -> 'StockWorkItem':
+        """
+        并发获取实时行情、筹码分布与分析上下文，并写入工作单元
+
+        Args:
+            item: 工作单元
+            realtime_future: 已提交的实时行情任务（可选，未提供时在此提交）
+            deadlines: 各阶段截止时间（与 realtime_future 同时计算；未提供时从现在起算）
+        """
+        code = item.code
+        if deadlines is None:
+            deadlines = self._stage_deadlines()
+
+        if realtime_future is None:
+            realtime_future = _get_stage_executor('quote').submit(self._fetch_realtime_stage, code)
+        chip_future = _get_stage_executor('quote').submit(self._fetch_chip_stage, code)
+        context_future = _get_stage_executor('db').submit(self._load_context_stage, code)
+
+        item.realtime_quote = self._await_stage(code, '实时行情', realtime_future, deadlines['realtime'])
+        item.chip_data = self._await_stage(code, '筹码分布', chip_future, deadlines['chip'])
+        item.context, item.trend_result = self._await_stage(
+            code, '分析上下文', context_future, deadlines['context'], default=(None, None)
+        )
+
+        # 获取股票名称（优先从实时行情获取真实名称）
+        item.stock_name = self._resolve_stock_name(code, item.realtime_quote)
+        return item
+
+    @traced("stage.llm", code_param='item.code')
+    def _run_llm(self, item: 'StockWorkItem') -> Optional['StockWorkItem']:
+        """构建增强上下文并调用 AI 分析，失败返回 None"""
+        if self.on_partial is not None:
+            # 交互式请求：流式调用，字段完成即回调给调用方
+            self._prepare_llm_context(item)
+            item.result = self.analyzer.analyze_stream(
+                item.enhanced_context, news_context=item.news_context, use_cache=self.use_llm_cache,
+                report_type=item.report_type, on_partial=self.on_partial,
+            )
+            return item if item.result else None
+
+        if self.config.llm_async_enabled:
+            # 异步模式下单股分析也走共享事件循环，与批量任务共用并发上限
+            return self._submit_llm(item).result()
+
+        self._prepare_llm_context(item)
+        
+        # 调用 AI 分析（传入增强的上下文和新闻）
+        item.result = self.analyzer.analyze(
+            item.enhanced_context, news_context=item.news_context, use_cache=self.use_llm_cache,
+            report_type=item.report_type,
+        )
+        return item if item.result else None
+
+    def _submit_llm(self, item: 'StockWorkItem') -> Future:
+        """
+        构建增强上下文后把 AI 分析提交到异步 LLM 事件循环
+
+        Returns:
+            Future，结果为 item（分析失败为 None）
+        """
+        self._prepare_llm_context(item)
+
+        async def run() -> Optional['StockWorkItem']:
+            with trace_span("stage.llm", code=item.code):
+                item.result = await self.analyzer.analyze_async(
+                    item.enhanced_context, news_context=item.news_context, use_cache=self.use_llm_cache,
+                    report_type=item.report_type,
+                )
+            return item if item.result else None
+
+        return get_async_llm_runner().submit(run())
+
+    def _run_llm_batch(self, items: List['StockWorkItem']) -> List[Optional['StockWorkItem']]:
+        """多只股票合并为一次 AI 请求（精简报告批量模式），返回与 items 等长的列表"""
+        with trace_span("stage.llm", batch_size=len(items)):
+            results = self.analyzer.analyze_batch(
+                [(item.enhanced_context, item.news_context) for item in items],
+                use_cache=self.use_llm_cache,
+            )
+        outputs: List[Optional[StockWorkItem]] = []
+        for item, result in zip(items, results):
+            item.result = result
+            outputs.append(item if result else None)
+        return outputs
+
+    def _prepare_llm_context(self, item: 'StockWorkItem') -> None:
+        """构建增强上下文（分析上下文缺失时降级为仅新闻 + 实时行情）"""
+        code = item.code
+
+        # 分析上下文缺失时降级
+        context = item.context
+        if context is None:
+            logger.warning(f"[{code}] 无法获取历史行情数据，将仅基于新闻和实时行情分析")
+            context = {
+                'code': code,
+                'stock_name': item.stock_name,
+                'date': date.today().isoformat(),
+                'data_missing': True,
+                'today': {},
+                'yesterday': {}
+            }
+        
+        # 增强上下文数据（添加实时行情、筹码、趋势分析结果、股票名称）
+        item.enhanced_context = self._enhance_context(
+            context, 
+            item.realtime_quote, 
+            item.chip_data, 
+            item.trend_result,
+            item.stock_name  # 传入股票名称
+        )
+
+    @traced("stage.persist", code_param='item.code')
+    def _persist_result(self, item: 'StockWorkItem') -> None:
+        """保存分析历史记录"""
+        try:
+            context_snapshot = self._build_context_snapshot(
+                enhanced_context=item.enhanced_context,
+                news_content=item.news_context,
+                realtime_quote=item.realtime_quote,
+                chip_data=item.chip_data
+            )
+            self.db.save_analysis_history(
+                result=item.result,
+                query_id=self.query_id or "",
+                report_type=item.report_type.value,
+                news_content=item.news_context,
+                context_snapshot=context_snapshot,
+                save_snapshot=self.save_context_snapshot
+            )
+        except Exception as e:
+            logger.warning(f"[{item.code}] 保存分析历史失败: {e}")
+
+    def _stage_timeouts(self) -> Dict[str, float]:
+        """读取各阶段超时（秒）"""
+        return {
+            'realtime': getattr(self.config, 'stage_timeout_realtime', 15.0),
+            'chip': getattr(self.config, 'stage_timeout_chip', 20.0),
+            'context': getattr(self.config, 'stage_timeout_context', 10.0),
+            'intel': getattr(self.config, 'stage_timeout_intel', 60.0),
+        }
+
+    def _stage_deadlines(self) -> Dict[str, float]:
+        """各阶段截止时间（time.monotonic()），在提交阶段任务时计算"""
+        now = time.monotonic()
+        return {stage: now + timeout for stage, timeout in self._stage_timeouts().items()}
+
+    @staticmethod
+    def _await_stage(code: str, label: str, future: Future, deadline: float, default: Any = None) -> Any:
+        """
+        等待阶段结果直到截止时间，超时或异常时降级为 default
+
+        超时的阶段若仍在线程池中排队则取消，避免占用共享线程池拖慢后续股票；
+        已开始执行的无法强制中断，其结果会被丢弃。
+        """
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            future.cancel()
+            logger.warning(f"[{code}] {label}未在截止时间内完成，降级继续分析")
+        except Exception as e:
+            logger.warning(f"[{code}] {label}阶段失败: {e}")
+        return default
+
+    def _resolve_stock_name(self, code: str, realtime_quote=None) -> str:
+        """解析股票名称：实时行情 > 本地映射 > 名称缓存 > 代码占位"""
+        if realtime_quote is not None and getattr(realtime_quote, 'name', None):
+            return realtime_quote.name
+        name = STOCK_NAME_MAP.get(code, '')
+        if not name:
+            name = getattr(self.fetcher_manager, '_stock_name_cache', {}).get(code, '')
+        return name or f'股票{code}'
+
+    @traced("stage.realtime", code_param='code')
+    def _fetch_realtime_stage(self, code: str):
+        """阶段：获取实时行情（量比、换手率等）- 统一入口，自动故障切换"""
+        try:
+            realtime_quote = self.fetcher_manager.get_realtime_quote(code)
+        except Exception as e:
+            logger.warning(f"[{code}] 获取实时行情失败: {e}")
+            return None
+
+        if realtime_quote:
+            # 兼容不同数据源的字段（有些数据源可能没有 volume_ratio）
+            volume_ratio = getattr(realtime_quote, 'volume_ratio', None)
+            turnover_rate = getattr(realtime_quote, 'turnover_rate', None)
+            logger.info(f"[{code}] {realtime_quote.name or ''} 实时行情: 价格={realtime_quote.price}, "
+                      f"量比={volume_ratio}, 换手率={turnover_rate}% "
+                      f"(来源: {realtime_quote.source.value if hasattr(realtime_quote, 'source') else 'unknown'})")
+        else:
+            logger.info(f"[{code}] 实时行情获取失败或已禁用，将使用历史数据进行分析")
+        return realtime_quote
+
+    @traced("stage.chip", code_param='code')
+    def _fetch_chip_stage(self, code: str) -> Optional[ChipDistribution]:
+        """阶段：获取筹码分布 - 统一入口，带熔断保护"""
+        try:
+            chip_data = self.fetcher_manager.get_chip_distribution(code)
+        except Exception as e:
+            logger.warning(f"[{code}] 获取筹码分布失败: {e}")
+            return None
+
+        if chip_data:
+            logger.info(f"[{code}] 筹码分布: 获利比例={chip_data.profit_ratio:.1%}, "
+                      f"90%集中度={chip_data.concentration_90:.2%}")
+        else:
+            logger.debug(f"[{code}] 筹码分布获取失败或已禁用")
+        return chip_data
+
+    @traced("stage.context", code_param='code')
+    def _load_context_stage(
+        self, code: str
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[TrendAnalysisResult]]:
+        """阶段：从数据库获取分析上下文（技术面数据）并进行趋势分析"""
+        context = self.db.get_analysis_context(code)
+
+        trend_result: Optional[TrendAnalysisResult] = None
+        try:
+            if context:
+                # 同一根 K 线、同一组参数的结果已缓存时不再读取历史日线重算
+                trend_result = self.trend_cache.get(code, self.trend_analyzer)
+            if trend_result:
+                logger.info(f"[{code}] 趋势分析: {trend_result.trend_status.value}, "
+                          f"买入信号={trend_result.buy_signal.value}, 评分={trend_result.signal_score}")
+        except Exception as e:
+            logger.warning(f"[{code}] 趋势分析失败: {e}")
+
+        return context, trend_result
+
+    def _search_intel_after_name(
+        self, code: str, realtime_future: Future, name_deadline: float
+    ) -> Optional[str]:
+        """
+        情报搜索（单股并发模式）
+
+        搜索关键词需要股票名称：本地已知名称时立即开始，
+        否则等待实时行情阶段提供名称（最多到实时行情的截止时间 name_deadline）。
+        """
+        if not self.search_service.is_available:
+            logger.info(f"[{code}] 搜索服务不可用，跳过情报搜索")
+            return None
+
+        stock_name = STOCK_NAME_MAP.get(code, '') or getattr(
+            self.fetcher_manager, '_stock_name_cache', {}
+        ).get(code, '')
+        if not stock_name:
+            realtime_quote = self._await_stage(code, '实时行情', realtime_future, name_deadline)
+            stock_name = self._resolve_stock_name(code, realtime_quote)
+        return self._search_intel(code, stock_name)
+
+    @traced("stage.search", code_param='code')
+    def _search_intel(self, code: str, stock_name: str) -> Optional[str]:
+        """阶段：多维度情报搜索（最新消息+风险排查+业绩预期）"""
+        if not self.search_service.is_available:
+            logger.info(f"[{code}] 搜索服务不可用，跳过情报搜索")
+            return None
+
+        logger.info(f"[{code}] 开始多维度情报搜索...")
+        
+        # 使用多维度搜索（最多5次搜索）
+        intel_results = self.search_service.search_comprehensive_intel(
+            stock_code=code,
+            stock_name=stock_name,
+            max_searches=5
+        )
+        if not intel_results:
+            return None
+        
+        # 格式化情报报告
+        news_context = self.search_service.format_intel_report(intel_results, stock_name)
+        total_results = sum(
+            len(r.results) for r in intel_results.values() if r.success
+        )
+        logger.info(f"[{code}] 情报搜索完成: 共 {total_results} 条结果")
+        logger.debug(f"[{code}] 情报搜索结果:\n{news_context}")
+
+        # 保存新闻情报到数据库（用于后续复盘与查询）
+        try:
+            query_context = self._build_query_context()
+            for dim_name, response in intel_results.items():
+                if response and response.success and response.results:
+                    self.db.save_news_intel(
+                        code=code,
+                        name=stock_name,
+                        dimension=dim_name,
+                        query=response.query,
+                        response=response,
+                        query_context=query_context
+                    )
+        except Exception as e:
+            logger.warning(f"[{code}] 保存新闻情报失败: {e}")
+
+        return news_context
     
     def _enhance_context(
         self,
@@ -542,24 +782,8 @@ class StockAnalysisPipeline:
                 )
                 
                 # 单股推送模式（#55）：每分析完一只股票立即推送
-                if single_stock_notify and self.notifier.is_available():
-                    try:
-                        # 根据报告类型选择生成方法
-                        if report_type == ReportType.FULL:
-                            # 完整报告：使用决策仪表盘格式
-                            report_content = self.notifier.generate_dashboard_report([result])
-                            logger.info(f"[{code}] 使用完整报告格式")
-                        else:
-                            # 精简报告：使用单股报告格式（默认）
-                            report_content = self.notifier.generate_single_stock_report(result)
-                            logger.info(f"[{code}] 使用精简报告格式")
-                        
-                        if self.notifier.send(report_content):
-                            logger.info(f"[{code}] 单股推送成功")
-                        else:
-                            logger.warning(f"[{code}] 单股推送失败")
-                    except Exception as e:
-                        logger.error(f"[{code}] 单股推送异常: {e}")
+                if single_stock_notify:
+                    self._send_single_stock_notification(result, report_type)
             
             return result
             
@@ -567,19 +791,200 @@ class StockAnalysisPipeline:
             # 捕获所有异常，确保单股失败不影响整体
             logger.exception(f"[{code}] 处理过程发生未知异常: {e}")
             return None
+
+    @traced("stage.notify", code_param='result.code')
+    def _send_single_stock_notification(self, result: AnalysisResult, report_type: ReportType) -> bool:
+        """单股推送（#55），返回是否推送成功"""
+        code = result.code
+        if not self.notifier.is_available():
+            return False
+        try:
+            # 根据报告类型选择生成方法
+            if report_type == ReportType.FULL:
+                # 完整报告：使用决策仪表盘格式
+                report_content = self.notifier.generate_dashboard_report([result])
+                logger.info(f"[{code}] 使用完整报告格式")
+            else:
+                # 精简报告：使用单股报告格式（默认）
+                report_content = self.notifier.generate_single_stock_report(result)
+                logger.info(f"[{code}] 使用精简报告格式")
+            
+            if self.notifier.send(report_content):
+                logger.info(f"[{code}] 单股推送成功")
+                return True
+            logger.warning(f"[{code}] 单股推送失败")
+        except Exception as e:
+            logger.error(f"[{code}] 单股推送异常: {e}")
+        return False
+
+    def _journal(self, code: str, stage: str, news_context: Optional[str] = None) -> None:
+        """记录运行日志（断点续跑），未设置 query_id 时不记录"""
+        if not self.query_id:
+            return
+        try:
+            self.db.mark_run_stage(self.query_id, code, stage, news_context=news_context)
+        except Exception as e:
+            logger.debug(f"[{code}] 写入运行日志失败: {e}")
+
+    def _load_resumed_results(
+        self, stock_codes: List[str]
+    ) -> Tuple[List[AnalysisResult], List[str], List[AnalysisResult]]:
+        """
+        从运行日志与分析历史恢复已完成的股票
+
+        未完成股票的运行日志保存在 _resume_journal 中，流水线据此跳过
+        已完成的数据获取与情报搜索阶段。
+
+        Returns:
+            (已恢复的分析结果, 待处理的股票代码, 已分析但尚未单股推送的结果)
+        """
+        journal = self.db.get_run_journal(self.query_id) if self.query_id else {}
+        saved = self.db.get_analysis_results(self.query_id) if journal else {}
+
+        resumed: List[AnalysisResult] = []
+        unnotified: List[AnalysisResult] = []
+        remaining: List[str] = []
+        for code in stock_codes:
+            entry = journal.get(code) or {}
+            data = saved.get(code)
+            if entry.get('llm_done') and data:
+                try:
+                    result = AnalysisResult.from_dict(data)
+                except Exception as e:
+                    logger.warning(f"[{code}] 恢复分析结果失败，将重新分析: {e}")
+                    remaining.append(code)
+                    continue
+                resumed.append(result)
+                if not entry.get('notified'):
+                    unnotified.append(result)
+            else:
+                remaining.append(code)
+        self._resume_journal = {code: journal[code] for code in remaining if code in journal}
+        return resumed, remaining, unnotified
+
+    def _build_staged_executor(
+        self,
+        report_type: ReportType,
+        dry_run: bool,
+        single_stock_notify: bool,
+    ) -> StagedExecutor:
+        """
+        构建分阶段流水线：数据获取 -> 情报搜索 -> AI 分析 -> 持久化/推送
+
+        各阶段线程数与队列长度独立配置：数据获取保持低并发防封禁，
+        AI 分析可以更高并发，慢速 LLM 调用与后续股票的数据获取重叠执行。
+        """
+        config = self.config
+        queue_size = getattr(config, 'pipeline_queue_size', 10)
+        job_scheduler = get_job_scheduler()
+
+        def in_slot(func: Callable[[Any], Any]) -> Callable[[Any], Any]:
+            # 每只股票的每个上游阶段单独申请槽位，股票边界处让出给高优先级任务；
+            # 异步/批量 LLM 阶段返回 Future，槽位保持到请求完成
+            def wrapper(item: Any) -> Any:
+                return job_scheduler.call(self.priority, self.job_owner, func, item)
+            return wrapper
+
+        resume_journal = getattr(self, '_resume_journal', {})
+
+        def fetch_stage(code: str) -> Optional[StockWorkItem]:
+            if resume_journal.get(code, {}).get('data_done'):
+                logger.info(f"[{code}] 断点续跑：数据获取已完成，跳过")
+                success, error = True, None
+            else:
+                success, error = self.fetch_and_save_stock_data(code)
+            if success:
+                self._journal(code, 'data_done')
+            else:
+                logger.warning(f"[{code}] 数据获取失败: {error}")
+                # 即使获取失败，也尝试用已有数据分析
+            if dry_run:
+                logger.info(f"[{code}] 跳过 AI 分析（dry-run 模式）")
+                return None
+            item = StockWorkItem(code=code, report_type=report_type, data_ok=success)
+            return self._gather_market_data(item)
+
+        def search_stage(item: StockWorkItem) -> StockWorkItem:
+            entry = resume_journal.get(item.code, {})
+            if entry.get('intel_done'):
+                logger.info(f"[{item.code}] 断点续跑：复用已保存的情报搜索结果")
+                item.news_context = entry.get('news_context')
+                return item
+            try:
+                item.news_context = self._search_intel(item.code, item.stock_name)
+                self._journal(item.code, 'intel_done', news_context=item.news_context)
+            except Exception as e:
+                logger.warning(f"[{item.code}] 情报搜索失败: {e}")
+            return item
+
+        def llm_stage(item: StockWorkItem) -> Optional[StockWorkItem]:
+            # AI 调用频率由全局 LLM 调度器按 RPM/TPM 控制
+            return self._run_llm(item)
+
+        # 异步模式：阶段线程只负责提交，请求在事件循环中并发进行，
+        # 同时挂起的分析数为并发上限的两倍（排队等待 RPM 的请求不占用请求名额）
+        llm_async = getattr(config, 'llm_async_enabled', False)
+        llm_inflight = max(1, getattr(config, 'llm_async_concurrency', 8)) * 2 if llm_async else 0
+        llm_workers = getattr(config, 'pipeline_llm_workers', 3)
+        llm_func = self._submit_llm if llm_async else llm_stage
+
+        # 精简报告批量模式：凑满一批（或等待超时）后多只股票合并为一次请求，优先于异步模式
+        batch_size = getattr(config, 'llm_batch_size', 0)
+        if report_type == ReportType.SIMPLE and batch_size > 1:
+            batcher = Batcher(
+                self._run_llm_batch,
+                batch_size=batch_size,
+                max_wait=getattr(config, 'llm_batch_wait', 2.0),
+                workers=llm_workers,
+                name="llm-batch",
+            )
+
+            def batch_submit(item: StockWorkItem) -> Future:
+                self._prepare_llm_context(item)
+                return batcher.submit(item)
+
+            # 提交只需一个阶段线程；挂起数覆盖执行中的批次外加一个正在凑的批次
+            llm_func = batch_submit
+            llm_inflight = batch_size * (max(1, llm_workers) + 1)
+            llm_workers = 1
+
+        def persist_stage(item: StockWorkItem) -> AnalysisResult:
+            result = item.result
+            self._persist_result(item)
+            self._journal(item.code, 'llm_done')
+            logger.info(
+                f"[{item.code}] 分析完成: {result.operation_advice}, "
+                f"评分 {result.sentiment_score}"
+            )
+            if single_stock_notify and self._send_single_stock_notification(result, report_type):
+                self._journal(item.code, 'notified')
+            return result
+
+        return StagedExecutor([
+            Stage("fetch", in_slot(fetch_stage), workers=getattr(config, 'pipeline_fetch_workers', 0) or self.max_workers,
+                  queue_size=queue_size),
+            Stage("search", in_slot(search_stage), workers=getattr(config, 'pipeline_search_workers', 2),
+                  queue_size=queue_size),
+            Stage("llm", in_slot(llm_func), workers=llm_workers,
+                  queue_size=queue_size, max_inflight=llm_inflight),
+            Stage("persist", persist_stage, workers=getattr(config, 'pipeline_notify_workers', 1),
+                  queue_size=queue_size),
+        ])
     
     def run(
         self, 
         stock_codes: Optional[List[str]] = None,
         dry_run: bool = False,
-        send_notification: bool = True
+        send_notification: bool = True,
+        resume: bool = False,
+        on_result: Optional[Callable[[AnalysisResult], None]] = None
     ) -> List[AnalysisResult]:
         """
         运行完整的分析流程
         
         流程：
         1. 获取待分析的股票列表
-        2. 使用线程池并发处理
+        2. 分阶段流水线并发处理（数据获取 -> 情报搜索 -> AI 分析 -> 持久化/推送）
         3. 收集分析结果
         4. 发送通知
         
@@ -587,10 +992,39 @@ class StockAnalysisPipeline:
             stock_codes: 股票代码列表（可选，默认使用配置中的自选股）
             dry_run: 是否仅获取数据不分析
             send_notification: 是否发送推送通知
+            resume: 是否断点续跑（按 query_id 从运行日志恢复已完成的股票）
+            on_result: 每完成一只股票的回调（用于实时展示进度）
             
         Returns:
             分析结果列表
         """
+        results: List[AnalysisResult] = []
+        for result in self.run_iter(stock_codes, dry_run, send_notification, resume):
+            results.append(result)
+            if on_result is not None:
+                try:
+                    on_result(result)
+                except Exception as e:
+                    logger.warning(f"[{result.code}] 结果回调失败: {e}")
+        return results
+    
+    def run_iter(
+        self, 
+        stock_codes: Optional[List[str]] = None,
+        dry_run: bool = False,
+        send_notification: bool = True,
+        resume: bool = False
+    ) -> Iterator[AnalysisResult]:
+        """
+        运行完整的分析流程，按完成顺序逐个产出分析结果
+        
+        参数与 run() 相同。每个结果产出时即追加到增量决策仪表盘，
+        迭代结束后用已渲染的段落汇总日报并发送通知；
+        提前停止迭代则不发送汇总通知。
+        
+        Yields:
+            AnalysisResult（断点续跑恢复的结果最先产出）
+        """
         start_time = time.time()
         
         # 使用配置中的股票列表
@@ -600,11 +1034,11 @@ class StockAnalysisPipeline:
         
         if not stock_codes:
             logger.error("未配置自选股列表，请在 .env 文件中设置 STOCK_LIST")
-            return []
+            return
         
         logger.info(f"===== 开始分析 {len(stock_codes)} 只股票 =====")
         logger.info(f"股票列表: {', '.join(stock_codes)}")
-        logger.info(f"并发数: {self.max_workers}, 模式: {'仅获取数据' if dry_run else '完整分析'}")
+        logger.info(f"数据获取并发数: {self.max_workers}, 模式: {'仅获取数据' if dry_run else '完整分析'}")
         
         # === 批量预取实时行情（优化：避免每只股票都触发全量拉取）===
         # 只有股票数量 >= 5 时才进行预取，少量股票直接逐个查询更高效
@@ -618,52 +1052,47 @@ class StockAnalysisPipeline:
         # Issue #119: 从配置读取报告类型
         report_type_str = getattr(self.config, 'report_type', 'simple').lower()
         report_type = ReportType.FULL if report_type_str == 'full' else ReportType.SIMPLE
-        # Issue #128: 从配置读取分析间隔
-        analysis_delay = getattr(self.config, 'analysis_delay', 0)
 
         if single_stock_notify:
             logger.info(f"已启用单股推送模式：每分析完一只股票立即推送（报告类型: {report_type_str}）")
         
-        results: List[AnalysisResult] = []
-        
-        # 使用线程池并发处理
-        # 注意：max_workers 设置较低（默认3）以避免触发反爬
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # 提交任务
-            future_to_code = {
-                executor.submit(
-                    self.process_single_stock,
-                    code,
-                    skip_analysis=dry_run,
-                    single_stock_notify=single_stock_notify and send_notification,
-                    report_type=report_type  # Issue #119: 传递报告类型
-                ): code
-                for code in stock_codes
-            }
-            
-            # 收集结果
-            for idx, future in enumerate(as_completed(future_to_code)):
-                code = future_to_code[future]
-                try:
-                    result = future.result()
-                    if result:
-                        results.append(result)
+        # 断点续跑：恢复已完成 AI 分析的股票，只处理剩余部分
+        all_codes = stock_codes
+        resumed: List[AnalysisResult] = []
+        if resume and not dry_run:
+            resumed, stock_codes, unnotified = self._load_resumed_results(stock_codes)
+            logger.info(f"断点续跑 (query_id={self.query_id}): 已完成 {len(resumed)} 只，剩余 {len(stock_codes)} 只")
+            if single_stock_notify and send_notification:
+                for result in unnotified:
+                    if self._send_single_stock_notification(result, report_type):
+                        self._journal(result.code, 'notified')
 
-                    # Issue #128: 分析间隔 - 在个股分析和大盘分析之间添加延迟
-                    if idx < len(stock_codes) - 1 and analysis_delay > 0:
-                        logger.debug(f"等待 {analysis_delay} 秒后继续下一只股票...")
-                        time.sleep(analysis_delay)
-
-                except Exception as e:
-                    logger.error(f"[{code}] 任务执行失败: {e}")
+        # 分阶段流水线：数据获取/情报搜索/AI 分析/持久化推送各自独立并发
+        # 注意：数据获取阶段并发（默认 max_workers=3）保持较低以避免触发反爬
+        executor = self._build_staged_executor(
+            report_type=report_type,  # Issue #119: 传递报告类型
+            dry_run=dry_run,
+            single_stock_notify=single_stock_notify and send_notification,
+        )
+        dashboard = DashboardBuilder(self.notifier)
+        results: List[AnalysisResult] = []
+        # 调用方提前停止迭代时关闭执行器的迭代器，使流水线不再处理剩余股票
+        with closing(executor.run_iter(stock_codes)) as outputs:
+            for result in itertools.chain(resumed, outputs):
+                results.append(result)
+                dashboard.add(result)
+                yield result
+        stock_codes = all_codes
+        logger.debug(f"流水线阶段统计: {executor.stats()}")
         
         # 统计
         elapsed_time = time.time() - start_time
         
         # dry-run 模式下，数据获取成功即视为成功
         if dry_run:
-            # 检查哪些股票的数据今天已存在
-            success_count = sum(1 for code in stock_codes if self.db.has_today_data(code))
+            # 检查哪些股票的数据今天已存在（fetch 阶段已写入缓存，这里为纯内存查询）
+            today = date.today()
+            success_count = sum(1 for code in stock_codes if self.db.has_today_data(code, today))
             fail_count = len(stock_codes) - success_count
         else:
             success_count = len(results)
@@ -671,19 +1100,50 @@ class StockAnalysisPipeline:
         
         logger.info("===== 分析完成 =====")
         logger.info(f"成功: {success_count}, 失败: {fail_count}, 耗时: {elapsed_time:.2f} 秒")
+        cache_stats = self.db.get_cache_stats()
+        logger.debug(f"数据库查询缓存: 命中 {cache_stats['hits']}, 未命中 {cache_stats['misses']}")
+        for model_key, llm_stats in get_llm_scheduler().stats().items():
+            logger.info(
+                f"LLM 调度 {model_key}: 请求 {llm_stats['requests']} 次, "
+                f"排队 P50 {llm_stats['p50_wait']}s / P95 {llm_stats['p95_wait']}s / 最大 {llm_stats['max_wait']}s"
+            )
+        
+        # 运行剖析：各阶段/数据源耗时分位数与每只股票的关键路径
+        if getattr(self.config, 'tracing_enabled', True):
+            self._write_run_profile(start_time, stock_codes)
         
         # 发送通知（单股推送模式下跳过汇总推送，避免重复）
         if results and send_notification and not dry_run:
             if single_stock_notify:
                 # 单股推送模式：只保存汇总报告，不再重复推送
                 logger.info("单股推送模式：跳过汇总推送，仅保存报告到本地")
-                self._send_notifications(results, skip_push=True)
+                self._send_notifications(results, skip_push=True, dashboard=dashboard)
             else:
-                self._send_notifications(results)
-        
-        return results
+                self._send_notifications(results, dashboard=dashboard)
     
-    def _send_notifications(self, results: List[AnalysisResult], skip_push: bool = False) -> None:
+    def _write_run_profile(self, started: float, stock_codes: List[str]) -> None:
+        """汇总本次运行的 span，写出 JSON/Markdown 剖析报告"""
+        try:
+            finished = time.time()
+            spans = get_tracer().spans(since=started, until=finished, codes=stock_codes)
+            profile = build_run_profile(spans, started, finished, codes=stock_codes, run_id=self.query_id)
+            _, md_path = write_run_profile(profile)
+            logger.info(f"运行剖析已保存: {md_path}")
+            for name, stats in profile['stages'].items():
+                if name.startswith('stage.'):
+                    logger.info(
+                        f"阶段 {name[len('stage.'):]}: {stats['count']} 次, "
+                        f"P50 {stats['p50']}s / P95 {stats['p95']}s, 累计 {stats['total']}s"
+                    )
+        except Exception as e:
+            logger.warning(f"生成运行剖析失败: {e}")
+
+    def _send_notifications(
+        self,
+        results: List[AnalysisResult],
+        skip_push: bool = False,
+        dashboard: Optional[DashboardBuilder] = None
+    ) -> None:
         """
         发送分析结果通知
         
@@ -692,12 +1152,16 @@ class StockAnalysisPipeline:
         Args:
             results: 分析结果列表
             skip_push: 是否跳过推送（仅保存到本地，用于单股推送模式）
+            dashboard: 已增量渲染的决策仪表盘（为空时按 results 重新生成）
         """
         try:
             logger.info("生成决策仪表盘日报...")
             
             # 生成决策仪表盘格式的详细日报
-            report = self.notifier.generate_dashboard_report(results)
+            if dashboard is not None:
+                report = dashboard.build()
+            else:
+                report = self.notifier.generate_dashboard_report(results)
             
             # 保存到本地
             filepath = self.notifier.save_report_to_file(report)
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 重复请求合并（singleflight）
+===================================
+
+职责：
+1. 相同 key 的并发请求只执行一次，后到的请求挂接到进行中的任务上
+2. 任务成功后在短时间内缓存结果，窗口内的重复请求直接复用
+3. 失败或空结果不缓存，下一次请求重新执行
+
+示例：
+    flight = SingleFlight(result_ttl=300)
+    future, shared = flight.submit(key, executor, fn, *args)
+    result = future.result()
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    按 key 合并重复任务
+
+    Args:
+        result_ttl: 成功结果的缓存秒数，0 表示只合并进行中的任务
+    """
+
+    def __init__(self, result_ttl: float = 0):
+        self.result_ttl = result_ttl
+        self._inflight: Dict[Hashable, Future] = {}
+        self._results: Dict[Hashable, Tuple[float, Future]] = {}
+        self._lock = threading.Lock()
+        self.started = 0
+        self.coalesced = 0
+        self.cache_hits = 0
+
+    def submit(
+        self,
+        key: Hashable,
+        executor: Executor,
+        fn: Callable[..., Any],
+        *args: Any,
+        **kwargs: Any,
+    ) -> Tuple[Future, bool]:
+        """
+        提交任务；若同 key 任务正在执行或结果仍在缓存期内，则复用
+
+        Returns:
+            (future, shared)，shared 为 True 表示复用了已有任务
+        """
+        with self._lock:
+            self._evict_expired(time.monotonic())
+            cached = self._results.get(key)
+            if cached is not None:
+                self.cache_hits += 1
+                return cached[1], True
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, True
+            future = executor.submit(fn, *args, **kwargs)
+            self._inflight[key] = future
+            self.started += 1
+
+        future.add_done_callback(lambda f: self._complete(key, f))
+        return future, False
+
+    def _complete(self, key: Hashable, future: Future) -> None:
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+            if self.result_ttl <= 0 or future.cancelled() or future.exception() is not None:
+                return
+            if future.result() is None:
+                return
+            self._results[key] = (time.monotonic() + self.result_ttl, future)
+
+    def _evict_expired(self, now: float) -> None:
+        expired = [key for key, (expires, _) in self._results.items() if expires <= now]
+        for key in expired:
+            del self._results[key]
+
+    def forget(self, key: Hashable) -> None:
+        """丢弃某个 key 的缓存结果（进行中的任务不受影响）"""
+        with self._lock:
+            self._results.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        """执行次数、合并次数、缓存命中次数"""
+        with self._lock:
+            return {
+                'started': self.started,
+                'coalesced': self.coalesced,
+                'cache_hits': self.cache_hits,
+                'inflight': len(self._inflight),
+                'cached': len(self._results),
+            }
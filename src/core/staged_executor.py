@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 分阶段流水线执行器
+===================================
+
+职责：
+1. 将批量任务拆分为多个阶段（生产者/消费者模型）
+2. 每个阶段拥有独立的工作线程数与有界队列
+3. 下游阻塞时通过有界队列对上游形成背压
+
+示例：
+    executor = StagedExecutor([
+        Stage("fetch", fetch_fn, workers=3),
+        Stage("llm", llm_fn, workers=5),
+    ])
+    outputs = executor.run(items)
+
+    # 或逐个获取完成的结果
+    for output in executor.run_iter(items):
+        ...
+
+阶段函数接收上一阶段的输出并返回下一阶段的输入；
+返回 None 表示该任务在此阶段结束（不再进入后续阶段）。
+
+异步阶段（max_inflight > 0）的函数返回 concurrent.futures.Future，
+工作线程提交后立即处理下一个任务，Future 完成后由收集线程转交下游；
+同时挂起的 Future 不超过 max_inflight，超出时工作线程阻塞形成背压。
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 队列结束标记
+_SENTINEL = object()
+
+
+@dataclass
+class Stage:
+    """流水线阶段定义"""
+    name: str
+    func: Callable[[Any], Any]
+    workers: int = 1
+    queue_size: int = 0  # 0 表示无界
+    max_inflight: int = 0  # >0 表示异步阶段：函数返回 Future，最多同时挂起的数量
+
+    # 运行统计（由执行器填充）
+    processed: int = field(default=0, init=False)
+    failed: int = field(default=0, init=False)
+    busy_seconds: float = field(default=0.0, init=False)
+
+
+class _Pending:
+    """异步阶段的挂起状态：已完成 Future 队列 + 挂起数量信号量"""
+
+    def __init__(self, max_inflight: int):
+        self.max_inflight = max_inflight
+        self.slots = threading.Semaphore(max_inflight)
+        self.done: queue.Queue = queue.Queue()
+        self.collector: Optional[threading.Thread] = None
+
+    def drain(self) -> None:
+        """等待全部挂起的 Future 被收集线程取走并处理完毕"""
+        for _ in range(self.max_inflight):
+            self.slots.acquire()
+        self.done.put(_SENTINEL)
+        if self.collector is not None:
+            self.collector.join()
+
+
+class StagedExecutor:
+    """
+    分阶段流水线执行器
+
+    每个阶段是一组消费上游队列、写入下游队列的线程。
+    总耗时趋近于最慢阶段的吞吐，而不是各阶段耗时之和。
+    """
+
+    def __init__(self, stages: List[Stage]):
+        if not stages:
+            raise ValueError("至少需要一个阶段")
+        self.stages = stages
+        self._lock = threading.Lock()
+
+    def run(
+        self,
+        items: Iterable[Any],
+        on_output: Optional[Callable[[Any], None]] = None,
+        stop: Optional[threading.Event] = None,
+    ) -> List[Any]:
+        """
+        执行流水线，阻塞直到所有任务处理完成
+
+        Args:
+            items: 输入任务
+            on_output: 最后一个阶段每产出一个结果时的回调（在工作线程中调用）
+            stop: 置位后不再投入新任务，各阶段丢弃尚未开始的任务，正在执行的任务完成后返回
+
+        Returns:
+            最后一个阶段的输出列表（按完成顺序）
+        """
+        queues = [queue.Queue(maxsize=max(0, stage.queue_size)) for stage in self.stages]
+        outputs: List[Any] = []
+        threads: List[List[threading.Thread]] = []
+        # 异步阶段：完成的 Future 队列、挂起数量限制、收集线程
+        pending: Dict[int, _Pending] = {}
+
+        for index, stage in enumerate(self.stages):
+            stage.processed = stage.failed = 0
+            stage.busy_seconds = 0.0
+            if stage.max_inflight > 0:
+                pending[index] = _Pending(stage.max_inflight)
+                pending[index].collector = threading.Thread(
+                    target=self._collector,
+                    args=(index, pending[index], queues, outputs, on_output, stop),
+                    name=f"stage-{stage.name}-collect",
+                    daemon=True,
+                )
+                pending[index].collector.start()
+            stage_threads = []
+            for n in range(max(1, stage.workers)):
+                t = threading.Thread(
+                    target=self._worker,
+                    args=(index, queues, outputs, on_output, pending.get(index), stop),
+                    name=f"stage-{stage.name}-{n}",
+                    daemon=True,
+                )
+                t.start()
+                stage_threads.append(t)
+            threads.append(stage_threads)
+
+        # 生产者：有界队列满时阻塞，形成背压
+        for item in items:
+            if stop is not None and stop.is_set():
+                break
+            queues[0].put(item)
+
+        # 逐级关闭：上一阶段全部线程（及挂起的 Future）结束后，再通知下一阶段结束
+        for index, stage_threads in enumerate(threads):
+            for _ in stage_threads:
+                queues[index].put(_SENTINEL)
+            for t in stage_threads:
+                t.join()
+            if index in pending:
+                pending[index].drain()
+
+        return outputs
+
+    def run_iter(self, items: Iterable[Any]) -> Iterator[Any]:
+        """
+        执行流水线，按完成顺序逐个产出最后一个阶段的结果
+
+        流水线在后台线程中运行；调用方提前停止迭代（break 或关闭生成器）时，
+        不再投入新任务，尚未开始的任务被丢弃，正在执行的任务完成后后台线程退出。
+        """
+        outbox: queue.Queue = queue.Queue()
+        stop = threading.Event()
+
+        def drive() -> None:
+            try:
+                self.run(items, on_output=outbox.put, stop=stop)
+            finally:
+                outbox.put(_SENTINEL)
+
+        threading.Thread(target=drive, name="stage-driver", daemon=True).start()
+        try:
+            while True:
+                output = outbox.get()
+                if output is _SENTINEL:
+                    return
+                yield output
+        finally:
+            stop.set()
+
+    def _worker(
+        self,
+        index: int,
+        queues: List[queue.Queue],
+        outputs: List[Any],
+        on_output: Optional[Callable[[Any], None]],
+        pending: Optional['_Pending'] = None,
+        stop: Optional[threading.Event] = None,
+    ) -> None:
+        stage = self.stages[index]
+        inbox = queues[index]
+
+        while True:
+            item = inbox.get()
+            if item is _SENTINEL:
+                return
+            if stop is not None and stop.is_set():
+                # 已停止：丢弃尚未开始的任务，让上游尽快排空
+                continue
+
+            if pending is not None:
+                pending.slots.acquire()
+            start = time.time()
+            try:
+                result = stage.func(item)
+                ok = True
+            except Exception as e:
+                logger.exception(f"[流水线] 阶段 {stage.name} 处理失败: {e}")
+                result, ok = None, False
+
+            if pending is not None:
+                if isinstance(result, Future):
+                    result.add_done_callback(lambda future, start=start: pending.done.put((future, start)))
+                    continue
+                pending.slots.release()
+
+            self._finish(index, result, ok, time.time() - start, queues, outputs, on_output)
+
+    def _collector(
+        self,
+        index: int,
+        pending: '_Pending',
+        queues: List[queue.Queue],
+        outputs: List[Any],
+        on_output: Optional[Callable[[Any], None]],
+        stop: Optional[threading.Event] = None,
+    ) -> None:
+        """异步阶段：按完成顺序取出 Future 的结果并转交下游（已停止时丢弃）"""
+        stage = self.stages[index]
+        while True:
+            entry = pending.done.get()
+            if entry is _SENTINEL:
+                return
+            future, start = entry
+            pending.slots.release()
+            if stop is not None and stop.is_set():
+                continue
+            try:
+                result, ok = future.result(), True
+            except Exception as e:
+                logger.error(f"[流水线] 阶段 {stage.name} 异步任务失败: {e}")
+                result, ok = None, False
+            self._finish(index, result, ok, time.time() - start, queues, outputs, on_output)
+
+    def _finish(
+        self,
+        index: int,
+        result: Any,
+        ok: bool,
+        elapsed: float,
+        queues: List[queue.Queue],
+        outputs: List[Any],
+        on_output: Optional[Callable[[Any], None]],
+    ) -> None:
+        """记录阶段统计，并把结果交给下一阶段（或作为最终输出）"""
+        stage = self.stages[index]
+        is_last = index == len(self.stages) - 1
+
+        with self._lock:
+            stage.busy_seconds += elapsed
+            if ok:
+                stage.processed += 1
+            else:
+                stage.failed += 1
+
+        if result is None:
+            return
+        if is_last:
+            with self._lock:
+                outputs.append(result)
+            if on_output is not None:
+                try:
+                    on_output(result)
+                except Exception as e:
+                    logger.warning(f"[流水线] 结果回调失败: {e}")
+        else:
+            queues[index + 1].put(result)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """各阶段统计：处理数、失败数、累计耗时"""
+        return {
+            stage.name: {
+                "workers": stage.workers,
+                "processed": stage.processed,
+                "failed": stage.failed,
+                "busy_seconds": round(stage.busy_seconds, 3),
+            }
+            for stage in self.stages
+        }
@@ -8,6 +8,7 @@
 """
 
 from enum import Enum
+from typing import Optional
 
 
 class ReportType(str, Enum):
@@ -43,3 +44,57 @@ class ReportType(str, Enum):
             ReportType.SIMPLE: "精简报告",
             ReportType.FULL: "完整报告",
         }.get(self, "精简报告")
+
+
+class JobPriority(str, Enum):
+    """
+    分析任务优先级枚举
+
+    交互式（Web/Bot 单股分析） > 定时任务 > 批量任务，
+    由 src.core.job_scheduler.JobScheduler 按此顺序分配执行槽位。
+    """
+    INTERACTIVE = "interactive"  # 用户实时等待的单股分析
+    SCHEDULED = "scheduled"      # 每日定时分析
+    BATCH = "batch"              # 手动触发的批量/全量分析
+
+    @property
+    def rank(self) -> int:
+        """数值越小优先级越高"""
+        return {
+            JobPriority.INTERACTIVE: 0,
+            JobPriority.SCHEDULED: 1,
+            JobPriority.BATCH: 2,
+        }[self]
+
+
+class IntelDimension(str, Enum):
+    """
+    情报搜索维度枚举
+
+    search_comprehensive_intel() 的结果键；format_intel_report() 按 display_name 输出段落标题，
+    提示词构建器据此拆分情报报告并按维度排定保留优先级。
+    """
+    LATEST_NEWS = "latest_news"          # 最新消息
+    MARKET_ANALYSIS = "market_analysis"  # 机构分析
+    RISK_CHECK = "risk_check"            # 风险排查
+    EARNINGS = "earnings"                # 业绩预期
+    INDUSTRY = "industry"                # 行业分析
+
+    @property
+    def display_name(self) -> str:
+        """情报报告中的段落标题"""
+        return {
+            IntelDimension.LATEST_NEWS: "📰 最新消息",
+            IntelDimension.MARKET_ANALYSIS: "📈 机构分析",
+            IntelDimension.RISK_CHECK: "⚠️ 风险排查",
+            IntelDimension.EARNINGS: "📊 业绩预期",
+            IntelDimension.INDUSTRY: "🏭 行业分析",
+        }[self]
+
+    @classmethod
+    def from_display_name(cls, label: str) -> Optional["IntelDimension"]:
+        """由段落标题反查维度，未知标题返回 None"""
+        for dimension in cls:
+            if dimension.display_name == label:
+                return dimension
+        return None
@@ -0,0 +1,455 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 盘中增量信号
+===================================
+
+职责：
+1. 按股票维护增量指标状态（MA、EMA/MACD、Wilder RSI、VWAP），
+   每次行情更新只做 O(1) 的数组运算，不重算整段历史
+2. 支持轮询的全市场实时快照（累计成交量/额）与分钟 K 线两种输入
+3. 趋势/MACD/RSI/VWAP 状态变化时产出 StockTrendAnalyzer 同款状态的信号事件
+4. 交易时段内定时轮询快照并推送信号（python main.py --intraday）
+
+说明：
+- 快照轮询时按 bar_minutes 切分 K 线：同一根 K 线内的更新只刷新「未收盘」值，
+  进入下一根 K 线时以上一根的最后价格收盘并写入状态
+- 指标周期与阈值沿用 StockTrendAnalyzer（MA5/10/20、MACD 12/26/9、RSI_MID）
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from datetime import time as dt_time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.stock_analyzer import MACDStatus, RSIStatus, StockTrendAnalyzer, TrendStatus
+
+logger = logging.getLogger(__name__)
+
+# A 股连续竞价时段
+TRADING_SESSIONS = ((dt_time(9, 30), dt_time(11, 30)), (dt_time(13, 0), dt_time(15, 0)))
+
+# 每手股数（全市场快照的成交量以「手」计，见 data_provider.base.SNAPSHOT_COLUMNS）
+SHARES_PER_LOT = 100
+
+# VWAP 状态
+VWAP_ABOVE = "站上VWAP"
+VWAP_BELOW = "跌破VWAP"
+
+_TRENDS = list(TrendStatus)
+_RSI_ZONES = (RSIStatus.OVERSOLD, RSIStatus.NEUTRAL, RSIStatus.OVERBOUGHT)
+
+
+def is_trading_time(now: Optional[datetime] = None) -> bool:
+    """是否处于 A 股连续竞价时段（不含节假日判断）"""
+    now = now or datetime.now()
+    if now.weekday() >= 5:
+        return False
+    return any(start <= now.time() <= end for start, end in TRADING_SESSIONS)
+
+
+@dataclass
+class SignalEvent:
+    """盘中信号事件"""
+    code: str
+    kind: str                   # trend / macd / rsi / vwap
+    status: str                 # 新状态（中文）
+    previous: str               # 变化前状态
+    price: float
+    time: datetime
+
+    def to_text(self) -> str:
+        return f"{self.time:%H:%M} {self.code} {self.status}（{self.previous} → {self.status}）现价 {self.price:.2f}"
+
+
+class IntradayEngine:
+    """
+    盘中增量指标引擎
+
+    所有股票的状态保存在按代码分配槽位的 numpy 数组中，一次更新即对一批股票
+    做向量化计算，500 只股票单次更新为毫秒级。
+
+    Args:
+        bar_minutes: 快照轮询时合成 K 线的周期（分钟）
+        analyzer: 提供指标周期与阈值的趋势分析器
+    """
+
+    MA_WINDOWS = (5, 10, 20)
+
+    def __init__(self, bar_minutes: int = 1, analyzer: Optional[StockTrendAnalyzer] = None, capacity: int = 256):
+        analyzer = analyzer or StockTrendAnalyzer()
+        self.bar_seconds = max(1, int(bar_minutes)) * 60
+        self.fast_alpha = 2 / (analyzer.MACD_FAST + 1)
+        self.slow_alpha = 2 / (analyzer.MACD_SLOW + 1)
+        self.signal_alpha = 2 / (analyzer.MACD_SIGNAL + 1)
+        self.macd_bars = analyzer.MACD_SLOW
+        self.rsi_period = analyzer.RSI_MID
+        self.rsi_overbought = analyzer.RSI_OVERBOUGHT
+        self.rsi_oversold = analyzer.RSI_OVERSOLD
+        self.window = max(self.MA_WINDOWS)
+
+        self._lock = threading.Lock()
+        self._index: Dict[str, int] = {}
+        self._codes: List[str] = []
+        self._allocate(capacity)
+
+    # === 状态存储 ===
+
+    _FLOAT_FIELDS = ('last_close', 'ema_fast', 'ema_slow', 'dea', 'avg_gain', 'avg_loss',
+                     'live', 'cum_volume', 'cum_amount')
+    _INT_FIELDS = ('pos', 'count', 'bucket', 'day')
+    _STATE_FIELDS = ('trend_state', 'macd_side', 'macd_zero', 'rsi_zone', 'vwap_side')
+
+    def _allocate(self, capacity: int) -> None:
+        self._capacity = capacity
+        self._ring = np.full((capacity, self.window), np.nan)
+        for name in self._FLOAT_FIELDS:
+            setattr(self, f'_{name}', np.full(capacity, np.nan))
+        for name in self._INT_FIELDS:
+            setattr(self, f'_{name}', np.full(capacity, -1 if name in ('bucket', 'day') else 0, dtype=np.int64))
+        for name in self._STATE_FIELDS:
+            setattr(self, f'_{name}', np.full(capacity, -1, dtype=np.int8))
+
+    def _grow(self, capacity: int) -> None:
+        """扩容并保留已有状态"""
+        old = {name: getattr(self, f'_{name}')
+               for name in ('ring', *self._FLOAT_FIELDS, *self._INT_FIELDS, *self._STATE_FIELDS)}
+        self._allocate(capacity)
+        for name, values in old.items():
+            getattr(self, f'_{name}')[:len(values)] = values
+
+    def _slots(self, codes: Iterable[str]) -> np.ndarray:
+        """股票代码 -> 槽位，新代码自动分配"""
+        slots = []
+        for code in codes:
+            slot = self._index.get(code)
+            if slot is None:
+                slot = len(self._codes)
+                self._index[code] = slot
+                self._codes.append(code)
+            slots.append(slot)
+        if len(self._codes) > self._capacity:
+            self._grow(max(len(self._codes), self._capacity * 2))
+        return np.asarray(slots, dtype=np.int64)
+
+    @property
+    def codes(self) -> List[str]:
+        return list(self._codes)
+
+    # === 输入 ===
+
+    def update(
+        self,
+        codes: Iterable[str],
+        prices: Iterable[float],
+        timestamp: Optional[datetime] = None,
+        volumes: Optional[Iterable[float]] = None,
+        amounts: Optional[Iterable[float]] = None,
+        cumulative: bool = True,
+    ) -> List[SignalEvent]:
+        """
+        批量更新一批股票的最新价
+
+        Args:
+            codes: 股票代码
+            prices: 最新价
+            timestamp: 行情时间（默认当前时间）
+            volumes: 成交量（股）；cumulative=True 为当日累计（快照），否则为本次增量（分钟 K 线）
+            amounts: 成交额（元），口径同 volumes；缺省时增量模式按 价格 × 成交量 估算
+            cumulative: volumes/amounts 是否为当日累计值
+
+        Returns:
+            本次更新触发的信号事件
+        """
+        timestamp = timestamp or datetime.now()
+        codes = np.asarray(list(codes), dtype=object)
+        prices = np.asarray(list(prices), dtype=float)
+        keep = np.isfinite(prices) & (prices > 0)
+        if not keep.any():
+            return []
+        volumes = None if volumes is None else np.asarray(list(volumes), dtype=float)[keep]
+        amounts = None if amounts is None else np.asarray(list(amounts), dtype=float)[keep]
+        codes, prices = codes[keep], prices[keep]
+
+        with self._lock:
+            slots = self._slots(codes)
+            bucket = int(timestamp.timestamp() // self.bar_seconds)
+
+            # 新交易日：VWAP 重新累计
+            day = timestamp.toordinal()
+            new_day = slots[self._day[slots] != day]
+            self._cum_volume[new_day] = 0.0
+            self._cum_amount[new_day] = 0.0
+            self._day[new_day] = day
+
+            # 进入新 K 线：上一根以最后价格收盘
+            live = self._live[slots]
+            rolled = (self._bucket[slots] != bucket) & ~np.isnan(live)
+            self._commit(slots[rolled], live[rolled])
+            self._bucket[slots] = bucket
+            self._live[slots] = prices
+
+            if volumes is not None:
+                if amounts is None:
+                    amounts = np.full(len(prices), np.nan) if cumulative else prices * volumes
+                if cumulative:
+                    self._cum_volume[slots] = volumes
+                    self._cum_amount[slots] = amounts
+                else:
+                    self._cum_volume[slots] += np.nan_to_num(volumes)
+                    self._cum_amount[slots] += np.nan_to_num(amounts)
+
+            return self._evaluate(slots, timestamp)
+
+    def update_snapshot(self, snapshot: pd.DataFrame, timestamp: Optional[datetime] = None) -> List[SignalEvent]:
+        """
+        用全市场实时快照更新（DataFetcherManager.get_realtime_snapshot() 的结果）
+
+        快照中的成交量/额为当日累计值，成交量单位为「手」，在此换算为股。
+        """
+        if snapshot is None or snapshot.empty:
+            return []
+        return self.update(
+            snapshot['code'], snapshot['price'], timestamp,
+            volumes=snapshot['volume'] * SHARES_PER_LOT if 'volume' in snapshot else None,
+            amounts=snapshot['amount'] if 'amount' in snapshot else None,
+            cumulative=True,
+        )
+
+    def update_bars(self, bars: pd.DataFrame, time_column: str = 'time') -> List[SignalEvent]:
+        """
+        用分钟 K 线更新（按时间顺序逐根写入）
+
+        每根 K 线的收盘价作为当前 K 线的最新价，下一根到来时写入状态；
+        K 线周期小于 bar_minutes 时自然合成为更大周期。
+
+        Args:
+            bars: 列为 code, time_column, close，可选 volume（股）/ amount（元）（单根 K 线的量额），
+                  成交量以「手」计的数据源需由调用方先换算为股
+        """
+        events: List[SignalEvent] = []
+        if bars is None or bars.empty:
+            return events
+        for ts, group in bars.sort_values(time_column, kind='stable').groupby(time_column, sort=True):
+            events += self.update(
+                group['code'], group['close'], pd.Timestamp(ts).to_pydatetime(),
+                volumes=group['volume'] if 'volume' in group else None,
+                amounts=group['amount'] if 'amount' in group else None,
+                cumulative=False,
+            )
+        return events
+
+    # === 指标 ===
+
+    def _commit(self, slots: np.ndarray, closes: np.ndarray) -> None:
+        """K 线收盘：把收盘价写入滚动窗口与 EMA/RSI 递推状态"""
+        if len(slots) == 0:
+            return
+        first = self._count[slots] == 0
+        delta = closes - self._last_close[slots]
+        a = 1 / self.rsi_period
+        self._avg_gain[slots] = np.where(first, 0.0, (1 - a) * self._avg_gain[slots] + a * np.fmax(delta, 0))
+        self._avg_loss[slots] = np.where(first, 0.0, (1 - a) * self._avg_loss[slots] + a * np.fmax(-delta, 0))
+
+        ema_fast = np.where(first, closes, self.fast_alpha * closes + (1 - self.fast_alpha) * self._ema_fast[slots])
+        ema_slow = np.where(first, closes, self.slow_alpha * closes + (1 - self.slow_alpha) * self._ema_slow[slots])
+        dif = ema_fast - ema_slow
+        self._dea[slots] = np.where(first, dif, self.signal_alpha * dif + (1 - self.signal_alpha) * self._dea[slots])
+        self._ema_fast[slots] = ema_fast
+        self._ema_slow[slots] = ema_slow
+
+        self._ring[slots, self._pos[slots]] = closes
+        self._pos[slots] = (self._pos[slots] + 1) % self.window
+        self._count[slots] += 1
+        self._last_close[slots] = closes
+
+    def _indicators(self, slots: np.ndarray) -> Dict[str, np.ndarray]:
+        """含未收盘 K 线的当前指标值（不修改状态）"""
+        price = self._live[slots]
+        count = self._count[slots]
+        first = count == 0
+        bars = count + 1
+
+        # 滚动窗口按时间顺序展开（最旧 -> 最新）
+        order = (self._pos[slots][:, None] + np.arange(self.window)) % self.window
+        history = np.take_along_axis(self._ring[slots], order, axis=1)
+        values: Dict[str, np.ndarray] = {'price': price, 'bars': bars}
+        for w in self.MA_WINDOWS:
+            ma = (history[:, self.window - (w - 1):].sum(axis=1) + price) / w
+            values[f'ma{w}'] = np.where(bars >= w, ma, np.nan)
+
+        ema_fast = np.where(first, price, self.fast_alpha * price + (1 - self.fast_alpha) * self._ema_fast[slots])
+        ema_slow = np.where(first, price, self.slow_alpha * price + (1 - self.slow_alpha) * self._ema_slow[slots])
+        dif = ema_fast - ema_slow
+        dea = np.where(first, dif, self.signal_alpha * dif + (1 - self.signal_alpha) * self._dea[slots])
+        values.update(macd_dif=dif, macd_dea=dea, macd_bar=(dif - dea) * 2)
+
+        a = 1 / self.rsi_period
+        delta = price - self._last_close[slots]
+        avg_gain = np.where(first, 0.0, (1 - a) * self._avg_gain[slots] + a * np.fmax(delta, 0))
+        avg_loss = np.where(first, 0.0, (1 - a) * self._avg_loss[slots] + a * np.fmax(-delta, 0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = np.where(avg_loss > 0, 100 - 100 / (1 + avg_gain / avg_loss), np.where(avg_gain > 0, 100.0, 50.0))
+            vwap = self._cum_amount[slots] / self._cum_volume[slots]
+        values['rsi'] = rsi
+        values['vwap'] = vwap
+        return values
+
+    def indicators(self, codes: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """当前指标快照（以 code 为索引）"""
+        with self._lock:
+            codes = list(codes) if codes is not None else list(self._codes)
+            codes = [code for code in codes if code in self._index]
+            slots = np.asarray([self._index[code] for code in codes], dtype=np.int64)
+            values = self._indicators(slots)
+        return pd.DataFrame(values, index=pd.Index(codes, name='code'))
+
+    # === 信号 ===
+
+    def _evaluate(self, slots: np.ndarray, timestamp: datetime) -> List[SignalEvent]:
+        """计算状态并与上次比较，状态变化时产出事件"""
+        v = self._indicators(slots)
+        bars, price = v['bars'], v['price']
+        m5, m10, m20 = v['ma5'], v['ma10'], v['ma20']
+        dif, dea = v['macd_dif'], v['macd_dea']
+
+        bull = (m5 > m10) & (m10 > m20)
+        bear = (m5 < m10) & (m10 < m20)
+        trend = np.select(
+            [bull, (m5 > m10) & (m10 <= m20), bear, (m5 < m10) & (m10 >= m20)],
+            [_TRENDS.index(s) for s in (TrendStatus.BULL, TrendStatus.WEAK_BULL, TrendStatus.BEAR, TrendStatus.WEAK_BEAR)],
+            default=_TRENDS.index(TrendStatus.CONSOLIDATION),
+        )
+        macd_ready = bars >= self.macd_bars
+        rsi_zone = np.select([v['rsi'] > self.rsi_overbought, v['rsi'] < self.rsi_oversold], [2, 0], default=1)
+        vwap_ready = np.isfinite(v['vwap'])
+
+        states = {
+            'trend_state': np.where(bars >= self.window, trend, -1),
+            'macd_side': np.where(macd_ready, dif > dea, -1),
+            'macd_zero': np.where(macd_ready, dif > 0, -1),
+            'rsi_zone': np.where(bars > self.rsi_period, rsi_zone, -1),
+            'vwap_side': np.where(vwap_ready, price >= v['vwap'], -1),
+        }
+
+        events: List[SignalEvent] = []
+        for name, current in states.items():
+            store = getattr(self, f'_{name}')
+            previous = store[slots]
+            changed = np.flatnonzero((previous >= 0) & (current >= 0) & (current != previous))
+            for i in changed:
+                kind, status, before = self._describe(name, int(previous[i]), int(current[i]), dif[i])
+                events.append(SignalEvent(
+                    code=self._codes[slots[i]], kind=kind, status=status, previous=before,
+                    price=float(price[i]), time=timestamp,
+                ))
+            ready = current >= 0
+            store[slots[ready]] = current[ready]
+        return events
+
+    @staticmethod
+    def _describe(name: str, previous: int, current: int, dif: float):
+        """状态序号 -> (事件类型, 新状态, 旧状态) 中文描述"""
+        if name == 'trend_state':
+            return 'trend', _TRENDS[current].value, _TRENDS[previous].value
+        if name == 'macd_side':
+            if current:
+                status = MACDStatus.GOLDEN_CROSS_ZERO if dif > 0 else MACDStatus.GOLDEN_CROSS
+                return 'macd', status.value, MACDStatus.DEATH_CROSS.value
+            return 'macd', MACDStatus.DEATH_CROSS.value, MACDStatus.GOLDEN_CROSS.value
+        if name == 'macd_zero':
+            up, down = MACDStatus.CROSSING_UP.value, MACDStatus.CROSSING_DOWN.value
+            return ('macd', up, down) if current else ('macd', down, up)
+        if name == 'rsi_zone':
+            return 'rsi', _RSI_ZONES[current].value, _RSI_ZONES[previous].value
+        return ('vwap', VWAP_ABOVE, VWAP_BELOW) if current else ('vwap', VWAP_BELOW, VWAP_ABOVE)
+
+
+class IntradayMonitor:
+    """
+    盘中信号监控：交易时段内定时轮询全市场快照，更新指标并推送信号
+
+    Args:
+        codes: 监控的股票代码（默认自选股 STOCK_LIST）
+        poll_seconds: 轮询间隔（默认 INTRADAY_POLL_SECONDS）
+        bar_minutes: K 线周期（默认 INTRADAY_BAR_MINUTES）
+    """
+
+    def __init__(
+        self,
+        codes: Optional[List[str]] = None,
+        poll_seconds: Optional[int] = None,
+        bar_minutes: Optional[int] = None,
+        fetcher_manager=None,
+        notifier=None,
+        kinds: Optional[Iterable[str]] = None,
+    ):
+        from src.config import get_config
+
+        config = get_config()
+        self.codes = list(codes or config.stock_list)
+        self.poll_seconds = poll_seconds or config.intraday_poll_seconds
+        self.kinds = set(kinds or config.intraday_signal_kinds)
+        self.engine = IntradayEngine(bar_minutes=bar_minutes or config.intraday_bar_minutes)
+        self._fetcher_manager = fetcher_manager
+        self._notifier = notifier
+
+    @property
+    def fetcher_manager(self):
+        if self._fetcher_manager is None:
+            from src.core.components import get_components
+            self._fetcher_manager = get_components().fetcher_manager
+        return self._fetcher_manager
+
+    @property
+    def notifier(self):
+        if self._notifier is None:
+            from src.notification import NotificationService
+            self._notifier = NotificationService()
+        return self._notifier
+
+    def poll_once(self, now: Optional[datetime] = None) -> List[SignalEvent]:
+        """拉取一次快照并更新，返回（按类型过滤后的）信号事件"""
+        snapshot = self.fetcher_manager.get_realtime_snapshot(max_age=self.poll_seconds / 2)
+        if snapshot is None or snapshot.empty:
+            return []
+        if self.codes:
+            snapshot = snapshot[snapshot['code'].isin(self.codes)]
+        started = time.perf_counter()
+        events = self.engine.update_snapshot(snapshot, now)
+        logger.debug(f"[盘中] 更新 {len(snapshot)} 只，耗时 {(time.perf_counter() - started) * 1000:.1f}ms")
+        return [event for event in events if event.kind in self.kinds]
+
+    def run(self, stop_event: Optional[threading.Event] = None, send_notification: bool = True) -> None:
+        """交易时段内循环轮询，收盘或 stop_event 置位后退出"""
+        stop_event = stop_event or threading.Event()
+        logger.info(f"[盘中] 开始监控 {len(self.codes) or '全市场'} 只股票，轮询间隔 {self.poll_seconds}s")
+        while not stop_event.is_set():
+            now = datetime.now()
+            if now.weekday() >= 5 or now.time() > TRADING_SESSIONS[-1][1]:
+                logger.info("[盘中] 已收盘，停止监控")
+                break
+            if is_trading_time(now):
+                try:
+                    events = self.poll_once(now)
+                except Exception as e:
+                    logger.warning(f"[盘中] 轮询失败: {e}")
+                    events = []
+                if events:
+                    logger.info(f"[盘中] {len(events)} 条信号")
+                    if send_notification:
+                        self.notifier.send(self.format_events(events))
+            stop_event.wait(self.poll_seconds)
+
+    @staticmethod
+    def format_events(events: List[SignalEvent]) -> str:
+        """信号事件渲染为 Markdown 推送内容"""
+        lines = [f"## ⏱ 盘中信号 ({events[0].time:%H:%M})", ""]
+        lines += [f"- {event.to_text()}" for event in events]
+        return "\n".join(lines)
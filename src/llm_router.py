@@ -0,0 +1,426 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - LLM 多模型路由
+===================================
+
+职责：
+1. 维护各 provider/model 的实时健康与延迟统计（EWMA、P95、近期错误率）
+2. 按报告类型选择模型档位（精简报告优先 fast 档，完整报告优先 strong 档），
+   同档位内选择预期最快的健康路由
+3. 熔断：429 限流立即熔断一段时间（连续限流时加倍），其他错误连续多次后熔断；
+   冷却结束后进入半开状态，只放行一个试探请求，成功即闭合、失败则重新熔断
+4. 对冲（可选）：首选路由超过其 P95 延迟仍未返回时，向次选路由并发发出同一请求，
+   先成功者胜出
+
+与原有的“同一模型指数退避 -> 重试过半才切备选模型 -> 最后才用 OpenAI”相比，
+失败的路由在下一次尝试时即被跳过，单个被限流的提供方不会拖住整只股票。
+
+用法：
+    router = get_llm_router()
+    text = router.call(lambda route: request(route), tier="fast")
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, List, Optional
+
+from src.config import get_config
+
+logger = logging.getLogger(__name__)
+
+TIER_FAST = "fast"
+TIER_STRONG = "strong"
+
+# 尚无成功样本的路由的预估延迟（秒），保证新路由有机会被探测
+UNKNOWN_LATENCY = 8.0
+# 对冲等待时间的上下限（秒）：样本不足时使用上限
+MIN_HEDGE_DELAY = 1.0
+MAX_HEDGE_DELAY = 30.0
+MIN_HEDGE_SAMPLES = 5
+
+
+@dataclass(frozen=True)
+class LLMRoute:
+    """一条候选路由：提供方 + 模型 + 档位"""
+    provider: str
+    model: str
+    tier: str = TIER_STRONG
+
+    @property
+    def key(self) -> str:
+        return f"{self.provider}:{self.model}"
+
+
+class CircuitOpenError(RuntimeError):
+    """路由处于半开状态且试探请求在途，本次请求未发出"""
+
+
+class _RouteStats:
+    """单条路由的延迟与熔断状态（由路由器加锁访问）"""
+
+    def __init__(self):
+        self.ewma: Optional[float] = None
+        self.latencies: Deque[float] = deque(maxlen=100)
+        self.outcomes: Deque[bool] = deque(maxlen=20)
+        self.requests = 0
+        self.failures = 0
+        self.rate_limited = 0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.trips = 0
+        # 半开状态：熔断后已放行的试探请求尚未返回
+        self.probing = False
+
+    def is_open(self, now: float) -> bool:
+        """熔断中：冷却未结束，或已有试探请求在途（半开状态只放行一个）"""
+        return now < self.open_until or self.probing
+
+    def tripped(self) -> bool:
+        """是否处于熔断/半开状态（尚未被成功请求闭合）"""
+        return self.open_until > 0.0
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1.0 - sum(self.outcomes) / len(self.outcomes)
+
+    def expected_latency(self) -> float:
+        """预期延迟：EWMA 按近期错误率加罚"""
+        base = self.ewma if self.ewma is not None else UNKNOWN_LATENCY
+        return base * (1.0 + 2.0 * self.error_rate())
+
+
+class LLMRouter:
+    """
+    延迟感知的多模型路由器
+
+    call() 负责选择、对冲、熔断与跨路由重试；实际请求由调用方提供的
+    request(route) 完成（只发一次请求，不自行重试）。
+    """
+
+    def __init__(
+        self,
+        routes: List[LLMRoute],
+        hedge: bool = False,
+        circuit_cooldown: float = 30.0,
+        failure_threshold: int = 3,
+        max_attempts: int = 3,
+        retry_delay: float = 1.0,
+    ):
+        """
+        Args:
+            routes: 候选路由（配置顺序即同等条件下的优先顺序）
+            hedge: 是否启用对冲请求
+            circuit_cooldown: 熔断基础冷却秒数（连续限流时加倍，最长 10 倍）
+            failure_threshold: 非限流错误连续多少次后熔断
+            max_attempts: 单次 call 最多尝试的轮数（对冲的两个请求算一轮）
+            retry_delay: 同一路由被再次选中时的基础退避秒数
+        """
+        self.routes = list(routes)
+        self.hedge = hedge
+        self.circuit_cooldown = circuit_cooldown
+        self.failure_threshold = max(1, failure_threshold)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._stats: Dict[LLMRoute, _RouteStats] = {route: _RouteStats() for route in self.routes}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @classmethod
+    def from_config(cls) -> 'LLMRouter':
+        config = get_config()
+        routes = parse_routes(config.llm_routes) if config.llm_routes else default_routes(config)
+        return cls(
+            routes,
+            hedge=config.llm_hedge_enabled,
+            circuit_cooldown=config.llm_circuit_cooldown,
+            max_attempts=config.gemini_max_retries,
+            retry_delay=config.gemini_retry_delay,
+        )
+
+    # === 选择 ===
+
+    def select(
+        self,
+        tier: Optional[str] = None,
+        available: Optional[Callable[[LLMRoute], bool]] = None,
+    ) -> List[LLMRoute]:
+        """
+        按优先顺序返回可用路由
+
+        排序：未熔断 > 档位匹配 > 预期延迟 > 配置顺序。
+        全部熔断时仍返回（最早恢复的排在前面），由调用方作为试探请求。
+        """
+        now = time.monotonic()
+        candidates = [r for r in self.routes if available is None or available(r)]
+        with self._lock:
+            def order(indexed):
+                index, route = indexed
+                stats = self._stats[route]
+                is_open = stats.is_open(now)
+                return (
+                    is_open,
+                    stats.open_until if is_open else 0.0,
+                    tier is not None and route.tier != tier,
+                    stats.expected_latency(),
+                    index,
+                )
+            ranked = sorted(enumerate(candidates), key=order)
+        return [route for _, route in ranked]
+
+    def hedge_delay(self, route: LLMRoute) -> float:
+        """首选路由的对冲等待时间：其成功请求的 P95 延迟（样本不足时取上限）"""
+        with self._lock:
+            latencies = sorted(self._stats[route].latencies)
+        if len(latencies) < MIN_HEDGE_SAMPLES:
+            return MAX_HEDGE_DELAY
+        return min(MAX_HEDGE_DELAY, max(MIN_HEDGE_DELAY, _percentile(latencies, 0.95)))
+
+    # === 统计 ===
+
+    def admit(self, route: LLMRoute) -> Optional[bool]:
+        """
+        熔断过的路由只放行一个试探请求，直到记录成功或失败
+
+        Returns:
+            None 表示不放行；否则为本次请求是否为试探请求（失败时传给 record_failure）
+        """
+        with self._lock:
+            stats = self._stats.setdefault(route, _RouteStats())
+            if not stats.tripped():
+                return False
+            if stats.probing:
+                return None
+            stats.probing = True
+            return True
+
+    def release_probe(self, route: LLMRoute) -> None:
+        """试探请求未得出结果（如调用方提前关闭流），放行下一个试探请求"""
+        with self._lock:
+            self._stats.setdefault(route, _RouteStats()).probing = False
+
+    def record_success(self, route: LLMRoute, latency: float) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(route, _RouteStats())
+            stats.requests += 1
+            stats.latencies.append(latency)
+            stats.outcomes.append(True)
+            stats.ewma = latency if stats.ewma is None else 0.3 * latency + 0.7 * stats.ewma
+            stats.consecutive_failures = 0
+            stats.trips = 0
+            stats.open_until = 0.0
+            stats.probing = False
+
+    def record_failure(self, route: LLMRoute, error: Exception, probe: bool = False) -> None:
+        rate_limited = _is_rate_limit_error(error)
+        with self._lock:
+            stats = self._stats.setdefault(route, _RouteStats())
+            stats.requests += 1
+            stats.failures += 1
+            stats.outcomes.append(False)
+            stats.consecutive_failures += 1
+            if probe:
+                stats.probing = False
+            if rate_limited:
+                stats.rate_limited += 1
+            if rate_limited or probe or stats.consecutive_failures >= self.failure_threshold:
+                stats.trips += 1
+                cooldown = self.circuit_cooldown * min(10, 2 ** (stats.trips - 1))
+                stats.open_until = time.monotonic() + cooldown
+                logger.warning(
+                    f"[LLM路由] {route.key} 熔断 {cooldown:.0f} 秒"
+                    f"（{'限流' if rate_limited else f'连续失败 {stats.consecutive_failures} 次'}）"
+                )
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """各路由的健康与延迟统计"""
+        now = time.monotonic()
+        result: Dict[str, Dict[str, float]] = {}
+        with self._lock:
+            for route, stats in self._stats.items():
+                latencies = sorted(stats.latencies)
+                result[route.key] = {
+                    'tier': route.tier,
+                    'requests': stats.requests,
+                    'failures': stats.failures,
+                    'rate_limited': stats.rate_limited,
+                    'error_rate': round(stats.error_rate(), 3),
+                    'ewma': round(stats.ewma, 3) if stats.ewma is not None else None,
+                    'p95': round(_percentile(latencies, 0.95), 3),
+                    'open_seconds': round(max(0.0, stats.open_until - now), 1),
+                }
+        return result
+
+    # === 调用 ===
+
+    def call(
+        self,
+        request: Callable[[LLMRoute], str],
+        tier: Optional[str] = None,
+        available: Optional[Callable[[LLMRoute], bool]] = None,
+    ) -> str:
+        """
+        选择路由并发出请求，失败时换路由重试
+
+        Args:
+            request: 向指定路由发出一次请求，返回响应文本
+            tier: 期望档位（fast / strong），None 表示不区分
+            available: 路由是否可用（如对应客户端是否已初始化）
+
+        Returns:
+            响应文本；所有尝试失败时抛出最后一个异常
+        """
+        last_error: Optional[Exception] = None
+        last_primary: Optional[LLMRoute] = None
+        repeats = 0
+        for attempt in range(self.max_attempts):
+            routes = self.select(tier, available)
+            if not routes:
+                raise RuntimeError("没有可用的 LLM 路由")
+            primary = routes[0]
+            if primary == last_primary:
+                # 没有其他健康路由可换，按退避等待后重试同一路由
+                repeats += 1
+                delay = min(MAX_HEDGE_DELAY, self.retry_delay * (2 ** (repeats - 1)))
+                logger.info(f"[LLM路由] 第 {attempt + 1} 次尝试仍使用 {primary.key}，等待 {delay:.1f} 秒")
+                time.sleep(delay)
+            last_primary = primary
+            backup = routes[1] if self.hedge and len(routes) > 1 else None
+            try:
+                return self._race(request, primary, backup)
+            except Exception as e:
+                last_error = e
+                logger.warning(
+                    f"[LLM路由] 第 {attempt + 1}/{self.max_attempts} 次尝试失败 ({primary.key}): {str(e)[:100]}"
+                )
+        raise last_error or RuntimeError("LLM 路由调用失败")
+
+    def _race(self, request: Callable[[LLMRoute], str], primary: LLMRoute, backup: Optional[LLMRoute]) -> str:
+        """发出首选请求，超过 P95 未返回时对冲次选路由，返回先成功的结果"""
+        if backup is None:
+            return self._timed(request, primary)
+
+        futures: Dict[Future, LLMRoute] = {self._submit(request, primary): primary}
+        done, _ = wait(futures, timeout=self.hedge_delay(primary))
+        if not done:
+            logger.info(f"[LLM路由] {primary.key} 超过 P95 未返回，对冲请求 {backup.key}")
+            with self._lock:
+                self.hedged += 1
+            futures[self._submit(request, backup)] = backup
+
+        errors: List[Exception] = []
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    text = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                if futures[future] is not primary:
+                    with self._lock:
+                        self.hedge_wins += 1
+                # 落后的请求继续在后台完成，只用于更新统计
+                return text
+        raise errors[0]
+
+    def _submit(self, request: Callable[[LLMRoute], str], route: LLMRoute) -> Future:
+        # 复制上下文，让请求线程中的 span 归属到当前 stage.llm
+        context = contextvars.copy_context()
+        return self._get_executor().submit(context.run, self._timed, request, route)
+
+    def _timed(self, request: Callable[[LLMRoute], str], route: LLMRoute) -> str:
+        probe = self.admit(route)
+        if probe is None:
+            raise CircuitOpenError(f"{route.key} 熔断中，试探请求尚未返回")
+        start = time.monotonic()
+        try:
+            text = request(route)
+        except Exception as e:
+            self.record_failure(route, e, probe=probe)
+            raise
+        self.record_success(route, time.monotonic() - start)
+        return text
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm_hedge")
+        return self._executor
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _is_rate_limit_error(error: Exception) -> bool:
+    text = str(error).lower()
+    return '429' in text or 'quota' in text or 'rate limit' in text or 'resource has been exhausted' in text
+
+
+def parse_routes(text: str) -> List[LLMRoute]:
+    """
+    解析路由配置
+
+    格式：provider:model[:tier]，多个以逗号分隔，tier 为 fast / strong（默认 strong），例如：
+        gemini:gemini-3-flash-preview:strong,gemini:gemini-2.5-flash:fast,openai:deepseek-chat:fast
+    """
+    routes: List[LLMRoute] = []
+    for part in (text or '').split(','):
+        fields = [f.strip() for f in part.strip().split(':')]
+        if len(fields) < 2 or not fields[0] or not fields[1]:
+            if part.strip():
+                logger.warning(f"[LLM路由] 忽略无效路由配置: {part}")
+            continue
+        tier = fields[2].lower() if len(fields) > 2 and fields[2] else TIER_STRONG
+        if tier not in (TIER_FAST, TIER_STRONG):
+            logger.warning(f"[LLM路由] 未知档位 {tier}，按 strong 处理: {part}")
+            tier = TIER_STRONG
+        routes.append(LLMRoute(fields[0].lower(), fields[1], tier))
+    return routes
+
+
+def default_routes(config) -> List[LLMRoute]:
+    """未配置 LLM_ROUTES 时：Gemini 主模型为 strong，备选模型与 OpenAI 兼容模型为 fast"""
+    routes = [
+        LLMRoute("gemini", config.gemini_model, TIER_STRONG),
+        LLMRoute("gemini", config.gemini_model_fallback, TIER_FAST),
+    ]
+    if config.openai_api_key:
+        routes.append(LLMRoute("openai", config.openai_model, TIER_FAST))
+    return [route for route in routes if route.model]
+
+
+# === 便捷函数 ===
+
+_router: Optional[LLMRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_llm_router() -> LLMRouter:
+    """获取进程级 LLM 路由器"""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = LLMRouter.from_config()
+    return _router
+
+
+def reset_llm_router() -> None:
+    """重置路由器（主要用于测试）"""
+    global _router
+    _router = None
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - LLM 请求调度器
+===================================
+
+职责：
+1. 进程内统一管理所有大模型请求的速率（替代固定 sleep）
+2. 按 provider/model 分别执行 RPM（每分钟请求数）与 TPM（每分钟 Token 数）令牌桶
+3. 预算充足时立即放行，不足时按到达顺序排队等待
+4. 统计排队等待时间（次数、平均、P50/P95、最大值）
+
+令牌桶采用“预约”方式：请求到达时立即扣减预算（允许透支），
+透支部分按补充速率换算为等待时间，天然保证先到先得。
+请求完成后可用实际 Token 用量修正预估值。
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Optional, Tuple
+
+from src.config import get_config
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    预约式令牌桶（线程不安全，由调度器加锁）
+
+    Args:
+        rate: 每秒补充的令牌数
+        capacity: 桶容量（允许的突发量）
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(capacity))
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """扣减 amount 个令牌，返回需要等待的秒数"""
+        self._refill(now)
+        self.tokens -= amount
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+    def adjust(self, delta: float, now: float) -> None:
+        """修正已扣减的令牌（delta > 0 表示退还）"""
+        self._refill(now)
+        self.tokens = min(self.capacity, self.tokens + delta)
+
+
+@dataclass
+class LLMTicket:
+    """一次调度放行的凭证，用于事后修正 Token 用量"""
+    key: Tuple[str, str]
+    estimated_tokens: int
+    wait_seconds: float
+
+
+class _ModelLimiter:
+    """单个 provider/model 的限流器与统计"""
+
+    def __init__(self, rpm: int, tpm: int, burst: int):
+        self.request_bucket = TokenBucket(rpm / 60.0, burst) if rpm > 0 else None
+        self.token_bucket = TokenBucket(tpm / 60.0, tpm) if tpm > 0 else None
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.recent_waits: Deque[float] = deque(maxlen=1000)
+
+
+class LLMScheduler:
+    """
+    进程级 LLM 请求调度器
+
+    用法：
+        ticket = get_llm_scheduler().acquire("gemini", model, estimated_tokens)
+        ... 调用 API ...
+        get_llm_scheduler().settle(ticket, actual_tokens)
+
+    协程中使用 await acquire_async(...)，与线程中的请求共享同一组预算。
+    """
+
+    def __init__(
+        self,
+        default_rpm: int = 0,
+        default_tpm: int = 0,
+        burst: int = 1,
+        limits: Optional[Dict[str, Tuple[int, int]]] = None,
+    ):
+        """
+        Args:
+            default_rpm: 未单独配置的模型的 RPM（0 表示不限）
+            default_tpm: 未单独配置的模型的 TPM（0 表示不限）
+            burst: 请求令牌桶容量（空闲时允许连续放行的请求数）
+            limits: 单独配置，键为 "provider" 或 "provider:model"，值为 (rpm, tpm)
+        """
+        self.default_rpm = default_rpm
+        self.default_tpm = default_tpm
+        self.burst = max(1, burst)
+        self.limits = limits or {}
+        self._limiters: Dict[Tuple[str, str], _ModelLimiter] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> 'LLMScheduler':
+        config = get_config()
+        return cls(
+            default_rpm=getattr(config, 'llm_default_rpm', 0),
+            default_tpm=getattr(config, 'llm_default_tpm', 0),
+            burst=getattr(config, 'llm_burst', 1),
+            limits=parse_rate_limits(getattr(config, 'llm_rate_limits', '')),
+        )
+
+    def _get_limiter(self, key: Tuple[str, str]) -> _ModelLimiter:
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            provider, model = key
+            # 配置中的键已统一小写（见 parse_rate_limits）
+            rpm, tpm = self.limits.get(
+                f"{provider}:{model}".lower(),
+                self.limits.get(provider, (self.default_rpm, self.default_tpm)),
+            )
+            limiter = _ModelLimiter(rpm, tpm, self.burst)
+            self._limiters[key] = limiter
+        return limiter
+
+    def acquire(self, provider: str, model: str, estimated_tokens: int = 0) -> LLMTicket:
+        """
+        申请一次请求预算，阻塞直到放行
+
+        Args:
+            provider: 提供方（gemini / openai 等）
+            model: 模型名称
+            estimated_tokens: 预估 Token 数（输入 + 输出）
+
+        Returns:
+            LLMTicket
+        """
+        ticket = self._reserve(provider, model, estimated_tokens)
+        if ticket.wait_seconds > 0:
+            time.sleep(ticket.wait_seconds)
+        return ticket
+
+    async def acquire_async(self, provider: str, model: str, estimated_tokens: int = 0) -> LLMTicket:
+        """acquire 的协程版本：排队等待期间不占用事件循环线程"""
+        ticket = self._reserve(provider, model, estimated_tokens)
+        if ticket.wait_seconds > 0:
+            await asyncio.sleep(ticket.wait_seconds)
+        return ticket
+
+    def _reserve(self, provider: str, model: str, estimated_tokens: int) -> LLMTicket:
+        """扣减预算并返回需要等待的时间（同步/异步共用，同一组令牌桶）"""
+        key = (provider.lower(), model or 'default')
+        with self._lock:
+            limiter = self._get_limiter(key)
+            now = time.monotonic()
+            wait = 0.0
+            if limiter.request_bucket is not None:
+                wait = max(wait, limiter.request_bucket.reserve(1, now))
+            if limiter.token_bucket is not None and estimated_tokens > 0:
+                wait = max(wait, limiter.token_bucket.reserve(estimated_tokens, now))
+            limiter.requests += 1
+            limiter.total_wait += wait
+            limiter.max_wait = max(limiter.max_wait, wait)
+            limiter.recent_waits.append(wait)
+
+        if wait > 0:
+            logger.info(f"[LLM调度] {key[0]}/{key[1]} 排队等待 {wait:.2f} 秒")
+        return LLMTicket(key=key, estimated_tokens=estimated_tokens, wait_seconds=wait)
+
+    def settle(self, ticket: Optional[LLMTicket], actual_tokens: Optional[int]) -> None:
+        """用实际 Token 用量修正预估值（多退少补）"""
+        if ticket is None or not actual_tokens:
+            return
+        with self._lock:
+            limiter = self._limiters.get(ticket.key)
+            if limiter is None or limiter.token_bucket is None:
+                return
+            limiter.token_bucket.adjust(ticket.estimated_tokens - actual_tokens, time.monotonic())
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """各 provider/model 的排队统计"""
+        result = {}
+        with self._lock:
+            for (provider, model), limiter in self._limiters.items():
+                waits = sorted(limiter.recent_waits)
+                result[f"{provider}:{model}"] = {
+                    'rpm': limiter.rpm,
+                    'tpm': limiter.tpm,
+                    'requests': limiter.requests,
+                    'avg_wait': round(limiter.total_wait / limiter.requests, 3) if limiter.requests else 0.0,
+                    'p50_wait': round(_percentile(waits, 0.5), 3),
+                    'p95_wait': round(_percentile(waits, 0.95), 3),
+                    'max_wait': round(limiter.max_wait, 3),
+                }
+        return result
+
+
+def _percentile(sorted_values, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def parse_rate_limits(text: str) -> Dict[str, Tuple[int, int]]:
+    """
+    解析限流配置
+
+    格式：provider[:model]=rpm[/tpm]，多个以逗号分隔，例如：
+        gemini=15/1000000,gemini:gemini-2.5-flash=10,openai=60/200000
+    """
+    limits: Dict[str, Tuple[int, int]] = {}
+    for part in (text or '').split(','):
+        part = part.strip()
+        if not part or '=' not in part:
+            continue
+        key, value = part.split('=', 1)
+        rpm_text, _, tpm_text = value.partition('/')
+        try:
+            rpm = int(rpm_text.strip() or 0)
+            tpm = int(tpm_text.strip() or 0)
+        except ValueError:
+            logger.warning(f"[LLM调度] 忽略无效限流配置: {part}")
+            continue
+        limits[key.strip().lower()] = (rpm, tpm)
+    return limits
+
+
+def estimate_tokens(*texts: Optional[str]) -> int:
+    """粗略估算 Token 数（中文约 1 字 1 Token，英文约 4 字符 1 Token，这里取折中）"""
+    return sum(len(t) for t in texts if t) // 2 + 1
+
+
+# === 便捷函数 ===
+
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """获取进程级 LLM 调度器"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = LLMScheduler.from_config()
+    return _scheduler
+
+
+def reset_llm_scheduler() -> None:
+    """重置调度器（主要用于测试）"""
+    global _scheduler
+    _scheduler = None
@@ -38,6 +38,7 @@ except ImportError:
 from src.config import get_config
 from src.analyzer import AnalysisResult
 from src.formatters import format_feishu_markdown
+from src.tracing import traced
 from bot.models import BotMessage
 
 logger = logging.getLogger(__name__)
@@ -575,12 +576,18 @@ class NotificationService:
         Returns:
             Markdown 格式的决策仪表盘日报
         """
-        if report_date is None:
-            report_date = datetime.now().strftime('%Y-%m-%d')
-
-        # 按评分排序（高分在前）
-        sorted_results = sorted(results, key=lambda x: x.sentiment_score, reverse=True)
+        builder = DashboardBuilder(self)
+        for result in results:
+            builder.add(result)
+        return builder.build(report_date)
 
+    def _render_dashboard_header(
+        self,
+        results: List[AnalysisResult],
+        sorted_results: List[AnalysisResult],
+        report_date: str
+    ) -> List[str]:
+        """决策仪表盘标题与分析结果摘要（依赖全部结果，每次汇总时重新生成）"""
         # 统计信息 - 使用 decision_type 字段准确统计
         buy_count = sum(1 for r in results if getattr(r, 'decision_type', '') == 'buy')
         sell_count = sum(1 for r in results if getattr(r, 'decision_type', '') == 'sell')
@@ -611,234 +618,239 @@ class NotificationService:
                 "",
             ])
 
-        # 逐个股票的决策仪表盘
-        for result in sorted_results:
-            signal_text, signal_emoji, signal_tag = self._get_signal_level(result)
-            dashboard = result.dashboard if hasattr(result, 'dashboard') and result.dashboard else {}
-            
-            # 股票名称（优先使用 dashboard 或 result 中的名称）
-            stock_name = result.name if result.name and not result.name.startswith('股票') else f'股票{result.code}'
-            
+        return report_lines
+
+    def _render_dashboard_section(self, result: AnalysisResult) -> List[str]:
+        """单只股票的决策仪表盘段落（只依赖该股票结果，可增量缓存）"""
+        report_lines: List[str] = []
+        signal_text, signal_emoji, signal_tag = self._get_signal_level(result)
+        dashboard = result.dashboard if hasattr(result, 'dashboard') and result.dashboard else {}
+        
+        # 股票名称（优先使用 dashboard 或 result 中的名称）
+        stock_name = result.name if result.name and not result.name.startswith('股票') else f'股票{result.code}'
+        
+        report_lines.extend([
+            f"## {signal_emoji} {stock_name} ({result.code})",
+            "",
+        ])
+        
+        # ========== 舆情与基本面概览（放在最前面）==========
+        intel = dashboard.get('intelligence', {}) if dashboard else {}
+        if intel:
             report_lines.extend([
-                f"## {signal_emoji} {stock_name} ({result.code})",
+                "### 📰 重要信息速览",
                 "",
             ])
             
-            # ========== 舆情与基本面概览（放在最前面）==========
-            intel = dashboard.get('intelligence', {}) if dashboard else {}
-            if intel:
-                report_lines.extend([
-                    "### 📰 重要信息速览",
-                    "",
-                ])
-                
-                # 舆情情绪总结
-                if intel.get('sentiment_summary'):
-                    report_lines.append(f"**💭 舆情情绪**: {intel['sentiment_summary']}")
-                
-                # 业绩预期
-                if intel.get('earnings_outlook'):
-                    report_lines.append(f"**📊 业绩预期**: {intel['earnings_outlook']}")
-                
-                # 风险警报（醒目显示）
-                risk_alerts = intel.get('risk_alerts', [])
-                if risk_alerts:
-                    report_lines.append("")
-                    report_lines.append("**🚨 风险警报**:")
-                    for alert in risk_alerts:
-                        report_lines.append(f"- {alert}")
-                
-                # 利好催化
-                catalysts = intel.get('positive_catalysts', [])
-                if catalysts:
-                    report_lines.append("")
-                    report_lines.append("**✨ 利好催化**:")
-                    for cat in catalysts:
-                        report_lines.append(f"- {cat}")
-                
-                # 最新消息
-                if intel.get('latest_news'):
-                    report_lines.append("")
-                    report_lines.append(f"**📢 最新动态**: {intel['latest_news']}")
-                
+            # 舆情情绪总结
+            if intel.get('sentiment_summary'):
+                report_lines.append(f"**💭 舆情情绪**: {intel['sentiment_summary']}")
+            
+            # 业绩预期
+            if intel.get('earnings_outlook'):
+                report_lines.append(f"**📊 业绩预期**: {intel['earnings_outlook']}")
+            
+            # 风险警报（醒目显示）
+            risk_alerts = intel.get('risk_alerts', [])
+            if risk_alerts:
                 report_lines.append("")
+                report_lines.append("**🚨 风险警报**:")
+                for alert in risk_alerts:
+                    report_lines.append(f"- {alert}")
             
-            # ========== 核心结论 ==========
-            core = dashboard.get('core_conclusion', {}) if dashboard else {}
-            one_sentence = core.get('one_sentence', result.analysis_summary)
-            time_sense = core.get('time_sensitivity', '本周内')
-            pos_advice = core.get('position_advice', {})
+            # 利好催化
+            catalysts = intel.get('positive_catalysts', [])
+            if catalysts:
+                report_lines.append("")
+                report_lines.append("**✨ 利好催化**:")
+                for cat in catalysts:
+                    report_lines.append(f"- {cat}")
             
+            # 最新消息
+            if intel.get('latest_news'):
+                report_lines.append("")
+                report_lines.append(f"**📢 最新动态**: {intel['latest_news']}")
+            
+            report_lines.append("")
+        
+        # ========== 核心结论 ==========
+        core = dashboard.get('core_conclusion', {}) if dashboard else {}
+        one_sentence = core.get('one_sentence', result.analysis_summary)
+        time_sense = core.get('time_sensitivity', '本周内')
+        pos_advice = core.get('position_advice', {})
+        
+        report_lines.extend([
+            "### 📌 核心结论",
+            "",
+            f"**{signal_emoji} {signal_text}** | {result.trend_prediction}",
+            "",
+            f"> **一句话决策**: {one_sentence}",
+            "",
+            f"⏰ **时效性**: {time_sense}",
+            "",
+        ])
+        
+        # 持仓分类建议
+        if pos_advice:
             report_lines.extend([
-                "### 📌 核心结论",
-                "",
-                f"**{signal_emoji} {signal_text}** | {result.trend_prediction}",
+                "| 持仓情况 | 操作建议 |",
+                "|---------|---------|",
+                f"| 🆕 **空仓者** | {pos_advice.get('no_position', result.operation_advice)} |",
+                f"| 💼 **持仓者** | {pos_advice.get('has_position', '继续持有')} |",
                 "",
-                f"> **一句话决策**: {one_sentence}",
-                "",
-                f"⏰ **时效性**: {time_sense}",
+            ])
+        
+        # ========== 数据透视 ==========
+        data_persp = dashboard.get('data_perspective', {}) if dashboard else {}
+        if data_persp:
+            trend_data = data_persp.get('trend_status', {})
+            price_data = data_persp.get('price_position', {})
+            vol_data = data_persp.get('volume_analysis', {})
+            chip_data = data_persp.get('chip_structure', {})
+            
+            report_lines.extend([
+                "### 📊 数据透视",
                 "",
             ])
             
-            # 持仓分类建议
-            if pos_advice:
+            # 趋势状态
+            if trend_data:
+                is_bullish = "✅ 是" if trend_data.get('is_bullish', False) else "❌ 否"
                 report_lines.extend([
-                    "| 持仓情况 | 操作建议 |",
-                    "|---------|---------|",
-                    f"| 🆕 **空仓者** | {pos_advice.get('no_position', result.operation_advice)} |",
-                    f"| 💼 **持仓者** | {pos_advice.get('has_position', '继续持有')} |",
+                    f"**均线排列**: {trend_data.get('ma_alignment', 'N/A')} | 多头排列: {is_bullish} | 趋势强度: {trend_data.get('trend_score', 'N/A')}/100",
                     "",
                 ])
             
-            # ========== 数据透视 ==========
-            data_persp = dashboard.get('data_perspective', {}) if dashboard else {}
-            if data_persp:
-                trend_data = data_persp.get('trend_status', {})
-                price_data = data_persp.get('price_position', {})
-                vol_data = data_persp.get('volume_analysis', {})
-                chip_data = data_persp.get('chip_structure', {})
-                
+            # 价格位置
+            if price_data:
+                bias_status = price_data.get('bias_status', 'N/A')
+                bias_emoji = "✅" if bias_status == "安全" else ("⚠️" if bias_status == "警戒" else "🚨")
                 report_lines.extend([
-                    "### 📊 数据透视",
+                    "| 价格指标 | 数值 |",
+                    "|---------|------|",
+                    f"| 当前价 | {price_data.get('current_price', 'N/A')} |",
+                    f"| MA5 | {price_data.get('ma5', 'N/A')} |",
+                    f"| MA10 | {price_data.get('ma10', 'N/A')} |",
+                    f"| MA20 | {price_data.get('ma20', 'N/A')} |",
+                    f"| 乖离率(MA5) | {price_data.get('bias_ma5', 'N/A')}% {bias_emoji}{bias_status} |",
+                    f"| 支撑位 | {price_data.get('support_level', 'N/A')} |",
+                    f"| 压力位 | {price_data.get('resistance_level', 'N/A')} |",
                     "",
                 ])
-                
-                # 趋势状态
-                if trend_data:
-                    is_bullish = "✅ 是" if trend_data.get('is_bullish', False) else "❌ 否"
-                    report_lines.extend([
-                        f"**均线排列**: {trend_data.get('ma_alignment', 'N/A')} | 多头排列: {is_bullish} | 趋势强度: {trend_data.get('trend_score', 'N/A')}/100",
-                        "",
-                    ])
-                
-                # 价格位置
-                if price_data:
-                    bias_status = price_data.get('bias_status', 'N/A')
-                    bias_emoji = "✅" if bias_status == "安全" else ("⚠️" if bias_status == "警戒" else "🚨")
-                    report_lines.extend([
-                        "| 价格指标 | 数值 |",
-                        "|---------|------|",
-                        f"| 当前价 | {price_data.get('current_price', 'N/A')} |",
-                        f"| MA5 | {price_data.get('ma5', 'N/A')} |",
-                        f"| MA10 | {price_data.get('ma10', 'N/A')} |",
-                        f"| MA20 | {price_data.get('ma20', 'N/A')} |",
-                        f"| 乖离率(MA5) | {price_data.get('bias_ma5', 'N/A')}% {bias_emoji}{bias_status} |",
-                        f"| 支撑位 | {price_data.get('support_level', 'N/A')} |",
-                        f"| 压力位 | {price_data.get('resistance_level', 'N/A')} |",
-                        "",
-                    ])
-                
-                # 量能分析
-                if vol_data:
-                    report_lines.extend([
-                        f"**量能**: 量比 {vol_data.get('volume_ratio', 'N/A')} ({vol_data.get('volume_status', '')}) | 换手率 {vol_data.get('turnover_rate', 'N/A')}%",
-                        f"💡 *{vol_data.get('volume_meaning', '')}*",
-                        "",
-                    ])
-                
-                # 筹码结构
-                if chip_data:
-                    chip_health = chip_data.get('chip_health', 'N/A')
-                    chip_emoji = "✅" if chip_health == "健康" else ("⚠️" if chip_health == "一般" else "🚨")
-                    report_lines.extend([
-                        f"**筹码**: 获利比例 {chip_data.get('profit_ratio', 'N/A')} | 平均成本 {chip_data.get('avg_cost', 'N/A')} | 集中度 {chip_data.get('concentration', 'N/A')} {chip_emoji}{chip_health}",
-                        "",
-                    ])
-            
-            # 舆情情报已移至顶部显示
-            
-            # ========== 作战计划 ==========
-            battle = dashboard.get('battle_plan', {}) if dashboard else {}
-            if battle:
+            
+            # 量能分析
+            if vol_data:
                 report_lines.extend([
-                    "### 🎯 作战计划",
+                    f"**量能**: 量比 {vol_data.get('volume_ratio', 'N/A')} ({vol_data.get('volume_status', '')}) | 换手率 {vol_data.get('turnover_rate', 'N/A')}%",
+                    f"💡 *{vol_data.get('volume_meaning', '')}*",
                     "",
                 ])
-                
-                # 狙击点位
-                sniper = battle.get('sniper_points', {})
-                if sniper:
-                    report_lines.extend([
-                        "**📍 狙击点位**",
-                        "",
-                        "| 点位类型 | 价格 |",
-                        "|---------|------|",
-                        f"| 🎯 理想买入点 | {sniper.get('ideal_buy', 'N/A')} |",
-                        f"| 🔵 次优买入点 | {sniper.get('secondary_buy', 'N/A')} |",
-                        f"| 🛑 止损位 | {sniper.get('stop_loss', 'N/A')} |",
-                        f"| 🎊 目标位 | {sniper.get('take_profit', 'N/A')} |",
-                        "",
-                    ])
-                
-                # 仓位策略
-                position = battle.get('position_strategy', {})
-                if position:
-                    report_lines.extend([
-                        f"**💰 仓位建议**: {position.get('suggested_position', 'N/A')}",
-                        f"- 建仓策略: {position.get('entry_plan', 'N/A')}",
-                        f"- 风控策略: {position.get('risk_control', 'N/A')}",
-                        "",
-                    ])
-                
-                # 检查清单
-                checklist = battle.get('action_checklist', []) if battle else []
-                if checklist:
-                    report_lines.extend([
-                        "**✅ 检查清单**",
-                        "",
-                    ])
-                    for item in checklist:
-                        report_lines.append(f"- {item}")
-                    report_lines.append("")
-            
-            # 如果没有 dashboard，显示传统格式
-            if not dashboard:
-                # 操作理由
-                if result.buy_reason:
-                    report_lines.extend([
-                        f"**💡 操作理由**: {result.buy_reason}",
-                        "",
-                    ])
-                
-                # 风险提示
-                if result.risk_warning:
-                    report_lines.extend([
-                        f"**⚠️ 风险提示**: {result.risk_warning}",
-                        "",
-                    ])
-                
-                # 技术面分析
-                if result.ma_analysis or result.volume_analysis:
-                    report_lines.extend([
-                        "### 📊 技术面",
-                        "",
-                    ])
-                    if result.ma_analysis:
-                        report_lines.append(f"**均线**: {result.ma_analysis}")
-                    if result.volume_analysis:
-                        report_lines.append(f"**量能**: {result.volume_analysis}")
-                    report_lines.append("")
-                
-                # 消息面
-                if result.news_summary:
-                    report_lines.extend([
-                        "### 📰 消息面",
-                        f"{result.news_summary}",
-                        "",
-                    ])
             
+            # 筹码结构
+            if chip_data:
+                chip_health = chip_data.get('chip_health', 'N/A')
+                chip_emoji = "✅" if chip_health == "健康" else ("⚠️" if chip_health == "一般" else "🚨")
+                report_lines.extend([
+                    f"**筹码**: 获利比例 {chip_data.get('profit_ratio', 'N/A')} | 平均成本 {chip_data.get('avg_cost', 'N/A')} | 集中度 {chip_data.get('concentration', 'N/A')} {chip_emoji}{chip_health}",
+                    "",
+                ])
+        
+        # 舆情情报已移至顶部显示
+        
+        # ========== 作战计划 ==========
+        battle = dashboard.get('battle_plan', {}) if dashboard else {}
+        if battle:
             report_lines.extend([
-                "---",
+                "### 🎯 作战计划",
                 "",
             ])
+            
+            # 狙击点位
+            sniper = battle.get('sniper_points', {})
+            if sniper:
+                report_lines.extend([
+                    "**📍 狙击点位**",
+                    "",
+                    "| 点位类型 | 价格 |",
+                    "|---------|------|",
+                    f"| 🎯 理想买入点 | {sniper.get('ideal_buy', 'N/A')} |",
+                    f"| 🔵 次优买入点 | {sniper.get('secondary_buy', 'N/A')} |",
+                    f"| 🛑 止损位 | {sniper.get('stop_loss', 'N/A')} |",
+                    f"| 🎊 目标位 | {sniper.get('take_profit', 'N/A')} |",
+                    "",
+                ])
+            
+            # 仓位策略
+            position = battle.get('position_strategy', {})
+            if position:
+                report_lines.extend([
+                    f"**💰 仓位建议**: {position.get('suggested_position', 'N/A')}",
+                    f"- 建仓策略: {position.get('entry_plan', 'N/A')}",
+                    f"- 风控策略: {position.get('risk_control', 'N/A')}",
+                    "",
+                ])
+            
+            # 检查清单
+            checklist = battle.get('action_checklist', []) if battle else []
+            if checklist:
+                report_lines.extend([
+                    "**✅ 检查清单**",
+                    "",
+                ])
+                for item in checklist:
+                    report_lines.append(f"- {item}")
+                report_lines.append("")
+        
+        # 如果没有 dashboard，显示传统格式
+        if not dashboard:
+            # 操作理由
+            if result.buy_reason:
+                report_lines.extend([
+                    f"**💡 操作理由**: {result.buy_reason}",
+                    "",
+                ])
+            
+            # 风险提示
+            if result.risk_warning:
+                report_lines.extend([
+                    f"**⚠️ 风险提示**: {result.risk_warning}",
+                    "",
+                ])
+            
+            # 技术面分析
+            if result.ma_analysis or result.volume_analysis:
+                report_lines.extend([
+                    "### 📊 技术面",
+                    "",
+                ])
+                if result.ma_analysis:
+                    report_lines.append(f"**均线**: {result.ma_analysis}")
+                if result.volume_analysis:
+                    report_lines.append(f"**量能**: {result.volume_analysis}")
+                report_lines.append("")
+            
+            # 消息面
+            if result.news_summary:
+                report_lines.extend([
+                    "### 📰 消息面",
+                    f"{result.news_summary}",
+                    "",
+                ])
         
-        # 底部（去除免责声明）
         report_lines.extend([
+            "---",
             "",
-            f"*报告生成时间：{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*",
         ])
-        
-        return "\n".join(report_lines)
+
+        return report_lines
+
+    def _render_dashboard_footer(self) -> List[str]:
+        """决策仪表盘底部"""
+        # 底部（去除免责声明）
+        return [
+            "",
+            f"*报告生成时间：{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*",
+        ]
     
     def generate_wechat_dashboard(self, results: List[AnalysisResult]) -> str:
         """
@@ -2927,6 +2939,7 @@ class NotificationService:
             logger.error(f"AstrBot 发送异常: {e}")
             return False
     
+    @traced("notify.send")
     def send(self, content: str) -> bool:
         """
         统一发送接口 - 向所有已配置的渠道发送
@@ -3070,6 +3083,58 @@ class NotificationService:
         return str(filepath)
 
 
+class DashboardBuilder:
+    """
+    增量决策仪表盘构建器
+
+    每只股票的段落在 add() 时渲染一次并缓存，build() 只重新生成
+    标题/摘要并按评分拼接已渲染的段落，结果与 generate_dashboard_report 一致。
+
+    用法：
+        builder = DashboardBuilder(notifier)
+        for result in pipeline.run_iter():
+            builder.add(result)
+        report = builder.build()
+    """
+
+    def __init__(self, notifier: NotificationService):
+        self.notifier = notifier
+        self._entries: List[tuple] = []
+
+    def add(self, result: AnalysisResult) -> None:
+        """追加一只股票的分析结果"""
+        self._entries.append((result, self.notifier._render_dashboard_section(result)))
+
+    @property
+    def results(self) -> List[AnalysisResult]:
+        """已追加的分析结果（按追加顺序）"""
+        return [result for result, _ in self._entries]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def build(self, report_date: Optional[str] = None) -> str:
+        """
+        汇总为完整的决策仪表盘日报
+
+        Args:
+            report_date: 报告日期（默认今天）
+        """
+        if report_date is None:
+            report_date = datetime.now().strftime('%Y-%m-%d')
+
+        # 按评分排序（高分在前）
+        entries = sorted(self._entries, key=lambda x: x[0].sentiment_score, reverse=True)
+        results = self.results
+        sorted_results = [result for result, _ in entries]
+
+        report_lines = self.notifier._render_dashboard_header(results, sorted_results, report_date)
+        for _, section in entries:
+            report_lines.extend(section)
+        report_lines.extend(self.notifier._render_dashboard_footer())
+        return "\n".join(report_lines)
+
+
 class NotificationBuilder:
     """
     通知消息构建器
@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 提示词预算构建器
+===================================
+
+职责：
+1. 按段落估算提示词 Token 数，超出预算时从低优先级段落开始截断/丢弃
+2. 把情报报告（format_intel_report 的输出）拆分为维度段落，并去除重复新闻
+3. 为每个提示词生成大小报告（各段落 Token、裁剪情况、去重条数、节省比例）
+
+保留优先级（数值越小越重要）：
+    基础信息 / 分析任务（必留） > 技术面 > 风险排查 > 最新消息 / 业绩 / 机构分析 > 行业分析
+
+用法：
+    builder = PromptBuilder(budget_tokens=3000)
+    builder.add("header", header_text, PRIORITY_REQUIRED)
+    builder.add("trend", trend_text, PRIORITY_TECHNICAL)
+    prompt, report = builder.build()
+    logger.info(report.summary())
+"""
+
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.enums import IntelDimension
+from src.llm_scheduler import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_REQUIRED = 0
+PRIORITY_TECHNICAL = 10
+PRIORITY_RISK_NEWS = 20
+PRIORITY_NEWS = 30
+PRIORITY_INDUSTRY = 40
+
+# 情报维度的保留优先级
+INTEL_PRIORITIES: Dict[IntelDimension, int] = {
+    IntelDimension.RISK_CHECK: PRIORITY_RISK_NEWS,
+    IntelDimension.LATEST_NEWS: PRIORITY_NEWS,
+    IntelDimension.EARNINGS: PRIORITY_NEWS + 1,
+    IntelDimension.MARKET_ANALYSIS: PRIORITY_NEWS + 2,
+    IntelDimension.INDUSTRY: PRIORITY_INDUSTRY,
+}
+
+# 截断后剩余不足该 Token 数的段落直接丢弃
+MIN_SECTION_TOKENS = 40
+
+TRUNCATED_MARK = "…（已按长度预算截断）"
+
+_HEADING_RE = re.compile(r"^(?P<label>\S.*?) \(来源: (?P<provider>.*)\):$")
+_ITEM_RE = re.compile(r"^\s{2}\d+\. (?P<title>.*)$")
+_DATE_SUFFIX_RE = re.compile(r"\s*\[[^\]]*\]$")
+_NON_WORD_RE = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def count_tokens(text: Optional[str]) -> int:
+    """估算一段文本的 Token 数（与 LLM 调度器的估算口径一致）"""
+    return estimate_tokens(text) - 1 if text else 0
+
+
+def _truncate_lines(text: str, max_tokens: int) -> str:
+    """按整行截断到 max_tokens 以内（首行过长时按字符截断）"""
+    mark = "\n" + TRUNCATED_MARK + "\n"
+    lines = text.split("\n")
+    kept: List[str] = []
+    length = len(mark)
+    for line in lines:
+        extra = len(line) + (1 if kept else 0)
+        if count_tokens("x" * (length + extra)) > max_tokens:
+            break
+        kept.append(line)
+        length += extra
+    if not kept:
+        kept.append(lines[0][:max(0, max_tokens * 2 - len(mark))])
+    return "\n".join(kept).rstrip() + mark
+
+
+@dataclass
+class PromptSection:
+    """提示词段落"""
+    name: str
+    text: str
+    priority: int = PRIORITY_TECHNICAL
+    raw_tokens: int = 0  # 去重/精简前的 Token 数（用于统计节省）
+    status: str = "kept"  # kept / truncated / dropped
+    group: Optional[str] = None  # 同组的必留段落（如标题、代码块围栏）随组内内容全部丢弃而替换为 fallback
+    fallback: str = ""
+
+    @property
+    def tokens(self) -> int:
+        return count_tokens(self.text)
+
+    @property
+    def required(self) -> bool:
+        return self.priority <= PRIORITY_REQUIRED
+
+
+@dataclass
+class PromptReport:
+    """单个提示词的大小报告"""
+    budget: int
+    raw_tokens: int
+    tokens: int
+    duplicates_removed: int = 0
+    sections: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def saved_ratio(self) -> float:
+        if not self.raw_tokens:
+            return 0.0
+        return max(0.0, 1 - self.tokens / self.raw_tokens)
+
+    @property
+    def trimmed(self) -> List[str]:
+        return [f"{s['name']}({s['status']})" for s in self.sections if s['status'] != 'kept']
+
+    def summary(self) -> str:
+        budget = f" / 预算 {self.budget}" if self.budget else ""
+        parts = [f"[Prompt] 约 {self.tokens} tokens{budget}（精简前 {self.raw_tokens}，节省 {self.saved_ratio:.0%}）"]
+        if self.duplicates_removed:
+            parts.append(f"去重 {self.duplicates_removed} 条新闻")
+        if self.trimmed:
+            parts.append(f"裁剪: {', '.join(self.trimmed)}")
+        return "；".join(parts)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'budget': self.budget,
+            'raw_tokens': self.raw_tokens,
+            'tokens': self.tokens,
+            'saved_ratio': round(self.saved_ratio, 4),
+            'duplicates_removed': self.duplicates_removed,
+            'sections': self.sections,
+        }
+
+
+class PromptBuilder:
+    """
+    按 Token 预算组装提示词
+
+    段落按添加顺序输出；超出预算时按优先级从低到高（同优先级先处理靠后的段落）
+    逐个截断，截断后过短则整段丢弃。必留段落（PRIORITY_REQUIRED）不参与裁剪。
+    """
+
+    def __init__(self, budget_tokens: int = 0):
+        self.budget_tokens = max(0, budget_tokens)
+        self.sections: List[PromptSection] = []
+        self.duplicates_removed = 0
+
+    def add(
+        self,
+        name: str,
+        text: str,
+        priority: int = PRIORITY_TECHNICAL,
+        raw_tokens: Optional[int] = None,
+        group: Optional[str] = None,
+        fallback: str = "",
+    ) -> None:
+        """
+        追加段落
+
+        Args:
+            raw_tokens: 精简前的 Token 数（缺省为 text 的长度）
+            group: 段落分组；组内可裁剪的段落全部被丢弃时，组内必留段落改为输出 fallback
+        """
+        if not text:
+            return
+        self.sections.append(PromptSection(
+            name=name,
+            text=text,
+            priority=priority,
+            raw_tokens=count_tokens(text) if raw_tokens is None else raw_tokens,
+            group=group,
+            fallback=fallback,
+        ))
+
+    def add_intel(self, news_context: str, compact: bool = False, group: Optional[str] = None) -> bool:
+        """
+        拆分情报报告为维度段落（按维度优先级、去重后加入）
+
+        Args:
+            news_context: format_intel_report() 输出的情报报告
+            compact: 精简模式（每个维度最多 2 条、摘要截短）
+
+        Returns:
+            是否识别为情报报告格式；否则调用方应将其作为整段新闻加入
+        """
+        intel = IntelReport.parse(news_context)
+        if intel is None:
+            return False
+        self.duplicates_removed += intel.deduplicate()
+        raw_tokens = count_tokens(news_context)
+        rendered = [
+            (block, block.render(max_items=2 if compact else None, snippet_chars=80 if compact else None))
+            for block in intel.blocks
+        ]
+        total_rendered = sum(count_tokens(text) for _, text in rendered) or 1
+        for block, text in rendered:
+            # 按渲染后的占比分摊原始 Token，使段落明细之和等于原始情报长度
+            share = round(raw_tokens * count_tokens(text) / total_rendered)
+            self.add(f"intel.{block.key}", text, block.priority, raw_tokens=share, group=group)
+        return True
+
+    def build(self) -> Tuple[str, PromptReport]:
+        """按预算裁剪并拼接，返回 (提示词, 大小报告)"""
+        total = sum(s.tokens for s in self.sections)
+        if self.budget_tokens and total > self.budget_tokens:
+            order = sorted(
+                (s for s in self.sections if not s.required),
+                key=lambda s: (-s.priority, -self.sections.index(s)),
+            )
+            for section in order:
+                excess = total - self.budget_tokens
+                if excess <= 0:
+                    break
+                before = section.tokens
+                keep = before - excess
+                if keep >= MIN_SECTION_TOKENS:
+                    section.text = _truncate_lines(section.text, keep)
+                    section.status = "truncated"
+                else:
+                    section.text = ""
+                    section.status = "dropped"
+                total -= before - section.tokens
+            self._collapse_empty_groups()
+            if sum(s.tokens for s in self.sections) > self.budget_tokens:
+                logger.debug(f"[Prompt] 必留段落已超过预算: {total} > {self.budget_tokens}")
+
+        prompt = "".join(s.text for s in self.sections)
+        report = PromptReport(
+            budget=self.budget_tokens,
+            raw_tokens=sum(s.raw_tokens for s in self.sections),
+            tokens=sum(s.tokens for s in self.sections),
+            duplicates_removed=self.duplicates_removed,
+            sections=[
+                {'name': s.name, 'raw_tokens': s.raw_tokens, 'tokens': s.tokens, 'status': s.status}
+                for s in self.sections
+            ],
+        )
+        return prompt, report
+
+
+    def _collapse_empty_groups(self) -> None:
+        """组内可裁剪段落全部被丢弃时，标题/围栏等必留段落改为 fallback 文本"""
+        for group in {s.group for s in self.sections if s.group}:
+            members = [s for s in self.sections if s.group == group]
+            content = [s for s in members if not s.required]
+            if not content or any(s.text for s in content):
+                continue
+            for section in members:
+                if section.required:
+                    section.text = section.fallback
+                    section.status = "dropped"
+
+
+# === 情报报告拆分 ===
+
+@dataclass
+class IntelItem:
+    """情报报告中的一条新闻（标题行 + 摘要行）"""
+    title: str
+    lines: List[str] = field(default_factory=list)
+
+    @property
+    def keys(self) -> Tuple[str, str]:
+        """去重键：规范化标题、摘要前 30 字"""
+        title = _NON_WORD_RE.sub("", _DATE_SUFFIX_RE.sub("", self.title)).lower()
+        snippet = _NON_WORD_RE.sub("", " ".join(self.lines)).lower()
+        return title, snippet[:30] if len(snippet) >= 20 else ""
+
+
+@dataclass
+class IntelBlock:
+    """情报报告中的一个维度段落"""
+    heading: str
+    dimension: Optional[IntelDimension]
+    items: List[IntelItem] = field(default_factory=list)
+    notes: List[str] = field(default_factory=list)
+    duplicates: int = 0
+
+    @property
+    def key(self) -> str:
+        return self.dimension.value if self.dimension else "other"
+
+    @property
+    def priority(self) -> int:
+        return INTEL_PRIORITIES.get(self.dimension, PRIORITY_NEWS) if self.dimension else PRIORITY_NEWS
+
+    def render(self, max_items: Optional[int] = None, snippet_chars: Optional[int] = None) -> str:
+        if not self.items and self.duplicates:
+            # 全部与更重要的维度重复，整段省略
+            return ""
+        lines = ["", self.heading]
+        for index, item in enumerate(self.items[:max_items], 1):
+            lines.append(f"  {index}. {item.title}")
+            for line in item.lines:
+                if snippet_chars and len(line.strip()) > snippet_chars:
+                    line = line[:line.index(line.strip()) + snippet_chars] + "..."
+                lines.append(line)
+        lines.extend(self.notes)
+        return "\n".join(lines) + "\n"
+
+
+@dataclass
+class IntelReport:
+    """format_intel_report() 输出的结构化视图"""
+    title: str
+    blocks: List[IntelBlock]
+
+    @classmethod
+    def parse(cls, text: str) -> Optional["IntelReport"]:
+        """解析情报报告，格式不符（如外部传入的自由文本）返回 None"""
+        lines = text.strip("\n").split("\n")
+        if not lines or not lines[0].startswith("【"):
+            return None
+        blocks: List[IntelBlock] = []
+        for line in lines[1:]:
+            heading = _HEADING_RE.match(line)
+            if heading:
+                blocks.append(IntelBlock(
+                    heading=line,
+                    dimension=IntelDimension.from_display_name(heading.group('label')),
+                ))
+                continue
+            if not blocks or not line.strip():
+                continue
+            block = blocks[-1]
+            item = _ITEM_RE.match(line)
+            if item:
+                block.items.append(IntelItem(title=item.group('title')))
+            elif block.items and line.startswith("     "):
+                block.items[-1].lines.append(line)
+            else:
+                block.notes.append(line)
+        if not blocks:
+            return None
+        return cls(title=lines[0], blocks=blocks)
+
+    def deduplicate(self) -> int:
+        """
+        去除跨维度重复的新闻（标题或摘要开头相同）
+
+        按维度优先级处理，重复条目保留在更重要的维度（如风险排查）中。
+
+        Returns:
+            移除的条数
+        """
+        seen = set()
+        removed = 0
+        for block in sorted(self.blocks, key=lambda b: b.priority):
+            unique = []
+            for item in block.items:
+                keys = [(kind, key) for kind, key in zip(("title", "snippet"), item.keys) if key]
+                if any(key in seen for key in keys):
+                    block.duplicates += 1
+                    removed += 1
+                    continue
+                seen.update(keys)
+                unique.append(item)
+            block.items = unique
+        return removed
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - LLM 结构化输出解析
+===================================
+
+职责：
+1. 从响应中提取 JSON 块（原生 JSON 模式的裸 JSON、```json 代码块、前后夹杂说明文字）
+2. 先用严格的 json.loads 解析，失败时才升级到正则修复 + json_repair
+3. 按声明的决策仪表盘结构校验字段，能纠正的（数字字符串、越界评分）就地纠正
+
+绝大多数响应（尤其开启原生 JSON 模式后）是合法 JSON，快路径只需一次 json.loads；
+修复只在少数格式错误的响应上执行。两级都失败时由调用方退回纯文本关键词分析。
+
+使用方式：
+    outcome = parse_json_response(text)
+    if outcome.data is not None:
+        problems = validate_fields(outcome.data, DASHBOARD_SCHEMA, fix=True)
+"""
+
+import json
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from json_repair import repair_json
+
+logger = logging.getLogger(__name__)
+
+# 解析阶段
+STAGE_STRICT = "strict"
+STAGE_REPAIRED = "repaired"
+STAGE_FAILED = "failed"
+
+
+@dataclass(frozen=True)
+class FieldRule:
+    """单个字段的校验规则"""
+    types: Tuple[type, ...]
+    required: bool = False
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+    choices: Tuple[str, ...] = ()
+
+
+# 决策仪表盘结构（点号表示嵌套字段；未声明的字段不校验）
+DASHBOARD_SCHEMA: Dict[str, FieldRule] = {
+    'sentiment_score': FieldRule((int,), required=True, minimum=0, maximum=100),
+    'trend_prediction': FieldRule((str,), required=True),
+    'operation_advice': FieldRule((str,), required=True),
+    'decision_type': FieldRule((str,), choices=('buy', 'hold', 'sell')),
+    'confidence_level': FieldRule((str,)),
+    'stock_name': FieldRule((str,)),
+    'analysis_summary': FieldRule((str,)),
+    'dashboard': FieldRule((dict,)),
+    'dashboard.core_conclusion': FieldRule((dict,)),
+    'dashboard.data_perspective': FieldRule((dict,)),
+    'dashboard.intelligence': FieldRule((dict,)),
+    'dashboard.battle_plan': FieldRule((dict,)),
+}
+
+
+@dataclass
+class ParseOutcome:
+    """一次解析的结果：data 为 None 表示两级解析都失败"""
+    data: Any
+    stage: str
+    error: str = ""
+
+
+def extract_json_block(text: str, opener: str = "{") -> Optional[str]:
+    """
+    提取响应中的 JSON 块
+
+    依次尝试：整段即 JSON（原生 JSON 模式）、以 opener 开头的代码块、
+    首个 opener 到最后一个对应闭合括号之间的内容。
+    """
+    closer = "}" if opener == "{" else "]"
+    stripped = text.strip()
+    if stripped.startswith(opener) and stripped.endswith(closer):
+        return stripped
+    fence = text.find("```")
+    while fence >= 0:
+        body_start = text.find("\n", fence)
+        body_end = text.find("```", body_start) if body_start >= 0 else -1
+        if body_end < 0:
+            break
+        block = text[body_start:body_end].strip()
+        if block.startswith(opener):
+            return block
+        fence = text.find("```", body_end + 3)
+    start = text.find(opener)
+    end = text.rfind(closer) + 1
+    if start < 0 or end <= start:
+        return None
+    return text[start:end]
+
+
+def repair_json_text(json_str: str) -> str:
+    """修复常见的 JSON 格式问题（注释、尾随逗号、Python 布尔值等）"""
+    # 移除注释
+    json_str = re.sub(r'//.*?\n', '\n', json_str)
+    json_str = re.sub(r'/\*.*?\*/', '', json_str, flags=re.DOTALL)
+
+    # 修复尾随逗号
+    json_str = re.sub(r',\s*}', '}', json_str)
+    json_str = re.sub(r',\s*]', ']', json_str)
+
+    # 确保布尔值是小写
+    json_str = json_str.replace('True', 'true').replace('False', 'false')
+
+    # fix by json-repair
+    return repair_json(json_str)
+
+
+def parse_json_response(text: str, expect: type = dict) -> ParseOutcome:
+    """
+    解析 LLM 响应中的 JSON 对象（expect=dict）或数组（expect=list）
+
+    先严格解析提取出的块；失败时去掉代码块标记后修复再解析。
+    """
+    opener = "{" if expect is dict else "["
+    if not text:
+        return ParseOutcome(None, STAGE_FAILED, "响应为空")
+
+    block = extract_json_block(text, opener)
+    if block is not None:
+        try:
+            data = json.loads(block)
+            if isinstance(data, expect):
+                return ParseOutcome(data, STAGE_STRICT)
+        except json.JSONDecodeError:
+            pass
+
+    # 升级到修复：与旧逻辑一致，先去掉全部代码块标记再截取（兼容截断、未闭合的代码块）
+    cleaned = text.replace('```json', '').replace('```', '')
+    start = cleaned.find(opener)
+    if start < 0:
+        return ParseOutcome(None, STAGE_FAILED, f"响应中未找到 JSON {'对象' if expect is dict else '数组'}")
+    end = cleaned.rfind("}" if expect is dict else "]") + 1
+    candidate = cleaned[start:end] if end > start else cleaned[start:]
+    try:
+        data = json.loads(repair_json_text(candidate))
+    except (json.JSONDecodeError, ValueError) as e:
+        return ParseOutcome(None, STAGE_FAILED, f"修复后仍无法解析: {e}")
+    if not isinstance(data, expect):
+        return ParseOutcome(None, STAGE_FAILED, f"解析结果类型为 {type(data).__name__}")
+    return ParseOutcome(data, STAGE_REPAIRED)
+
+
+def _lookup(data: Dict[str, Any], path: str) -> Tuple[Optional[Dict[str, Any]], str]:
+    """按点号路径找到字段所在的字典与键名；中间层缺失时返回 (None, 键名)"""
+    parts = path.split('.')
+    node: Any = data
+    for part in parts[:-1]:
+        node = node.get(part) if isinstance(node, dict) else None
+        if not isinstance(node, dict):
+            return None, parts[-1]
+    return node, parts[-1]
+
+
+def _coerce_int(value: Any) -> Optional[int]:
+    """模型常把评分输出为 "72" 或 72.0，能无歧义转为整数的视为合法"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    try:
+        return int(float(str(value).strip()))
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def validate_fields(data: Dict[str, Any], schema: Dict[str, FieldRule], fix: bool = False) -> List[str]:
+    """
+    按结构校验字段，返回问题列表（空列表表示通过）
+
+    Args:
+        fix: 为 True 时就地纠正：数字转为整数、越界值截断到范围内，
+             类型或取值错误的字段删除（由构建结果时的默认值兜底）；
+             其中可选字段被删除不计为问题
+    """
+    problems: List[str] = []
+
+    def report(rule: FieldRule, node: Dict[str, Any], key: str, problem: str) -> None:
+        if fix:
+            del node[key]
+        if rule.required or not fix:
+            problems.append(problem)
+        else:
+            logger.debug(f"[结构校验] 丢弃字段: {problem}")
+
+    for path, rule in schema.items():
+        node, key = _lookup(data, path)
+        if node is None or key not in node or node[key] is None:
+            if rule.required:
+                problems.append(f"缺少 {path}")
+            continue
+
+        value = node[key]
+        if rule.types == (int,):
+            number = _coerce_int(value)
+            if number is None:
+                report(rule, node, key, f"{path} 不是整数")
+                continue
+            if (rule.minimum is not None and number < rule.minimum) or (
+                rule.maximum is not None and number > rule.maximum
+            ):
+                problems.append(f"{path} 超出 {rule.minimum}-{rule.maximum} 范围")
+                if rule.minimum is not None:
+                    number = max(number, int(rule.minimum))
+                if rule.maximum is not None:
+                    number = min(number, int(rule.maximum))
+            if fix:
+                node[key] = number
+            continue
+
+        if not isinstance(value, rule.types):
+            report(rule, node, key, f"{path} 类型应为 {'/'.join(t.__name__ for t in rule.types)}")
+        elif rule.required and isinstance(value, str) and not value.strip():
+            problems.append(f"缺少 {path}")
+        elif rule.choices and value not in rule.choices:
+            report(rule, node, key, f"{path} 取值 {str(value)[:20]} 不在 {'/'.join(rule.choices)} 中")
+    return problems
@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 全市场技术面选股
+===================================
+
+职责：
+1. 单条 SQL 批量读取本地日线，合并一次全市场实时快照作为最新一根 K 线
+2. 用 StockTrendAnalyzer.analyze_panel 向量化计算全市场趋势评分
+3. 按 signal_score 排序输出候选池，可选将前 N 只交给 AI 分析流水线
+4. 为 CLI（main.py --screen）、Web（/screener）与 Bot（/screen）提供统一入口
+
+说明：
+- 选股范围为本地数据库中有日线的 A 股（6 位数字代码），
+  可通过 backfill() / --screen-backfill 一次性补齐全市场历史日线
+- 实时快照只用于补充/刷新最新交易日的 K 线，不写入数据库
+"""
+
+import logging
+import re
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.config import Config, get_config
+from src.enums import JobPriority
+from src.intraday import TRADING_SESSIONS
+from src.stock_analyzer import StockTrendAnalyzer
+from src.storage import DatabaseManager, get_db
+from src.tracing import trace_span
+
+logger = logging.getLogger(__name__)
+
+# 仅筛选 A 股（6 位数字代码）
+_A_SHARE_PATTERN = re.compile(r'^\d{6}$')
+
+# 候选池输出列
+RANKING_COLUMNS = [
+    'code', 'name', 'signal_score', 'buy_signal', 'trend_status', 'current_price', 'change_pct',
+    'bias_ma5', 'volume_ratio_5d', 'macd_status', 'rsi_12', 'rsi_status',
+]
+
+
+@dataclass
+class ScreenResult:
+    """选股结果"""
+    as_of: str                          # 最新 K 线日期
+    universe: int                       # 参与筛选的股票数
+    scored: int                         # 数据充足、完成评分的股票数
+    realtime: bool                      # 是否合并了实时快照
+    elapsed: float                      # 耗时（秒）
+    ranking: pd.DataFrame = field(default_factory=pd.DataFrame)
+
+    @property
+    def codes(self) -> List[str]:
+        return self.ranking['code'].tolist() if not self.ranking.empty else []
+
+    def to_dict(self) -> Dict[str, Any]:
+        records = self.ranking.round(2).to_dict(orient='records') if not self.ranking.empty else []
+        return {
+            'as_of': self.as_of,
+            'universe': self.universe,
+            'scored': self.scored,
+            'realtime': self.realtime,
+            'elapsed': round(self.elapsed, 3),
+            'count': len(records),
+            'ranking': records,
+        }
+
+    def to_markdown(self) -> str:
+        """渲染为 Markdown 候选池"""
+        lines = [
+            f"## 🔎 全市场技术面选股 ({self.as_of})",
+            "",
+            f"> 筛选 {self.universe} 只，完成评分 {self.scored} 只"
+            f"{'，已合并实时行情' if self.realtime else ''}，耗时 {self.elapsed:.2f}s",
+            "",
+        ]
+        if self.ranking.empty:
+            lines.append("暂无符合条件的股票")
+            return "\n".join(lines)
+
+        lines += [
+            "| # | 股票 | 评分 | 信号 | 趋势 | 现价 | 涨跌幅 | 乖离MA5 | 量比 | MACD | RSI12 |",
+            "|---|------|------|------|------|------|--------|---------|------|------|-------|",
+        ]
+        for i, row in enumerate(self.ranking.itertuples(index=False), 1):
+            change = f"{row.change_pct:+.2f}%" if pd.notna(row.change_pct) else "-"
+            lines.append(
+                f"| {i} | {row.name or row.code}({row.code}) | {row.signal_score} | {row.buy_signal} | "
+                f"{row.trend_status} | {row.current_price:.2f} | {change} | {row.bias_ma5:+.2f}% | "
+                f"{row.volume_ratio_5d:.2f} | {row.macd_status} | {row.rsi_12:.1f} |"
+            )
+        return "\n".join(lines)
+
+
+class MarketScreener:
+    """
+    全市场技术面选股器
+
+    Args:
+        config: 配置（默认全局配置）
+        db: 数据库管理器（默认全局实例）
+        fetcher_manager: 数据源管理器（默认共享组件容器中的实例）
+        trend_analyzer: 趋势分析器（默认共享组件容器中的实例）
+    """
+
+    def __init__(
+        self,
+        config: Optional[Config] = None,
+        db: Optional[DatabaseManager] = None,
+        fetcher_manager=None,
+        trend_analyzer: Optional[StockTrendAnalyzer] = None,
+    ):
+        self.config = config or get_config()
+        self.db = db or get_db()
+        self._fetcher_manager = fetcher_manager
+        self.trend_analyzer = trend_analyzer or StockTrendAnalyzer()
+
+    @property
+    def fetcher_manager(self):
+        if self._fetcher_manager is None:
+            from src.core.components import get_components
+            self._fetcher_manager = get_components().fetcher_manager
+        return self._fetcher_manager
+
+    def screen(
+        self,
+        top_n: Optional[int] = None,
+        min_score: int = 0,
+        use_realtime: bool = True,
+        exclude_st: Optional[bool] = None,
+    ) -> ScreenResult:
+        """
+        执行全市场选股
+
+        Args:
+            top_n: 返回前 N 只（默认 SCREENER_TOP_N）
+            min_score: 最低综合评分
+            use_realtime: 是否拉取全市场实时快照作为最新 K 线
+            exclude_st: 是否排除 ST 股票（默认 SCREENER_EXCLUDE_ST）
+
+        Returns:
+            ScreenResult
+        """
+        started = time.time()
+        top_n = top_n or self.config.screener_top_n
+        exclude_st = self.config.screener_exclude_st if exclude_st is None else exclude_st
+
+        with trace_span("screener.load"):
+            bars = self._load_bars()
+        snapshot = self._load_snapshot() if use_realtime else None
+        if snapshot is not None:
+            bars = self._merge_snapshot(bars, snapshot)
+
+        if bars.empty:
+            logger.warning("[选股] 本地无日线数据，请先运行 --screen-backfill 补齐历史数据")
+            return ScreenResult(as_of='', universe=0, scored=0, realtime=snapshot is not None,
+                                elapsed=time.time() - started)
+
+        with trace_span("screener.score"):
+            panel = bars.pivot(index='date', columns='code', values=list(StockTrendAnalyzer.PANEL_FIELDS))
+            scores = self.trend_analyzer.analyze_panel(panel)
+
+        scored = scores[scores['bars'] >= 20].copy()
+        scored['code'] = scored.index
+        names = snapshot.set_index('code')['name'] if snapshot is not None else pd.Series(dtype=str)
+        scored['name'] = scored['code'].map(names).fillna('')
+        changes = snapshot.set_index('code')['change_pct'] if snapshot is not None else pd.Series(dtype=float)
+        scored['change_pct'] = scored['code'].map(changes)
+        if exclude_st:
+            scored = scored[~scored['name'].str.upper().str.contains('ST')]
+        scored = scored[scored['signal_score'] >= min_score]
+
+        ranking = (
+            scored.sort_values(['signal_score', 'volume_ratio_5d'], ascending=[False, False])
+            .head(top_n)[RANKING_COLUMNS]
+            .reset_index(drop=True)
+        )
+        result = ScreenResult(
+            as_of=pd.Timestamp(bars['date'].max()).date().isoformat(),
+            universe=int(scores.shape[0]),
+            scored=int((scores['bars'] >= 20).sum()),
+            realtime=snapshot is not None,
+            elapsed=time.time() - started,
+            ranking=ranking,
+        )
+        logger.info(
+            f"[选股] 筛选 {result.universe} 只，完成评分 {result.scored} 只，"
+            f"候选 {len(ranking)} 只，耗时 {result.elapsed:.2f}s"
+        )
+        return result
+
+    def analyze_top(
+        self,
+        result: ScreenResult,
+        top_n: Optional[int] = None,
+        send_notification: bool = True,
+        priority: JobPriority = JobPriority.BATCH,
+        source_message=None,
+    ) -> List[Any]:
+        """
+        将候选池前 N 只交给 AI 分析流水线
+
+        分析数量上限为 SCREENER_TOP_N，避免大候选池（如 /screen 5000 analyze）
+        把全市场送进 LLM。
+
+        Returns:
+            AnalysisResult 列表
+        """
+        from src.core.pipeline import StockAnalysisPipeline
+
+        codes = result.codes[:self.analyze_limit(top_n or len(result.codes))]
+        if not codes:
+            return []
+        logger.info(f"[选股] 将候选池前 {len(codes)} 只交给 AI 分析: {', '.join(codes)}")
+        pipeline = StockAnalysisPipeline(
+            config=self.config,
+            source_message=source_message,
+            query_id=uuid.uuid4().hex,
+            query_source='screener',
+            priority=priority,
+        )
+        return pipeline.run(stock_codes=codes, send_notification=send_notification)
+
+    def analyze_limit(self, top_n: int) -> int:
+        """候选池交给 AI 分析的实际数量（不超过 SCREENER_TOP_N）"""
+        return max(0, min(top_n, self.config.screener_top_n))
+
+    def backfill(self, codes: Optional[List[str]] = None, workers: Optional[int] = None) -> int:
+        """
+        补齐本地日线（一次性初始化全市场历史数据）
+
+        Args:
+            codes: 股票代码（默认取全市场快照中本地缺少最新日线的股票）
+            workers: 并发数（默认 MAX_WORKERS）
+
+        Returns:
+            成功写入的股票数
+        """
+        if codes is None:
+            snapshot = self._load_snapshot()
+            if snapshot is None:
+                logger.error("[选股] 无法获取全市场股票列表，补齐失败")
+                return 0
+            stored = self._load_bars()
+            latest = stored.groupby('code')['date'].max() if not stored.empty else pd.Series(dtype='datetime64[ns]')
+            stale_before = pd.Timestamp(date.today() - timedelta(days=7))
+            codes = [
+                code for code in snapshot['code']
+                if _A_SHARE_PATTERN.match(code) and not (code in latest.index and latest[code] >= stale_before)
+            ]
+
+        days = self.config.screener_lookback_days
+        logger.info(f"[选股] 开始补齐 {len(codes)} 只股票的历史日线（{days} 天）")
+
+        def fetch(code: str) -> bool:
+            df, source = self.fetcher_manager.get_daily_data(code, days=days)
+            self.db.save_daily_data(df, code, source)
+            return True
+
+        saved = 0
+        with ThreadPoolExecutor(max_workers=workers or self.config.max_workers) as executor:
+            futures = {executor.submit(fetch, code): code for code in codes}
+            for future in as_completed(futures):
+                try:
+                    saved += int(future.result())
+                except Exception as e:
+                    logger.warning(f"[选股] {futures[future]} 补齐失败: {e}")
+        logger.info(f"[选股] 补齐完成: {saved}/{len(codes)}")
+        return saved
+
+    def _load_bars(self) -> pd.DataFrame:
+        """批量读取回看窗口内的 A 股日线"""
+        start = date.today() - timedelta(days=self.config.screener_lookback_days)
+        bars = self.db.get_daily_bars(start, columns=StockTrendAnalyzer.PANEL_FIELDS)
+        if bars.empty:
+            return bars
+        codes = [code for code in bars['code'].unique() if _A_SHARE_PATTERN.match(code)]
+        return bars[bars['code'].isin(codes)]
+
+    def _load_snapshot(self) -> Optional[pd.DataFrame]:
+        """全市场实时快照（停牌/无成交的股票已剔除）"""
+        snapshot = self.fetcher_manager.get_realtime_snapshot()
+        if snapshot is None or snapshot.empty:
+            logger.warning("[选股] 全市场实时快照不可用，仅使用本地日线")
+            return None
+        snapshot = snapshot[snapshot['code'].str.match(_A_SHARE_PATTERN)]
+        return snapshot.drop_duplicates('code').reset_index(drop=True)
+
+    @staticmethod
+    def _merge_snapshot(bars: pd.DataFrame, snapshot: pd.DataFrame, now: Optional[datetime] = None) -> pd.DataFrame:
+        """
+        用实时快照补充最新交易日 K 线
+
+        快照本身不带日期，只在交易日开盘后合并，日期记为当天；本地已有当天 K 线时
+        以快照刷新，没有则追加。周末、开盘前不合并；工作日休市（如国庆）时快照仍是
+        上一交易日行情，与本地最新 K 线的收盘价、最高价一致，此时同样跳过，避免追加
+        重复 K 线。只处理本地已有历史日线的股票。
+        """
+        now = now or datetime.now()
+        if now.weekday() >= 5 or now.time() < TRADING_SESSIONS[0][0]:
+            logger.info("[选股] 非交易时段，跳过实时快照合并")
+            return bars
+        snapshot_ts = pd.Timestamp(now.date())
+
+        live = snapshot[(snapshot['price'] > 0) & snapshot['code'].isin(bars['code'].unique())]
+        if live.empty:
+            return bars
+        if snapshot_ts > bars['date'].max() and _is_stale_snapshot(bars, live):
+            logger.info("[选股] 实时快照与最近交易日 K 线一致（休市日），跳过合并")
+            return bars
+        latest_bars = pd.DataFrame({
+            'code': live['code'].values,
+            'date': snapshot_ts,
+            'close': live['price'].values,
+            'high': live['high'].fillna(live['price']).values,
+            'volume': live['volume'].values,
+        })
+        kept = bars[~((bars['date'] == snapshot_ts) & bars['code'].isin(latest_bars['code']))]
+        return pd.concat([kept, latest_bars], ignore_index=True)
+
+
+def _is_stale_snapshot(bars: pd.DataFrame, live: pd.DataFrame) -> bool:
+    """快照是否仍是本地最新一个交易日的行情（多数股票收盘价与最高价均未变化）"""
+    last = bars[bars['date'] == bars['date'].max()].drop_duplicates('code').set_index('code')
+    quotes = live.drop_duplicates('code').set_index('code')
+    common = quotes.index.intersection(last.index)
+    if common.empty:
+        return False
+    same = (
+        np.isclose(quotes.loc[common, 'price'], last.loc[common, 'close'])
+        & np.isclose(quotes.loc[common, 'high'].fillna(quotes.loc[common, 'price']), last.loc[common, 'high'])
+    )
+    return bool(same.mean() > 0.5)
+
+
+def run_screen(
+    top_n: Optional[int] = None,
+    analyze: bool = False,
+    send_notification: bool = True,
+    use_realtime: bool = True,
+) -> Tuple[ScreenResult, List[Any]]:
+    """
+    CLI 入口：选股并（可选）对候选池做 AI 分析
+
+    Returns:
+        (ScreenResult, AnalysisResult 列表)
+    """
+    screener = MarketScreener()
+    result = screener.screen(top_n=top_n, use_realtime=use_realtime)
+    logger.info(f"[选股] 选股结果：\n{result.to_markdown()}")
+    analyses = screener.analyze_top(result, send_notification=send_notification) if analyze else []
+    return result, analyses
@@ -16,8 +16,9 @@
 - 量能形态：缩量回调优先
 """
 
+import hashlib
 import logging
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 from typing import Optional, Dict, Any, List, Tuple
 from enum import Enum
 
@@ -163,8 +164,48 @@ class TrendAnalysisResult:
             'rsi_24': self.rsi_24,
             'rsi_status': self.rsi_status.value,
             'rsi_signal': self.rsi_signal,
+            'support_levels': self.support_levels,
+            'resistance_levels': self.resistance_levels,
         }
 
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'TrendAnalysisResult':
+        """由 to_dict() 的结果还原（用于趋势结果缓存），未知字段忽略"""
+        enum_fields = {
+            'trend_status': TrendStatus,
+            'volume_status': VolumeStatus,
+            'buy_signal': BuySignal,
+            'macd_status': MACDStatus,
+            'rsi_status': RSIStatus,
+        }
+        kwargs = {}
+        for f in fields(cls):
+            if f.name not in data:
+                continue
+            value = data[f.name]
+            if f.name in enum_fields:
+                value = enum_fields[f.name](value)
+            elif isinstance(value, list):
+                value = list(value)
+            kwargs[f.name] = value
+        return cls(**kwargs)
+
+
+def _enum_index(enum_cls) -> Dict[Enum, int]:
+    """枚举成员 -> 序号（面板模式中状态以序号数组表示）"""
+    return {member: i for i, member in enumerate(enum_cls)}
+
+
+def _enum_values(enum_cls) -> np.ndarray:
+    """序号 -> 枚举中文值，可直接用序号数组索引"""
+    return np.array([member.value for member in enum_cls], dtype=object)
+
+
+def _select(conditions: List[np.ndarray], choices: List[Enum], default: Enum) -> np.ndarray:
+    """np.select 的枚举版本，返回枚举序号数组"""
+    index = _enum_index(type(default))
+    return np.select(conditions, [index[c] for c in choices], default=index[default])
+
 
 class StockTrendAnalyzer:
     """
@@ -177,6 +218,8 @@ class StockTrendAnalyzer:
     4. 买点识别 - 回踩 MA5/MA10 支撑
     5. MACD 指标 - 趋势确认和金叉死叉信号
     6. RSI 指标 - 超买超卖判断
+    7. 面板模式 - analyze_panel() 按 (date × code) 面板批量计算全部股票
+    8. 历史评分 - score_history() 计算面板中每个交易日的评分，供回测使用
     """
     
     # 交易参数配置
@@ -196,10 +239,100 @@ class StockTrendAnalyzer:
     RSI_LONG = 24              # 长期RSI周期
     RSI_OVERBOUGHT = 70        # 超买阈值
     RSI_OVERSOLD = 30          # 超卖阈值
+
+    # 趋势状态 -> (均线排列描述, 趋势强度)
+    TREND_DESCRIPTIONS = {
+        TrendStatus.STRONG_BULL: ("强势多头排列，均线发散上行", 90),
+        TrendStatus.BULL: ("多头排列 MA5>MA10>MA20", 75),
+        TrendStatus.WEAK_BULL: ("弱势多头，MA5>MA10 但 MA10≤MA20", 55),
+        TrendStatus.CONSOLIDATION: ("均线缠绕，趋势不明", 50),
+        TrendStatus.WEAK_BEAR: ("弱势空头，MA5<MA10 但 MA10≥MA20", 40),
+        TrendStatus.BEAR: ("空头排列 MA5<MA10<MA20", 25),
+        TrendStatus.STRONG_BEAR: ("强势空头排列，均线发散下行", 10),
+    }
+
+    VOLUME_TRENDS = {
+        VolumeStatus.HEAVY_VOLUME_UP: "放量上涨，多头力量强劲",
+        VolumeStatus.HEAVY_VOLUME_DOWN: "放量下跌，注意风险",
+        VolumeStatus.SHRINK_VOLUME_UP: "缩量上涨，上攻动能不足",
+        VolumeStatus.SHRINK_VOLUME_DOWN: "缩量回调，洗盘特征明显（好）",
+        VolumeStatus.NORMAL: "量能正常",
+    }
+
+    MACD_SIGNALS = {
+        MACDStatus.GOLDEN_CROSS_ZERO: "⭐ 零轴上金叉，强烈买入信号！",
+        MACDStatus.CROSSING_UP: "⚡ DIF上穿零轴，趋势转强",
+        MACDStatus.GOLDEN_CROSS: "✅ 金叉，趋势向上",
+        MACDStatus.DEATH_CROSS: "❌ 死叉，趋势向下",
+        MACDStatus.CROSSING_DOWN: "⚠️ DIF下穿零轴，趋势转弱",
+        MACDStatus.BULLISH: "✓ 多头排列，持续上涨",
+        MACDStatus.BEARISH: "⚠ 空头排列，持续下跌",
+    }
+    MACD_NEUTRAL_SIGNAL = " MACD 中性区域"
+
+    RSI_SIGNALS = {
+        RSIStatus.OVERBOUGHT: "⚠️ RSI超买({:.1f}>70)，短期回调风险高",
+        RSIStatus.STRONG_BUY: "✅ RSI强势({:.1f})，多头力量充足",
+        RSIStatus.NEUTRAL: " RSI中性({:.1f})，震荡整理中",
+        RSIStatus.WEAK: "⚡ RSI弱势({:.1f})，关注反弹",
+        RSIStatus.OVERSOLD: "⭐ RSI超卖({:.1f}<30)，反弹机会大",
+    }
+
+    # 综合评分表（趋势 30 / 量能 15 / MACD 15 / RSI 10）
+    TREND_SCORES = {
+        TrendStatus.STRONG_BULL: 30,
+        TrendStatus.BULL: 26,
+        TrendStatus.WEAK_BULL: 18,
+        TrendStatus.CONSOLIDATION: 12,
+        TrendStatus.WEAK_BEAR: 8,
+        TrendStatus.BEAR: 4,
+        TrendStatus.STRONG_BEAR: 0,
+    }
+    VOLUME_SCORES = {
+        VolumeStatus.SHRINK_VOLUME_DOWN: 15,  # 缩量回调最佳
+        VolumeStatus.HEAVY_VOLUME_UP: 12,     # 放量上涨次之
+        VolumeStatus.NORMAL: 10,
+        VolumeStatus.SHRINK_VOLUME_UP: 6,     # 无量上涨较差
+        VolumeStatus.HEAVY_VOLUME_DOWN: 0,    # 放量下跌最差
+    }
+    MACD_SCORES = {
+        MACDStatus.GOLDEN_CROSS_ZERO: 15,  # 零轴上金叉最强
+        MACDStatus.GOLDEN_CROSS: 12,      # 金叉
+        MACDStatus.CROSSING_UP: 10,       # 上穿零轴
+        MACDStatus.BULLISH: 8,            # 多头
+        MACDStatus.BEARISH: 2,            # 空头
+        MACDStatus.CROSSING_DOWN: 0,       # 下穿零轴
+        MACDStatus.DEATH_CROSS: 0,        # 死叉
+    }
+    RSI_SCORES = {
+        RSIStatus.OVERSOLD: 10,       # 超卖最佳
+        RSIStatus.STRONG_BUY: 8,     # 强势
+        RSIStatus.NEUTRAL: 5,        # 中性
+        RSIStatus.WEAK: 3,            # 弱势
+        RSIStatus.OVERBOUGHT: 0,       # 超买最差
+    }
+
+    # 买入信号评分阈值（100 分制）
+    STRONG_BUY_SCORE = 75       # 强烈买入（需多头排列）
+    BUY_SCORE = 60              # 买入（需多头或弱势多头）
+    HOLD_SCORE = 45             # 持有
+    WAIT_SCORE = 30             # 观望，低于此分为卖出
     
     def __init__(self):
         """初始化分析器"""
         pass
+
+    def params_hash(self) -> str:
+        """
+        分析参数哈希（全部大写属性，含实例覆盖的值）
+
+        用作趋势结果缓存键的一部分：调整阈值或评分表后旧缓存自然失效。
+        """
+        params = sorted(
+            (name, repr(getattr(self, name)))
+            for name in dir(self) if name.isupper() and not name.startswith('_')
+        )
+        return hashlib.sha1(repr(params).encode('utf-8')).hexdigest()[:16]
     
     def analyze(self, df: pd.DataFrame, code: str) -> TrendAnalysisResult:
         """
@@ -352,17 +485,11 @@ class StockTrendAnalyzer:
             
             if curr_spread > prev_spread and curr_spread > 5:
                 result.trend_status = TrendStatus.STRONG_BULL
-                result.ma_alignment = "强势多头排列，均线发散上行"
-                result.trend_strength = 90
             else:
                 result.trend_status = TrendStatus.BULL
-                result.ma_alignment = "多头排列 MA5>MA10>MA20"
-                result.trend_strength = 75
                 
         elif ma5 > ma10 and ma10 <= ma20:
             result.trend_status = TrendStatus.WEAK_BULL
-            result.ma_alignment = "弱势多头，MA5>MA10 但 MA10≤MA20"
-            result.trend_strength = 55
             
         elif ma5 < ma10 < ma20:
             prev = df.iloc[-5] if len(df) >= 5 else df.iloc[-1]
@@ -371,22 +498,16 @@ class StockTrendAnalyzer:
             
             if curr_spread > prev_spread and curr_spread > 5:
                 result.trend_status = TrendStatus.STRONG_BEAR
-                result.ma_alignment = "强势空头排列，均线发散下行"
-                result.trend_strength = 10
             else:
                 result.trend_status = TrendStatus.BEAR
-                result.ma_alignment = "空头排列 MA5<MA10<MA20"
-                result.trend_strength = 25
                 
         elif ma5 < ma10 and ma10 >= ma20:
             result.trend_status = TrendStatus.WEAK_BEAR
-            result.ma_alignment = "弱势空头，MA5<MA10 但 MA10≥MA20"
-            result.trend_strength = 40
             
         else:
             result.trend_status = TrendStatus.CONSOLIDATION
-            result.ma_alignment = "均线缠绕，趋势不明"
-            result.trend_strength = 50
+
+        result.ma_alignment, result.trend_strength = self.TREND_DESCRIPTIONS[result.trend_status]
     
     def _calculate_bias(self, result: TrendAnalysisResult) -> None:
         """
@@ -428,20 +549,16 @@ class StockTrendAnalyzer:
         if result.volume_ratio_5d >= self.VOLUME_HEAVY_RATIO:
             if price_change > 0:
                 result.volume_status = VolumeStatus.HEAVY_VOLUME_UP
-                result.volume_trend = "放量上涨，多头力量强劲"
             else:
                 result.volume_status = VolumeStatus.HEAVY_VOLUME_DOWN
-                result.volume_trend = "放量下跌，注意风险"
         elif result.volume_ratio_5d <= self.VOLUME_SHRINK_RATIO:
             if price_change > 0:
                 result.volume_status = VolumeStatus.SHRINK_VOLUME_UP
-                result.volume_trend = "缩量上涨，上攻动能不足"
             else:
                 result.volume_status = VolumeStatus.SHRINK_VOLUME_DOWN
-                result.volume_trend = "缩量回调，洗盘特征明显（好）"
         else:
             result.volume_status = VolumeStatus.NORMAL
-            result.volume_trend = "量能正常"
+        result.volume_trend = self.VOLUME_TRENDS[result.volume_status]
     
     def _analyze_support_resistance(self, df: pd.DataFrame, result: TrendAnalysisResult) -> None:
         """
@@ -516,28 +633,21 @@ class StockTrendAnalyzer:
         # 判断 MACD 状态
         if is_golden_cross and curr_zero > 0:
             result.macd_status = MACDStatus.GOLDEN_CROSS_ZERO
-            result.macd_signal = "⭐ 零轴上金叉，强烈买入信号！"
         elif is_crossing_up:
             result.macd_status = MACDStatus.CROSSING_UP
-            result.macd_signal = "⚡ DIF上穿零轴，趋势转强"
         elif is_golden_cross:
             result.macd_status = MACDStatus.GOLDEN_CROSS
-            result.macd_signal = "✅ 金叉，趋势向上"
         elif is_death_cross:
             result.macd_status = MACDStatus.DEATH_CROSS
-            result.macd_signal = "❌ 死叉，趋势向下"
         elif is_crossing_down:
             result.macd_status = MACDStatus.CROSSING_DOWN
-            result.macd_signal = "⚠️ DIF下穿零轴，趋势转弱"
         elif result.macd_dif > 0 and result.macd_dea > 0:
             result.macd_status = MACDStatus.BULLISH
-            result.macd_signal = "✓ 多头排列，持续上涨"
         elif result.macd_dif < 0 and result.macd_dea < 0:
             result.macd_status = MACDStatus.BEARISH
-            result.macd_signal = "⚠ 空头排列，持续下跌"
         else:
             result.macd_status = MACDStatus.BULLISH
-            result.macd_signal = " MACD 中性区域"
+        result.macd_signal = self._macd_signal_text(result)
 
     def _analyze_rsi(self, df: pd.DataFrame, result: TrendAnalysisResult) -> None:
         """
@@ -565,19 +675,21 @@ class StockTrendAnalyzer:
         # 判断 RSI 状态
         if rsi_mid > self.RSI_OVERBOUGHT:
             result.rsi_status = RSIStatus.OVERBOUGHT
-            result.rsi_signal = f"⚠️ RSI超买({rsi_mid:.1f}>70)，短期回调风险高"
         elif rsi_mid > 60:
             result.rsi_status = RSIStatus.STRONG_BUY
-            result.rsi_signal = f"✅ RSI强势({rsi_mid:.1f})，多头力量充足"
         elif rsi_mid >= 40:
             result.rsi_status = RSIStatus.NEUTRAL
-            result.rsi_signal = f" RSI中性({rsi_mid:.1f})，震荡整理中"
         elif rsi_mid >= self.RSI_OVERSOLD:
             result.rsi_status = RSIStatus.WEAK
-            result.rsi_signal = f"⚡ RSI弱势({rsi_mid:.1f})，关注反弹"
         else:
             result.rsi_status = RSIStatus.OVERSOLD
-            result.rsi_signal = f"⭐ RSI超卖({rsi_mid:.1f}<30)，反弹机会大"
+        result.rsi_signal = self.RSI_SIGNALS[result.rsi_status].format(rsi_mid)
+
+    def _macd_signal_text(self, result: TrendAnalysisResult) -> str:
+        """MACD 信号描述（多头状态下 DIF/DEA 未同时为正时为中性区域）"""
+        if result.macd_status == MACDStatus.BULLISH and not (result.macd_dif > 0 and result.macd_dea > 0):
+            return self.MACD_NEUTRAL_SIGNAL
+        return self.MACD_SIGNALS[result.macd_status]
 
     def _generate_signal(self, result: TrendAnalysisResult) -> None:
         """
@@ -596,16 +708,7 @@ class StockTrendAnalyzer:
         risks = []
 
         # === 趋势评分（30分）===
-        trend_scores = {
-            TrendStatus.STRONG_BULL: 30,
-            TrendStatus.BULL: 26,
-            TrendStatus.WEAK_BULL: 18,
-            TrendStatus.CONSOLIDATION: 12,
-            TrendStatus.WEAK_BEAR: 8,
-            TrendStatus.BEAR: 4,
-            TrendStatus.STRONG_BEAR: 0,
-        }
-        trend_score = trend_scores.get(result.trend_status, 12)
+        trend_score = self.TREND_SCORES.get(result.trend_status, 12)
         score += trend_score
 
         if result.trend_status in [TrendStatus.STRONG_BULL, TrendStatus.BULL]:
@@ -637,14 +740,7 @@ class StockTrendAnalyzer:
             risks.append(f"❌ 乖离率过高({bias:.1f}%>5%)，严禁追高！")
 
         # === 量能评分（15分）===
-        volume_scores = {
-            VolumeStatus.SHRINK_VOLUME_DOWN: 15,  # 缩量回调最佳
-            VolumeStatus.HEAVY_VOLUME_UP: 12,     # 放量上涨次之
-            VolumeStatus.NORMAL: 10,
-            VolumeStatus.SHRINK_VOLUME_UP: 6,     # 无量上涨较差
-            VolumeStatus.HEAVY_VOLUME_DOWN: 0,    # 放量下跌最差
-        }
-        vol_score = volume_scores.get(result.volume_status, 8)
+        vol_score = self.VOLUME_SCORES.get(result.volume_status, 8)
         score += vol_score
 
         if result.volume_status == VolumeStatus.SHRINK_VOLUME_DOWN:
@@ -661,16 +757,7 @@ class StockTrendAnalyzer:
             reasons.append("✅ MA10支撑有效")
 
         # === MACD 评分（15分）===
-        macd_scores = {
-            MACDStatus.GOLDEN_CROSS_ZERO: 15,  # 零轴上金叉最强
-            MACDStatus.GOLDEN_CROSS: 12,      # 金叉
-            MACDStatus.CROSSING_UP: 10,       # 上穿零轴
-            MACDStatus.BULLISH: 8,            # 多头
-            MACDStatus.BEARISH: 2,            # 空头
-            MACDStatus.CROSSING_DOWN: 0,       # 下穿零轴
-            MACDStatus.DEATH_CROSS: 0,        # 死叉
-        }
-        macd_score = macd_scores.get(result.macd_status, 5)
+        macd_score = self.MACD_SCORES.get(result.macd_status, 5)
         score += macd_score
 
         if result.macd_status in [MACDStatus.GOLDEN_CROSS_ZERO, MACDStatus.GOLDEN_CROSS]:
@@ -681,14 +768,7 @@ class StockTrendAnalyzer:
             reasons.append(result.macd_signal)
 
         # === RSI 评分（10分）===
-        rsi_scores = {
-            RSIStatus.OVERSOLD: 10,       # 超卖最佳
-            RSIStatus.STRONG_BUY: 8,     # 强势
-            RSIStatus.NEUTRAL: 5,        # 中性
-            RSIStatus.WEAK: 3,            # 弱势
-            RSIStatus.OVERBOUGHT: 0,       # 超买最差
-        }
-        rsi_score = rsi_scores.get(result.rsi_status, 5)
+        rsi_score = self.RSI_SCORES.get(result.rsi_status, 5)
         score += rsi_score
 
         if result.rsi_status in [RSIStatus.OVERSOLD, RSIStatus.STRONG_BUY]:
@@ -704,19 +784,469 @@ class StockTrendAnalyzer:
         result.risk_factors = risks
 
         # 生成买入信号（调整阈值以适应新的100分制）
-        if score >= 75 and result.trend_status in [TrendStatus.STRONG_BULL, TrendStatus.BULL]:
+        if score >= self.STRONG_BUY_SCORE and result.trend_status in [TrendStatus.STRONG_BULL, TrendStatus.BULL]:
             result.buy_signal = BuySignal.STRONG_BUY
-        elif score >= 60 and result.trend_status in [TrendStatus.STRONG_BULL, TrendStatus.BULL, TrendStatus.WEAK_BULL]:
+        elif score >= self.BUY_SCORE and result.trend_status in [TrendStatus.STRONG_BULL, TrendStatus.BULL, TrendStatus.WEAK_BULL]:
             result.buy_signal = BuySignal.BUY
-        elif score >= 45:
+        elif score >= self.HOLD_SCORE:
             result.buy_signal = BuySignal.HOLD
-        elif score >= 30:
+        elif score >= self.WAIT_SCORE:
             result.buy_signal = BuySignal.WAIT
         elif result.trend_status in [TrendStatus.BEAR, TrendStatus.STRONG_BEAR]:
             result.buy_signal = BuySignal.STRONG_SELL
         else:
             result.buy_signal = BuySignal.SELL
     
+    # === 面板批量分析 ===
+
+    PANEL_FIELDS = ('close', 'high', 'volume')
+
+    @staticmethod
+    def build_panel(frames: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        """
+        将多只股票的日线拼成 (date × code) 面板
+
+        Args:
+            frames: {股票代码: 包含 date/close/high/volume 的日线 DataFrame}
+
+        Returns:
+            以 date 为索引、(字段, 代码) 两级列的 DataFrame
+        """
+        parts = {
+            code: df[['date', *StockTrendAnalyzer.PANEL_FIELDS]]
+            for code, df in frames.items()
+            if df is not None and not df.empty
+        }
+        if not parts:
+            return pd.DataFrame(columns=pd.MultiIndex.from_product([StockTrendAnalyzer.PANEL_FIELDS, []]))
+        long = pd.concat(parts, names=['code', None]).reset_index(level=0)
+        return long.pivot(index='date', columns='code', values=list(StockTrendAnalyzer.PANEL_FIELDS)).sort_index()
+
+    def analyze_panel(self, panel) -> pd.DataFrame:
+        """
+        面板模式：对全部股票同时计算趋势分析（结果与逐只 analyze() 一致）
+
+        每只股票的有效 K 线（close 非空）先按时间右对齐，使停牌、上市晚的股票
+        与单股路径看到完全相同的序列；均线、MACD、RSI 按列整体计算，
+        状态判断与评分均为数组运算。
+
+        Args:
+            panel: build_panel() 的结果，或 {'close'/'high'/'volume': (date × code) DataFrame}
+
+        Returns:
+            以 code 为索引的 DataFrame，列为 TrendAnalysisResult 的标量字段
+            （枚举字段为其中文值），另含 bars（有效 K 线数）与 resistance（近 20 日高点压力位）
+        """
+        close, high, volume = self._panel_arrays(panel)
+        codes = close.columns
+        bars = close.notna().to_numpy().sum(axis=0)
+
+        out = self._empty_panel_result(codes, bars)
+        if len(close) < 20 or not (bars >= 20).any():
+            return out
+
+        close_a, high_a, volume_a, _ = self._align_panel(close, high, volume)
+        latest = {name: values[-1] for name, values in self._panel_signals(close_a, volume_a, last_only=True).items()}
+
+        # 压力位：近 20 日高点（不参与评分，只在最新一根 K 线上计算）
+        price = latest['current_price']
+        recent_high = high_a.to_numpy()[-20:].max(axis=0)
+        resistance = np.where(recent_high > price, recent_high, np.nan)
+
+        trend = latest['trend_status']
+        computed = pd.DataFrame({
+            'current_price': price,
+            'ma5': latest['ma5'],
+            'ma10': latest['ma10'],
+            'ma20': latest['ma20'],
+            'ma60': latest['ma60'],
+            'trend_status': _enum_values(TrendStatus)[trend],
+            'trend_strength': np.array([float(self.TREND_DESCRIPTIONS[s][1]) for s in TrendStatus])[trend],
+            'bias_ma5': latest['bias_ma5'],
+            'bias_ma10': latest['bias_ma10'],
+            'bias_ma20': latest['bias_ma20'],
+            'volume_status': _enum_values(VolumeStatus)[latest['volume_status']],
+            'volume_ratio_5d': latest['volume_ratio_5d'],
+            'support_ma5': latest['support_ma5'],
+            'support_ma10': latest['support_ma10'],
+            'resistance': resistance,
+            'macd_dif': latest['macd_dif'],
+            'macd_dea': latest['macd_dea'],
+            'macd_bar': latest['macd_bar'],
+            'macd_status': _enum_values(MACDStatus)[latest['macd_status']],
+            'rsi_6': latest['rsi_6'],
+            'rsi_12': latest['rsi_12'],
+            'rsi_24': latest['rsi_24'],
+            'rsi_status': _enum_values(RSIStatus)[latest['rsi_status']],
+            'signal_score': latest['signal_score'],
+            'buy_signal': _enum_values(BuySignal)[latest['buy_signal']],
+        }, index=codes)
+        ok = bars >= 20
+        out.loc[ok, computed.columns] = computed[ok]
+        return out
+
+    def score_history(self, panel) -> pd.DataFrame:
+        """
+        历史评分：计算面板中每个 (date, code) 当日收盘后的综合评分与买入信号
+
+        每个位置的结果与把该股截至当日的日线交给 analyze() 完全一致
+        （均线/EMA/RSI 都只依赖历史数据），供回测批量使用。
+
+        Args:
+            panel: 同 analyze_panel()
+
+        Returns:
+            与输入同索引、(字段, 代码) 两级列的 DataFrame，字段为
+            signal_score（float，停牌或有效 K 线不足 20 根时为 NaN）、
+            buy_signal / trend_status（中文值，无评分时为 None）
+        """
+        close, high, volume = self._panel_arrays(panel)
+        valid = close.notna().to_numpy()
+        shape = valid.shape
+        empty = {
+            'signal_score': np.full(shape, np.nan),
+            'buy_signal': np.full(shape, None, dtype=object),
+            'trend_status': np.full(shape, None, dtype=object),
+        }
+
+        if shape[0] >= 20 and (valid.sum(axis=0) >= 20).any():
+            close_a, _, volume_a, order = self._align_panel(close, high, volume)
+            signals = self._panel_signals(close_a, volume_a, last_only=False)
+
+            # 还原到原始日期位置
+            def restore(values: np.ndarray) -> np.ndarray:
+                restored = np.empty_like(values)
+                np.put_along_axis(restored, order, values, axis=0)
+                return restored
+
+            scored = valid & (restore(signals['bars']) >= 20)
+            empty['signal_score'][scored] = restore(signals['signal_score'])[scored]
+            empty['buy_signal'][scored] = _enum_values(BuySignal)[restore(signals['buy_signal'])][scored]
+            empty['trend_status'][scored] = _enum_values(TrendStatus)[restore(signals['trend_status'])][scored]
+
+        return pd.concat(
+            {name: pd.DataFrame(values, index=close.index, columns=close.columns) for name, values in empty.items()},
+            axis=1,
+        )
+
+    @staticmethod
+    def _align_panel(
+        close: pd.DataFrame, high: pd.DataFrame, volume: pd.DataFrame
+    ) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, np.ndarray]:
+        """
+        有效 K 线右对齐：每列最后一行即该股最新一根 K 线，停牌日被压缩到顶部
+
+        Returns:
+            (close, high, volume, order)，order[i, j] 为对齐后第 i 行在原面板中的行号
+        """
+        order = np.argsort(close.notna().to_numpy(), axis=0, kind='stable')
+        aligned = lambda frame: pd.DataFrame(np.take_along_axis(frame.to_numpy(dtype=float), order, axis=0))
+        return aligned(close), aligned(high), aligned(volume), order
+
+    def _panel_signals(self, close_a: pd.DataFrame, volume_a: pd.DataFrame, last_only: bool) -> Dict[str, np.ndarray]:
+        """
+        在右对齐的面板上计算指标、状态与评分
+
+        Args:
+            close_a: 右对齐的收盘价宽表
+            volume_a: 右对齐的成交量宽表
+            last_only: True 只计算最后一行（analyze_panel），False 计算每一行（score_history）
+
+        Returns:
+            {字段: 数组}，形状为 (1 或 行数, 股票数)；状态字段为对应枚举的序号，
+            bars 为截至该行的有效 K 线数
+        """
+        def at(values, lag: int = 0) -> np.ndarray:
+            """取各行（或最后一行）往前第 lag 根 K 线的值"""
+            values = np.asarray(values)
+            if last_only:
+                return values[len(values) - 1 - lag:len(values) - lag]
+            if lag == 0:
+                return values
+            shifted = np.full(values.shape, np.nan)
+            shifted[lag:] = values[:-lag]
+            return shifted
+
+        valid_a = close_a.notna()
+        bars = at(valid_a.to_numpy().cumsum(axis=0))
+        close_v = close_a.to_numpy()
+        volume_v = volume_a.to_numpy()
+
+        ma5 = close_a.rolling(window=5).mean().to_numpy()
+        ma10 = close_a.rolling(window=10).mean().to_numpy()
+        ma20 = close_a.rolling(window=20).mean().to_numpy()
+        ma60 = close_a.rolling(window=60).mean().to_numpy()
+
+        price = at(close_v)
+        m5, m10, m20 = at(ma5), at(ma10), at(ma20)
+        m60 = np.where(bars >= 60, at(ma60), m20)
+
+        # 1. 趋势判断
+        p5, p20 = at(ma5, 4), at(ma20, 4)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            bull_prev = np.where(p20 > 0, (p5 - p20) / p20 * 100, 0)
+            bull_curr = np.where(m20 > 0, (m5 - m20) / m20 * 100, 0)
+            bear_prev = np.where(p5 > 0, (p20 - p5) / p5 * 100, 0)
+            bear_curr = np.where(m5 > 0, (m20 - m5) / m5 * 100, 0)
+        bull = (m5 > m10) & (m10 > m20)
+        bear = (m5 < m10) & (m10 < m20)
+        trend = _select(
+            [
+                bull & (bull_curr > bull_prev) & (bull_curr > 5),
+                bull,
+                (m5 > m10) & (m10 <= m20),
+                bear & (bear_curr > bear_prev) & (bear_curr > 5),
+                bear,
+                (m5 < m10) & (m10 >= m20),
+            ],
+            [
+                TrendStatus.STRONG_BULL, TrendStatus.BULL, TrendStatus.WEAK_BULL,
+                TrendStatus.STRONG_BEAR, TrendStatus.BEAR, TrendStatus.WEAK_BEAR,
+            ],
+            default=TrendStatus.CONSOLIDATION,
+        )
+
+        # 2. 乖离率
+        with np.errstate(divide='ignore', invalid='ignore'):
+            bias5 = np.where(m5 > 0, (price - m5) / m5 * 100, 0.0)
+            bias10 = np.where(m10 > 0, (price - m10) / m10 * 100, 0.0)
+            bias20 = np.where(m20 > 0, (price - m20) / m20 * 100, 0.0)
+
+        # 3. 量能（前 5 日均量按时间顺序累加，与单股路径的 mean() 逐位一致）
+        vol_5d_avg = sum(at(volume_v, lag) for lag in range(5, 0, -1)) / 5
+        prev_close = at(close_v, 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            volume_ratio = np.where(vol_5d_avg > 0, at(volume_v) / vol_5d_avg, 0.0)
+            price_change = (price - prev_close) / prev_close * 100
+        rising = price_change > 0
+        heavy = volume_ratio >= self.VOLUME_HEAVY_RATIO
+        shrink = volume_ratio <= self.VOLUME_SHRINK_RATIO
+        volume_status = _select(
+            [heavy & rising, heavy, shrink & rising, shrink],
+            [
+                VolumeStatus.HEAVY_VOLUME_UP, VolumeStatus.HEAVY_VOLUME_DOWN,
+                VolumeStatus.SHRINK_VOLUME_UP, VolumeStatus.SHRINK_VOLUME_DOWN,
+            ],
+            default=VolumeStatus.NORMAL,
+        )
+
+        # 4. 均线支撑
+        with np.errstate(divide='ignore', invalid='ignore'):
+            support5 = (m5 > 0) & (np.abs(price - m5) / m5 <= self.MA_SUPPORT_TOLERANCE) & (price >= m5)
+            support10 = (m10 > 0) & (np.abs(price - m10) / m10 <= self.MA_SUPPORT_TOLERANCE) & (price >= m10)
+
+        # 5. MACD
+        ema_fast = close_a.ewm(span=self.MACD_FAST, adjust=False).mean()
+        ema_slow = close_a.ewm(span=self.MACD_SLOW, adjust=False).mean()
+        dif_frame = (ema_fast - ema_slow).to_numpy()
+        dea_frame = pd.DataFrame(dif_frame).ewm(span=self.MACD_SIGNAL, adjust=False).mean().to_numpy()
+        macd_ok = bars >= self.MACD_SLOW
+        dif = np.where(macd_ok, at(dif_frame), 0.0)
+        dea = np.where(macd_ok, at(dea_frame), 0.0)
+        macd_bar = np.where(macd_ok, (at(dif_frame) - at(dea_frame)) * 2, 0.0)
+        prev_dif = at(dif_frame, 1)
+        prev_dd = prev_dif - at(dea_frame, 1)
+        curr_dd = dif - dea
+        golden = (prev_dd <= 0) & (curr_dd > 0)
+        macd_status = _select(
+            [
+                ~macd_ok,
+                golden & (dif > 0),
+                (prev_dif <= 0) & (dif > 0),
+                golden,
+                (prev_dd >= 0) & (curr_dd < 0),
+                (prev_dif >= 0) & (dif < 0),
+                (dif > 0) & (dea > 0),
+                (dif < 0) & (dea < 0),
+            ],
+            [
+                MACDStatus.BULLISH,
+                MACDStatus.GOLDEN_CROSS_ZERO, MACDStatus.CROSSING_UP, MACDStatus.GOLDEN_CROSS,
+                MACDStatus.DEATH_CROSS, MACDStatus.CROSSING_DOWN,
+                MACDStatus.BULLISH, MACDStatus.BEARISH,
+            ],
+            default=MACDStatus.BULLISH,
+        )
+
+        # 6. RSI（停牌前的补齐行不计入滚动窗口）
+        delta = close_a.diff()
+        gain = delta.where(delta > 0, 0).where(valid_a)
+        loss = (-delta.where(delta < 0, 0)).where(valid_a)
+        rsi_ok = bars >= self.RSI_LONG
+        rsi = {}
+        for period in [self.RSI_SHORT, self.RSI_MID, self.RSI_LONG]:
+            rs = gain.rolling(window=period).mean() / loss.rolling(window=period).mean()
+            rsi[period] = np.where(rsi_ok, at((100 - (100 / (1 + rs))).fillna(50)), 0.0)
+        rsi_mid = rsi[self.RSI_MID]
+        rsi_status = _select(
+            [
+                ~rsi_ok,
+                rsi_mid > self.RSI_OVERBOUGHT,
+                rsi_mid > 60,
+                rsi_mid >= 40,
+                rsi_mid >= self.RSI_OVERSOLD,
+            ],
+            [RSIStatus.NEUTRAL, RSIStatus.OVERBOUGHT, RSIStatus.STRONG_BUY, RSIStatus.NEUTRAL, RSIStatus.WEAK],
+            default=RSIStatus.OVERSOLD,
+        )
+
+        # 7. 综合评分与买入信号
+        lookup = lambda table, enum_cls, statuses: np.array([table[s] for s in enum_cls], dtype=int)[statuses]
+        bias_score = np.select(
+            [bias5 < 0, bias5 < 2, bias5 < self.BIAS_THRESHOLD],
+            [np.select([bias5 > -3, bias5 > -5], [20, 16], default=8), 18, 14],
+            default=4,
+        )
+        score = (
+            lookup(self.TREND_SCORES, TrendStatus, trend)
+            + bias_score
+            + lookup(self.VOLUME_SCORES, VolumeStatus, volume_status)
+            + support5 * 5 + support10 * 5
+            + lookup(self.MACD_SCORES, MACDStatus, macd_status)
+            + lookup(self.RSI_SCORES, RSIStatus, rsi_status)
+        )
+        trend_index = _enum_index(TrendStatus)
+        strong_trend = np.isin(trend, [trend_index[TrendStatus.STRONG_BULL], trend_index[TrendStatus.BULL]])
+        buy_signal = _select(
+            [
+                (score >= self.STRONG_BUY_SCORE) & strong_trend,
+                (score >= self.BUY_SCORE) & (strong_trend | (trend == trend_index[TrendStatus.WEAK_BULL])),
+                score >= self.HOLD_SCORE,
+                score >= self.WAIT_SCORE,
+                np.isin(trend, [trend_index[TrendStatus.BEAR], trend_index[TrendStatus.STRONG_BEAR]]),
+            ],
+            [BuySignal.STRONG_BUY, BuySignal.BUY, BuySignal.HOLD, BuySignal.WAIT, BuySignal.STRONG_SELL],
+            default=BuySignal.SELL,
+        )
+
+        return {
+            'bars': bars,
+            'current_price': price,
+            'ma5': m5,
+            'ma10': m10,
+            'ma20': m20,
+            'ma60': m60,
+            'trend_status': trend,
+            'bias_ma5': bias5,
+            'bias_ma10': bias10,
+            'bias_ma20': bias20,
+            'volume_status': volume_status,
+            'volume_ratio_5d': volume_ratio,
+            'support_ma5': support5,
+            'support_ma10': support10,
+            'macd_dif': dif,
+            'macd_dea': dea,
+            'macd_bar': macd_bar,
+            'macd_status': macd_status,
+            'rsi_6': rsi[self.RSI_SHORT],
+            'rsi_12': rsi[self.RSI_MID],
+            'rsi_24': rsi[self.RSI_LONG],
+            'rsi_status': rsi_status,
+            'signal_score': score,
+            'buy_signal': buy_signal,
+        }
+
+    def results_from_panel(self, panel_result: pd.DataFrame) -> Dict[str, TrendAnalysisResult]:
+        """
+        将 analyze_panel() 的结果还原为完整的 TrendAnalysisResult（含描述文本与理由）
+
+        Args:
+            panel_result: analyze_panel() 返回的 DataFrame
+
+        Returns:
+            {股票代码: TrendAnalysisResult}
+        """
+        results: Dict[str, TrendAnalysisResult] = {}
+        for code, row in panel_result.iterrows():
+            result = TrendAnalysisResult(code=code)
+            results[code] = result
+            bars = int(row['bars'])
+            if bars < 20:
+                result.risk_factors.append("数据不足，无法完成分析")
+                continue
+
+            for name in ('current_price', 'ma5', 'ma10', 'ma20', 'ma60', 'bias_ma5', 'bias_ma10', 'bias_ma20',
+                         'volume_ratio_5d', 'macd_dif', 'macd_dea', 'macd_bar', 'rsi_6', 'rsi_12', 'rsi_24'):
+                setattr(result, name, float(row[name]))
+            result.trend_status = TrendStatus(row['trend_status'])
+            result.ma_alignment, result.trend_strength = self.TREND_DESCRIPTIONS[result.trend_status]
+            result.volume_status = VolumeStatus(row['volume_status'])
+            result.volume_trend = self.VOLUME_TRENDS[result.volume_status]
+
+            result.support_ma5 = bool(row['support_ma5'])
+            result.support_ma10 = bool(row['support_ma10'])
+            if result.support_ma5:
+                result.support_levels.append(result.ma5)
+            if result.support_ma10 and result.ma10 not in result.support_levels:
+                result.support_levels.append(result.ma10)
+            if result.ma20 > 0 and result.current_price >= result.ma20:
+                result.support_levels.append(result.ma20)
+            if not pd.isna(row['resistance']):
+                result.resistance_levels.append(float(row['resistance']))
+
+            result.macd_status = MACDStatus(row['macd_status'])
+            result.macd_signal = (
+                self._macd_signal_text(result) if bars >= self.MACD_SLOW else "数据不足"
+            )
+            result.rsi_status = RSIStatus(row['rsi_status'])
+            result.rsi_signal = (
+                self.RSI_SIGNALS[result.rsi_status].format(result.rsi_12) if bars >= self.RSI_LONG else "数据不足"
+            )
+
+            # 评分与买卖信号已在面板中算出，这里只补齐理由与风险描述
+            self._generate_signal(result)
+        return results
+
+    def _panel_arrays(self, panel) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """取出按日期排序、列对齐的 close/high/volume 宽表"""
+        if isinstance(panel, pd.DataFrame):
+            if not isinstance(panel.columns, pd.MultiIndex):
+                raise ValueError("面板需为 (字段, 代码) 两级列的 DataFrame，可用 build_panel() 构建")
+            fields = {name: panel[name] for name in panel.columns.get_level_values(0).unique()}
+        else:
+            fields = dict(panel)
+        missing = [name for name in self.PANEL_FIELDS if name not in fields]
+        if missing:
+            raise ValueError(f"面板缺少字段: {', '.join(missing)}")
+
+        close = fields['close'].sort_index()
+        high = fields['high'].reindex(index=close.index, columns=close.columns)
+        volume = fields['volume'].reindex(index=close.index, columns=close.columns)
+        return close, high, volume
+
+    @staticmethod
+    def _empty_panel_result(codes: pd.Index, bars: np.ndarray) -> pd.DataFrame:
+        """数据不足时的默认结果（与 TrendAnalysisResult 默认值一致）"""
+        count = len(codes)
+        return pd.DataFrame({
+            'bars': bars.astype(int),
+            'current_price': np.zeros(count),
+            'ma5': np.zeros(count),
+            'ma10': np.zeros(count),
+            'ma20': np.zeros(count),
+            'ma60': np.zeros(count),
+            'trend_status': TrendStatus.CONSOLIDATION.value,
+            'trend_strength': np.zeros(count),
+            'bias_ma5': np.zeros(count),
+            'bias_ma10': np.zeros(count),
+            'bias_ma20': np.zeros(count),
+            'volume_status': VolumeStatus.NORMAL.value,
+            'volume_ratio_5d': np.zeros(count),
+            'support_ma5': np.zeros(count, dtype=bool),
+            'support_ma10': np.zeros(count, dtype=bool),
+            'resistance': np.full(count, np.nan),
+            'macd_dif': np.zeros(count),
+            'macd_dea': np.zeros(count),
+            'macd_bar': np.zeros(count),
+            'macd_status': MACDStatus.BULLISH.value,
+            'rsi_6': np.zeros(count),
+            'rsi_12': np.zeros(count),
+            'rsi_24': np.zeros(count),
+            'rsi_status': RSIStatus.NEUTRAL.value,
+            'signal_score': np.zeros(count, dtype=int),
+            'buy_signal': BuySignal.WAIT.value,
+        }, index=pd.Index(codes, name='code'))
+    
     def format_analysis(self, result: TrendAnalysisResult) -> str:
         """
         格式化分析结果为文本
@@ -16,8 +16,11 @@ import hashlib
 import json
 import logging
 import re
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, date, timedelta
-from typing import Optional, List, Dict, Any, TYPE_CHECKING
+from typing import Optional, List, Dict, Any, Hashable, Tuple, TYPE_CHECKING
 from pathlib import Path
 
 import pandas as pd
@@ -29,6 +32,7 @@ from sqlalchemy import (
     Date,
     DateTime,
     Integer,
+    Boolean,
     Index,
     UniqueConstraint,
     Text,
@@ -36,6 +40,7 @@ from sqlalchemy import (
     and_,
     desc,
 )
+from sqlalchemy.engine import Connection
 from sqlalchemy.orm import (
     declarative_base,
     sessionmaker,
@@ -44,6 +49,7 @@ from sqlalchemy.orm import (
 from sqlalchemy.exc import IntegrityError
 
 from src.config import get_config
+from src.tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -239,6 +245,163 @@ class AnalysisHistory(Base):
         }
 
 
+class RunJournal(Base):
+    """
+    运行日志模型（断点续跑）
+
+    按 query_id 记录每只股票在一次批量运行中各阶段的完成情况，
+    运行中断后可通过 --resume 只处理未完成的股票，并跳过其已完成的阶段
+    （数据获取、情报搜索；情报搜索结果随 intel_done 一起保存）。
+    """
+    __tablename__ = 'run_journal'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    query_id = Column(String(64), nullable=False, index=True)
+    run_date = Column(Date, nullable=False, index=True)
+    code = Column(String(10), nullable=False)
+
+    # 阶段完成标记
+    data_done = Column(Boolean, default=False)
+    intel_done = Column(Boolean, default=False)
+    llm_done = Column(Boolean, default=False)
+    notified = Column(Boolean, default=False)
+
+    # 情报搜索结果（断点续跑时复用，避免重复付费搜索）
+    news_context = Column(Text)
+
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    __table_args__ = (
+        UniqueConstraint('query_id', 'code', name='uix_journal_query_code'),
+    )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'query_id': self.query_id,
+            'run_date': self.run_date.isoformat() if self.run_date else None,
+            'code': self.code,
+            'data_done': bool(self.data_done),
+            'intel_done': bool(self.intel_done),
+            'llm_done': bool(self.llm_done),
+            'notified': bool(self.notified),
+            'news_context': self.news_context,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+
+class TrendCacheEntry(Base):
+    """
+    趋势分析结果缓存模型
+
+    以 (代码, 最新 K 线日期, 分析器参数哈希) 为键保存 TrendAnalysisResult，
+    同一股票当日被定时任务/Web/Bot 多次分析时直接复用。
+    保存日线时删除该代码在写入日期及之后的条目。
+    """
+    __tablename__ = 'trend_cache'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    code = Column(String(10), nullable=False)
+    bar_date = Column(Date, nullable=False)
+    params_hash = Column(String(16), nullable=False)
+    result_json = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.now)
+
+    __table_args__ = (
+        UniqueConstraint('code', 'bar_date', 'params_hash', name='uix_trend_cache_key'),
+    )
+
+
+class LLMResponseCache(Base):
+    """
+    LLM 响应缓存模型（内容寻址）
+
+    以 (模型, 系统提示词, 提示词, 生成参数) 的哈希为键保存响应文本，
+    同一天重跑任务时相同的请求不再重复调用 API。
+    """
+    __tablename__ = 'llm_response_cache'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    cache_key = Column(String(64), nullable=False, unique=True)
+    model = Column(String(100))
+    response = Column(Text, nullable=False)
+    hits = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.now, index=True)
+
+
+class LookupCache:
+    """
+    热点查询缓存（LRU + TTL，线程安全）
+
+    用于 has_today_data / get_latest_data 等同一轮运行内被反复调用的查询。
+    键的第二个元素约定为股票代码，便于按代码精确失效。
+
+    缓存是进程内的：本进程的写入会立即失效对应条目，其他进程（如定时任务与 Web 服务）
+    的写入要等条目过期后才可见。因此“无数据”这类否定结果不缓存，避免别的进程写入后仍被误判。
+    """
+
+    def __init__(self, max_size: int = 2048, ttl: float = 300.0):
+        self.max_size = max(0, int(max_size))
+        self.ttl = float(ttl)
+        self._data: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl > 0
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """返回 (是否命中, 值)"""
+        if not self.enabled:
+            return False, None
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._data[key]
+            self.misses += 1
+            return False, None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, predicate) -> int:
+        """删除满足 predicate(key) 的条目，返回删除数量"""
+        with self._lock:
+            keys = [k for k in self._data if predicate(k)]
+            for k in keys:
+                del self._data[k]
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            }
+
+
 class DatabaseManager:
     """
     数据库管理器 - 单例模式
@@ -289,6 +452,13 @@ class DatabaseManager:
         # 创建所有表
         Base.metadata.create_all(self._engine)
 
+        # 热点查询缓存（has_today_data / get_latest_data）
+        config = get_config()
+        self._lookup_cache = LookupCache(
+            max_size=getattr(config, 'db_cache_size', 2048),
+            ttl=getattr(config, 'db_cache_ttl', 300),
+        )
+
         self._initialized = True
         logger.info(f"数据库初始化完成: {db_url}")
 
@@ -341,6 +511,16 @@ class DatabaseManager:
         except Exception:
             session.close()
             raise
+
+    def get_connection(self) -> Connection:
+        """
+        获取数据库连接（Core 层批量只读查询，跳过 ORM 开销）
+
+        使用示例:
+            with db.get_connection() as conn:
+                df = pd.read_sql_query(stmt, conn)
+        """
+        return self._engine.connect()
     
     def has_today_data(self, code: str, target_date: Optional[date] = None) -> bool:
         """
@@ -357,10 +537,15 @@ class DatabaseManager:
         """
         if target_date is None:
             target_date = date.today()
+
+        cache_key = ('has_data', code, target_date)
+        hit, cached = self._lookup_cache.get(cache_key)
+        if hit:
+            return cached
         
         with self.get_session() as session:
             result = session.execute(
-                select(StockDaily).where(
+                select(StockDaily.id).where(
                     and_(
                         StockDaily.code == code,
                         StockDaily.date == target_date
@@ -368,7 +553,11 @@ class DatabaseManager:
                 )
             ).scalar_one_or_none()
             
-            return result is not None
+        exists = result is not None
+        if exists:
+            # 只缓存 True：其他进程随时可能写入该日数据
+            self._lookup_cache.set(cache_key, exists)
+        return exists
     
     def get_latest_data(
         self, 
@@ -387,6 +576,11 @@ class DatabaseManager:
         Returns:
             StockDaily 对象列表（按日期降序）
         """
+        cache_key = ('latest', code, days)
+        hit, cached = self._lookup_cache.get(cache_key)
+        if hit:
+            return list(cached)
+
         with self.get_session() as session:
             results = session.execute(
                 select(StockDaily)
@@ -395,8 +589,150 @@ class DatabaseManager:
                 .limit(days)
             ).scalars().all()
             
-            return list(results)
+        results = list(results)
+        if results:
+            self._lookup_cache.set(cache_key, tuple(results))
+        return results
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """获取热点查询缓存统计（命中/未命中次数等）"""
+        return self._lookup_cache.stats()
+
+    def clear_cache(self) -> None:
+        """清空热点查询缓存"""
+        self._lookup_cache.clear()
+
+    def _invalidate_code_cache(self, code: str, saved_dates: List[date]) -> None:
+        """
+        保存日线后按代码精确失效缓存
+
+        - get_latest_data 的结果依赖该代码全部日期，直接失效
+        - has_today_data 只会因本次写入的日期从 False 变为 True，
+          写入的日期直接置为 True，其余日期的缓存仍然有效
+        """
+        self._lookup_cache.invalidate(lambda key: key[0] in ('latest', 'trend') and key[1] == code)
+        for saved_date in saved_dates:
+            self._lookup_cache.set(('has_data', code, saved_date), True)
+
+    def get_trend_cache(self, code: str, bar_date: date, params_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        读取趋势分析结果缓存
+
+        Args:
+            code: 股票代码
+            bar_date: 最新 K 线日期
+            params_hash: 分析器参数哈希
+
+        Returns:
+            TrendAnalysisResult.to_dict() 形式的字典，未命中返回 None
+        """
+        cache_key = ('trend', code, bar_date, params_hash)
+        hit, cached = self._lookup_cache.get(cache_key)
+        if hit:
+            return json.loads(cached)
+
+        with self.get_session() as session:
+            result_json = session.execute(
+                select(TrendCacheEntry.result_json).where(
+                    and_(
+                        TrendCacheEntry.code == code,
+                        TrendCacheEntry.bar_date == bar_date,
+                        TrendCacheEntry.params_hash == params_hash,
+                    )
+                )
+            ).scalar_one_or_none()
+
+        if result_json is None:
+            return None
+        self._lookup_cache.set(cache_key, result_json)
+        return json.loads(result_json)
+
+    def save_trend_cache(
+        self, code: str, bar_date: date, params_hash: str, result: Dict[str, Any]
+    ) -> None:
+        """
+        保存趋势分析结果缓存
+
+        同一代码、同一组参数只保留最新 K 线日期的一条，旧日期的条目一并删除。
+        """
+        result_json = self._safe_json_dumps(result)
+        with self.get_session() as session:
+            try:
+                session.query(TrendCacheEntry).filter(
+                    TrendCacheEntry.code == code,
+                    TrendCacheEntry.params_hash == params_hash,
+                ).delete(synchronize_session=False)
+                session.add(TrendCacheEntry(
+                    code=code,
+                    bar_date=bar_date,
+                    params_hash=params_hash,
+                    result_json=result_json,
+                ))
+                session.commit()
+            except IntegrityError:
+                # 并发写入同一键，保留先写入的结果
+                session.rollback()
+                return
+        self._lookup_cache.set(('trend', code, bar_date, params_hash), result_json)
+
+    def get_llm_response(self, cache_key: str, ttl: float) -> Optional[str]:
+        """
+        读取 LLM 响应缓存
+
+        Args:
+            cache_key: 请求内容哈希
+            ttl: 有效期（秒），过期条目视为未命中并删除
+
+        Returns:
+            响应文本，未命中返回 None
+        """
+        with self.get_session() as session:
+            entry = session.execute(
+                select(LLMResponseCache).where(LLMResponseCache.cache_key == cache_key)
+            ).scalar_one_or_none()
+            if entry is None:
+                return None
+            if entry.created_at is None or entry.created_at < datetime.now() - timedelta(seconds=ttl):
+                session.delete(entry)
+                session.commit()
+                return None
+            entry.hits = (entry.hits or 0) + 1
+            response = entry.response
+            session.commit()
+            return response
+
+    def save_llm_response(self, cache_key: str, model: str, response: str, max_entries: int) -> None:
+        """
+        保存 LLM 响应缓存，超过 max_entries 时按写入时间淘汰最旧的条目
+        """
+        with self.get_session() as session:
+            try:
+                entry = session.execute(
+                    select(LLMResponseCache).where(LLMResponseCache.cache_key == cache_key)
+                ).scalar_one_or_none()
+                if entry is None:
+                    session.add(LLMResponseCache(cache_key=cache_key, model=model, response=response))
+                else:
+                    entry.model = model
+                    entry.response = response
+                    entry.hits = 0
+                    entry.created_at = datetime.now()
+                session.flush()
+
+                total = session.query(LLMResponseCache.id).count()
+                if total > max_entries:
+                    stale_ids = select(LLMResponseCache.id).order_by(
+                        LLMResponseCache.created_at, LLMResponseCache.id
+                    ).limit(total - max_entries)
+                    session.query(LLMResponseCache).filter(
+                        LLMResponseCache.id.in_(stale_ids)
+                    ).delete(synchronize_session=False)
+                session.commit()
+            except IntegrityError:
+                # 并发写入同一请求，保留先写入的响应
+                session.rollback()
 
+    @traced("db.write", code_param='code', table='news_intel')
     def save_news_intel(
         self,
         code: str,
@@ -526,6 +862,7 @@ class DatabaseManager:
 
             return list(results)
 
+    @traced("db.write", table='analysis_history')
     def save_analysis_history(
         self,
         result: Any,
@@ -604,6 +941,112 @@ class DatabaseManager:
 
             return list(results)
     
+    # 运行日志可标记的阶段
+    RUN_STAGES = ('data_done', 'intel_done', 'llm_done', 'notified')
+
+    def mark_run_stage(
+        self,
+        query_id: str,
+        code: str,
+        stage: str,
+        run_date: Optional[date] = None,
+        news_context: Optional[str] = None
+    ) -> None:
+        """
+        标记某只股票在某次运行中完成了某个阶段
+
+        Args:
+            query_id: 运行 ID
+            code: 股票代码
+            stage: data_done / intel_done / llm_done / notified
+            run_date: 运行日期（默认今天）
+            news_context: 情报搜索结果（仅 intel_done 阶段保存）
+        """
+        if not query_id:
+            return
+        if stage not in self.RUN_STAGES:
+            raise ValueError(f"未知的运行阶段: {stage}")
+
+        with self.get_session() as session:
+            try:
+                entry = session.execute(
+                    select(RunJournal).where(
+                        and_(RunJournal.query_id == query_id, RunJournal.code == code)
+                    )
+                ).scalar_one_or_none()
+                if entry is None:
+                    entry = RunJournal(
+                        query_id=query_id,
+                        run_date=run_date or date.today(),
+                        code=code,
+                    )
+                    session.add(entry)
+                self._apply_run_stage(entry, stage, news_context)
+                entry.updated_at = datetime.now()
+                session.commit()
+            except IntegrityError:
+                # 并发插入同一条记录，重试一次更新
+                session.rollback()
+                entry = session.execute(
+                    select(RunJournal).where(
+                        and_(RunJournal.query_id == query_id, RunJournal.code == code)
+                    )
+                ).scalar_one()
+                self._apply_run_stage(entry, stage, news_context)
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                logger.warning(f"写入运行日志失败 {query_id}/{code}/{stage}: {e}")
+
+    @staticmethod
+    def _apply_run_stage(entry: RunJournal, stage: str, news_context: Optional[str]) -> None:
+        setattr(entry, stage, True)
+        if stage == 'intel_done':
+            entry.news_context = news_context
+
+    def get_run_journal(self, query_id: str) -> Dict[str, Dict[str, Any]]:
+        """获取某次运行的日志，{code: 阶段状态}"""
+        with self.get_session() as session:
+            entries = session.execute(
+                select(RunJournal).where(RunJournal.query_id == query_id)
+            ).scalars().all()
+            return {entry.code: entry.to_dict() for entry in entries}
+
+    def get_latest_run_query_id(self, run_date: Optional[date] = None) -> Optional[str]:
+        """获取指定日期（默认今天）最近一次运行的 query_id"""
+        with self.get_session() as session:
+            entry = session.execute(
+                select(RunJournal)
+                .where(RunJournal.run_date == (run_date or date.today()))
+                .order_by(desc(RunJournal.updated_at))
+                .limit(1)
+            ).scalar_one_or_none()
+            return entry.query_id if entry else None
+
+    def get_analysis_results(self, query_id: str) -> Dict[str, Dict[str, Any]]:
+        """
+        读取某次运行已保存的完整分析结果（raw_result）
+
+        Returns:
+            {code: 分析结果字典}，同一代码有多条时取最新一条
+        """
+        with self.get_session() as session:
+            records = session.execute(
+                select(AnalysisHistory)
+                .where(AnalysisHistory.query_id == query_id)
+                .order_by(AnalysisHistory.created_at)
+            ).scalars().all()
+
+            results: Dict[str, Dict[str, Any]] = {}
+            for record in records:
+                try:
+                    data = json.loads(record.raw_result) if record.raw_result else None
+                except (TypeError, ValueError):
+                    data = None
+                if isinstance(data, dict):
+                    results[record.code] = data
+            return results
+    
     def get_data_range(
         self, 
         code: str, 
@@ -635,7 +1078,43 @@ class DatabaseManager:
             ).scalars().all()
             
             return list(results)
-    
+
+    def get_daily_bars(
+        self,
+        start_date: date,
+        end_date: Optional[date] = None,
+        codes: Optional[List[str]] = None,
+        columns: Tuple[str, ...] = ('open', 'high', 'low', 'close', 'volume', 'amount'),
+    ) -> pd.DataFrame:
+        """
+        批量读取多只股票的日线（单条 SQL，供全市场选股/回测使用）
+
+        Args:
+            start_date: 开始日期
+            end_date: 结束日期（默认不限）
+            codes: 股票代码列表（默认全部）
+            columns: 需要的行情列
+
+        Returns:
+            长表 DataFrame，列为 code, date 及 columns，按 code/date 排序
+        """
+        stmt = select(StockDaily.code, StockDaily.date, *[getattr(StockDaily, c) for c in columns])
+        stmt = stmt.where(StockDaily.date >= start_date)
+        if end_date is not None:
+            stmt = stmt.where(StockDaily.date <= end_date)
+        if codes:
+            stmt = stmt.where(StockDaily.code.in_(list(codes)))
+        stmt = stmt.order_by(StockDaily.code, StockDaily.date)
+
+        # 直接读取 DBAPI 游标，跳过 ORM 行对象与逐行类型转换（全市场数据量下差异明显）
+        with self.get_connection() as conn:
+            rows = conn.execute(stmt).cursor.fetchall()
+        df = pd.DataFrame.from_records(rows, columns=['code', 'date', *columns])
+        if not df.empty:
+            df['date'] = pd.to_datetime(df['date'])
+        return df
+
+    @traced("db.write", code_param='code', table='stock_daily')
     def save_daily_data(
         self, 
         df: pd.DataFrame, 
@@ -662,6 +1141,8 @@ class DatabaseManager:
             return 0
         
         saved_count = 0
+        saved_dates: List[date] = []
+        committed = False
         
         with self.get_session() as session:
             try:
@@ -674,6 +1155,7 @@ class DatabaseManager:
                         row_date = row_date.date()
                     elif isinstance(row_date, pd.Timestamp):
                         row_date = row_date.date()
+                    saved_dates.append(row_date)
                     
                     # 检查是否已存在
                     existing = session.execute(
@@ -720,14 +1202,24 @@ class DatabaseManager:
                         )
                         session.add(record)
                         saved_count += 1
-                
+
+                # 趋势缓存：最早写入日期及之后的结果用到了被改写的 K 线，同一事务内删除
+                if saved_dates:
+                    session.query(TrendCacheEntry).filter(
+                        TrendCacheEntry.code == code,
+                        TrendCacheEntry.bar_date >= min(saved_dates),
+                    ).delete(synchronize_session=False)
+
                 session.commit()
+                committed = True
                 logger.info(f"保存 {code} 数据成功，新增 {saved_count} 条")
                 
             except Exception as e:
                 session.rollback()
                 logger.error(f"保存 {code} 数据失败: {e}")
                 raise
+            finally:
+                self._invalidate_code_cache(code, saved_dates if committed else [])
         
         return saved_count
     
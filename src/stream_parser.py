@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 流式 JSON 增量解析
+===================================
+
+职责：
+1. 逐块接收 LLM 流式输出，跳过 ```json 代码块标记等前缀
+2. 每当某个字段的值完整到达时立即解析并产出（不等待整个 JSON 结束）
+3. 维护已完成字段的嵌套快照，供 Web SSE / Bot 卡片展示部分结果
+
+决策仪表盘 JSON 的字段顺序是 sentiment_score、operation_advice 在前，
+dashboard.core_conclusion 紧随其后，因此首批有用字段通常在前几百个 token 内完成。
+
+使用方式：
+    parser = IncrementalJsonParser(max_depth=2)
+    for chunk in stream:
+        for path, value in parser.feed(chunk):
+            ...  # path 如 ('sentiment_score',) / ('dashboard', 'core_conclusion')
+    parser.snapshot()
+"""
+
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+JsonPath = Tuple[Union[str, int], ...]
+
+_WHITESPACE = " \t\r\n"
+
+
+class _Frame:
+    """一个尚未闭合的对象/数组"""
+
+    __slots__ = ("kind", "path", "start", "key", "expect_key", "index", "value_start")
+
+    def __init__(self, kind: str, path: JsonPath, start: int):
+        self.kind = kind              # 'obj' | 'arr'
+        self.path = path
+        self.start = start            # 左括号在缓冲区中的位置
+        self.key: Optional[str] = None
+        self.expect_key = kind == "obj"
+        self.index = 0
+        self.value_start: Optional[int] = None  # 进行中的数字/字面量起始位置
+
+    def child_path(self) -> JsonPath:
+        return self.path + ((self.key,) if self.kind == "obj" else (self.index,))
+
+
+class IncrementalJsonParser:
+    """
+    流式 JSON 增量解析器
+
+    只在值完整时产出（字符串遇到结束引号、数字/字面量遇到逗号或右括号、
+    对象/数组遇到匹配的右括号），因此产出的值与最终完整解析的结果一致。
+    深度超过 max_depth 的值随其所在的上层值一起产出。
+    """
+
+    def __init__(self, max_depth: int = 2):
+        self.max_depth = max_depth
+        self._buffer = ""
+        self._pos = 0
+        self._stack: List[_Frame] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._string_is_key = False
+        self._started = False
+        self.done = False
+        self.fields: Dict[JsonPath, Any] = {}
+
+    def feed(self, chunk: str) -> List[Tuple[JsonPath, Any]]:
+        """追加一段文本，返回本次新完成的 (路径, 值) 列表"""
+        if self.done or not chunk:
+            return []
+        self._buffer += chunk
+        completed: List[Tuple[JsonPath, Any]] = []
+        buffer = self._buffer
+        for i in range(self._pos, len(buffer)):
+            self._step(buffer, i, completed)
+            if self.done:
+                break
+        self._pos = len(buffer)
+        return completed
+
+    def snapshot(self) -> Dict[str, Any]:
+        """已完成字段组成的嵌套字典（只包含对象路径，数组元素随数组整体出现）"""
+        result: Dict[str, Any] = {}
+        for path, value in self.fields.items():
+            if any(not isinstance(part, str) for part in path):
+                continue
+            node = result
+            for part in path[:-1]:
+                child = node.get(part)
+                if not isinstance(child, dict):
+                    child = node[part] = {}
+                node = child
+            node[path[-1]] = value
+        return result
+
+    # === 内部实现 ===
+
+    def _step(self, buffer: str, i: int, completed: List[Tuple[JsonPath, Any]]) -> None:
+        ch = buffer[i]
+
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+                self._close_string(buffer, i, completed)
+            return
+
+        if not self._started:
+            # 跳过代码块标记、说明文字等前缀，直到根对象开始
+            if ch == "{":
+                self._started = True
+                self._stack.append(_Frame("obj", (), i))
+            return
+
+        frame = self._stack[-1]
+        if ch == '"':
+            self._in_string = True
+            self._string_start = i
+            self._string_is_key = frame.kind == "obj" and frame.expect_key
+        elif ch in "{[":
+            self._stack.append(_Frame("obj" if ch == "{" else "arr", frame.child_path(), i))
+        elif ch in "}]":
+            self._finish_literal(frame, buffer, i, completed)
+            self._stack.pop()
+            if not self._stack:
+                self.done = True
+                return
+            self._complete(self._stack[-1], frame.path, buffer[frame.start:i + 1], completed)
+        elif ch == ",":
+            self._finish_literal(frame, buffer, i, completed)
+            if frame.kind == "obj":
+                frame.expect_key = True
+            else:
+                frame.index += 1
+        elif ch == ":":
+            frame.expect_key = False
+        elif ch not in _WHITESPACE and frame.value_start is None and not (frame.kind == "obj" and frame.expect_key):
+            frame.value_start = i
+
+    def _close_string(self, buffer: str, end: int, completed: List[Tuple[JsonPath, Any]]) -> None:
+        frame = self._stack[-1]
+        text = buffer[self._string_start:end + 1]
+        if self._string_is_key:
+            try:
+                frame.key = json.loads(text)
+            except ValueError:
+                frame.key = text.strip('"')
+            return
+        self._complete(frame, frame.child_path(), text, completed)
+
+    def _finish_literal(self, frame: _Frame, buffer: str, end: int, completed: List[Tuple[JsonPath, Any]]) -> None:
+        if frame.value_start is None:
+            return
+        text = buffer[frame.value_start:end].strip()
+        frame.value_start = None
+        self._complete(frame, frame.child_path(), text, completed)
+
+    def _complete(self, frame: _Frame, path: JsonPath, text: str, completed: List[Tuple[JsonPath, Any]]) -> None:
+        if len(path) > self.max_depth or (frame.kind == "obj" and frame.key is None):
+            return
+        try:
+            value = json.loads(text)
+        except ValueError:
+            # 模型输出的局部语法问题（如尾随逗号）留给最终的完整解析修复
+            logger.debug(f"[流式解析] 字段 {'.'.join(map(str, path))} 暂无法解析，跳过")
+            return
+        self.fields[path] = value
+        completed.append((path, value))
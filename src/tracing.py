@@ -0,0 +1,449 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 轻量级链路追踪与运行剖析
+===================================
+
+职责：
+1. 以 span 记录各环节耗时（数据源、实时行情/筹码、搜索、LLM、数据库写入、推送）
+2. span 携带 code / source 等属性，嵌套 span 自动继承父级的股票代码
+3. 运行结束后生成剖析报告：各阶段/数据源 P50/P95、每只股票的关键路径
+4. 按 Prometheus 文本格式导出累计直方图（Web: GET /metrics）
+
+用法：
+    with trace_span("fetch.daily", code=code, source=fetcher.name):
+        ...
+
+    @traced("db.write", table="stock_daily")
+    def save_daily_data(self, df, code, ...): ...
+"""
+
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.config import get_config
+
+logger = logging.getLogger(__name__)
+
+# Prometheus 直方图桶（秒）
+HISTOGRAM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# 参与关键路径计算的顶层阶段 span 前缀
+STAGE_PREFIX = "stage."
+
+
+@dataclass
+class Span:
+    """一次计时记录"""
+    name: str
+    start: float
+    attrs: Dict[str, Any] = field(default_factory=dict)
+    end: Optional[float] = None
+    error: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.time()) - self.start
+
+    @property
+    def code(self) -> Optional[str]:
+        return self.attrs.get('code')
+
+    @property
+    def source(self) -> str:
+        return str(self.attrs.get('source') or '')
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'start': round(self.start, 6),
+            'duration': round(self.duration, 6),
+            'attrs': self.attrs,
+            'error': self.error,
+        }
+
+
+class _Histogram:
+    """单个 (span 名称, 数据源) 的累计直方图"""
+
+    __slots__ = ('buckets', 'count', 'total', 'errors')
+
+    def __init__(self):
+        self.buckets = [0] * len(HISTOGRAM_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+
+    def observe(self, seconds: float, error: bool) -> None:
+        self.count += 1
+        self.total += seconds
+        if error:
+            self.errors += 1
+        for index, bound in enumerate(HISTOGRAM_BUCKETS):
+            if seconds <= bound:
+                self.buckets[index] += 1
+
+
+class Tracer:
+    """
+    进程级追踪器
+
+    最近的 span 保存在有界队列中（供运行剖析），
+    同时累计到直方图（供 Prometheus 导出，不受队列长度影响）。
+
+    Args:
+        enabled: 是否启用（关闭后 span 不做任何记录）
+        max_spans: 内存中保留的 span 数上限
+    """
+
+    def __init__(self, enabled: bool = True, max_spans: int = 50000):
+        self.enabled = enabled
+        self._spans: Deque[Span] = deque(maxlen=max_spans)
+        self._histograms: Dict[Tuple[str, str], _Histogram] = {}
+        self._lock = threading.Lock()
+        # span 栈放在 ContextVar 中：线程之间、同一事件循环上的协程任务之间互不干扰
+        self._stack_var: contextvars.ContextVar[Tuple[Span, ...]] = contextvars.ContextVar(
+            f"trace_stack_{id(self)}", default=()
+        )
+
+    @contextmanager
+    def span(self, name: str, **attrs: Any) -> Iterator[Optional[Span]]:
+        """记录一个 span；未指定 code 时继承父 span 的股票代码"""
+        if not self.enabled:
+            yield None
+            return
+        stack = self._stack_var.get()
+        if 'code' not in attrs and stack and stack[-1].code:
+            attrs['code'] = stack[-1].code
+        span = Span(name=name, start=time.time(), attrs=attrs)
+        token = self._stack_var.set(stack + (span,))
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"[:200]
+            raise
+        finally:
+            span.end = time.time()
+            self._stack_var.reset(token)
+            self._record(span)
+
+    def annotate(self, **attrs: Any) -> None:
+        """为当前线程（或协程任务）最内层的 span 补充属性（如最终成功的数据源）"""
+        stack = self._stack_var.get()
+        if self.enabled and stack:
+            stack[-1].attrs.update(attrs)
+
+    def _record(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span)
+            key = (span.name, span.source)
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram()
+            histogram.observe(span.duration, span.error is not None)
+
+    def spans(
+        self,
+        since: float = 0.0,
+        until: Optional[float] = None,
+        codes: Optional[Iterable[str]] = None,
+    ) -> List[Span]:
+        """按时间窗口与股票代码筛选已结束的 span"""
+        code_set = set(codes) if codes is not None else None
+        with self._lock:
+            snapshot = list(self._spans)
+        return [
+            s for s in snapshot
+            if s.start >= since
+            and (until is None or s.end <= until)
+            and (code_set is None or s.code is None or s.code in code_set)
+        ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+            self._histograms.clear()
+
+    def prometheus_text(self, prefix: str = "stock_analysis") -> str:
+        """导出 Prometheus 文本格式（累计直方图 + 错误计数）"""
+        metric = f"{prefix}_span_duration_seconds"
+        lines = [
+            f"# HELP {metric} Duration of traced spans by name and source.",
+            f"# TYPE {metric} histogram",
+        ]
+        error_lines = [
+            f"# HELP {prefix}_span_errors_total Traced spans that raised an exception.",
+            f"# TYPE {prefix}_span_errors_total counter",
+        ]
+        with self._lock:
+            items = sorted(self._histograms.items())
+            for (name, source), histogram in items:
+                labels = f'name="{_escape(name)}",source="{_escape(source)}"'
+                for bound, count in zip(HISTOGRAM_BUCKETS, histogram.buckets):
+                    lines.append(f'{metric}_bucket{{{labels},le="{bound:g}"}} {count}')
+                lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f'{metric}_sum{{{labels}}} {histogram.total:.6f}')
+                lines.append(f'{metric}_count{{{labels}}} {histogram.count}')
+                error_lines.append(f'{prefix}_span_errors_total{{{labels}}} {histogram.errors}')
+        return "\n".join(lines + error_lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _summarize(durations: List[float], errors: int) -> Dict[str, Any]:
+    values = sorted(durations)
+    return {
+        'count': len(values),
+        'errors': errors,
+        'total': round(sum(values), 3),
+        'p50': round(_percentile(values, 0.5), 3),
+        'p95': round(_percentile(values, 0.95), 3),
+        'max': round(values[-1], 3) if values else 0.0,
+    }
+
+
+def critical_path(stage_spans: List[Span]) -> List[Dict[str, Any]]:
+    """
+    计算单只股票的关键路径
+
+    从最后结束的阶段向前回溯：每一步选择在当前阶段开始前最晚结束的阶段，
+    中间的空档记为 wait（排队/等待上游）。
+    """
+    if not stage_spans:
+        return []
+    remaining = sorted(stage_spans, key=lambda s: s.end)
+    current = remaining.pop()
+    path = [current]
+    while True:
+        candidates = [s for s in remaining if s.end <= current.start + 1e-3]
+        if not candidates:
+            break
+        previous = candidates[-1]
+        gap = current.start - previous.end
+        if gap > 1e-3:
+            path.append(Span(name='wait', start=previous.end, end=current.start))
+        path.append(previous)
+        remaining = [s for s in remaining if s is not previous and s.end <= previous.start + 1e-3]
+        current = previous
+    path.reverse()
+    return [
+        {'name': s.name, 'source': s.source, 'duration': round(s.duration, 3)}
+        for s in path
+    ]
+
+
+def build_run_profile(
+    spans: List[Span],
+    started: float,
+    finished: float,
+    codes: Optional[List[str]] = None,
+    run_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    汇总一次运行的剖析报告
+
+    Returns:
+        {run_id, wall_seconds, stages: {name: stats}, sources: {"name|source": stats},
+         prompts: {count, tokens, raw_tokens, saved_ratio, p50, max},
+         stocks: {code: {wall_seconds, critical_path}}}
+    """
+    by_name: Dict[str, Tuple[List[float], List[int]]] = {}
+    by_source: Dict[str, Tuple[List[float], List[int]]] = {}
+    by_code: Dict[str, List[Span]] = {}
+
+    for span in spans:
+        for key, bucket in ((span.name, by_name), (f"{span.name}|{span.source}", by_source)):
+            durations, errors = bucket.setdefault(key, ([], [0]))
+            durations.append(span.duration)
+            if span.error:
+                errors[0] += 1
+        if span.code and span.name.startswith(STAGE_PREFIX):
+            by_code.setdefault(span.code, []).append(span)
+
+    # 提示词大小（analyzer 在 stage.llm span 上标注 prompt_tokens / prompt_raw_tokens）
+    prompt_tokens = [s.attrs['prompt_tokens'] for s in spans if 'prompt_tokens' in s.attrs]
+    raw_tokens = sum(s.attrs.get('prompt_raw_tokens', 0) for s in spans if 'prompt_tokens' in s.attrs)
+    prompts = {}
+    if prompt_tokens:
+        values = sorted(prompt_tokens)
+        prompts = {
+            'count': len(values),
+            'tokens': sum(values),
+            'raw_tokens': raw_tokens,
+            'saved_ratio': round(1 - sum(values) / raw_tokens, 4) if raw_tokens else 0.0,
+            'p50': _percentile(values, 0.5),
+            'max': values[-1],
+        }
+
+    stocks = {}
+    for code in (codes or sorted(by_code)):
+        stage_spans = by_code.get(code, [])
+        if not stage_spans:
+            continue
+        stocks[code] = {
+            'wall_seconds': round(max(s.end for s in stage_spans) - min(s.start for s in stage_spans), 3),
+            'critical_path': critical_path(stage_spans),
+        }
+
+    return {
+        'run_id': run_id,
+        'started_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(started)),
+        'wall_seconds': round(finished - started, 3),
+        'span_count': len(spans),
+        'stages': {k: _summarize(d, e[0]) for k, (d, e) in sorted(by_name.items())},
+        'sources': {k: _summarize(d, e[0]) for k, (d, e) in sorted(by_source.items()) if not k.endswith('|')},
+        'prompts': prompts,
+        'stocks': stocks,
+    }
+
+
+def render_profile_markdown(profile: Dict[str, Any], top: int = 10) -> str:
+    """将剖析报告渲染为 Markdown"""
+    lines = [
+        f"# 运行剖析 {profile.get('run_id') or ''}".rstrip(),
+        "",
+        f"> 开始时间 {profile['started_at']} | 总耗时 {profile['wall_seconds']}s | span 数 {profile['span_count']}",
+        "",
+        "## 各阶段耗时",
+        "",
+        "| 阶段 | 次数 | 失败 | 累计(s) | P50(s) | P95(s) | 最大(s) |",
+        "|------|------|------|---------|--------|--------|---------|",
+    ]
+    for name, stats in profile['stages'].items():
+        lines.append(
+            f"| {name} | {stats['count']} | {stats['errors']} | {stats['total']} | "
+            f"{stats['p50']} | {stats['p95']} | {stats['max']} |"
+        )
+    if profile['sources']:
+        lines.extend([
+            "",
+            "## 按数据源",
+            "",
+            "| 阶段 | 数据源 | 次数 | 失败 | P50(s) | P95(s) | 最大(s) |",
+            "|------|--------|------|------|--------|--------|---------|",
+        ])
+        for key, stats in profile['sources'].items():
+            name, source = key.split('|', 1)
+            lines.append(
+                f"| {name} | {source} | {stats['count']} | {stats['errors']} | "
+                f"{stats['p50']} | {stats['p95']} | {stats['max']} |"
+            )
+    prompts = profile.get('prompts')
+    if prompts:
+        lines.extend([
+            "",
+            "## 提示词大小",
+            "",
+            f"- {prompts['count']} 次请求，共约 {prompts['tokens']} tokens"
+            f"（精简前 {prompts['raw_tokens']}，节省 {prompts['saved_ratio']:.0%}）",
+            f"- 单次 P50 {prompts['p50']} tokens，最大 {prompts['max']} tokens",
+        ])
+    stocks = sorted(profile['stocks'].items(), key=lambda x: x[1]['wall_seconds'], reverse=True)
+    if stocks:
+        lines.extend([
+            "",
+            f"## 关键路径（最慢 {min(top, len(stocks))} 只）",
+            "",
+        ])
+        for code, info in stocks[:top]:
+            path = " → ".join(
+                f"{step['name']}{'(' + step['source'] + ')' if step['source'] else ''} {step['duration']}s"
+                for step in info['critical_path']
+            )
+            lines.append(f"- **{code}** {info['wall_seconds']}s: {path}")
+    return "\n".join(lines) + "\n"
+
+
+def write_run_profile(profile: Dict[str, Any], directory: Optional[str] = None) -> Tuple[str, str]:
+    """写出 JSON 与 Markdown 剖析报告，返回两个文件路径"""
+    directory = directory or getattr(get_config(), 'profile_dir', './reports/profiles')
+    path = Path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+    stem = f"profile_{time.strftime('%Y%m%d_%H%M%S')}_{(profile.get('run_id') or 'run')[:8]}"
+    json_path = path / f"{stem}.json"
+    md_path = path / f"{stem}.md"
+    json_path.write_text(json.dumps(profile, ensure_ascii=False, indent=2), encoding='utf-8')
+    md_path.write_text(render_profile_markdown(profile), encoding='utf-8')
+    return str(json_path), str(md_path)
+
+
+# === 便捷函数 ===
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """获取进程级追踪器"""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _tracer = Tracer(enabled=getattr(get_config(), 'tracing_enabled', True))
+    return _tracer
+
+
+def reset_tracer() -> None:
+    """重置追踪器（主要用于测试）"""
+    global _tracer
+    _tracer = None
+
+
+def trace_span(name: str, **attrs: Any):
+    """get_tracer().span 的快捷方式"""
+    return get_tracer().span(name, **attrs)
+
+
+def annotate_span(**attrs: Any) -> None:
+    """get_tracer().annotate 的快捷方式"""
+    get_tracer().annotate(**attrs)
+
+
+def traced(name: str, code_param: Optional[str] = None, **static_attrs: Any) -> Callable:
+    """
+    以 span 包裹整个函数
+
+    Args:
+        name: span 名称
+        code_param: 作为 code 属性记录的参数名（如 'code'），支持 'item.code' 取参数的属性
+        static_attrs: 固定属性（如 table='stock_daily'）
+    """
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func) if code_param else None
+        param, _, attr = (code_param or '').partition('.')
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            attrs = dict(static_attrs)
+            if signature is not None:
+                try:
+                    code = signature.bind_partial(*args, **kwargs).arguments.get(param)
+                except TypeError:
+                    code = None
+                if attr and code is not None:
+                    code = getattr(code, attr, None)
+                if code:
+                    attrs['code'] = code
+            with trace_span(name, **attrs):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 趋势分析结果缓存
+===================================
+
+职责：
+1. 以 (代码, 最新 K 线日期, 分析器参数哈希) 为键持久缓存 TrendAnalysisResult
+2. 命中时只查询最新 K 线日期，不读取历史日线、不重算指标
+3. 为流水线、run_new.py 流式分析与 Bot /analyze 提供统一的读取入口
+
+缓存失效：
+- 新的一根 K 线改变键中的日期，旧条目在下次写入时删除
+- 保存日线（含盘中改写当日 K 线）时，存储层在同一事务内删除受影响的条目
+- 调整分析器参数改变参数哈希
+"""
+
+import logging
+from datetime import date, timedelta
+from typing import Optional
+
+import pandas as pd
+
+from src.config import get_config
+from src.stock_analyzer import StockTrendAnalyzer, TrendAnalysisResult
+
+logger = logging.getLogger(__name__)
+
+
+class TrendCache:
+    """
+    趋势分析结果缓存（读穿透）
+
+    用法：
+        cache = get_components().trend_cache
+        result = cache.get(code, analyzer)
+    """
+
+    def __init__(self, db=None, lookback: Optional[int] = None, enabled: Optional[bool] = None):
+        config = get_config()
+        self._db = db
+        self.lookback = max(20, int(lookback if lookback is not None else config.trend_cache_lookback))
+        self.enabled = config.trend_cache_enabled if enabled is None else enabled
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def db(self):
+        if self._db is None:
+            from src.storage import get_db
+            self._db = get_db()
+        return self._db
+
+    def _params_hash(self, analyzer: StockTrendAnalyzer) -> str:
+        # 回看 K 线数影响 EMA 类指标的结果，一并计入
+        return f"{analyzer.params_hash()[:12]}{self.lookback:04d}"
+
+    def get(self, code: str, analyzer: StockTrendAnalyzer) -> Optional[TrendAnalysisResult]:
+        """
+        获取股票最新 K 线的趋势分析结果
+
+        Args:
+            code: 股票代码
+            analyzer: 趋势分析器
+
+        Returns:
+            TrendAnalysisResult，本地无日线时返回 None
+        """
+        latest = self.db.get_latest_data(code, days=1)
+        if not latest:
+            return None
+        bar_date = latest[0].date
+        params_hash = self._params_hash(analyzer)
+
+        if self.enabled:
+            cached = self.db.get_trend_cache(code, bar_date, params_hash)
+            if cached is not None:
+                self.hits += 1
+                logger.debug(f"[{code}] 趋势分析命中缓存 ({bar_date})")
+                return TrendAnalysisResult.from_dict(cached)
+            self.misses += 1
+
+        df = self._load_bars(code, bar_date)
+        result = analyzer.analyze(df, code)
+        # 数据不足时不缓存，补齐历史后可立即得到完整结果
+        if self.enabled and len(df) >= 20:
+            try:
+                self.db.save_trend_cache(code, bar_date, params_hash, result.to_dict())
+            except Exception as e:
+                logger.warning(f"[{code}] 趋势分析缓存写入失败: {e}")
+        return result
+
+    def _load_bars(self, code: str, bar_date: date) -> pd.DataFrame:
+        """读取最近 lookback 根日线（按自然日多取一些，覆盖节假日与停牌）"""
+        start = bar_date - timedelta(days=self.lookback * 2 + 30)
+        rows = self.db.get_data_range(code, start, bar_date)[-self.lookback:]
+        return pd.DataFrame([row.to_dict() for row in rows])
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'lookback': self.lookback,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+        }
+
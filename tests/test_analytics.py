@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 分析型查询引擎单元测试
+===================================
+
+职责：
+1. 验证增量导出只导出新增/更新的行
+2. 验证 SQL 查询结果与只读校验
+3. 验证查询连接缓存复用，导出新分片后失效
+"""
+
+import os
+import tempfile
+import unittest
+from datetime import date, timedelta
+from unittest import mock
+
+import pandas as pd
+
+from src.config import Config
+from src.storage import DatabaseManager
+from src.analyzer import AnalysisResult
+from src.analytics import AnalyticsEngine
+
+
+class AnalyticsEngineTestCase(unittest.TestCase):
+    """分析型查询引擎测试"""
+
+    def setUp(self) -> None:
+        """为每个用例初始化独立数据库与导出目录"""
+        self._temp_dir = tempfile.TemporaryDirectory()
+        os.environ["DATABASE_PATH"] = os.path.join(self._temp_dir.name, "test_analytics.db")
+
+        Config._instance = None
+        DatabaseManager.reset_instance()
+        self.db = DatabaseManager.get_instance()
+        self.engine = AnalyticsEngine(
+            db=self.db,
+            export_dir=os.path.join(self._temp_dir.name, "analytics"),
+        )
+
+    def tearDown(self) -> None:
+        """清理资源"""
+        self.engine.invalidate()
+        DatabaseManager.reset_instance()
+        self._temp_dir.cleanup()
+
+    def _save_daily(self, code: str, start: date, days: int, volume_ratio: float = 1.0) -> None:
+        df = pd.DataFrame({
+            "date": [start + timedelta(days=i) for i in range(days)],
+            "open": [10.0] * days,
+            "high": [11.0] * days,
+            "low": [9.0] * days,
+            "close": [10.5] * days,
+            "volume": [1000.0] * days,
+            "amount": [10500.0] * days,
+            "pct_chg": [0.5] * days,
+            "volume_ratio": [volume_ratio] * days,
+        })
+        self.db.save_daily_data(df, code, data_source="test")
+
+    def test_incremental_export(self) -> None:
+        """第二次导出只包含新增行，更新过的行以最新版本为准"""
+        start = date(2026, 1, 5)
+        self._save_daily("600519", start, 3)
+        self.assertEqual(self.engine.export(["stock_daily"]), {"stock_daily": 3})
+        self.assertEqual(self.engine.export(["stock_daily"]), {"stock_daily": 0})
+
+        self._save_daily("000001", start, 2, volume_ratio=2.5)
+        self.assertEqual(self.engine.export(["stock_daily"]), {"stock_daily": 2})
+
+        df = self.engine.query(
+            "SELECT code, COUNT(*) AS n FROM stock_daily "
+            "WHERE volume_ratio > 2 GROUP BY code"
+        )
+        self.assertEqual(df.to_dict("records"), [{"code": "000001", "n": 2}])
+
+    def test_query_analysis_history(self) -> None:
+        """分析历史导出后可通过 SQL 聚合"""
+        for advice in ("买入", "买入", "观望"):
+            self.db.save_analysis_history(
+                result=AnalysisResult(
+                    code="600519", name="贵州茅台", sentiment_score=70,
+                    trend_prediction="看多", operation_advice=advice,
+                ),
+                query_id="q1",
+                report_type="simple",
+                news_content=None,
+                context_snapshot=None,
+                save_snapshot=False,
+            )
+
+        result = self.engine.query_records(
+            "SELECT operation_advice, COUNT(*) AS n FROM analysis_history "
+            "GROUP BY operation_advice ORDER BY n DESC",
+            refresh=True,
+        )
+        self.assertEqual(result["records"][0], {"operation_advice": "买入", "n": 2})
+        self.assertFalse(result["truncated"])
+
+        # 非正数 limit 按 1 处理，不会静默丢弃末尾行
+        result = self.engine.query_records("SELECT * FROM analysis_history", limit=-1)
+        self.assertEqual((result["count"], result["truncated"]), (1, True))
+
+    def test_query_reuses_loaded_tables(self) -> None:
+        """连续查询不重复读取 Parquet 分片，export() 写入新分片后重新载入"""
+        start = date(2026, 1, 5)
+        self._save_daily("600519", start, 3)
+        self.engine.export(["stock_daily"])
+
+        sql = "SELECT COUNT(*) AS n FROM stock_daily"
+        with mock.patch("src.analytics.pd.read_parquet", wraps=pd.read_parquet) as read_parquet:
+            self.assertEqual(self.engine.query(sql)["n"].tolist(), [3])
+            loads = read_parquet.call_count
+            self.assertEqual(self.engine.query(sql)["n"].tolist(), [3])
+            self.assertEqual(read_parquet.call_count, loads)
+
+            self._save_daily("000001", start, 2)
+            self.engine.export(["stock_daily"])
+            self.assertEqual(self.engine.query(sql)["n"].tolist(), [5])
+            self.assertGreater(read_parquet.call_count, loads)
+
+    def test_reject_non_select(self) -> None:
+        """非只读语句被拒绝"""
+        with self.assertRaises(ValueError):
+            self.engine.query("DELETE FROM stock_daily")
+        with self.assertRaises(ValueError):
+            self.engine.query("SELECT 1; DROP TABLE stock_daily")
+
+
+if __name__ == "__main__":
+    unittest.main()
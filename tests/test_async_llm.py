@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 异步 LLM 路径单元测试
+===================================
+
+职责：
+1. 验证事件循环线程上的请求并发进行，且不超过 LLM_ASYNC_CONCURRENCY
+2. 验证异步路径的限流重试与同步版本一致
+3. 验证异步路径同样读写 LLM 响应缓存
+4. 验证启用路由时按 RPM/TPM 排队不占用并发名额
+5. 验证事件循环的 to_thread 使用按并发上限确定大小的专用线程池
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from src.analyzer import GeminiAnalyzer
+from src.async_llm import get_async_llm_runner, reset_async_llm_runner
+from src.config import Config
+from src.llm_router import reset_llm_router
+from src.llm_scheduler import get_llm_scheduler, reset_llm_scheduler
+from src.storage import DatabaseManager
+
+RESPONSE = json.dumps({
+    "stock_name": "贵州茅台",
+    "sentiment_score": 70,
+    "trend_prediction": "看多",
+    "operation_advice": "持有",
+    "analysis_summary": "异步测试",
+}, ensure_ascii=False)
+
+
+def _context(code: str) -> dict:
+    return {
+        "code": code,
+        "stock_name": f"测试{code}",
+        "date": "2026-10-19",
+        "today": {"close": 10.0, "ma5": 9.9, "ma10": 9.8, "ma20": 9.7},
+    }
+
+
+class _FakeAsyncModels:
+    """模拟 google-genai 的 client.aio.models，记录同时进行中的请求数"""
+
+    def __init__(self, delay: float = 0.05, failures: int = 0):
+        self.delay = delay
+        self.failures = failures
+        self.calls = 0
+        self.inflight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    async def generate_content(self, model, contents, config):
+        with self._lock:
+            self.calls += 1
+            if self.failures:
+                self.failures -= 1
+                raise RuntimeError("429 Resource has been exhausted")
+            self.inflight += 1
+            self.peak = max(self.peak, self.inflight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            with self._lock:
+                self.inflight -= 1
+        return SimpleNamespace(text=RESPONSE, usage_metadata=None)
+
+
+class _AsyncAnalyzer(GeminiAnalyzer):
+    """使用假异步客户端的分析器"""
+
+    def __init__(self, models: _FakeAsyncModels):
+        self._models = models
+        super().__init__(api_key="offline-test-api-key")
+
+    def _init_model(self) -> None:
+        self._gemini_client = SimpleNamespace(aio=SimpleNamespace(models=self._models))
+        self._current_model_name = "test-model"
+
+
+class AsyncLLMTestCase(unittest.TestCase):
+    """异步 LLM 路径测试"""
+
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._env = {
+            "DATABASE_PATH": os.path.join(self._temp_dir.name, "test_async_llm.db"),
+            "LLM_ASYNC_CONCURRENCY": "3",
+            "LLM_DEFAULT_RPM": "0",
+            "GEMINI_RETRY_DELAY": "0.01",
+            "GEMINI_MAX_RETRIES": "3",
+        }
+        os.environ.update(self._env)
+
+        Config._instance = None
+        DatabaseManager.reset_instance()
+        reset_llm_scheduler()
+        reset_async_llm_runner()
+
+    def tearDown(self) -> None:
+        reset_async_llm_runner()
+        for name in self._env:
+            if name != "DATABASE_PATH":
+                os.environ.pop(name, None)
+        Config._instance = None
+        reset_llm_scheduler()
+        DatabaseManager.reset_instance()
+        self._temp_dir.cleanup()
+
+    def test_concurrent_requests_bounded(self) -> None:
+        """10 个请求在事件循环上并发进行，峰值受并发上限约束"""
+        models = _FakeAsyncModels(delay=0.1)
+        analyzer = _AsyncAnalyzer(models)
+        runner = get_async_llm_runner()
+
+        futures = [
+            runner.submit(analyzer.analyze_async(_context(f"6000{i:02d}"), use_cache=False))
+            for i in range(10)
+        ]
+        results = [future.result(10) for future in futures]
+
+        self.assertTrue(all(r.success for r in results))
+        self.assertEqual([r.sentiment_score for r in results], [70] * 10)
+        self.assertEqual(models.peak, 3)
+        self.assertEqual(models.calls, 10)
+
+    def test_rate_limit_retry(self) -> None:
+        """限流错误按退避重试后成功"""
+        models = _FakeAsyncModels(delay=0, failures=2)
+        analyzer = _AsyncAnalyzer(models)
+
+        result = get_async_llm_runner().run(analyzer.analyze_async(_context("600519"), use_cache=False), 10)
+
+        self.assertTrue(result.success)
+        self.assertEqual(models.calls, 3)
+
+    def test_response_cache(self) -> None:
+        """异步路径与同步路径共用响应缓存"""
+        models = _FakeAsyncModels(delay=0)
+        analyzer = _AsyncAnalyzer(models)
+        runner = get_async_llm_runner()
+
+        first = runner.run(analyzer.analyze_async(_context("600519")), 10)
+        second = runner.run(analyzer.analyze_async(_context("600519")), 10)
+
+        self.assertEqual(models.calls, 1)
+        self.assertFalse(first.cache_hit)
+        self.assertTrue(second.cache_hit)
+
+    def test_loop_executor_sized_from_concurrency(self) -> None:
+        """to_thread 在专用线程池中执行，大小为 2 × LLM_ASYNC_CONCURRENCY + 4"""
+        async def worker_name() -> str:
+            return await asyncio.to_thread(lambda: threading.current_thread().name)
+
+        runner = get_async_llm_runner()
+        self.assertTrue(runner.run(worker_name(), 10).startswith("llm-loop-worker"))
+        self.assertEqual(runner._executor._max_workers, 3 * 2 + 4)
+
+    def test_routed_budget_wait_does_not_hold_slot(self) -> None:
+        """启用路由且并发上限为 1 时，一个请求等待调度预算期间另一个请求仍可发出"""
+        overrides = {"LLM_ROUTER_ENABLED": "true", "LLM_ROUTES": "gemini:test-model", "LLM_ASYNC_CONCURRENCY": "1"}
+        os.environ.update(overrides)
+        self._env.update(overrides)
+        Config._instance = None
+        reset_llm_router()
+        self.addCleanup(reset_llm_router)
+
+        sent = threading.Event()
+
+        def generate_content(model, contents, config):
+            sent.set()
+            return SimpleNamespace(text=RESPONSE, usage_metadata=None)
+
+        analyzer = _AsyncAnalyzer(_FakeAsyncModels())
+        analyzer._gemini_client.models = SimpleNamespace(generate_content=generate_content)
+        scheduler = get_llm_scheduler()
+        acquire = scheduler.acquire
+        waited = []
+        lock = threading.Lock()
+
+        def slow_acquire(*args, **kwargs):
+            # 第一个请求模拟排队等待预算，直到另一个请求已发出
+            with lock:
+                first_call = not waited
+                waited.append(None)
+            if first_call:
+                waited[0] = sent.wait(3)
+            return acquire(*args, **kwargs)
+
+        runner = get_async_llm_runner()
+        with mock.patch.object(scheduler, "acquire", side_effect=slow_acquire):
+            first = runner.submit(analyzer.analyze_async(_context("600519"), use_cache=False))
+            second = runner.submit(analyzer.analyze_async(_context("000001"), use_cache=False))
+            results = [first.result(10), second.result(10)]
+
+        self.assertTrue(all(r.success for r in results))
+        self.assertEqual(waited, [True, None])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 趋势信号回测单元测试
+===================================
+
+职责：
+1. 验证历史评分与逐日截断后的 analyze() 一致
+2. 验证止损/止盈/到期的成交规则与分桶统计
+3. 验证参数网格展开与并行扫描
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.backtest import BacktestParams, Backtester, _split_groups, expand_grid, run_sweep
+from src.stock_analyzer import StockTrendAnalyzer
+
+
+def _bars(count: int = 4, periods: int = 80, seed: int = 11) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2024-01-01", periods=periods)
+    parts = []
+    for i in range(count):
+        close = 10 * np.exp(np.cumsum(rng.normal(0.002, 0.02, periods)))
+        part = pd.DataFrame({
+            "code": f"{600000 + i:06d}",
+            "date": dates,
+            "open": close * (1 + rng.normal(0, 0.005, periods)),
+            "high": close * 1.02,
+            "low": close * 0.98,
+            "close": close,
+            "volume": rng.integers(100_000, 1_000_000, periods).astype(float),
+        })
+        if i == 1:
+            # 停牌：中间缺失若干交易日
+            part = part.drop(part.index[30:35])
+        parts.append(part)
+    return pd.concat(parts, ignore_index=True)
+
+
+class BacktestTestCase(unittest.TestCase):
+    """趋势信号回测测试"""
+
+    def setUp(self) -> None:
+        self.bars = _bars()
+        self.backtester = Backtester(self.bars)
+
+    def test_history_matches_truncated_analysis(self) -> None:
+        """每个位置的历史评分等于截至当日的 analyze() 结果"""
+        scores, signals = self.backtester.score_history()
+        analyzer = StockTrendAnalyzer()
+        bars = self.backtester.bars
+        for code, group in bars.groupby("code"):
+            for k in (10, 20, 45, len(group)):
+                row = group.index[k - 1]
+                if k < 20:
+                    self.assertTrue(np.isnan(scores[row]))
+                    continue
+                expected = analyzer.analyze(group.iloc[:k], code)
+                self.assertEqual(scores[row], expected.signal_score, (code, k))
+                self.assertEqual(signals[row], expected.buy_signal.value, (code, k))
+
+    def test_exit_rules(self) -> None:
+        """次日开盘买入；跳空低开按开盘价止损，触及止盈按止盈价卖出，否则到期收盘卖出"""
+        bars = pd.DataFrame({
+            "code": "600000",
+            "date": pd.bdate_range("2024-01-01", periods=6),
+            "open": [10, 10, 10.5, 8.5, 10, 10],
+            "high": [10, 10.2, 11.2, 9, 10, 10],
+            "low": [10, 9.8, 10.4, 8, 10, 10],
+            "close": [10, 10, 11, 9, 10, 10.3],
+            "volume": 1e6,
+        })
+        backtester = Backtester(bars)
+        scores = np.array([60.0, 50.0, np.nan, np.nan, np.nan, np.nan])
+        params = BacktestParams(hold_days=3, stop_loss_pct=10, cost_pct=0)
+
+        trades = backtester.simulate(scores, params).set_index("row")
+        # 第 0 行信号：10 元买入，第 3 根 K 线开盘 8.5 跳空跌破止损 9
+        self.assertAlmostEqual(trades.loc[0, "return"], -0.15)
+        self.assertEqual(trades.loc[0, "days"], 3)
+        self.assertAlmostEqual(trades.loc[0, "drawdown"], -0.15)
+        # 第 1 行信号：10.5 元买入，持有第 2 根 K 线同样跳空跌破止损 9.45，按开盘价成交
+        self.assertAlmostEqual(trades.loc[1, "return"], 8.5 / 10.5 - 1)
+        self.assertEqual(trades.loc[1, "days"], 2)
+
+        params = BacktestParams(hold_days=3, take_profit_pct=10, cost_pct=0)
+        trades = backtester.simulate(scores, params).set_index("row")
+        self.assertAlmostEqual(trades.loc[0, "return"], 0.10)
+        self.assertEqual(trades.loc[0, "days"], 2)
+        # 未触及止盈，到期收盘卖出
+        self.assertAlmostEqual(trades.loc[1, "return"], 10 / 10.5 - 1)
+        self.assertEqual(trades.loc[1, "days"], 3)
+
+    def test_report_buckets(self) -> None:
+        """分桶笔数之和等于交易笔数，汇总只统计入场信号"""
+        report = self.backtester.run(BacktestParams(hold_days=5))
+        scores, _ = self.backtester.score_history()
+        trades = self.backtester.simulate(scores, BacktestParams(hold_days=5))
+
+        self.assertEqual(report.signals["trades"].sum(), len(trades))
+        self.assertEqual(report.scores["trades"].sum(), len(trades))
+        entry = report.signals[report.signals["bucket"].isin(report.params.entry_signals)]
+        self.assertEqual(report.summary["trades"], entry["trades"].sum())
+        self.assertIn("买入信号", report.to_markdown())
+
+    def test_sweep(self) -> None:
+        """网格展开区分交易参数与分析器参数，扫描结果按平均收益降序"""
+        grid = expand_grid({"hold_days": [3, 5], "BIAS_THRESHOLD": [3.0, 5.0]})
+        self.assertEqual(len(grid), 4)
+        self.assertEqual(grid[0].analyzer_params, {"BIAS_THRESHOLD": 3.0})
+        with self.assertRaises(ValueError):
+            expand_grid({"bias_threshold": [1]})
+
+        reports = run_sweep(self.bars, grid, workers=2)
+        self.assertEqual(len(reports), 4)
+        returns = [r.summary["avg_return"] for r in reports]
+        self.assertEqual(returns, sorted(returns, reverse=True))
+        single = Backtester(self.bars).run(reports[0].params)
+        self.assertEqual(single.summary, reports[0].summary)
+
+    def test_sweep_splits_trade_only_grid(self) -> None:
+        """只扫描交易参数时仍拆分到多个进程，结果与单进程一致"""
+        grid = expand_grid({"hold_days": [3, 5, 10], "stop_loss_pct": [0.0, 5.0]})
+        tasks = _split_groups([grid], 4)
+        self.assertEqual(len(tasks), 6)
+        self.assertEqual([p for task in tasks for p in task], grid)
+        self.assertEqual(len(_split_groups([grid[:3], grid[3:]], 2)), 2)
+
+        reports = run_sweep(self.bars, grid, workers=3)
+        serial = run_sweep(self.bars, grid, workers=1)
+        self.assertEqual([r.summary for r in reports], [r.summary for r in serial])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 离线基准测试替身单元测试
+===================================
+
+职责：
+1. 验证录制数据替身能离线驱动完整流水线
+2. 验证报告包含吞吐、内存与各阶段延迟
+"""
+
+import os
+import unittest
+from unittest import mock
+
+from benchmarks.fakes import FixtureStore, LatencyProfile, UpstreamSimulator, _extract_code
+from benchmarks.run_pipeline import format_report, parse_arguments, run_once
+from data_provider.base import DataFetchError
+from src.config import Config
+from src.core.job_scheduler import reset_job_scheduler
+from src.llm_scheduler import reset_llm_scheduler
+from src.storage import DatabaseManager
+from src.tracing import reset_tracer
+
+
+class BenchmarkHarnessTestCase(unittest.TestCase):
+    """离线基准测试替身测试"""
+
+    def tearDown(self) -> None:
+        Config._instance = None
+        DatabaseManager.reset_instance()
+        reset_llm_scheduler()
+        reset_job_scheduler()
+        reset_tracer()
+
+    def test_fixture_rewrites_code(self) -> None:
+        """回放数据按股票代码改写，日线截至今天"""
+        fixtures = FixtureStore()
+        frame = fixtures.daily_frame("600001")
+        self.assertEqual(len(frame), len(fixtures.data['daily']))
+        self.assertNotEqual(frame['close'].iloc[-1], fixtures.data['daily'][-1]['close'])
+        self.assertEqual(fixtures.realtime_quote("600001").code, "600001")
+        self.assertIn("600001", fixtures.llm_response("600001"))
+        self.assertEqual(_extract_code("| 股票代码 | **600001** |"), "600001")
+
+    def test_upstream_error_injection(self) -> None:
+        """错误率为 1 时每次调用都抛出数据源异常"""
+        upstream = UpstreamSimulator({'daily': LatencyProfile(error_rate=1.0)})
+        with self.assertRaises(DataFetchError):
+            upstream.call('daily')
+        upstream.call('unknown')
+
+    def test_run_small_pipeline(self) -> None:
+        """无延迟、无错误时全部股票完成分析并输出阶段统计"""
+        args = parse_arguments(['--sizes', '3', '--latency-scale', '0', '--error-rate', '0', '--no-search'])
+        with mock.patch.dict(os.environ, {}):
+            report = run_once(3, args)
+
+        self.assertEqual(report['completed'], 3)
+        self.assertGreater(report['throughput_per_min'], 0)
+        self.assertGreater(report['peak_rss_mb'], 0)
+        for stage in ('stage.fetch', 'stage.llm', 'llm.request', 'fetch.daily'):
+            self.assertEqual(report['stages'][stage]['count'], 3)
+        self.assertIn("| 3 | 3 |", format_report([report]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 共享组件容器单元测试
+===================================
+
+职责：
+1. 验证组件懒加载：首次访问时才构建，之后返回同一实例
+2. 验证多个流水线复用同一个数据源管理器、AI 分析器与搜索服务
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from src.config import Config
+from src.core.components import PipelineComponents, get_components
+from src.core.pipeline import StockAnalysisPipeline
+from src.storage import DatabaseManager
+
+
+def _factory(name: str) -> mock.Mock:
+    """每次调用返回新对象的组件类替身"""
+    return mock.Mock(side_effect=lambda *args, **kwargs: mock.Mock(name=name, is_available=False))
+
+
+class PipelineComponentsTestCase(unittest.TestCase):
+    """共享组件容器测试"""
+
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        os.environ["DATABASE_PATH"] = os.path.join(self._temp_dir.name, "test_components.db")
+        Config._instance = None
+        DatabaseManager.reset_instance()
+        PipelineComponents.reset_instance()
+
+        self.factories = {
+            "fetcher_manager": _factory("fetcher_manager"),
+            "analyzer": _factory("analyzer"),
+            "search_service": _factory("search_service"),
+        }
+        patchers = [
+            mock.patch("data_provider.DataFetcherManager", self.factories["fetcher_manager"]),
+            mock.patch("src.analyzer.GeminiAnalyzer", self.factories["analyzer"]),
+            mock.patch("src.search_service.SearchService", self.factories["search_service"]),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self) -> None:
+        PipelineComponents.reset_instance()
+        DatabaseManager.reset_instance()
+        Config._instance = None
+        self._temp_dir.cleanup()
+
+    def test_lazy_shared_singletons(self) -> None:
+        """容器为进程级单例，组件首次访问时才构建且只构建一次"""
+        components = get_components()
+        self.assertIs(get_components(), components)
+        self.assertTrue(all(factory.call_count == 0 for factory in self.factories.values()))
+
+        for name, factory in self.factories.items():
+            first = getattr(components, name)
+            self.assertIs(getattr(components, name), first)
+            self.assertEqual(factory.call_count, 1, name)
+
+        PipelineComponents.reset_instance()
+        self.assertIsNot(get_components().analyzer, components.analyzer)
+
+    def test_pipelines_reuse_components(self) -> None:
+        """两个流水线共用同一个数据源管理器、AI 分析器与搜索服务"""
+        first = StockAnalysisPipeline(query_source="cli")
+        second = StockAnalysisPipeline(query_source="cli")
+
+        for name, factory in self.factories.items():
+            self.assertIs(getattr(first, name), getattr(second, name), name)
+            self.assertEqual(factory.call_count, 1, name)
+        self.assertIs(first.trend_cache, second.trend_cache)
+        self.assertIsNot(first.notifier, second.notifier)
+
+
+if __name__ == "__main__":
+    unittest.main()
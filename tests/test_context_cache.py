@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - LLM 上下文缓存单元测试
+===================================
+
+职责：
+1. 验证系统提示词在 provider 侧只缓存一次，各股请求引用句柄而不再携带提示词
+2. 验证句柄临近过期时续期、provider 报告失效时重建并重试成功
+3. 验证创建失败时请求照常携带完整系统提示词，且短时间内不再重复尝试
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from src.analyzer import GeminiAnalyzer
+from src.config import Config
+from src.context_cache import get_context_cache, reset_context_cache
+from src.llm_scheduler import reset_llm_scheduler
+from src.storage import DatabaseManager
+
+RESPONSE_TEXT = json.dumps(
+    {"sentiment_score": 66, "trend_prediction": "看多", "operation_advice": "持有"}, ensure_ascii=False
+)
+
+
+class _FakeGeminiProvider:
+    """
+    模拟 Gemini 的 caches / models 接口
+
+    按字符数统计每次请求需要重新处理的输入量；引用缓存句柄时系统提示词不计入。
+    """
+
+    def __init__(self, fail_create: bool = False):
+        self.fail_create = fail_create
+        self.caches = SimpleNamespace(create=self._create, update=self._update)
+        self.models = SimpleNamespace(generate_content=self._generate_content)
+        self.store = {}
+        self.created = 0
+        self.updated = 0
+        self.processed_chars = 0
+        self.cached_chars = 0
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def expire_all(self) -> None:
+        """模拟 provider 侧句柄全部过期"""
+        for entry in self.store.values():
+            entry["expire_at"] = time.time() - 1
+
+    def _cached(self, name: str, expire_at: float) -> SimpleNamespace:
+        return SimpleNamespace(name=name, expire_time=datetime.fromtimestamp(expire_at, tz=timezone.utc))
+
+    def _create(self, model, config):
+        if self.fail_create:
+            raise RuntimeError("400 Cached content is too small. min_total_token_count=4096")
+        with self._lock:
+            self.created += 1
+            name = f"cachedContents/{self.created}"
+            expire_at = time.time() + int(config.ttl.rstrip("s"))
+            self.store[name] = {"model": model, "system": config.system_instruction, "expire_at": expire_at}
+        return self._cached(name, expire_at)
+
+    def _update(self, name, config):
+        with self._lock:
+            self.updated += 1
+            entry = self.store[name]
+            entry["expire_at"] = time.time() + int(config.ttl.rstrip("s"))
+        return self._cached(name, entry["expire_at"])
+
+    def _generate_content(self, model, contents, config):
+        with self._lock:
+            self.requests.append(config)
+            cached = 0
+            if config.cached_content:
+                entry = self.store.get(config.cached_content)
+                if entry is None or entry["expire_at"] <= time.time():
+                    raise RuntimeError("404 CachedContent not found (or permission denied)")
+                assert config.system_instruction is None and entry["model"] == model
+                cached = len(entry["system"])
+                self.processed_chars += len(contents)
+                self.cached_chars += cached
+            else:
+                self.processed_chars += len(config.system_instruction) + len(contents)
+        return SimpleNamespace(text=RESPONSE_TEXT, usage_metadata=SimpleNamespace(
+            total_token_count=None, cached_content_token_count=cached,
+        ))
+
+
+class _CachingAnalyzer(GeminiAnalyzer):
+    def __init__(self, provider: _FakeGeminiProvider):
+        self._provider = provider
+        super().__init__(api_key="offline-test-api-key")
+
+    def _init_model(self) -> None:
+        self._gemini_client = self._provider
+        self._current_model_name = "gemini-test"
+
+
+def _context(code: str) -> dict:
+    return {"code": code, "stock_name": f"测试{code}", "date": "2026-10-19", "today": {"close": 10.0}}
+
+
+class ContextCacheTestCase(unittest.TestCase):
+    """上下文缓存测试"""
+
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._env = {
+            "DATABASE_PATH": os.path.join(self._temp_dir.name, "test_context_cache.db"),
+            "LLM_CONTEXT_CACHE_ENABLED": "true",
+            "LLM_DEFAULT_RPM": "0",
+            "LLM_CACHE_ENABLED": "false",
+            "GEMINI_RETRY_DELAY": "0.01",
+        }
+        os.environ.update(self._env)
+        Config._instance = None
+        DatabaseManager.reset_instance()
+        reset_llm_scheduler()
+        reset_context_cache()
+
+    def tearDown(self) -> None:
+        for name in self._env:
+            if name != "DATABASE_PATH":
+                os.environ.pop(name, None)
+        Config._instance = None
+        reset_llm_scheduler()
+        reset_context_cache()
+        DatabaseManager.reset_instance()
+        self._temp_dir.cleanup()
+
+    def _run(self, provider: _FakeGeminiProvider, size: int) -> list:
+        analyzer = _CachingAnalyzer(provider)
+        codes = [f"{600000 + i}" for i in range(size)]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            return list(pool.map(lambda code: analyzer.analyze(_context(code)), codes))
+
+    def test_system_prompt_cached_once_per_run(self) -> None:
+        """100 只股票并发分析只创建一次句柄，每次请求都引用句柄，重复处理的输入大幅减少"""
+        cached = _FakeGeminiProvider()
+        results = self._run(cached, 100)
+        self.assertTrue(all(r.success and r.sentiment_score == 66 for r in results))
+        self.assertEqual(cached.created, 1)
+        self.assertTrue(all(config.cached_content == "cachedContents/1" for config in cached.requests))
+        self.assertEqual(cached.cached_chars, 100 * len(GeminiAnalyzer.SYSTEM_PROMPT))
+        self.assertEqual(get_context_cache().stats()["references"], 100)
+
+        os.environ["LLM_CONTEXT_CACHE_ENABLED"] = "false"
+        Config._instance = None
+        uncached = _FakeGeminiProvider()
+        self._run(uncached, 100)
+        self.assertEqual(uncached.created, 0)
+        self.assertLess(cached.processed_chars, uncached.processed_chars * 0.6)
+
+    def test_refresh_and_recreate(self) -> None:
+        """临近过期时续期；provider 侧句柄失效时丢弃并重建，本次请求重试成功"""
+        provider = _FakeGeminiProvider()
+        analyzer = _CachingAnalyzer(provider)
+        analyzer.analyze(_context("600519"))
+
+        cache = get_context_cache()
+        for entry in cache._entries.values():
+            entry.expire_at = time.time() + 5
+        analyzer.analyze(_context("600519"))
+        self.assertEqual((provider.created, provider.updated), (1, 1))
+        self.assertEqual(cache.stats()["refreshed"], 1)
+
+        provider.expire_all()
+        result = analyzer.analyze(_context("000001"))
+        self.assertTrue(result.success)
+        self.assertEqual(result.operation_advice, "持有")
+        self.assertEqual(provider.created, 2)
+        self.assertEqual(provider.requests[-1].cached_content, "cachedContents/2")
+
+    def test_create_failure_sends_full_prompt(self) -> None:
+        """创建失败（如低于最小缓存长度）时携带完整系统提示词，且不在每次请求时重复尝试"""
+        provider = _FakeGeminiProvider(fail_create=True)
+        results = self._run(provider, 5)
+        self.assertTrue(all(r.success for r in results))
+        self.assertTrue(all(config.cached_content is None for config in provider.requests))
+        self.assertTrue(all(config.system_instruction == GeminiAnalyzer.SYSTEM_PROMPT for config in provider.requests))
+        self.assertEqual(get_context_cache().stats()["failures"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 增量决策仪表盘单元测试
+===================================
+
+职责：
+1. 验证增量构建结果与一次性生成的日报一致
+2. 验证段落只在追加时渲染一次
+"""
+
+import unittest
+from unittest import mock
+
+from src.analyzer import AnalysisResult
+from src.notification import DashboardBuilder, NotificationService
+
+
+def _result(code: str, name: str, score: int, **kwargs) -> AnalysisResult:
+    return AnalysisResult(
+        code=code, name=name, sentiment_score=score,
+        trend_prediction="看多", operation_advice="持有", **kwargs
+    )
+
+
+class DashboardBuilderTestCase(unittest.TestCase):
+    """增量决策仪表盘测试"""
+
+    def setUp(self) -> None:
+        self.notifier = NotificationService()
+        self.results = [
+            _result("600519", "贵州茅台", 70, decision_type="buy", buy_reason="趋势向上"),
+            _result("000001", "平安银行", 40, dashboard={"core_conclusion": {"one_sentence": "观望"}}),
+            _result("300750", "宁德时代", 70),
+        ]
+
+    def test_matches_full_report(self) -> None:
+        """逐个追加后的汇总与 generate_dashboard_report 相同"""
+        builder = DashboardBuilder(self.notifier)
+        for result in self.results:
+            builder.add(result)
+
+        with mock.patch("src.notification.datetime") as fake_datetime:
+            fake_datetime.now.return_value.strftime.return_value = "2026-01-05 18:00:00"
+            expected = self.notifier.generate_dashboard_report(self.results, "2026-01-05")
+            actual = builder.build("2026-01-05")
+        self.assertEqual(actual, expected)
+        self.assertLess(actual.index("贵州茅台"), actual.index("平安银行"))
+
+    def test_sections_rendered_once(self) -> None:
+        """多次汇总不会重新渲染已追加的段落"""
+        builder = DashboardBuilder(self.notifier)
+        with mock.patch.object(
+            self.notifier, "_render_dashboard_section", wraps=self.notifier._render_dashboard_section
+        ) as render:
+            for result in self.results:
+                builder.add(result)
+                builder.build()
+        self.assertEqual(render.call_count, len(self.results))
+        self.assertEqual(len(builder), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 盘中增量信号单元测试
+===================================
+
+职责：
+1. 验证增量指标与整段重算（pandas）一致
+2. 验证同一 K 线内的更新不写入状态、跨日 VWAP 重置、快照成交量按手换算
+3. 验证状态变化事件与监控轮询
+"""
+
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from src.intraday import VWAP_ABOVE, VWAP_BELOW, IntradayEngine, IntradayMonitor, is_trading_time
+from src.stock_analyzer import MACDStatus, TrendStatus
+
+START = datetime(2026, 10, 19, 9, 30)
+
+
+def _minute_bars(closes, code="600519"):
+    return pd.DataFrame({
+        "code": code,
+        "time": [START + timedelta(minutes=i) for i in range(len(closes))],
+        "close": closes,
+        "volume": 100.0,
+    })
+
+
+class IntradayEngineTestCase(unittest.TestCase):
+    """盘中增量指标测试"""
+
+    def test_matches_full_recompute(self) -> None:
+        """逐根写入分钟 K 线后，指标与整段 pandas 重算一致"""
+        rng = np.random.default_rng(5)
+        closes = 10 * np.exp(np.cumsum(rng.normal(0, 0.003, 80)))
+        engine = IntradayEngine()
+        engine.update_bars(_minute_bars(closes))
+        actual = engine.indicators(["600519"]).iloc[0]
+
+        close = pd.Series(closes)
+        dif = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+        dea = dif.ewm(span=9, adjust=False).mean()
+        delta = close.diff()
+        gain = delta.where(delta > 0, 0.0).ewm(alpha=1 / 12, adjust=False).mean()
+        loss = (-delta).where(delta < 0, 0.0).ewm(alpha=1 / 12, adjust=False).mean()
+
+        self.assertEqual(actual["bars"], 80)
+        for window in (5, 10, 20):
+            self.assertAlmostEqual(actual[f"ma{window}"], close.rolling(window).mean().iloc[-1], places=9)
+        self.assertAlmostEqual(actual["macd_dif"], dif.iloc[-1], places=9)
+        self.assertAlmostEqual(actual["macd_dea"], dea.iloc[-1], places=9)
+        self.assertAlmostEqual(actual["rsi"], 100 - 100 / (1 + gain.iloc[-1] / loss.iloc[-1]), places=6)
+        self.assertAlmostEqual(actual["vwap"], closes.mean(), places=9)
+
+    def test_live_bar_and_new_day(self) -> None:
+        """同一 K 线内只刷新最新价；跨日累计成交量重新计算 VWAP"""
+        engine = IntradayEngine(bar_minutes=5)
+        engine.update(["600519"], [10.0], START, volumes=[100], amounts=[1000], cumulative=True)
+        engine.update(["600519"], [10.4], START + timedelta(minutes=2), volumes=[300], amounts=[3100])
+        row = engine.indicators().iloc[0]
+        self.assertEqual(row["bars"], 1)
+        self.assertEqual(row["price"], 10.4)
+        self.assertAlmostEqual(row["vwap"], 3100 / 300)
+
+        engine.update(["600519"], [10.6], START + timedelta(minutes=5), volumes=[400], amounts=[4160])
+        self.assertEqual(engine.indicators().iloc[0]["bars"], 2)
+
+        engine.update(["600519"], [11.0], START + timedelta(days=1), volumes=[1000], amounts=[11000])
+        self.assertAlmostEqual(engine.indicators().iloc[0]["vwap"], 11.0)
+
+    def test_snapshot_volume_in_lots(self) -> None:
+        """全市场快照的成交量以「手」计，写入时换算为股"""
+        engine = IntradayEngine()
+        engine.update_snapshot(pd.DataFrame({
+            "code": ["600519"], "price": [1500.0], "volume": [20.0], "amount": [3_000_000.0],
+        }), START)
+        self.assertAlmostEqual(engine.indicators().iloc[0]["vwap"], 1500.0)
+
+    def test_signal_events(self) -> None:
+        """预热期内不产生事件，趋势反转时产生趋势与 MACD 死叉事件"""
+        closes = list(np.linspace(10, 12, 40)) + list(np.linspace(12, 10.5, 30))
+        engine = IntradayEngine()
+        warmup = engine.update_bars(_minute_bars(closes[:30]))
+        self.assertEqual([e for e in warmup if e.kind != "vwap"], [])
+
+        events = engine.update_bars(_minute_bars(closes)[30:])
+        statuses = {(e.kind, e.status) for e in events}
+        self.assertIn(("macd", MACDStatus.DEATH_CROSS.value), statuses)
+        self.assertIn(("trend", TrendStatus.BEAR.value), statuses)
+        self.assertIn(("vwap", VWAP_BELOW), statuses)
+        self.assertNotIn(("vwap", VWAP_ABOVE), statuses)
+        self.assertTrue(all(e.code == "600519" and e.previous != e.status for e in events))
+
+    def test_capacity_growth(self) -> None:
+        """股票数超过初始容量时自动扩容并保留状态"""
+        engine = IntradayEngine(capacity=2)
+        engine.update(["600000", "600001"], [10.0, 20.0], START)
+        engine.update([f"{600000 + i:06d}" for i in range(5)], [11.0, 21.0, 5.0, 6.0, 7.0], START + timedelta(minutes=1))
+        frame = engine.indicators()
+        self.assertEqual(len(frame), 5)
+        self.assertEqual(frame.loc["600001", "bars"], 2)
+        self.assertEqual(frame.loc["600004", "bars"], 1)
+
+
+class IntradayMonitorTestCase(unittest.TestCase):
+    """盘中监控轮询测试"""
+
+    def test_poll_filters_codes_and_kinds(self) -> None:
+        """只更新监控的股票，只返回配置的信号类型，快照缓存年龄不超过半个轮询周期"""
+        requested = []
+
+        class _Manager:
+            def __init__(self):
+                self.price = 9.8
+
+            def get_realtime_snapshot(self, max_age=None):
+                requested.append(max_age)
+                self.price *= 1.01
+                return pd.DataFrame({
+                    "code": ["600519", "000001"], "price": [self.price, 5.0],
+                    "volume": [1.0, 1.0], "amount": [1000.0, 500.0],
+                })
+
+        monitor = IntradayMonitor(codes=["600519"], poll_seconds=10, fetcher_manager=_Manager(), kinds=["vwap"])
+        events = []
+        for i in range(3):
+            events += monitor.poll_once(START + timedelta(minutes=i))
+
+        self.assertEqual(monitor.engine.codes, ["600519"])
+        self.assertEqual(requested, [5.0, 5.0, 5.0])
+        self.assertEqual([e.status for e in events], [VWAP_ABOVE])
+        self.assertIn("600519", IntradayMonitor.format_events(events))
+
+    def test_trading_time(self) -> None:
+        """午间休市与周末不在交易时段"""
+        self.assertTrue(is_trading_time(datetime(2026, 10, 19, 10, 0)))
+        self.assertFalse(is_trading_time(datetime(2026, 10, 19, 12, 0)))
+        self.assertFalse(is_trading_time(datetime(2026, 10, 18, 10, 0)))
+
+
+if __name__ == "__main__":
+    unittest.main()
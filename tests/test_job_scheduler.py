@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 优先级任务调度器单元测试
+===================================
+
+职责：
+1. 验证槽位按优先级分配、各类并发上限生效
+2. 验证同一优先级内按 owner 轮转
+3. 验证返回 Future 的任务占用槽位直到 Future 完成
+"""
+
+import threading
+import time
+import unittest
+from concurrent.futures import Future
+
+from src.core.job_scheduler import JobScheduler
+from src.enums import JobPriority
+
+
+class JobSchedulerTestCase(unittest.TestCase):
+    """优先级任务调度器测试"""
+
+    def _wait_until(self, predicate, timeout: float = 5.0) -> None:
+        deadline = time.time() + timeout
+        while not predicate():
+            if time.time() > deadline:
+                self.fail("等待超时")
+            time.sleep(0.005)
+
+    def _waiting(self, scheduler: JobScheduler, priority: JobPriority) -> int:
+        return scheduler.stats()[priority.value]["waiting"]
+
+    def test_interactive_not_blocked_by_batch(self) -> None:
+        """批量任务达到上限时，交互式请求使用剩余槽位立即执行"""
+        scheduler = JobScheduler(total_slots=3, class_limits={JobPriority.BATCH: 2})
+        release = threading.Event()
+
+        def batch_unit():
+            with scheduler.slot(JobPriority.BATCH, "batch"):
+                release.wait(5)
+
+        threads = [threading.Thread(target=batch_unit) for _ in range(4)]
+        for t in threads:
+            t.start()
+        self._wait_until(lambda: self._waiting(scheduler, JobPriority.BATCH) == 2)
+        self.assertEqual(scheduler.stats()["batch"]["running"], 2)
+
+        future = scheduler.submit(JobPriority.INTERACTIVE, "web", lambda: "done")
+        self.assertEqual(future.result(timeout=1), "done")
+
+        release.set()
+        for t in threads:
+            t.join(5)
+        self.assertEqual(scheduler.stats()["batch"]["granted"], 4)
+
+    def test_priority_and_fair_order(self) -> None:
+        """槽位释放后先给高优先级，同优先级内按 owner 轮转"""
+        scheduler = JobScheduler(total_slots=1)
+        order = []
+        lock = threading.Lock()
+
+        scheduler.acquire(JobPriority.BATCH, "holder")
+
+        def unit(priority, owner, tag):
+            with scheduler.slot(priority, owner):
+                with lock:
+                    order.append(tag)
+
+        threads = []
+        pending = [
+            (JobPriority.BATCH, "chat_a", "a1"),
+            (JobPriority.BATCH, "chat_a", "a2"),
+            (JobPriority.BATCH, "chat_a", "a3"),
+            (JobPriority.BATCH, "chat_b", "b1"),
+            (JobPriority.INTERACTIVE, "web", "i1"),
+        ]
+        for index, args in enumerate(pending):
+            t = threading.Thread(target=unit, args=args)
+            t.start()
+            threads.append(t)
+            total = index + 1
+            self._wait_until(lambda: sum(s["waiting"] for s in scheduler.stats().values()) == total)
+
+        scheduler.release(JobPriority.BATCH)
+        for t in threads:
+            t.join(5)
+
+        self.assertEqual(order, ["i1", "a1", "b1", "a2", "a3"])
+
+    def test_call_holds_slot_until_future_done(self) -> None:
+        """fn 返回 Future 时槽位保持到 Future 完成；普通返回值与异常立即归还"""
+        scheduler = JobScheduler(total_slots=2)
+        pending = Future()
+        self.assertIs(scheduler.call(JobPriority.BATCH, "batch", lambda: pending), pending)
+        self.assertEqual(scheduler.stats()["batch"]["running"], 1)
+
+        self.assertEqual(scheduler.call(JobPriority.BATCH, "batch", lambda x: x * 2, 21), 42)
+        with self.assertRaises(ValueError):
+            scheduler.call(JobPriority.BATCH, "batch", int, "abc")
+        self.assertEqual(scheduler.stats()["batch"]["running"], 1)
+
+        pending.set_result("done")
+        self.assertEqual(scheduler.stats()["batch"]["running"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
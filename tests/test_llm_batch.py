@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 多股批量分析单元测试
+===================================
+
+职责：
+1. 验证多只股票合并为一次请求，并按代码拆分回各自的结果
+2. 验证校验不通过的条目、无法解析的响应改为单股请求
+3. 验证凑批执行器按数量/超时发出批次并分发结果
+"""
+
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import unittest
+
+from src.analyzer import GeminiAnalyzer
+from src.config import Config
+from src.core.batcher import Batcher
+from src.storage import DatabaseManager
+
+
+def _context(code: str) -> dict:
+    return {
+        "code": code,
+        "stock_name": f"测试{code}",
+        "date": "2026-10-19",
+        "today": {"close": 10.0, "pct_chg": 1.2, "ma5": 9.9, "ma10": 9.8, "ma20": 9.7},
+        "trend_analysis": {"trend_status": "多头排列", "bias_ma5": 1.0, "risk_factors": ["量能不足"]},
+    }
+
+
+def _entry(code: str, score: int = 66) -> dict:
+    return {
+        "code": code,
+        "sentiment_score": score,
+        "trend_prediction": "看多",
+        "operation_advice": "持有",
+        "dashboard": {"core_conclusion": {"one_sentence": f"{code} 回踩可轻仓"}},
+        "analysis_summary": f"{code} 批量结果",
+    }
+
+
+class _BatchAnalyzer(GeminiAnalyzer):
+    """按脚本返回批量/单股响应的分析器，记录每次请求的 Prompt"""
+
+    def __init__(self, batch_response):
+        self.batch_response = batch_response
+        self.prompts = []
+        super().__init__(api_key="offline-test-api-key")
+
+    def _init_model(self) -> None:
+        self._gemini_client = self
+        self._current_model_name = "test-model"
+
+    def _call_api_uncached(self, prompt: str, generation_config: dict) -> str:
+        self.prompts.append(prompt)
+        codes = re.findall(r"^## 股票 \d+：(\S+) ", prompt, flags=re.MULTILINE)
+        if codes:
+            return self.batch_response(codes)
+        code = re.search(r"股票代码 (?:\| )?\*\*([^*]+)\*\*", prompt).group(1)
+        return json.dumps(dict(_entry(code, 50), analysis_summary="单股结果"), ensure_ascii=False)
+
+
+class BatchAnalyzeTestCase(unittest.TestCase):
+    """多股批量分析测试"""
+
+    CODES = ["600519", "000001", "300750"]
+
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        os.environ["DATABASE_PATH"] = os.path.join(self._temp_dir.name, "test_llm_batch.db")
+        Config._instance = None
+        DatabaseManager.reset_instance()
+
+    def tearDown(self) -> None:
+        Config._instance = None
+        DatabaseManager.reset_instance()
+        self._temp_dir.cleanup()
+
+    def _items(self):
+        return [(_context(code), f"{code} 新闻" if i == 0 else None) for i, code in enumerate(self.CODES)]
+
+    def test_single_request_split_by_code(self) -> None:
+        """一次请求返回乱序数组，按代码拆分且保持输入顺序"""
+        def respond(codes):
+            # 乱序、代码被输出为数字（000001 -> 1）
+            entries = [_entry(code, 60 + i) for i, code in enumerate(codes)][::-1]
+            entries[1]["code"] = 1
+            return "```json\n" + json.dumps(entries, ensure_ascii=False) + "\n```"
+
+        analyzer = _BatchAnalyzer(respond)
+        results = analyzer.analyze_batch(self._items())
+
+        self.assertEqual(len(analyzer.prompts), 1)
+        self.assertEqual(analyzer.prompts[0].count("## 股票 "), 3)
+        self.assertEqual([r.code for r in results], self.CODES)
+        self.assertEqual([r.sentiment_score for r in results], [60, 61, 62])
+        self.assertTrue(results[0].search_performed)
+        self.assertFalse(results[1].search_performed)
+        self.assertEqual(results[2].get_core_conclusion(), "300750 回踩可轻仓")
+        self.assertEqual(json.loads(results[1].raw_response)["sentiment_score"], 61)
+
+    def test_invalid_entries_fall_back(self) -> None:
+        """缺失、评分越界、代码不在批次中的条目改为单股请求"""
+        def respond(codes):
+            return json.dumps([_entry(codes[0]), _entry(codes[1], 180), _entry("999999")])
+
+        analyzer = _BatchAnalyzer(respond)
+        results = analyzer.analyze_batch(self._items())
+
+        self.assertEqual(len(analyzer.prompts), 3)
+        self.assertEqual(results[0].analysis_summary, "600519 批量结果")
+        self.assertEqual([r.analysis_summary for r in results[1:]], ["单股结果", "单股结果"])
+        self.assertTrue(all(r.success for r in results))
+
+    def test_unparseable_response_falls_back(self) -> None:
+        """响应不是 JSON 数组时全部改为单股请求"""
+        analyzer = _BatchAnalyzer(lambda codes: json.dumps(_entry(codes[0])))
+        results = analyzer.analyze_batch(self._items())
+
+        self.assertEqual(len(analyzer.prompts), 4)
+        self.assertEqual([r.code for r in results], self.CODES)
+        self.assertEqual({r.analysis_summary for r in results}, {"单股结果"})
+
+
+class BatcherTestCase(unittest.TestCase):
+    """凑批执行器测试"""
+
+    def test_size_and_timeout_flush(self) -> None:
+        """满一批立即发出，不足一批在超时后发出"""
+        batches = []
+        lock = threading.Lock()
+
+        def double(items):
+            with lock:
+                batches.append(list(items))
+            return [x * 2 for x in items]
+
+        batcher = Batcher(double, batch_size=3, max_wait=0.1)
+        futures = [batcher.submit(x) for x in range(5)]
+
+        self.assertEqual([f.result(2) for f in futures[:3]], [0, 2, 4])
+        start = time.time()
+        self.assertEqual([f.result(2) for f in futures[3:]], [6, 8])
+        self.assertLess(time.time() - start, 1.0)
+        self.assertEqual(sorted(map(len, batches)), [2, 3])
+
+    def test_batch_error_propagates(self) -> None:
+        """批处理异常或结果数量不符时，该批所有 Future 以异常结束"""
+        batcher = Batcher(lambda items: items[:1], batch_size=2, max_wait=0.05)
+        futures = [batcher.submit(x) for x in range(2)]
+        for future in futures:
+            with self.assertRaises(ValueError):
+                future.result(2)
+
+
+if __name__ == "__main__":
+    unittest.main()
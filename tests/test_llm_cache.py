@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - LLM 响应缓存单元测试
+===================================
+
+职责：
+1. 验证相同请求命中缓存、AnalysisResult 标记命中
+2. 验证按调用绕过缓存、请求内容变化使用新键
+3. 验证过期与容量淘汰
+4. 验证解析失败的响应不写入缓存
+"""
+
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from src.analyzer import GeminiAnalyzer
+from src.config import Config
+from src.storage import DatabaseManager, LLMResponseCache
+
+RESPONSE = json.dumps({
+    "stock_name": "贵州茅台",
+    "sentiment_score": 66,
+    "trend_prediction": "看多",
+    "operation_advice": "持有",
+    "analysis_summary": "缓存测试",
+}, ensure_ascii=False)
+
+CONTEXT = {
+    "code": "600519",
+    "stock_name": "贵州茅台",
+    "date": "2026-10-19",
+    "today": {"close": 1820.0, "ma5": 1810.0, "ma10": 1800.0, "ma20": 1790.0},
+}
+
+
+class _CountingAnalyzer(GeminiAnalyzer):
+    """不调用真实接口、只统计请求次数的分析器"""
+
+    def __init__(self):
+        self.calls = 0
+        self.response = RESPONSE
+        super().__init__(api_key="offline-test-api-key")
+
+    def _init_model(self) -> None:
+        self._gemini_client = self
+        self._current_model_name = "test-model"
+
+    def _call_api_uncached(self, prompt: str, generation_config: dict) -> str:
+        self.calls += 1
+        return self.response
+
+
+class LLMResponseCacheTestCase(unittest.TestCase):
+    """LLM 响应缓存测试"""
+
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        os.environ["DATABASE_PATH"] = os.path.join(self._temp_dir.name, "test_llm_cache.db")
+        os.environ["LLM_CACHE_MAX_ENTRIES"] = "3"
+
+        Config._instance = None
+        DatabaseManager.reset_instance()
+        self.db = DatabaseManager.get_instance()
+        self.analyzer = _CountingAnalyzer()
+
+    def tearDown(self) -> None:
+        os.environ.pop("LLM_CACHE_MAX_ENTRIES", None)
+        Config._instance = None
+        DatabaseManager.reset_instance()
+        self._temp_dir.cleanup()
+
+    def _cached_rows(self) -> int:
+        with self.db.get_session() as session:
+            return session.query(LLMResponseCache).count()
+
+    def test_repeat_analysis_hits_cache(self) -> None:
+        """相同上下文第二次分析不调用接口，结果标记为缓存命中"""
+        first = self.analyzer.analyze(CONTEXT)
+        second = self.analyzer.analyze(CONTEXT)
+
+        self.assertEqual(self.analyzer.calls, 1)
+        self.assertFalse(first.cache_hit)
+        self.assertTrue(second.cache_hit)
+        self.assertTrue(second.to_dict()["cache_hit"])
+        self.assertEqual(second.sentiment_score, first.sentiment_score)
+
+    def test_unparseable_response_not_cached(self) -> None:
+        """无法解析或缺少必填字段的响应不写入缓存，下次分析重新请求"""
+        for response in ("建议持有观望", json.dumps({"analysis_summary": "缺少评分"}, ensure_ascii=False)):
+            self.analyzer.response = response
+            self.analyzer.analyze(CONTEXT)
+            self.assertEqual(self._cached_rows(), 0)
+
+        self.analyzer.response = RESPONSE
+        self.assertFalse(self.analyzer.analyze(CONTEXT).cache_hit)
+        self.assertTrue(self.analyzer.analyze(CONTEXT).cache_hit)
+        self.assertEqual(self.analyzer.calls, 3)
+
+    def test_bypass_and_key_changes(self) -> None:
+        """use_cache=False 强制调用；生成参数或模型变化都不命中"""
+        config = {"temperature": 0.7, "max_output_tokens": 100}
+        self.analyzer._call_api_with_retry("prompt", config)
+        self.analyzer._call_api_with_retry("prompt", config, use_cache=False)
+        self.assertEqual(self.analyzer.calls, 2)
+        self.assertFalse(self.analyzer._last_call_cache_hit())
+
+        self.analyzer._call_api_with_retry("prompt", dict(config, temperature=0.2))
+        self.analyzer._current_model_name = "other-model"
+        self.analyzer._call_api_with_retry("prompt", config)
+        self.assertEqual(self.analyzer.calls, 4)
+
+        self.analyzer._current_model_name = "test-model"
+        self.analyzer._call_api_with_retry("prompt", config)
+        self.assertEqual(self.analyzer.calls, 4)
+        self.assertTrue(self.analyzer._last_call_cache_hit())
+
+    def test_ttl_and_eviction(self) -> None:
+        """过期条目视为未命中；超过容量时淘汰最早写入的条目"""
+        config = {"temperature": 0.7}
+        self.analyzer._call_api_with_retry("p0", config)
+        with self.db.get_session() as session:
+            session.query(LLMResponseCache).update(
+                {LLMResponseCache.created_at: datetime.now() - timedelta(days=2)}
+            )
+            session.commit()
+        self.analyzer._call_api_with_retry("p0", config)
+        self.assertEqual(self.analyzer.calls, 2)
+
+        for i in range(1, 5):
+            self.analyzer._call_api_with_retry(f"p{i}", config)
+        self.assertEqual(self._cached_rows(), 3)
+        self.analyzer._call_api_with_retry("p4", config)
+        self.analyzer._call_api_with_retry("p1", config)
+        self.assertEqual(self.analyzer.calls, 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
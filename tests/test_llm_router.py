@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - LLM 多模型路由单元测试
+===================================
+
+职责：
+1. 验证按报告档位与实时延迟选择路由
+2. 验证 429 限流立即熔断并切换路由，冷却后半开状态只放行一个试探请求
+3. 验证首选路由超过 P95 未返回时对冲次选路由
+4. 验证分析器启用路由后限流模型不再拖慢分析
+"""
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from src.analyzer import GeminiAnalyzer
+from src.config import Config
+from src.enums import ReportType
+from src.llm_router import TIER_FAST, TIER_STRONG, LLMRoute, LLMRouter, parse_routes, reset_llm_router
+from src.llm_scheduler import reset_llm_scheduler
+from src.storage import DatabaseManager
+
+STRONG = LLMRoute("gemini", "pro", TIER_STRONG)
+FAST = LLMRoute("gemini", "flash", TIER_FAST)
+CHEAP = LLMRoute("openai", "mini", TIER_FAST)
+
+
+class LLMRouterTestCase(unittest.TestCase):
+    """路由器测试"""
+
+    def test_select_by_tier_and_latency(self) -> None:
+        """完整报告优先 strong 档；同档位内预期延迟低者优先，失败率高者降级"""
+        router = LLMRouter([STRONG, FAST, CHEAP])
+        self.assertEqual(router.select(TIER_STRONG)[0], STRONG)
+        self.assertEqual(router.select(TIER_FAST), [FAST, CHEAP, STRONG])
+
+        for _ in range(3):
+            router.record_success(FAST, 1.5)
+            router.record_success(CHEAP, 1.0)
+        self.assertEqual(router.select(TIER_FAST)[:2], [CHEAP, FAST])
+        self.assertEqual(router.select(TIER_FAST, available=lambda r: r.provider == "gemini"), [FAST, STRONG])
+
+        router.record_failure(CHEAP, RuntimeError("timeout"))
+        router.record_failure(CHEAP, RuntimeError("timeout"))
+        self.assertEqual(router.select(TIER_FAST)[0], FAST)
+        self.assertEqual(
+            parse_routes("gemini:pro, openai:mini:fast, bad"),
+            [LLMRoute("gemini", "pro", TIER_STRONG), LLMRoute("openai", "mini", TIER_FAST)],
+        )
+
+    def test_rate_limit_opens_circuit(self) -> None:
+        """429 后立即换路由且不等待退避；冷却结束后恢复试探，成功即闭合"""
+        router = LLMRouter([STRONG, FAST], circuit_cooldown=0.2, retry_delay=5.0)
+        calls = []
+
+        def request(route):
+            calls.append(route)
+            if route == STRONG and len(calls) == 1:
+                raise RuntimeError("429 Resource has been exhausted")
+            return route.model
+
+        start = time.monotonic()
+        self.assertEqual(router.call(request, tier=TIER_STRONG), "flash")
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual(calls, [STRONG, FAST])
+        self.assertGreater(router.stats()["gemini:pro"]["open_seconds"], 0)
+
+        # 熔断期间不再选中
+        self.assertEqual(router.call(request, tier=TIER_STRONG), "flash")
+        time.sleep(0.25)
+        self.assertEqual(router.call(request, tier=TIER_STRONG), "pro")
+        self.assertEqual(router.stats()["gemini:pro"]["open_seconds"], 0)
+        self.assertEqual(router.stats()["gemini:pro"]["rate_limited"], 1)
+
+    def test_half_open_admits_single_probe(self) -> None:
+        """冷却结束后只放行一个试探请求，其余请求绕开该路由；试探失败立即重新熔断"""
+        router = LLMRouter([STRONG, FAST], circuit_cooldown=0.1, failure_threshold=3)
+        router.record_failure(STRONG, RuntimeError("429 Too Many Requests"))
+        time.sleep(0.15)
+
+        probe_started = threading.Event()
+        release_probe = threading.Event()
+        calls = []
+
+        def request(route):
+            calls.append(route)
+            if route == STRONG:
+                probe_started.set()
+                release_probe.wait(timeout=5)
+                raise RuntimeError("500 internal error")
+            return route.model
+
+        results = []
+        prober = threading.Thread(target=lambda: results.append(router.call(request, tier=TIER_STRONG)))
+        prober.start()
+        self.assertTrue(probe_started.wait(timeout=5))
+
+        # 试探在途：其他请求不再发往该路由
+        self.assertIsNone(router.admit(STRONG))
+        self.assertEqual(router.select(TIER_STRONG)[0], FAST)
+        self.assertEqual(router.call(request, tier=TIER_STRONG), "flash")
+
+        release_probe.set()
+        prober.join(timeout=5)
+        self.assertEqual(results, ["flash"])
+        self.assertEqual(calls.count(STRONG), 1)
+        # 试探失败（非限流、未达连续失败阈值）也立即重新熔断
+        self.assertGreater(router.stats()["gemini:pro"]["open_seconds"], 0)
+
+    def test_hedge_after_p95(self) -> None:
+        """首选路由超过其 P95 仍未返回时并发请求次选路由，先返回者胜出"""
+        router = LLMRouter([STRONG, FAST], hedge=True)
+        for _ in range(10):
+            router.record_success(STRONG, 0.01)
+        release = threading.Event()
+
+        def request(route):
+            if route == STRONG:
+                release.wait(2)
+                return "slow"
+            return "hedged"
+
+        start = time.monotonic()
+        self.assertEqual(router.call(request, tier=TIER_STRONG), "hedged")
+        self.assertLess(time.monotonic() - start, 1.5)
+        release.set()
+        self.assertEqual((router.hedged, router.hedge_wins), (1, 1))
+
+
+class _FakeModels:
+    """按模型返回结果的假 Gemini 客户端：限流模型总是返回 429"""
+
+    def __init__(self, limited: set):
+        self.limited = limited
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def generate_content(self, model, contents, config):
+        with self._lock:
+            self.calls.append(model)
+        if model in self.limited:
+            raise RuntimeError("429 Resource has been exhausted")
+        return SimpleNamespace(
+            text='{"sentiment_score": 66, "trend_prediction": "看多", "operation_advice": "持有"}',
+            usage_metadata=None,
+        )
+
+
+class _RoutedAnalyzer(GeminiAnalyzer):
+    def __init__(self, models: _FakeModels):
+        self._models = models
+        super().__init__(api_key="offline-test-api-key")
+
+    def _init_model(self) -> None:
+        self._gemini_client = SimpleNamespace(models=self._models)
+        self._current_model_name = "gemini-pro"
+
+
+class AnalyzerRoutingTestCase(unittest.TestCase):
+    """分析器路由集成测试"""
+
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._env = {
+            "DATABASE_PATH": os.path.join(self._temp_dir.name, "test_llm_router.db"),
+            "LLM_ROUTER_ENABLED": "true",
+            "LLM_ROUTES": "gemini:gemini-pro:strong,gemini:gemini-flash:fast",
+            "LLM_DEFAULT_RPM": "0",
+            "LLM_CACHE_ENABLED": "false",
+        }
+        os.environ.update(self._env)
+        Config._instance = None
+        DatabaseManager.reset_instance()
+        reset_llm_scheduler()
+        reset_llm_router()
+
+    def tearDown(self) -> None:
+        for name in self._env:
+            if name != "DATABASE_PATH":
+                os.environ.pop(name, None)
+        Config._instance = None
+        reset_llm_scheduler()
+        reset_llm_router()
+        DatabaseManager.reset_instance()
+        self._temp_dir.cleanup()
+
+    def test_report_type_routing_and_failover(self) -> None:
+        """精简报告直接用 fast 档；strong 档限流时完整报告立即改用 fast 档，之后跳过被熔断的模型"""
+        context = {"code": "600519", "stock_name": "贵州茅台", "date": "2026-10-19", "today": {}}
+        models = _FakeModels(limited={"gemini-pro"})
+        analyzer = _RoutedAnalyzer(models)
+
+        simple = analyzer.analyze(context, report_type=ReportType.SIMPLE)
+        self.assertTrue(simple.success)
+        self.assertEqual(models.calls, ["gemini-flash"])
+
+        start = time.monotonic()
+        full = analyzer.analyze(context, report_type=ReportType.FULL)
+        again = analyzer.analyze(context, report_type=ReportType.FULL)
+        self.assertTrue(full.success and again.success)
+        self.assertLess(time.monotonic() - start, 2.0)
+        self.assertEqual(models.calls, ["gemini-flash", "gemini-pro", "gemini-flash", "gemini-flash"])
+
+    def test_route_available_keeps_default_provider(self) -> None:
+        """检查 OpenAI 路由可用性时按需创建客户端，不改变共享实例的默认 provider 与模型"""
+        os.environ["OPENAI_API_KEY"] = "sk-offline-test-key-0000"
+        self._env["OPENAI_API_KEY"] = os.environ["OPENAI_API_KEY"]
+        Config._instance = None
+        analyzer = _RoutedAnalyzer(_FakeModels(limited=set()))
+
+        self.assertTrue(analyzer._route_available(CHEAP))
+        self.assertIsNotNone(analyzer._openai_client)
+        self.assertFalse(analyzer._use_openai)
+        self.assertEqual(analyzer._current_model_name, "gemini-pro")
+
+    def test_rate_limit_fallback_is_per_call(self) -> None:
+        """未启用路由时 429 过半改用备选模型只作用于本次调用，共享实例的当前模型不变"""
+        overrides = {
+            "LLM_ROUTER_ENABLED": "false",
+            "GEMINI_MODEL_FALLBACK": "gemini-flash",
+            "GEMINI_MAX_RETRIES": "3",
+            "GEMINI_RETRY_DELAY": "0.01",
+        }
+        os.environ.update(overrides)
+        self._env.update(overrides)
+        Config._instance = None
+        context = {"code": "600519", "stock_name": "贵州茅台", "date": "2026-10-19", "today": {}}
+        models = _FakeModels(limited={"gemini-pro"})
+        analyzer = _RoutedAnalyzer(models)
+
+        self.assertTrue(analyzer.analyze(context).success)
+        self.assertEqual(models.calls, ["gemini-pro", "gemini-pro", "gemini-flash"])
+        self.assertEqual(analyzer._current_model_name, "gemini-pro")
+
+        models.limited = set()
+        self.assertTrue(analyzer.analyze(context).success)
+        self.assertEqual(models.calls[-1], "gemini-pro")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - LLM 请求调度器单元测试
+===================================
+
+职责：
+1. 验证 RPM/TPM 令牌桶的放行与排队
+2. 验证限流配置解析（provider:model 键不区分大小写）
+"""
+
+import unittest
+from unittest import mock
+
+from src.llm_scheduler import LLMScheduler, parse_rate_limits
+
+
+class LLMSchedulerTestCase(unittest.TestCase):
+    """LLM 调度器测试"""
+
+    def setUp(self) -> None:
+        # 用虚拟时钟替代真实等待
+        self.now = 1000.0
+        self._patches = [
+            mock.patch("src.llm_scheduler.time.monotonic", side_effect=lambda: self.now),
+            mock.patch("src.llm_scheduler.time.sleep", side_effect=self._advance),
+        ]
+        for p in self._patches:
+            p.start()
+
+    def tearDown(self) -> None:
+        for p in self._patches:
+            p.stop()
+
+    def _advance(self, seconds: float) -> None:
+        self.now += seconds
+
+    def test_rpm_admits_immediately_then_queues(self) -> None:
+        """预算充足立即放行，透支后按补充速率排队"""
+        scheduler = LLMScheduler(default_rpm=60, burst=2)
+
+        waits = [scheduler.acquire("gemini", "m").wait_seconds for _ in range(4)]
+        self.assertEqual(waits[:2], [0.0, 0.0])
+        self.assertAlmostEqual(waits[2], 1.0)
+
+        stats = scheduler.stats()["gemini:m"]
+        self.assertEqual(stats["requests"], 4)
+        self.assertGreater(stats["max_wait"], 0)
+
+    def test_tpm_settle_refunds_estimate(self) -> None:
+        """实际用量小于预估时退还 Token 预算"""
+        scheduler = LLMScheduler(default_rpm=0, default_tpm=600)
+
+        ticket = scheduler.acquire("openai", "m", estimated_tokens=600)
+        self.assertEqual(ticket.wait_seconds, 0.0)
+        scheduler.settle(ticket, 100)
+        self.assertEqual(scheduler.acquire("openai", "m", estimated_tokens=500).wait_seconds, 0.0)
+        self.assertGreater(scheduler.acquire("openai", "m", estimated_tokens=100).wait_seconds, 0.0)
+
+    def test_per_model_limits(self) -> None:
+        """provider:model 配置优先于 provider 配置"""
+        limits = parse_rate_limits("gemini=15/1000, gemini:flash=5, bad=x")
+        self.assertEqual(limits, {"gemini": (15, 1000), "gemini:flash": (5, 0)})
+
+        scheduler = LLMScheduler(default_rpm=0, limits=limits)
+        scheduler.acquire("gemini", "flash")
+        scheduler.acquire("gemini", "pro")
+        scheduler.acquire("openai", "gpt")
+        stats = scheduler.stats()
+        self.assertEqual(stats["gemini:flash"]["rpm"], 5)
+        self.assertEqual(stats["gemini:pro"]["rpm"], 15)
+        self.assertEqual(stats["openai:gpt"]["rpm"], 0)
+
+    def test_model_limit_case_insensitive(self) -> None:
+        """模型名大小写与配置不同时仍命中 provider:model 配置"""
+        scheduler = LLMScheduler(default_rpm=0, limits=parse_rate_limits("gemini:Gemini-2.5-Flash=5"))
+        scheduler.acquire("Gemini", "Gemini-2.5-Flash")
+        self.assertEqual(scheduler.stats()["gemini:Gemini-2.5-Flash"]["rpm"], 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
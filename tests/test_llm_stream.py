@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 流式分析单元测试
+===================================
+
+职责：
+1. 验证增量 JSON 解析在字段完整时立即产出，结果与完整解析一致
+2. 验证流式分析先回调评分/操作建议，最终结果与缓存行为与 analyze() 一致
+3. 验证流式请求失败时退回非流式调用
+4. 验证分析任务的部分结果按顺序转为 SSE 事件
+"""
+
+import json
+import os
+import tempfile
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from src.analyzer import AnalysisResult, GeminiAnalyzer
+from src.config import Config
+from src.enums import ReportType
+from src.llm_scheduler import reset_llm_scheduler
+from src.storage import DatabaseManager
+from src.stream_parser import IncrementalJsonParser
+from web.services import AnalysisService
+
+RESPONSE = {
+    "stock_name": "贵州茅台",
+    "sentiment_score": 72,
+    "trend_prediction": "看多",
+    "operation_advice": "持有",
+    "decision_type": "hold",
+    "confidence_level": "中",
+    "dashboard": {
+        "core_conclusion": {"one_sentence": "缩量回踩 MA5，持有为主", "signal_type": "🟡持有观望"},
+        "intelligence": {"risk_alerts": ["股东减持", "估值偏高"]},
+    },
+    "analysis_summary": "趋势完好，等待回踩",
+}
+RESPONSE_TEXT = "```json\n" + json.dumps(RESPONSE, ensure_ascii=False, indent=2) + "\n```"
+
+
+def _context(code: str = "600519") -> dict:
+    return {
+        "code": code,
+        "stock_name": "贵州茅台",
+        "date": "2026-10-19",
+        "today": {"close": 1820.0, "ma5": 1810.0, "ma10": 1800.0, "ma20": 1790.0},
+    }
+
+
+class _FakeModels:
+    """模拟 google-genai 的 client.models：流式逐块返回，可注入失败"""
+
+    def __init__(self, chunk_size: int = 16, fail_stream: bool = False, fail_after: int = 0):
+        self.chunk_size = chunk_size
+        self.fail_stream = fail_stream
+        self.fail_after = fail_after
+        self.stream_calls = 0
+        self.calls = 0
+        self.yielded = []
+
+    def generate_content_stream(self, model, contents, config):
+        self.stream_calls += 1
+        if self.fail_stream:
+            raise RuntimeError("stream not supported")
+        return self._chunks()
+
+    def _chunks(self):
+        for index, start in enumerate(range(0, len(RESPONSE_TEXT), self.chunk_size)):
+            if self.fail_after and index == self.fail_after:
+                raise ConnectionError("stream reset")
+            self.yielded.append(start)
+            yield SimpleNamespace(text=RESPONSE_TEXT[start:start + self.chunk_size], usage_metadata=None)
+
+    def generate_content(self, model, contents, config):
+        self.calls += 1
+        return SimpleNamespace(text=RESPONSE_TEXT, usage_metadata=None)
+
+
+class _StreamAnalyzer(GeminiAnalyzer):
+    """使用假 Gemini 客户端的分析器"""
+
+    def __init__(self, models: _FakeModels):
+        self._models = models
+        super().__init__(api_key="offline-test-api-key")
+
+    def _init_model(self) -> None:
+        self._gemini_client = SimpleNamespace(models=self._models)
+        self._current_model_name = "test-model"
+
+
+class IncrementalJsonParserTestCase(unittest.TestCase):
+    """增量 JSON 解析测试"""
+
+    def test_fields_complete_in_order(self) -> None:
+        """逐字符输入：字段按完成顺序产出，快照与完整解析一致"""
+        parser = IncrementalJsonParser(max_depth=2)
+        events = []
+        for position, char in enumerate(RESPONSE_TEXT):
+            for path, value in parser.feed(char):
+                events.append((position, path, value))
+
+        paths = [path for _, path, _ in events]
+        self.assertEqual(paths[:3], [("stock_name",), ("sentiment_score",), ("trend_prediction",)])
+        self.assertIn(("dashboard", "core_conclusion"), paths)
+        self.assertLess(paths.index(("dashboard", "core_conclusion")), paths.index(("dashboard",)))
+        # 评分在整段响应的前 20% 内可用
+        self.assertLess(events[1][0], len(RESPONSE_TEXT) * 0.2)
+        self.assertTrue(parser.done)
+        self.assertEqual(parser.snapshot(), RESPONSE)
+
+    def test_incomplete_values_not_emitted(self) -> None:
+        """数字、字符串未结束时不产出，转义引号不提前结束字符串"""
+        parser = IncrementalJsonParser()
+        self.assertEqual(parser.feed('{"score": 7'), [])
+        self.assertEqual(parser.feed('2, "name": "a\\"b'), [(("score",), 72)])
+        self.assertEqual(parser.feed('c", "tags": ["x"'), [(("name",), 'a"bc'), (("tags", 0), "x")])
+        self.assertEqual(parser.feed(']}'), [(("tags",), ["x"])])
+        self.assertEqual(parser.snapshot(), {"score": 72, "name": 'a"bc', "tags": ["x"]})
+
+
+class AnalyzeStreamTestCase(unittest.TestCase):
+    """流式分析测试"""
+
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._env = {
+            "DATABASE_PATH": os.path.join(self._temp_dir.name, "test_llm_stream.db"),
+            "LLM_DEFAULT_RPM": "0",
+            "GEMINI_RETRY_DELAY": "0.01",
+        }
+        os.environ.update(self._env)
+        Config._instance = None
+        DatabaseManager.reset_instance()
+        reset_llm_scheduler()
+
+    def tearDown(self) -> None:
+        for name in self._env:
+            if name != "DATABASE_PATH":
+                os.environ.pop(name, None)
+        Config._instance = None
+        reset_llm_scheduler()
+        DatabaseManager.reset_instance()
+        self._temp_dir.cleanup()
+
+    def test_partial_results_before_stream_ends(self) -> None:
+        """评分与操作建议在流结束前回调，最终结果与完整解析一致并写入缓存"""
+        models = _FakeModels()
+        analyzer = _StreamAnalyzer(models)
+        updates = []
+
+        def on_partial(update):
+            updates.append((len(models.yielded), update))
+
+        result = analyzer.analyze_stream(_context(), report_type=ReportType.FULL, on_partial=on_partial)
+
+        self.assertTrue(result.success)
+        self.assertEqual(result.sentiment_score, 72)
+        self.assertEqual(result.get_core_conclusion(), "缩量回踩 MA5，持有为主")
+        total_chunks = len(models.yielded)
+        first_seen = {}
+        for chunks, update in updates:
+            self.assertEqual(update["code"], "600519")
+            for field in update["fields"]:
+                first_seen.setdefault(field, chunks)
+        self.assertLess(first_seen["sentiment_score"], total_chunks // 4)
+        self.assertLess(first_seen["operation_advice"], total_chunks // 2)
+        self.assertLess(first_seen["dashboard.core_conclusion"], first_seen["analysis_summary"])
+        self.assertEqual(updates[-1][1]["partial"], RESPONSE)
+
+        # 第二次命中缓存：不再请求，整段一次性产出
+        again = analyzer.analyze_stream(_context(), report_type=ReportType.FULL, on_partial=lambda u: None)
+        self.assertTrue(again.cache_hit)
+        self.assertEqual(models.stream_calls, 1)
+
+    def test_stream_failure_falls_back(self) -> None:
+        """不支持流式时改用非流式调用；流中途断开时重新发起非流式请求"""
+        models = _FakeModels(fail_stream=True)
+        result = _StreamAnalyzer(models).analyze_stream(_context(), use_cache=False)
+        self.assertTrue(result.success)
+        self.assertEqual((models.stream_calls, models.calls), (1, 1))
+
+        models = _FakeModels(fail_after=3)
+        updates = []
+        result = _StreamAnalyzer(models).analyze_stream(_context(), use_cache=False, on_partial=updates.append)
+        self.assertTrue(result.success)
+        self.assertEqual(result.operation_advice, "持有")
+        self.assertEqual(models.calls, 1)
+        self.assertTrue(updates)
+
+
+class TaskEventsTestCase(unittest.TestCase):
+    """分析任务事件流测试"""
+
+    def test_partial_then_result_events(self) -> None:
+        """流水线回调的部分结果依次成为 partial 事件，完成后以 result 事件结束"""
+        release = threading.Event()
+        service = AnalysisService(max_workers=2)
+
+        def fake_run(code, task_id, report_type, source_message, save_snapshot):
+            service._record_partial(task_id, {"partial": {"sentiment_score": 72}, "elapsed": 0.5})
+            release.wait(5)
+            service._record_partial(
+                task_id, {"partial": {"sentiment_score": 72, "operation_advice": "持有"}, "elapsed": 0.9}
+            )
+            return AnalysisResult(
+                code=code, name="贵州茅台", sentiment_score=72,
+                trend_prediction="看多", operation_advice="持有",
+            )
+
+        with mock.patch.object(service, "_run_analysis", side_effect=fake_run):
+            task = service.submit_analysis("600519", ReportType.SIMPLE)
+            events = service.iter_task_events(task["task_id"], timeout=5, heartbeat=0.05)
+            first = next(events)
+            while first[0] == "ping":
+                first = next(events)
+            release.set()
+            rest = [event for event in events if event[0] != "ping"]
+            service.executor.shutdown(wait=True)
+
+        self.assertEqual(first, ("partial", {
+            "task_id": task["task_id"], "partial": {"sentiment_score": 72}, "elapsed": 0.5,
+        }))
+        kinds = [kind for kind, _ in rest]
+        self.assertEqual(kinds[-1], "result")
+        self.assertEqual(rest[-1][1]["result"]["operation_advice"], "持有")
+        self.assertEqual(rest[-2][1]["partial"]["operation_advice"], "持有")
+        self.assertEqual(service.get_task_status(task["task_id"])["partial_version"], 2)
+
+        # 未知任务直接返回 error，且产出事件时不持有任务锁（慢客户端不阻塞其他请求）
+        events = service.iter_task_events("missing")
+        self.assertEqual(next(events)[0], "error")
+        self.assertTrue(service._tasks_lock.acquire(timeout=1))
+        service._tasks_lock.release()
+        events.close()
+
+    def test_partial_events_for_coalesced_tasks(self) -> None:
+        """合并到进行中任务的请求同样收到部分结果：后到者先拿到最近快照，之后的快照推送给每个任务"""
+        started = threading.Event()
+        release = threading.Event()
+        service = AnalysisService(max_workers=2)
+
+        def fake_run(code, task_id, report_type, source_message, save_snapshot):
+            service._record_partial(task_id, {"partial": {"sentiment_score": 72}, "elapsed": 0.5})
+            started.set()
+            release.wait(5)
+            service._record_partial(
+                task_id, {"partial": {"sentiment_score": 72, "operation_advice": "持有"}, "elapsed": 0.9}
+            )
+            return AnalysisResult(
+                code=code, name="贵州茅台", sentiment_score=72,
+                trend_prediction="看多", operation_advice="持有",
+            )
+
+        with mock.patch.object(service, "_run_analysis", side_effect=fake_run):
+            first = service.submit_analysis("600519", ReportType.SIMPLE)
+            started.wait(5)
+            second = service.submit_analysis("600519", ReportType.SIMPLE)
+            self.assertTrue(second["coalesced"])
+            release.set()
+            events = {
+                task["task_id"]: [
+                    (kind, data) for kind, data in service.iter_task_events(task["task_id"], timeout=5, heartbeat=0.05)
+                    if kind != "ping"
+                ]
+                for task in (first, second)
+            }
+            service.executor.shutdown(wait=True)
+
+        for task in (first, second):
+            status = service.get_task_status(task["task_id"])
+            self.assertEqual(status["status"], "completed")
+            self.assertEqual(status["partial"]["operation_advice"], "持有")
+            self.assertEqual(events[task["task_id"]][-1][0], "result")
+        self.assertEqual(service.get_task_status(second["task_id"])["partial_version"], 2)
+        self.assertEqual(service._flight_tasks, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
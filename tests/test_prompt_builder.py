@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 提示词预算构建器单元测试
+===================================
+
+职责：
+1. 验证情报报告按维度拆分、跨维度重复新闻保留在更重要的维度
+2. 验证超出预算时按优先级裁剪（行业 -> 风险新闻 -> 技术面），必留段落不动
+3. 验证精简报告提示词更短，且大小报告记录精简前长度
+"""
+
+import os
+import tempfile
+import unittest
+
+from src.analyzer import GeminiAnalyzer
+from src.config import Config
+from src.enums import ReportType
+from src.prompt_builder import (
+    PRIORITY_INDUSTRY, PRIORITY_REQUIRED, PRIORITY_RISK_NEWS, PRIORITY_TECHNICAL,
+    IntelReport, PromptBuilder, count_tokens,
+)
+from src.search_service import SearchResponse, SearchResult, SearchService
+
+
+def _result(title: str, snippet: str) -> SearchResult:
+    return SearchResult(title=title, snippet=snippet, url="https://example.com", source="example",
+                        published_date="2026-10-18")
+
+
+SHARED = _result("贵州茅台：控股股东拟减持不超过1%股份", "公告显示控股股东计划在未来三个月内通过集中竞价方式减持公司股份。" * 2)
+
+
+def _intel_report() -> str:
+    intel = {
+        'latest_news': SearchResponse("最新", [SHARED, _result("茅台发布三季报", "营收同比增长 15%，净利润同比增长 14%，符合市场预期。")], "bench"),
+        'risk_check': SearchResponse("风险", [SHARED], "bench"),
+        'industry': SearchResponse("行业", [_result("白酒行业需求回暖", "中秋国庆双节动销好于预期，高端白酒批价企稳。" * 3)], "bench"),
+    }
+    return SearchService().format_intel_report(intel, "贵州茅台")
+
+
+CONTEXT = {
+    "code": "600519",
+    "stock_name": "贵州茅台",
+    "date": "2026-10-19",
+    "today": {"close": 1820.0, "open": 1800.0, "high": 1850.0, "low": 1790.0, "pct_chg": 1.2,
+              "volume": 3.2e6, "amount": 5.8e9, "ma5": 1810.0, "ma10": 1800.0, "ma20": 1790.0},
+    "ma_status": "多头排列",
+    "realtime": {"price": 1820.0, "volume_ratio": 1.1, "turnover_rate": 0.3, "pe_ratio": 25.0},
+    "chip": {"profit_ratio": 0.8, "avg_cost": 1700.0, "concentration_90": 0.12, "concentration_70": 0.08},
+    "trend_analysis": {"trend_status": "多头排列", "ma_alignment": "MA5>MA10>MA20", "bias_ma5": 0.6,
+                       "signal_reasons": ["缩量回踩 MA5"], "risk_factors": ["获利盘偏高"]},
+}
+
+
+class _OfflineAnalyzer(GeminiAnalyzer):
+    def _init_model(self) -> None:
+        self._gemini_client = self
+        self._current_model_name = "test-model"
+
+
+class PromptBuilderTestCase(unittest.TestCase):
+    """提示词预算构建器测试"""
+
+    def test_intel_split_and_deduplicate(self) -> None:
+        """重复新闻只保留在风险排查中，最新消息重新编号"""
+        intel = IntelReport.parse(_intel_report())
+        self.assertEqual([b.key for b in intel.blocks], ["latest_news", "risk_check", "industry"])
+        self.assertEqual(intel.deduplicate(), 1)
+
+        latest, risk, _ = intel.blocks
+        self.assertEqual(len(risk.items), 1)
+        self.assertEqual([item.title.split(" [")[0] for item in latest.items], ["茅台发布三季报"])
+        self.assertIn("  1. 茅台发布三季报", latest.render())
+        self.assertIsNone(IntelReport.parse("自由文本新闻"))
+
+    def test_budget_trims_by_priority(self) -> None:
+        """超出预算时先裁行业、再裁风险新闻，技术面与必留段落保留"""
+        technical = "技术面指标。" * 40 + "\n"
+        risk = "\n".join(f"风险新闻第{i}条：股东减持计划公告" for i in range(30)) + "\n"
+        industry = "行业新闻。" * 80 + "\n"
+
+        def build(budget):
+            builder = PromptBuilder(budget)
+            builder.add("header", "# 标题\n", PRIORITY_REQUIRED)
+            builder.add("technical", technical, PRIORITY_TECHNICAL)
+            builder.add("risk", risk, PRIORITY_RISK_NEWS)
+            builder.add("industry", industry, PRIORITY_INDUSTRY)
+            builder.add("task", "请输出 JSON。\n", PRIORITY_REQUIRED)
+            return builder.build()
+
+        full, report = build(0)
+        self.assertEqual(report.tokens, report.raw_tokens)
+        self.assertFalse(report.trimmed)
+
+        budget = count_tokens("# 标题\n请输出 JSON。\n") + count_tokens(technical) + count_tokens(risk) // 2
+        prompt, report = build(budget)
+        status = {s['name']: s['status'] for s in report.sections}
+        self.assertEqual(status, {"header": "kept", "technical": "kept", "risk": "truncated",
+                                  "industry": "dropped", "task": "kept"})
+        self.assertLessEqual(report.tokens, budget)
+        self.assertTrue(prompt.startswith("# 标题") and prompt.endswith("请输出 JSON。\n"))
+        self.assertIn("风险新闻第0条", prompt)
+        self.assertGreater(report.saved_ratio, 0.4)
+
+
+class AnalyzerPromptTestCase(unittest.TestCase):
+    """分析器提示词构建测试"""
+
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        os.environ["DATABASE_PATH"] = os.path.join(self._temp_dir.name, "test_prompt.db")
+        Config._instance = None
+        self.analyzer = _OfflineAnalyzer(api_key="offline-test-api-key")
+
+    def tearDown(self) -> None:
+        os.environ.pop("LLM_PROMPT_TOKEN_BUDGET", None)
+        Config._instance = None
+        self._temp_dir.cleanup()
+
+    def test_compact_simple_prompt(self) -> None:
+        """精简提示词保留关键数据且明显更短，精简前长度按完整版统计"""
+        news = _intel_report()
+        full, full_report = self.analyzer._build_prompt(CONTEXT, "贵州茅台", news)
+        compact, compact_report = self.analyzer._build_prompt(CONTEXT, "贵州茅台", news, compact=True)
+
+        self.assertIn("| 股票代码 | **600519** |", full)
+        self.assertEqual(full_report.duplicates_removed, 1)
+        for text in ("1820.0", "获利比例 80.0%", "缩量回踩 MA5", "控股股东拟减持", "生成【决策仪表盘】"):
+            self.assertIn(text, compact)
+        self.assertLess(compact_report.tokens, full_report.tokens * 0.8)
+        self.assertEqual(compact_report.raw_tokens, full_report.raw_tokens)
+
+        # 精简报告通过 report_type 选择精简提示词
+        prompt, _, _ = self.analyzer._prepare_request(CONTEXT, "600519", "贵州茅台", news, ReportType.SIMPLE)
+        self.assertEqual(prompt, compact)
+
+    def test_budget_from_config(self) -> None:
+        """LLM_PROMPT_TOKEN_BUDGET 生效：行业新闻先被裁剪，无法识别的新闻整段保留"""
+        os.environ["LLM_PROMPT_TOKEN_BUDGET"] = "900"
+        Config._instance = None
+        prompt, report = self.analyzer._build_prompt(CONTEXT, "贵州茅台", _intel_report())
+        self.assertLessEqual(report.tokens, 900)
+        self.assertIn("intel.industry(dropped)", report.trimmed)
+        self.assertIn("生成【决策仪表盘】", prompt)
+
+        # 新闻全部被裁剪时不保留空的代码块
+        os.environ["LLM_PROMPT_TOKEN_BUDGET"] = "700"
+        Config._instance = None
+        prompt, report = self.analyzer._build_prompt(CONTEXT, "贵州茅台", _intel_report())
+        self.assertIn("新闻搜索结果因长度限制已省略", prompt)
+        self.assertNotIn("```", prompt)
+
+        os.environ["LLM_PROMPT_TOKEN_BUDGET"] = "0"
+        Config._instance = None
+        prompt, _ = self.analyzer._build_prompt(CONTEXT, "贵州茅台", "外部传入的自由文本新闻")
+        self.assertIn("```\n外部传入的自由文本新闻\n```", prompt)
+
+
+if __name__ == "__main__":
+    unittest.main()
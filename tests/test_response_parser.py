@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - LLM 结构化输出解析单元测试
+===================================
+
+职责：
+1. 验证合法 JSON 只走严格解析，格式错误的响应才升级到修复
+2. 验证按仪表盘结构校验并纠正字段
+3. 验证分析器向 Gemini / OpenAI 请求原生 JSON 模式，服务端不支持时自动关闭
+4. 验证解析基准测试在录制语料上的恢复率不低于旧实现
+"""
+
+import json
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from benchmarks.run_parser import builtin_corpus, run
+from src.analyzer import GeminiAnalyzer
+from src.config import Config
+from src.llm_scheduler import reset_llm_scheduler
+from src.response_parser import (
+    DASHBOARD_SCHEMA,
+    STAGE_FAILED,
+    STAGE_REPAIRED,
+    STAGE_STRICT,
+    parse_json_response,
+    validate_fields,
+)
+from src.storage import DatabaseManager
+
+RESPONSE = {
+    "sentiment_score": 72,
+    "trend_prediction": "看多",
+    "operation_advice": "持有",
+    "decision_type": "hold",
+    "dashboard": {"core_conclusion": {"one_sentence": "缩量回踩 MA5，持有为主"}},
+    "analysis_summary": "趋势完好",
+}
+NATIVE = json.dumps(RESPONSE, ensure_ascii=False)
+
+
+class ResponseParserTestCase(unittest.TestCase):
+    """解析与结构校验测试"""
+
+    def test_strict_before_repair(self) -> None:
+        """裸 JSON、代码块、夹杂说明文字的合法 JSON 不调用修复；格式错误才修复"""
+        with mock.patch("src.response_parser.repair_json_text") as repair:
+            for text in (
+                NATIVE,
+                f"```json\n{NATIVE}\n```",
+                f"根据 {{技术面}} 分析：\n```json\n{NATIVE}\n```\n仅供参考",
+            ):
+                outcome = parse_json_response(text)
+                self.assertEqual((outcome.stage, outcome.data), (STAGE_STRICT, RESPONSE))
+            repair.assert_not_called()
+
+        # 尾随逗号
+        outcome = parse_json_response("```json\n" + NATIVE[:-1] + ",}\n```")
+        self.assertEqual(outcome.stage, STAGE_REPAIRED)
+        self.assertEqual(outcome.data["operation_advice"], "持有")
+
+        truncated = parse_json_response(NATIVE[:-40])
+        self.assertEqual((truncated.stage, truncated.data["sentiment_score"]), (STAGE_REPAIRED, 72))
+
+        self.assertEqual(parse_json_response("建议持有观望").stage, STAGE_FAILED)
+        self.assertEqual(parse_json_response("[" + NATIVE + "]", expect=list).data, [RESPONSE])
+        self.assertIsNone(parse_json_response(NATIVE, expect=list).data)
+
+    def test_schema_validation_and_fix(self) -> None:
+        """数字字符串转整数、评分越界截断并报告；可选字段错误直接丢弃，缺少必填字段报告"""
+        data = dict(RESPONSE, sentiment_score="68", decision_type="BUY", dashboard={"core_conclusion": "持有"})
+        self.assertEqual(validate_fields(dict(data), DASHBOARD_SCHEMA), [
+            "decision_type 取值 BUY 不在 buy/hold/sell 中",
+            "dashboard.core_conclusion 类型应为 dict",
+        ])
+        self.assertEqual(validate_fields(data, DASHBOARD_SCHEMA, fix=True), [])
+        self.assertEqual(data["sentiment_score"], 68)
+        self.assertNotIn("decision_type", data)
+        self.assertEqual(data["dashboard"], {})
+
+        data = {"sentiment_score": 180, "trend_prediction": " ", "operation_advice": "持有"}
+        self.assertEqual(validate_fields(data, DASHBOARD_SCHEMA, fix=True), [
+            "sentiment_score 超出 0-100 范围",
+            "缺少 trend_prediction",
+        ])
+        self.assertEqual(data["sentiment_score"], 100)
+
+    def test_parser_benchmark(self) -> None:
+        """录制语料上快路径恢复率不低于旧实现，合法形态全部走严格解析"""
+        report = run(builtin_corpus(), repeat=1)
+        summary = report["summary"]
+        self.assertGreaterEqual(summary["fast"]["recovery_rate"], summary["legacy"]["recovery_rate"])
+        stages = {row["name"].split(":")[1]: row["stage"] for row in report["rows"]}
+        self.assertEqual(stages["native_json"], STAGE_STRICT)
+        self.assertEqual(stages["prose_with_braces"], STAGE_STRICT)
+        self.assertEqual(stages["trailing_commas"], STAGE_REPAIRED)
+
+
+class _FakeCompletions:
+    """模拟 OpenAI chat.completions：可配置为拒绝 response_format 参数"""
+
+    def __init__(self, reject_response_format: bool = False):
+        self.reject_response_format = reject_response_format
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if self.reject_response_format and "response_format" in kwargs:
+            raise RuntimeError("400 Unrecognized request argument supplied: response_format")
+        message = SimpleNamespace(content=NATIVE)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+class _OpenAIAnalyzer(GeminiAnalyzer):
+    def __init__(self, completions: _FakeCompletions):
+        self._completions = completions
+        super().__init__(api_key="offline-test-api-key")
+
+    def _init_model(self) -> None:
+        self._openai_client = SimpleNamespace(chat=SimpleNamespace(completions=self._completions))
+        self._use_openai = True
+        self._current_model_name = "test-model"
+
+
+class JsonModeTestCase(unittest.TestCase):
+    """原生 JSON 模式测试"""
+
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._env = {
+            "DATABASE_PATH": os.path.join(self._temp_dir.name, "test_response_parser.db"),
+            "LLM_DEFAULT_RPM": "0",
+            "LLM_CACHE_ENABLED": "false",
+            "GEMINI_RETRY_DELAY": "0.01",
+        }
+        os.environ.update(self._env)
+        Config._instance = None
+        DatabaseManager.reset_instance()
+        reset_llm_scheduler()
+
+    def tearDown(self) -> None:
+        for name in self._env:
+            if name != "DATABASE_PATH":
+                os.environ.pop(name, None)
+        Config._instance = None
+        reset_llm_scheduler()
+        DatabaseManager.reset_instance()
+        self._temp_dir.cleanup()
+
+    def _context(self) -> dict:
+        return {"code": "600519", "stock_name": "贵州茅台", "date": "2026-10-19", "today": {}}
+
+    def test_openai_json_mode_with_fallback(self) -> None:
+        """请求携带 response_format；服务端拒绝后关闭 JSON 模式并重试成功"""
+        completions = _FakeCompletions()
+        result = _OpenAIAnalyzer(completions).analyze(self._context())
+        self.assertEqual(result.sentiment_score, 72)
+        self.assertEqual(completions.calls[0]["response_format"], {"type": "json_object"})
+
+        completions = _FakeCompletions(reject_response_format=True)
+        analyzer = _OpenAIAnalyzer(completions)
+        result = analyzer.analyze(self._context())
+        self.assertTrue(result.success)
+        self.assertEqual(result.operation_advice, "持有")
+        self.assertEqual(["response_format" in call for call in completions.calls], [True, False])
+
+        analyzer.analyze(self._context())
+        self.assertNotIn("response_format", completions.calls[-1])
+
+    def test_gemini_json_mime_type(self) -> None:
+        """Gemini 生成配置按 json_mode 设置 response_mime_type；关闭配置后不再请求"""
+        analyzer = _OpenAIAnalyzer(_FakeCompletions())
+        analyzer._gemini_client = object()
+        _, generation_config, _ = analyzer._prepare_request(self._context(), "600519", "贵州茅台", None)
+        gemini_config = analyzer._gemini_generate_config(generation_config)
+        self.assertEqual(gemini_config.response_mime_type, "application/json")
+
+        os.environ["LLM_JSON_MODE"] = "false"
+        self._env["LLM_JSON_MODE"] = "false"
+        Config._instance = None
+        _, generation_config, _ = analyzer._prepare_request(self._context(), "600519", "贵州茅台", None)
+        self.assertNotIn("json_mode", generation_config)
+        self.assertIsNone(analyzer._gemini_generate_config(generation_config).response_mime_type)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 运行日志（断点续跑）单元测试
+===================================
+
+职责：
+1. 验证运行阶段标记与查询
+2. 验证从分析历史恢复已完成的分析结果
+3. 验证续跑时跳过已完成的数据获取/情报搜索阶段，复用已保存的情报
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from src.config import Config
+from src.storage import DatabaseManager
+from src.analyzer import AnalysisResult
+from src.core.pipeline import StockAnalysisPipeline, StockWorkItem
+from src.enums import JobPriority, ReportType
+
+
+class RunJournalTestCase(unittest.TestCase):
+    """运行日志测试"""
+
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        os.environ["DATABASE_PATH"] = os.path.join(self._temp_dir.name, "test_journal.db")
+
+        Config._instance = None
+        DatabaseManager.reset_instance()
+        self.db = DatabaseManager.get_instance()
+
+    def tearDown(self) -> None:
+        DatabaseManager.reset_instance()
+        self._temp_dir.cleanup()
+
+    def test_mark_and_query_stages(self) -> None:
+        """阶段标记幂等，最近一次运行可按日期查到"""
+        self.db.mark_run_stage("run_1", "600519", "data_done")
+        self.db.mark_run_stage("run_1", "600519", "llm_done")
+        self.db.mark_run_stage("run_1", "600519", "llm_done")
+
+        journal = self.db.get_run_journal("run_1")
+        self.assertTrue(journal["600519"]["data_done"])
+        self.assertTrue(journal["600519"]["llm_done"])
+        self.assertFalse(journal["600519"]["notified"])
+        self.assertEqual(self.db.get_latest_run_query_id(), "run_1")
+
+        with self.assertRaises(ValueError):
+            self.db.mark_run_stage("run_1", "600519", "unknown")
+
+    def test_load_resumed_results(self) -> None:
+        """已完成 AI 分析的股票从分析历史恢复，其余股票待处理"""
+        result = AnalysisResult(
+            code="600519", name="贵州茅台", sentiment_score=80,
+            trend_prediction="看多", operation_advice="买入",
+            dashboard={"core_conclusion": {"one_sentence": "持有"}},
+        )
+        self.db.save_analysis_history(result, "run_1", "simple", None, save_snapshot=False)
+        self.db.mark_run_stage("run_1", "600519", "llm_done")
+        self.db.mark_run_stage("run_1", "000001", "data_done")
+
+        pipeline = StockAnalysisPipeline.__new__(StockAnalysisPipeline)
+        pipeline.db = self.db
+        pipeline.query_id = "run_1"
+
+        resumed, remaining, unnotified = pipeline._load_resumed_results(["600519", "000001", "300750"])
+
+        self.assertEqual([r.code for r in resumed], ["600519"])
+        self.assertEqual(resumed[0].dashboard, result.dashboard)
+        self.assertEqual(remaining, ["000001", "300750"])
+        self.assertEqual([r.code for r in unnotified], ["600519"])
+
+    def test_resume_skips_completed_stages(self) -> None:
+        """续跑时已完成的数据获取与情报搜索不再重复执行，情报从运行日志复用"""
+        self.db.mark_run_stage("run_1", "600519", "data_done")
+        self.db.mark_run_stage("run_1", "600519", "intel_done", news_context="已保存的情报")
+
+        pipeline = StockAnalysisPipeline.__new__(StockAnalysisPipeline)
+        pipeline.db = self.db
+        pipeline.config = Config.get_instance()
+        pipeline.query_id = "run_1"
+        pipeline.max_workers = 1
+        pipeline.priority = JobPriority.BATCH
+        pipeline.job_owner = "test"
+        _, remaining, _ = pipeline._load_resumed_results(["600519", "000001"])
+        self.assertEqual(remaining, ["600519", "000001"])
+
+        with mock.patch.object(pipeline, "fetch_and_save_stock_data", return_value=(True, None)) as fetch, \
+                mock.patch.object(pipeline, "_gather_market_data", side_effect=lambda item: item), \
+                mock.patch.object(pipeline, "_search_intel", return_value="新搜索的情报") as search:
+            executor = pipeline._build_staged_executor(ReportType.SIMPLE, dry_run=False, single_stock_notify=False)
+            fetch_stage, search_stage = executor.stages[0].func, executor.stages[1].func
+            items = [fetch_stage(code) for code in remaining]
+            contexts = [search_stage(item).news_context for item in items]
+
+        self.assertEqual([call.args[0] for call in fetch.call_args_list], ["000001"])
+        self.assertEqual([call.args[0] for call in search.call_args_list], ["000001"])
+        self.assertEqual(contexts, ["已保存的情报", "新搜索的情报"])
+        self.assertEqual(self.db.get_run_journal("run_1")["000001"]["news_context"], "新搜索的情报")
+
+
+if __name__ == "__main__":
+    unittest.main()
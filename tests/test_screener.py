@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 全市场选股单元测试
+===================================
+
+职责：
+1. 验证批量读取日线 + 面板评分的排序结果与逐只分析一致
+2. 验证实时快照刷新/追加最新 K 线、ST 过滤
+3. 验证非交易时段、休市日不合并快照，候选池分析数量受 SCREENER_TOP_N 限制
+"""
+
+import os
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta
+from datetime import time as dt_time
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from src.config import Config
+from src.screener import MarketScreener
+from src.stock_analyzer import StockTrendAnalyzer
+from src.storage import DatabaseManager
+
+
+class _SnapshotManager:
+    """只提供全市场快照的数据源替身"""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    def get_realtime_snapshot(self):
+        return self.snapshot
+
+
+def _fixed_datetime(now: datetime):
+    """now() 固定返回指定时间的 datetime 替身"""
+
+    class _FixedDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now
+
+    return _FixedDatetime
+
+
+class MarketScreenerTestCase(unittest.TestCase):
+    """全市场选股测试"""
+
+    CODES = ["600001", "600002", "000003", "300004", "600005"]
+
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        os.environ["DATABASE_PATH"] = os.path.join(self._temp_dir.name, "test_screener.db")
+
+        Config._instance = None
+        DatabaseManager.reset_instance()
+        self.db = DatabaseManager.get_instance()
+
+        # 截至上一个工作日的 80 根日线
+        end = date.today() - timedelta(days=1)
+        while end.weekday() >= 5:
+            end -= timedelta(days=1)
+        dates = pd.bdate_range(end=end, periods=80)
+        rng = np.random.default_rng(3)
+        self.frames = {}
+        for i, code in enumerate(self.CODES):
+            close = 10 * np.exp(np.cumsum(rng.normal(0.004 * (i - 2), 0.015, len(dates))))
+            df = pd.DataFrame({
+                "date": dates.date,
+                "open": close,
+                "high": close * 1.01,
+                "low": close * 0.99,
+                "close": close,
+                "volume": rng.integers(100_000, 1_000_000, len(dates)).astype(float),
+                "amount": close * 1e5,
+                "pct_chg": 0.0,
+            })
+            self.db.save_daily_data(df, code, data_source="test")
+            self.frames[code] = df.assign(date=pd.to_datetime(df["date"]))
+
+    def tearDown(self) -> None:
+        DatabaseManager.reset_instance()
+        Config._instance = None
+        self._temp_dir.cleanup()
+
+    def test_ranking_matches_per_stock_analysis(self) -> None:
+        """不合并快照时，候选池评分与逐只分析一致且按评分降序"""
+        screener = MarketScreener(db=self.db, fetcher_manager=_SnapshotManager(None))
+        result = screener.screen(top_n=3, use_realtime=False)
+
+        self.assertEqual(result.universe, len(self.CODES))
+        self.assertEqual(result.scored, len(self.CODES))
+        self.assertEqual(len(result.codes), 3)
+        scores = result.ranking["signal_score"].tolist()
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+        analyzer = StockTrendAnalyzer()
+        for row in result.ranking.itertuples(index=False):
+            expected = analyzer.analyze(self.frames[row.code], row.code)
+            self.assertEqual(row.signal_score, expected.signal_score, row.code)
+            self.assertEqual(row.trend_status, expected.trend_status.value, row.code)
+        self.assertIn("| 1 |", result.to_markdown())
+        self.assertEqual(result.to_dict()["count"], 3)
+
+    def test_snapshot_merge_and_st_filter(self) -> None:
+        """快照作为最新 K 线合并，ST 股票与无本地日线的股票被排除"""
+        snapshot = pd.DataFrame({
+            "code": ["600001", "600002", "000003", "300004", "600005", "688999"],
+            "name": ["甲", "*ST乙", "丙", "丁", "戊", "无日线"],
+            "price": [20.0, 20.0, 20.0, 20.0, 0.0, 20.0],
+            "open": 20.0, "high": [20.5] * 6, "low": 19.5,
+            "volume": [5e6] * 6, "amount": 1e8,
+            "change_pct": [5.0, 5.0, 5.0, 5.0, 0.0, 5.0],
+        })
+        bars = self.db.get_daily_bars(date.today() - timedelta(days=200), columns=("close", "high", "volume"))
+        last_date = bars["date"].max().to_pydatetime()
+        next_session = datetime.combine((last_date + pd.offsets.BDay(1)).date(), dt_time(10, 0))
+        screener = MarketScreener(db=self.db, fetcher_manager=_SnapshotManager(snapshot))
+        with mock.patch("src.screener.datetime", _fixed_datetime(next_session)):
+            result = screener.screen(top_n=10)
+
+        self.assertTrue(result.realtime)
+        self.assertEqual(result.universe, len(self.CODES))
+        self.assertNotIn("600002", result.codes)
+        self.assertNotIn("688999", result.codes)
+        ranking = result.ranking.set_index("code")
+        self.assertEqual(ranking.loc["600001", "current_price"], 20.0)
+        self.assertEqual(ranking.loc["600001", "name"], "甲")
+
+        # 同一交易日的快照覆盖本地 K 线，而不是重复追加
+        merged = MarketScreener._merge_snapshot(bars, snapshot, now=last_date.replace(hour=14))
+        self.assertEqual(len(merged), len(bars))
+        refreshed = merged[(merged["code"] == "600001") & (merged["date"] == last_date)]
+        self.assertEqual(refreshed["close"].tolist(), [20.0])
+        appended = MarketScreener._merge_snapshot(bars, snapshot, now=next_session)
+        self.assertEqual(len(appended), len(bars) + 4)
+
+    def test_snapshot_skipped_outside_sessions(self) -> None:
+        """开盘前、周末以及休市日（快照仍是上一交易日行情）不追加重复 K 线"""
+        bars = self.db.get_daily_bars(date.today() - timedelta(days=200), columns=("close", "high", "volume"))
+        last_date = bars["date"].max()
+        last = bars[bars["date"] == last_date]
+        stale = pd.DataFrame({
+            "code": last["code"].values, "name": "", "price": last["close"].values,
+            "open": last["close"].values, "high": last["high"].values, "low": last["close"].values,
+            "volume": last["volume"].values, "amount": 1e8, "change_pct": 0.0,
+        })
+        next_day = (last_date + pd.offsets.BDay(1)).date()
+
+        pre_open = datetime.combine(next_day, dt_time(9, 0))
+        self.assertEqual(len(MarketScreener._merge_snapshot(bars, stale, now=pre_open)), len(bars))
+        saturday = datetime.combine(next_day + timedelta(days=(5 - next_day.weekday()) % 7), dt_time(10, 0))
+        self.assertEqual(len(MarketScreener._merge_snapshot(bars, stale, now=saturday)), len(bars))
+        holiday = datetime.combine(next_day, dt_time(10, 0))
+        self.assertEqual(len(MarketScreener._merge_snapshot(bars, stale, now=holiday)), len(bars))
+
+        # 真正开盘后行情变化，快照作为当天 K 线追加
+        live = stale.assign(price=stale["price"] * 1.02, high=stale["high"] * 1.03)
+        self.assertEqual(len(MarketScreener._merge_snapshot(bars, live, now=holiday)), len(bars) + len(live))
+
+    def test_analyze_count_capped(self) -> None:
+        """/screen 5000 analyze 之类的大候选池只把前 SCREENER_TOP_N 只交给 AI 分析"""
+        screener = MarketScreener(db=self.db, fetcher_manager=_SnapshotManager(None))
+        screener.config.screener_top_n = 2
+        result = screener.screen(top_n=5000, use_realtime=False)
+        self.assertEqual(len(result.codes), len(self.CODES))
+
+        with mock.patch("src.core.pipeline.StockAnalysisPipeline") as pipeline_cls:
+            pipeline_cls.return_value.run.side_effect = lambda stock_codes, **kwargs: stock_codes
+            analyzed = screener.analyze_top(result, send_notification=False)
+        self.assertEqual(analyzed, result.codes[:2])
+        self.assertEqual(screener.analyze_limit(5000), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 重复请求合并单元测试
+===================================
+
+职责：
+1. 验证并发的相同 key 只执行一次
+2. 验证结果缓存与失败不缓存
+3. 验证 AnalysisService 合并重复分析请求，复用缓存结果时返回相应提示
+"""
+
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from src.analyzer import AnalysisResult
+from src.core.singleflight import SingleFlight
+from src.enums import ReportType
+from web.services import AnalysisService
+
+
+class SingleFlightTestCase(unittest.TestCase):
+    """SingleFlight 测试"""
+
+    def setUp(self) -> None:
+        self.executor = ThreadPoolExecutor(max_workers=4)
+
+    def tearDown(self) -> None:
+        self.executor.shutdown(wait=True)
+
+    def test_coalesce_inflight_and_cache(self) -> None:
+        """进行中的任务被复用，完成后在 TTL 内命中缓存"""
+        release = threading.Event()
+        calls = []
+
+        def work(value):
+            calls.append(value)
+            release.wait(5)
+            return value
+
+        flight = SingleFlight(result_ttl=60)
+        first, shared_first = flight.submit("k", self.executor, work, 1)
+        second, shared_second = flight.submit("k", self.executor, work, 2)
+        self.assertFalse(shared_first)
+        self.assertTrue(shared_second)
+        self.assertIs(first, second)
+
+        release.set()
+        self.assertEqual(first.result(timeout=5), 1)
+
+        third, shared_third = flight.submit("k", self.executor, work, 3)
+        self.assertTrue(shared_third)
+        self.assertEqual(third.result(), 1)
+        self.assertEqual(calls, [1])
+        self.assertEqual(flight.stats()["cache_hits"], 1)
+
+    def test_failure_not_cached(self) -> None:
+        """失败与空结果不缓存"""
+        flight = SingleFlight(result_ttl=60)
+        future, _ = flight.submit("k", self.executor, lambda: None)
+        future.result(timeout=5)
+
+        def boom():
+            raise RuntimeError("boom")
+
+        future, shared = flight.submit("k", self.executor, boom)
+        self.assertFalse(shared)
+        with self.assertRaises(RuntimeError):
+            future.result(timeout=5)
+
+        future, shared = flight.submit("k", self.executor, lambda: 42)
+        self.assertFalse(shared)
+        self.assertEqual(future.result(timeout=5), 42)
+
+
+class AnalysisServiceCoalesceTestCase(unittest.TestCase):
+    """AnalysisService 重复请求合并测试"""
+
+    def test_duplicate_requests_share_result(self) -> None:
+        """相同代码与报告类型只运行一次流水线，所有任务得到相同结果"""
+        release = threading.Event()
+        calls = []
+
+        def fake_run(code, task_id, report_type, source_message, save_snapshot):
+            calls.append(code)
+            release.wait(5)
+            return AnalysisResult(
+                code="600519", name="贵州茅台", sentiment_score=70,
+                trend_prediction="看多", operation_advice="持有",
+            )
+
+        service = AnalysisService(max_workers=4)
+        service._flight = SingleFlight(result_ttl=60)
+        with mock.patch.object(service, "_run_analysis", side_effect=fake_run), \
+                mock.patch.object(service, "_notify_source") as notify:
+            first = service.submit_analysis("600519", ReportType.FULL)
+            second = service.submit_analysis("600519", "full", source_message=mock.Mock())
+            other = service.submit_analysis("600519", ReportType.SIMPLE)
+            release.set()
+            deadline = time.time() + 5
+            while time.time() < deadline and any(
+                service.get_task_status(r["task_id"])["status"] == "running"
+                for r in (first, second, other)
+            ):
+                time.sleep(0.01)
+            service.executor.shutdown(wait=True)
+
+        self.assertFalse(first["coalesced"])
+        self.assertTrue(second["coalesced"])
+        self.assertFalse(other["coalesced"])
+        self.assertEqual(len(calls), 2)
+        for task_id in (first["task_id"], second["task_id"]):
+            task = service.get_task_status(task_id)
+            self.assertEqual(task["status"], "completed")
+            self.assertEqual(task["result"]["operation_advice"], "持有")
+        # 只有合并的请求需要另行推送
+        self.assertEqual(notify.call_count, 1)
+
+    def test_reused_result_message(self) -> None:
+        """结果缓存命中时不再执行分析，返回信息说明复用了已有结果而不是“已提交”"""
+        result = AnalysisResult(
+            code="600519", name="贵州茅台", sentiment_score=70,
+            trend_prediction="看多", operation_advice="持有",
+        )
+        service = AnalysisService(max_workers=2)
+        service._flight = SingleFlight(result_ttl=60)
+        with mock.patch.object(service, "_run_analysis", return_value=result) as run, \
+                mock.patch.object(service, "_notify_source") as notify:
+            first = service.submit_analysis("600519", ReportType.SIMPLE)
+            deadline = time.time() + 5
+            while time.time() < deadline and service.get_task_status(first["task_id"])["status"] == "running":
+                time.sleep(0.01)
+            reused = service.submit_analysis("600519", ReportType.SIMPLE)
+            service.executor.shutdown(wait=True)
+
+        self.assertEqual(run.call_count, 1)
+        self.assertFalse(first["reused"])
+        self.assertIn("已提交", first["message"])
+        self.assertTrue(reused["coalesced"] and reused["reused"])
+        self.assertIn("复用", reused["message"])
+        self.assertNotIn("推送", reused["message"])
+        self.assertEqual(service.get_task_status(reused["task_id"])["status"], "completed")
+        notify.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 单股分析阶段截止时间单元测试
+===================================
+
+职责：
+1. 验证单股分析的独立阶段并发执行，总等待不超过最长的阶段超时
+2. 验证超时阶段降级为空结果，分析照常继续
+"""
+
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from src.core.pipeline import StockAnalysisPipeline
+from src.enums import ReportType
+
+
+class StageDeadlineTestCase(unittest.TestCase):
+    """阶段截止时间测试"""
+
+    def setUp(self) -> None:
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+    def _pipeline(self) -> StockAnalysisPipeline:
+        pipeline = StockAnalysisPipeline.__new__(StockAnalysisPipeline)
+        pipeline.config = SimpleNamespace(
+            stage_timeout_realtime=0.3,
+            stage_timeout_chip=0.3,
+            stage_timeout_context=0.3,
+            stage_timeout_intel=0.5,
+        )
+        pipeline.fetcher_manager = SimpleNamespace(_stock_name_cache={})
+
+        def slow(*args):
+            self.release.wait(5)
+            return "late"
+
+        pipeline._fetch_realtime_stage = slow
+        pipeline._fetch_chip_stage = slow
+        pipeline._load_context_stage = slow
+        pipeline._search_intel_after_name = slow
+        pipeline._persist_result = lambda item: None
+        return pipeline
+
+    def test_slow_stages_degrade_within_longest_timeout(self) -> None:
+        """全部阶段都很慢时，按截止时间降级：总耗时约为最长阶段超时，而不是各阶段超时之和"""
+        pipeline = self._pipeline()
+        seen = []
+
+        def run_llm(item):
+            seen.append(item)
+            item.result = "analysis"
+            return item
+
+        pipeline._run_llm = run_llm
+
+        start = time.monotonic()
+        result = pipeline.analyze_stock("600519", ReportType.SIMPLE)
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(result, "analysis")
+        self.assertGreaterEqual(elapsed, 0.45)
+        self.assertLess(elapsed, 0.9)
+        item = seen[0]
+        self.assertIsNone(item.realtime_quote)
+        self.assertIsNone(item.chip_data)
+        self.assertEqual((item.context, item.trend_result), (None, None))
+        self.assertIsNone(item.news_context)
+        self.assertEqual(item.stock_name, "贵州茅台")
+
+
+if __name__ == "__main__":
+    unittest.main()
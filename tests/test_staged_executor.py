@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 分阶段流水线执行器单元测试
+===================================
+
+职责：
+1. 验证各阶段按顺序处理并汇总结果
+2. 验证阶段重叠执行与异常隔离
+3. 验证 run_iter 逐个产出结果，调用方提前停止时不再处理剩余任务
+4. 验证返回 Future 的异步阶段：单工作线程挂起多个任务，数量受 max_inflight 限制
+"""
+
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from src.core.staged_executor import Stage, StagedExecutor
+
+
+class StagedExecutorTestCase(unittest.TestCase):
+    """分阶段流水线执行器测试"""
+
+    def test_stages_chain_and_drop(self) -> None:
+        """返回 None 的任务不进入后续阶段，异常任务被隔离"""
+        def parse(x):
+            if x == 3:
+                raise ValueError("bad item")
+            return x
+
+        executor = StagedExecutor([
+            Stage("parse", parse, workers=2, queue_size=2),
+            Stage("filter", lambda x: x if x % 2 == 0 else None, workers=2),
+            Stage("square", lambda x: x * x, workers=1),
+        ])
+        outputs = executor.run(range(7))
+
+        self.assertEqual(sorted(outputs), [0, 4, 16, 36])
+        stats = executor.stats()
+        self.assertEqual(stats["parse"]["failed"], 1)
+        self.assertEqual(stats["square"]["processed"], 4)
+
+    def test_stages_overlap(self) -> None:
+        """慢阶段与快阶段重叠执行，总耗时接近最慢阶段"""
+        active = {"fetch": 0, "llm": 0}
+        overlap = threading.Event()
+        lock = threading.Lock()
+
+        def make(name, delay):
+            def fn(x):
+                with lock:
+                    active[name] += 1
+                    if active["fetch"] and active["llm"]:
+                        overlap.set()
+                time.sleep(delay)
+                with lock:
+                    active[name] -= 1
+                return x
+            return fn
+
+        executor = StagedExecutor([
+            Stage("fetch", make("fetch", 0.05), workers=1, queue_size=1),
+            Stage("llm", make("llm", 0.05), workers=1),
+        ])
+        start = time.time()
+        outputs = executor.run(range(6))
+
+        self.assertEqual(len(outputs), 6)
+        self.assertTrue(overlap.is_set())
+        self.assertLess(time.time() - start, 0.55)
+
+    def test_run_iter_yields_before_completion(self) -> None:
+        """第一个结果在其余任务完成前即被产出"""
+        release = threading.Event()
+
+        def work(x):
+            if x > 0:
+                release.wait(5)
+            return x
+
+        executor = StagedExecutor([Stage("work", work, workers=2)])
+        iterator = executor.run_iter(range(3))
+        self.assertEqual(next(iterator), 0)
+        release.set()
+        self.assertEqual(sorted(iterator), [1, 2])
+
+    def test_run_iter_stops_when_consumer_stops(self) -> None:
+        """提前关闭迭代器后不再投入新任务，尚未开始的任务被丢弃，后台线程退出"""
+        processed = []
+
+        def work(x):
+            processed.append(x)
+            time.sleep(0.01)
+            return x
+
+        executor = StagedExecutor([
+            Stage("fetch", work, workers=1, queue_size=2),
+            Stage("persist", lambda x: x, workers=1, queue_size=2),
+        ])
+        iterator = executor.run_iter(range(1000))
+        self.assertEqual(next(iterator), 0)
+        iterator.close()
+
+        def pipeline_threads():
+            prefixes = ("stage-fetch-", "stage-persist-", "stage-driver")
+            return [t.name for t in threading.enumerate() if t.name.startswith(prefixes)]
+
+        deadline = time.time() + 5
+        while pipeline_threads() and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(pipeline_threads(), [])
+        self.assertLess(len(processed), 20)
+
+    def test_async_stage_inflight(self) -> None:
+        """异步阶段单个工作线程同时挂起多个 Future，失败的 Future 被隔离"""
+        lock = threading.Lock()
+        active = {"now": 0, "peak": 0}
+
+        def slow(x):
+            with lock:
+                active["now"] += 1
+                active["peak"] = max(active["peak"], active["now"])
+            time.sleep(0.05)
+            with lock:
+                active["now"] -= 1
+            if x == 5:
+                raise ValueError("bad item")
+            return x * 10
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            executor = StagedExecutor([
+                Stage("llm", lambda x: pool.submit(slow, x), workers=1, max_inflight=3),
+                Stage("persist", lambda x: x + 1, workers=1),
+            ])
+            outputs = executor.run(range(8))
+
+        self.assertEqual(sorted(outputs), [1, 11, 21, 31, 41, 61, 71])
+        self.assertEqual(active["peak"], 3)
+        stats = executor.stats()
+        self.assertEqual(stats["llm"]["failed"], 1)
+        self.assertEqual(stats["persist"]["processed"], 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
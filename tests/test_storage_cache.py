@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 存储层热点查询缓存单元测试
+===================================
+
+职责：
+1. 验证 has_today_data / get_latest_data 命中缓存
+2. 验证 save_daily_data 按代码精确失效
+3. 验证“无数据”不被缓存，其他进程写入后立即可见
+"""
+
+import os
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+import pandas as pd
+
+from src.config import Config
+from src.storage import DatabaseManager, StockDaily
+
+
+class StorageCacheTestCase(unittest.TestCase):
+    """热点查询缓存测试"""
+
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        os.environ["DATABASE_PATH"] = os.path.join(self._temp_dir.name, "test_cache.db")
+
+        Config._instance = None
+        DatabaseManager.reset_instance()
+        self.db = DatabaseManager.get_instance()
+
+    def tearDown(self) -> None:
+        DatabaseManager.reset_instance()
+        self._temp_dir.cleanup()
+
+    def _save(self, code: str, dates) -> None:
+        df = pd.DataFrame({
+            "date": list(dates),
+            "open": 10.0, "high": 11.0, "low": 9.0, "close": 10.5,
+            "volume": 1000.0, "amount": 10500.0, "pct_chg": 0.5,
+        })
+        self.db.save_daily_data(df, code, data_source="test")
+
+    def test_has_today_data_cached_and_primed_on_save(self) -> None:
+        """存在数据的查询结果被缓存，保存后写入日期直接命中为 True"""
+        day = date(2026, 1, 5)
+        self.assertFalse(self.db.has_today_data("600519", day))
+
+        self._save("600519", [day])
+        misses_before = self.db.get_cache_stats()["misses"]
+        self.assertTrue(self.db.has_today_data("600519", day))
+        self.assertTrue(self.db.has_today_data("600519", day))
+        self.assertEqual(self.db.get_cache_stats()["misses"], misses_before)
+
+    def test_negative_results_not_cached(self) -> None:
+        """无数据的结果不缓存：其他进程（绕过本进程失效逻辑）写入后下一次查询即可见"""
+        day = date(2026, 1, 5)
+        self.assertFalse(self.db.has_today_data("600519", day))
+        self.assertEqual(self.db.get_latest_data("600519"), [])
+
+        with self.db.get_session() as session:
+            session.add(StockDaily(code="600519", date=day, close=10.5, data_source="other-process"))
+            session.commit()
+
+        self.assertTrue(self.db.has_today_data("600519", day))
+        self.assertEqual(len(self.db.get_latest_data("600519")), 1)
+        self.assertEqual(self.db.get_cache_stats()["size"], 2)
+
+    def test_latest_data_invalidated_per_code(self) -> None:
+        """保存某代码只失效该代码的 get_latest_data 缓存"""
+        day = date(2026, 1, 5)
+        self._save("600519", [day])
+        self._save("000001", [day])
+
+        self.assertEqual(len(self.db.get_latest_data("600519", days=5)), 1)
+        self.assertEqual(len(self.db.get_latest_data("000001", days=5)), 1)
+
+        self._save("600519", [day + timedelta(days=1)])
+        misses_before = self.db.get_cache_stats()["misses"]
+
+        self.assertEqual(len(self.db.get_latest_data("600519", days=5)), 2)
+        self.assertEqual(len(self.db.get_latest_data("000001", days=5)), 1)
+        self.assertEqual(self.db.get_cache_stats()["misses"], misses_before + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 链路追踪与运行剖析单元测试
+===================================
+
+职责：
+1. 验证 span 嵌套继承股票代码、异常记录
+2. 验证关键路径与剖析报告
+3. 验证 Prometheus 文本导出
+"""
+
+import os
+import tempfile
+import unittest
+
+from src.tracing import (
+    Span,
+    Tracer,
+    build_run_profile,
+    critical_path,
+    render_profile_markdown,
+    write_run_profile,
+)
+
+
+class TracingTestCase(unittest.TestCase):
+    """链路追踪测试"""
+
+    def test_nested_span_inherits_code(self) -> None:
+        """子 span 继承父 span 的股票代码，异常被记录并继续抛出"""
+        tracer = Tracer()
+        with tracer.span("stage.fetch", code="600519"):
+            with tracer.span("fetch.daily", source="AkshareFetcher"):
+                pass
+            with self.assertRaises(ValueError):
+                with tracer.span("fetch.daily", source="TushareFetcher"):
+                    raise ValueError("boom")
+
+        spans = tracer.spans()
+        self.assertEqual([s.name for s in spans], ["fetch.daily", "fetch.daily", "stage.fetch"])
+        self.assertTrue(all(s.code == "600519" for s in spans))
+        self.assertIn("boom", spans[1].error)
+
+    def test_critical_path(self) -> None:
+        """关键路径取决定完成时间的阶段链，空档记为 wait"""
+        spans = [
+            Span("stage.fetch", start=0.0, end=1.0, attrs={"code": "600519"}),
+            Span("stage.chip", start=1.0, end=1.5, attrs={"code": "600519"}),
+            Span("stage.realtime", start=1.0, end=3.0, attrs={"code": "600519"}),
+            Span("stage.llm", start=4.0, end=10.0, attrs={"code": "600519"}),
+        ]
+        path = critical_path(spans)
+        self.assertEqual(
+            [step["name"] for step in path],
+            ["stage.fetch", "stage.realtime", "wait", "stage.llm"],
+        )
+        self.assertEqual(path[2]["duration"], 1.0)
+
+    def test_critical_path_zero_duration_spans(self) -> None:
+        """零耗时阶段（缓存命中、无延迟回放）不会导致回溯死循环"""
+        spans = [
+            Span("stage.fetch", start=1.0, end=1.0, attrs={"code": "600519"}),
+            Span("stage.chip", start=1.0, end=1.0, attrs={"code": "600519"}),
+            Span("stage.llm", start=1.0, end=2.0, attrs={"code": "600519"}),
+        ]
+        path = critical_path(spans)
+        self.assertEqual([step["name"] for step in path], ["stage.fetch", "stage.chip", "stage.llm"])
+
+    def test_profile_and_prometheus(self) -> None:
+        """剖析报告包含分位数与关键路径，Prometheus 导出累计直方图"""
+        tracer = Tracer()
+        for code in ("600519", "000001"):
+            with tracer.span("stage.search", code=code):
+                with tracer.span("search.request", source="Tavily"):
+                    pass
+
+        spans = tracer.spans()
+        started = min(s.start for s in spans)
+        profile = build_run_profile(spans, started, started + 1, codes=["600519", "000001"], run_id="q1")
+        self.assertEqual(profile["stages"]["search.request"]["count"], 2)
+        self.assertIn("search.request|Tavily", profile["sources"])
+        self.assertEqual(set(profile["stocks"]), {"600519", "000001"})
+        self.assertIn("关键路径", render_profile_markdown(profile))
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            json_path, md_path = write_run_profile(profile, temp_dir)
+            self.assertTrue(os.path.exists(json_path) and os.path.exists(md_path))
+
+        text = tracer.prometheus_text()
+        self.assertIn('stock_analysis_span_duration_seconds_count{name="search.request",source="Tavily"} 2', text)
+        self.assertIn('le="+Inf"', text)
+
+    def test_disabled_tracer_records_nothing(self) -> None:
+        """关闭追踪后不记录 span"""
+        tracer = Tracer(enabled=False)
+        with tracer.span("stage.fetch", code="600519") as span:
+            self.assertIsNone(span)
+        self.assertEqual(tracer.spans(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 趋势分析结果缓存单元测试
+===================================
+
+职责：
+1. 验证缓存结果与直接分析一致，命中时不重算
+2. 验证保存日线（新 K 线 / 改写当日 K 线）后缓存失效
+3. 验证分析器参数变化使用不同的缓存键
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from src.config import Config
+from src.stock_analyzer import StockTrendAnalyzer, TrendAnalysisResult
+from src.storage import DatabaseManager, TrendCacheEntry
+from src.trend_cache import TrendCache
+
+
+class TrendCacheTestCase(unittest.TestCase):
+    """趋势分析结果缓存测试"""
+
+    CODE = "600519"
+
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        os.environ["DATABASE_PATH"] = os.path.join(self._temp_dir.name, "test_trend_cache.db")
+
+        Config._instance = None
+        DatabaseManager.reset_instance()
+        self.db = DatabaseManager.get_instance()
+
+        rng = np.random.default_rng(8)
+        self.dates = pd.bdate_range("2026-06-01", periods=61)
+        close = 10 * np.exp(np.cumsum(rng.normal(0.003, 0.015, len(self.dates))))
+        self.bars = pd.DataFrame({
+            "date": self.dates.date,
+            "open": close,
+            "high": close * 1.01,
+            "low": close * 0.99,
+            "close": close,
+            "volume": rng.integers(100_000, 1_000_000, len(self.dates)).astype(float),
+            "amount": close * 1e6,
+        })
+        self.db.save_daily_data(self.bars.iloc[:60], self.CODE, "test")
+        self.analyzer = StockTrendAnalyzer()
+        self.cache = TrendCache(db=self.db, lookback=120, enabled=True)
+
+    def tearDown(self) -> None:
+        DatabaseManager.reset_instance()
+        self._temp_dir.cleanup()
+
+    def _cached_rows(self) -> int:
+        with self.db.get_session() as session:
+            return session.query(TrendCacheEntry).filter(TrendCacheEntry.code == self.CODE).count()
+
+    def test_hit_matches_direct_analysis(self) -> None:
+        """命中缓存的结果与直接分析一致，且不再调用 analyze()"""
+        expected = self.analyzer.analyze(self.bars.iloc[:60], self.CODE)
+        first = self.cache.get(self.CODE, self.analyzer)
+        self.assertEqual(first.to_dict(), expected.to_dict())
+
+        # 清空内存缓存，确认从持久表还原
+        self.db.clear_cache()
+        with mock.patch.object(self.analyzer, "analyze", side_effect=AssertionError("recomputed")):
+            second = self.cache.get(self.CODE, self.analyzer)
+        self.assertIsInstance(second, TrendAnalysisResult)
+        self.assertEqual(second.to_dict(), expected.to_dict())
+        self.assertEqual(second.buy_signal, expected.buy_signal)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_invalidated_by_saved_bars(self) -> None:
+        """追加新 K 线与改写当日 K 线都会让缓存失效"""
+        self.cache.get(self.CODE, self.analyzer)
+        self.assertEqual(self._cached_rows(), 1)
+
+        self.db.save_daily_data(self.bars.iloc[60:], self.CODE, "test")
+        result = self.cache.get(self.CODE, self.analyzer)
+        self.assertEqual(result.to_dict(), self.analyzer.analyze(self.bars, self.CODE).to_dict())
+        self.assertEqual(self._cached_rows(), 1)
+
+        # 盘中改写最新一根 K 线：日期不变，但收盘价变化
+        revised = self.bars.iloc[60:].copy()
+        revised["close"] *= 1.05
+        self.db.save_daily_data(revised, self.CODE, "test")
+        self.assertEqual(self._cached_rows(), 0)
+        result = self.cache.get(self.CODE, self.analyzer)
+        self.assertAlmostEqual(result.current_price, float(revised["close"].iloc[0]))
+
+    def test_params_hash(self) -> None:
+        """调整分析器参数使用新的缓存键"""
+        tuned = StockTrendAnalyzer()
+        tuned.BIAS_THRESHOLD = 2.0
+        self.assertNotEqual(tuned.params_hash(), self.analyzer.params_hash())
+        self.assertEqual(StockTrendAnalyzer().params_hash(), self.analyzer.params_hash())
+
+        self.cache.get(self.CODE, self.analyzer)
+        with mock.patch.object(tuned, "analyze", wraps=tuned.analyze) as analyze:
+            self.cache.get(self.CODE, tuned)
+        analyze.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
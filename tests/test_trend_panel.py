@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 趋势分析面板模式单元测试
+===================================
+
+职责：
+1. 验证 analyze_panel 与逐只 analyze 的结果完全一致
+2. 验证停牌、上市较晚、数据不足等情况的对齐处理
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.stock_analyzer import BuySignal, StockTrendAnalyzer
+
+
+def _frames(count: int = 60, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2024-01-01", periods=150, freq="B")
+    frames = {}
+    for i in range(count):
+        n = [12, 20, 24, 26, 40, 60, 90, 150][i % 8]
+        close = 10 * np.exp(np.cumsum(rng.normal(rng.normal(0, 0.005), 0.02, n)))
+        df = pd.DataFrame({
+            "date": dates[-n:],
+            "close": close,
+            "high": close * (1 + rng.uniform(0, 0.03, n)),
+            "low": close * 0.98,
+            "volume": rng.integers(100_000, 5_000_000, n),
+        })
+        if i % 5 == 0 and n > 30:
+            # 停牌：中间缺失若干交易日
+            df = df.drop(df.index[3:8]).reset_index(drop=True)
+        frames[f"{600000 + i:06d}"] = df
+    return frames
+
+
+class TrendPanelTestCase(unittest.TestCase):
+    """面板批量趋势分析测试"""
+
+    def setUp(self) -> None:
+        self.analyzer = StockTrendAnalyzer()
+        self.frames = _frames()
+
+    def test_matches_per_stock_analysis(self) -> None:
+        """面板结果还原后与逐只分析的全部字段完全相同"""
+        panel = StockTrendAnalyzer.build_panel(self.frames)
+        restored = self.analyzer.results_from_panel(self.analyzer.analyze_panel(panel))
+
+        for code, df in self.frames.items():
+            expected = self.analyzer.analyze(df, code)
+            actual = restored[code]
+            self.assertEqual(actual.to_dict(), expected.to_dict(), code)
+            self.assertEqual(actual.support_levels, expected.support_levels, code)
+            self.assertEqual(actual.resistance_levels, expected.resistance_levels, code)
+
+    def test_field_mapping_input(self) -> None:
+        """支持 {字段: (date × code)} 形式的输入，数据不足的股票给出默认值"""
+        panel = StockTrendAnalyzer.build_panel(self.frames)
+        result = self.analyzer.analyze_panel({name: panel[name] for name in ("close", "high", "volume")})
+
+        self.assertEqual(list(result.index), list(self.frames))
+        short = result.loc["600000"]
+        self.assertEqual(short["bars"], 12)
+        self.assertEqual(short["signal_score"], 0)
+        self.assertEqual(short["buy_signal"], BuySignal.WAIT.value)
+        expected = self.analyzer.analyze(self.frames["600005"], "600005")
+        self.assertEqual(result.loc["600005", "signal_score"], expected.signal_score)
+
+    def test_missing_field(self) -> None:
+        """缺少必需字段时报错"""
+        panel = StockTrendAnalyzer.build_panel(self.frames)
+        with self.assertRaises(ValueError):
+            self.analyzer.analyze_panel({"close": panel["close"]})
+
+
+if __name__ == "__main__":
+    unittest.main()
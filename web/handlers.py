@@ -21,7 +21,7 @@ import re
 import logging
 from http import HTTPStatus
 from datetime import datetime
-from typing import Dict, Any, Optional, TYPE_CHECKING
+from typing import Dict, Any, Iterable, Optional, Tuple, TYPE_CHECKING
 
 from web.services import get_config_service, get_analysis_service
 from web.templates import render_config_page
@@ -90,6 +90,32 @@ class HtmlResponse(Response):
         )
 
 
+class EventStreamResponse(Response):
+    """SSE（text/event-stream）响应：逐个写出事件，客户端断开时停止"""
+
+    def __init__(self, events: Iterable[Tuple[str, Dict[str, Any]]]):
+        super().__init__(body=b"", content_type="text/event-stream; charset=utf-8")
+        self.events = events
+
+    def send(self, handler: 'BaseHTTPRequestHandler') -> None:
+        """发送响应头后逐个推送事件（ping 事件写为注释行，用于保持连接）"""
+        handler.send_response(self.status)
+        handler.send_header("Content-Type", self.content_type)
+        handler.send_header("Cache-Control", "no-cache")
+        handler.send_header("X-Accel-Buffering", "no")
+        handler.end_headers()
+        try:
+            for event, data in self.events:
+                if event == "ping":
+                    chunk = ": ping\n\n"
+                else:
+                    chunk = f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+                handler.wfile.write(chunk.encode("utf-8"))
+                handler.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            logger.info("[EventStream] 客户端已断开")
+
+
 # ============================================================
 # 页面处理器
 # ============================================================
@@ -147,8 +173,30 @@ class ApiHandler:
             "timestamp": datetime.now().isoformat(),
             "service": "stock-analysis-webui"
         }
+        from src.config import get_config
+        if get_config().llm_router_enabled:
+            from src.llm_router import get_llm_router
+            # 各模型的延迟、错误率与熔断剩余时间
+            data["llm_routes"] = get_llm_router().stats()
+        if get_config().llm_context_cache_enabled:
+            from src.context_cache import get_context_cache
+            # 系统提示词缓存句柄的剩余有效期与创建/续期/引用次数
+            data["llm_context_cache"] = get_context_cache().stats()
         return JsonResponse(data)
     
+    def handle_metrics(self) -> Response:
+        """
+        Prometheus 指标 GET /metrics
+
+        各环节 span 耗时的累计直方图（按 name / source 分组）
+        """
+        from src.tracing import get_tracer
+
+        return Response(
+            body=get_tracer().prometheus_text().encode("utf-8"),
+            content_type="text/plain; version=0.0.4; charset=utf-8"
+        )
+
     def handle_analysis(self, query: Dict[str, list]) -> Response:
         """
         触发股票分析 GET /analysis?code=xxx
@@ -161,13 +209,37 @@ class ApiHandler:
                 "success": true,
                 "message": "分析任务已提交",
                 "code": "600519",
-                "task_id": "600519_20260119_103000"
+                "task_id": "600519_20260119_103000",
+                "coalesced": false,
+                "reused": false
             }
         """
+        params, error = self._parse_analysis_query(query)
+        if error is not None:
+            return error
+
+        # 提交异步分析任务
+        try:
+            result = self.analysis_service.submit_analysis(**params)
+            return JsonResponse(result)
+        except Exception as e:
+            logger.error(f"[ApiHandler] 提交分析任务失败: {e}")
+            return JsonResponse(
+                {"success": False, "error": f"提交任务失败: {str(e)}"},
+                status=HTTPStatus.INTERNAL_SERVER_ERROR
+            )
+
+    def _parse_analysis_query(self, query: Dict[str, list]) -> Tuple[Optional[Dict[str, Any]], Optional[Response]]:
+        """
+        解析并校验分析请求参数
+
+        Returns:
+            (submit_analysis 的参数, None) 或 (None, 错误响应)
+        """
         # 获取股票代码参数
         code_list = query.get("code", [])
         if not code_list or not code_list[0].strip():
-            return JsonResponse(
+            return None, JsonResponse(
                 {"success": False, "error": "缺少必填参数: code (股票代码)"},
                 status=HTTPStatus.BAD_REQUEST
             )
@@ -181,7 +253,7 @@ class ApiHandler:
         is_us_stock = re.match(r'^[A-Z]{1,5}(\.[A-Z]{1,2})?$', code.upper())
 
         if not (is_a_stock or is_hk_stock or is_us_stock):
-            return JsonResponse(
+            return None, JsonResponse(
                 {"success": False, "error": f"无效的股票代码格式: {code} (A股6位数字 / 港股HK+5位数字 / 美股1-5个字母)"},
                 status=HTTPStatus.BAD_REQUEST
             )
@@ -195,21 +267,37 @@ class ApiHandler:
         if "save_context_snapshot" in query:
             save_snapshot = self._parse_bool(query.get("save_context_snapshot", [""])[0])
 
-        # 提交异步分析任务
+        return {"code": code, "report_type": report_type, "save_context_snapshot": save_snapshot}, None
+
+    def handle_analysis_stream(self, query: Dict[str, list]) -> Response:
+        """
+        触发股票分析并以 SSE 推送进度 GET /analysis/stream?code=xxx
+
+        事件顺序：
+            event: task     任务信息（同 /analysis 的返回）
+            event: partial  流式分析已完成的字段快照（评分、操作建议通常最先到达，可多次）
+            event: result   最终结果摘要
+            event: error    失败或超时
+        """
+        params, error = self._parse_analysis_query(query)
+        if error is not None:
+            return error
+
         try:
-            result = self.analysis_service.submit_analysis(
-                code,
-                report_type=report_type,
-                save_context_snapshot=save_snapshot
-            )
-            return JsonResponse(result)
+            task = self.analysis_service.submit_analysis(**params)
         except Exception as e:
-            logger.error(f"[ApiHandler] 提交分析任务失败: {e}")
+            logger.error(f"[ApiHandler] 提交流式分析任务失败: {e}")
             return JsonResponse(
                 {"success": False, "error": f"提交任务失败: {str(e)}"},
                 status=HTTPStatus.INTERNAL_SERVER_ERROR
             )
 
+        def events():
+            yield "task", task
+            yield from self.analysis_service.iter_task_events(task["task_id"])
+
+        return EventStreamResponse(events())
+
     def handle_analysis_history(self, query: Dict[str, list]) -> Response:
         """
         查询分析历史 GET /analysis/history
@@ -243,6 +331,80 @@ class ApiHandler:
             "count": len(history)
         })
 
+    def handle_analytics_query(self, query: Dict[str, list]) -> Response:
+        """
+        分析型 SQL 查询 GET /analytics/query
+
+        Args:
+            query: URL 查询参数 (sql, refresh, limit)
+        """
+        from src.analytics import get_analytics_engine
+
+        sql = query.get("sql", [""])[0]
+        refresh = self._parse_bool(query.get("refresh", [""])[0]) is True
+
+        try:
+            limit = int(query.get("limit", ["1000"])[0])
+        except ValueError:
+            limit = 1000
+
+        try:
+            result = get_analytics_engine().query_records(sql, refresh=refresh, limit=limit)
+        except ValueError as e:
+            return JsonResponse(
+                {"success": False, "error": str(e)},
+                status=HTTPStatus.BAD_REQUEST
+            )
+        except Exception as e:
+            logger.error(f"[ApiHandler] 分析查询失败: {e}")
+            return JsonResponse(
+                {"success": False, "error": f"查询失败: {str(e)}"},
+                status=HTTPStatus.INTERNAL_SERVER_ERROR
+            )
+
+        return JsonResponse({"success": True, **result})
+
+    def handle_screener(self, query: Dict[str, list]) -> Response:
+        """
+        全市场技术面选股 GET /screener
+
+        Args:
+            query: URL 查询参数 (top_n, min_score, realtime, analyze)
+        """
+        from src.screener import MarketScreener
+
+        try:
+            top_n = int(query.get("top_n", ["0"])[0]) or None
+            min_score = int(query.get("min_score", ["0"])[0])
+        except ValueError:
+            return JsonResponse(
+                {"success": False, "error": "top_n / min_score 必须为整数"},
+                status=HTTPStatus.BAD_REQUEST
+            )
+        realtime = self._parse_bool(query.get("realtime", [""])[0]) is not False
+        analyze = self._parse_bool(query.get("analyze", [""])[0]) is True
+
+        try:
+            screener = MarketScreener()
+            result = screener.screen(top_n=top_n, min_score=min_score, use_realtime=realtime)
+        except Exception as e:
+            logger.error(f"[ApiHandler] 选股失败: {e}")
+            return JsonResponse(
+                {"success": False, "error": f"选股失败: {str(e)}"},
+                status=HTTPStatus.INTERNAL_SERVER_ERROR
+            )
+
+        if analyze and result.codes:
+            # 候选池分析耗时较长，后台执行并推送汇总报告
+            self.analysis_service.executor.submit(screener.analyze_top, result)
+
+        return JsonResponse({
+            "success": True,
+            "analyzing": analyze and bool(result.codes),
+            "analyze_count": screener.analyze_limit(len(result.codes)) if analyze else 0,
+            **result.to_dict(),
+        })
+
     @staticmethod
     def _parse_bool(value: str) -> Optional[bool]:
         """
@@ -304,18 +304,42 @@ def create_default_router() -> Router:
         "健康检查"
     )
     
+    router.register(
+        "/metrics", "GET",
+        lambda q: api_handler.handle_metrics(),
+        "Prometheus 指标"
+    )
+    
     router.register(
         "/analysis", "GET",
         lambda q: api_handler.handle_analysis(q),
         "触发股票分析"
     )
 
+    router.register(
+        "/analysis/stream", "GET",
+        lambda q: api_handler.handle_analysis_stream(q),
+        "触发股票分析（SSE 推送部分结果）"
+    )
+
     router.register(
         "/analysis/history", "GET",
         lambda q: api_handler.handle_analysis_history(q),
         "查询分析历史"
     )
     
+    router.register(
+        "/analytics/query", "GET",
+        lambda q: api_handler.handle_analytics_query(q),
+        "分析型 SQL 查询"
+    )
+    
+    router.register(
+        "/screener", "GET",
+        lambda q: api_handler.handle_screener(q),
+        "全市场技术面选股"
+    )
+    
     router.register(
         "/tasks", "GET",
         lambda q: api_handler.handle_tasks(q),
@@ -15,11 +15,15 @@ import os
 import re
 import logging
 import threading
-from concurrent.futures import ThreadPoolExecutor
-from datetime import datetime
-from typing import Optional, Dict, Any, List, Union
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Optional, Dict, Any, Iterator, List, Tuple, Union
 
-from src.enums import ReportType
+from src.analyzer import AnalysisResult
+from src.core.job_scheduler import get_job_scheduler, owner_of
+from src.core.singleflight import SingleFlight
+from src.enums import JobPriority, ReportType
 from src.storage import get_db
 from bot.models import BotMessage
 
@@ -150,6 +154,11 @@ class AnalysisService:
         self._max_workers = max_workers
         self._tasks: Dict[str, Dict[str, Any]] = {}
         self._tasks_lock = threading.Lock()
+        # 任务状态或部分结果变化时通知 iter_task_events 的等待方
+        self._tasks_changed = threading.Condition(self._tasks_lock)
+        self._flight: Optional[SingleFlight] = None
+        # 合并 key -> 挂接在该 key 上、尚未完成的任务（流式部分结果推送给其中每一个任务）
+        self._flight_tasks: Dict[Tuple[str, str, str], List[str]] = {}
     
     @classmethod
     def get_instance(cls) -> 'AnalysisService':
@@ -180,6 +189,10 @@ class AnalysisService:
         """
         提交异步分析任务
         
+        同一交易日内相同 (股票代码, 报告类型) 的请求会合并：
+        后到的请求挂接到进行中的任务上，完成后共享同一个 AnalysisResult，
+        结果在 ANALYSIS_COALESCE_TTL 秒内直接复用。
+        
         Args:
             code: 股票代码
             report_type: 报告类型枚举
@@ -192,9 +205,32 @@ class AnalysisService:
             report_type = ReportType.from_str(report_type)
         
         task_id = f"{code}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+        flight_key = self._coalesce_key(code, report_type)
+        
+        with self._tasks_lock:
+            task = {
+                "task_id": task_id,
+                "code": code,
+                "status": "running",
+                "start_time": datetime.now().isoformat(),
+                "result": None,
+                "error": None,
+                "report_type": report_type.value
+            }
+            # 先挂接到合并 key 上：后到的请求也能收到进行中任务之后的部分结果，并从最近的快照开始
+            siblings = self._flight_tasks.setdefault(flight_key, [])
+            latest = next((self._tasks[t] for t in reversed(siblings) if self._tasks[t].get("partial")), None)
+            if latest is not None:
+                task.update(
+                    partial=latest["partial"], partial_elapsed=latest.get("partial_elapsed"), partial_version=1
+                )
+            siblings.append(task_id)
+            self._tasks[task_id] = task
         
-        # 提交到线程池
-        self.executor.submit(
+        # 以交互式优先级提交到任务调度器（相同 key 的任务合并执行）
+        future, shared = self.flight.submit(
+            flight_key,
+            get_job_scheduler().executor(JobPriority.INTERACTIVE, owner_of(source_message)),
             self._run_analysis,
             code,
             task_id,
@@ -202,16 +238,53 @@ class AnalysisService:
             source_message,
             save_context_snapshot
         )
+        # 合并的请求由执行任务的流水线之外单独推送到自己的会话
+        notify_message = source_message if shared else None
+        future.add_done_callback(
+            lambda f: self._on_analysis_done(task_id, code, report_type, f, notify_message, flight_key)
+        )
         
-        logger.info(f"[AnalysisService] 已提交股票 {code} 的分析任务, task_id={task_id}, report_type={report_type.value}")
+        # 结果缓存命中时 future 已完成：不会再执行分析，只有带来源会话的请求会收到推送
+        reused = shared and future.done()
+        if reused:
+            logger.info(f"[AnalysisService] 股票 {code} 复用最近的分析结果, task_id={task_id}")
+        elif shared:
+            logger.info(f"[AnalysisService] 股票 {code} 已有相同分析任务，合并执行, task_id={task_id}")
+        else:
+            logger.info(f"[AnalysisService] 已提交股票 {code} 的分析任务, task_id={task_id}, report_type={report_type.value}")
         
         return {
             "success": True,
-            "message": "分析任务已提交，将异步执行并推送通知",
+            "message": self._submit_message(shared, reused, source_message is not None),
             "code": code,
             "task_id": task_id,
-            "report_type": report_type.value
+            "report_type": report_type.value,
+            "coalesced": shared,
+            "reused": reused
         }
+
+    @staticmethod
+    def _submit_message(shared: bool, reused: bool, notify: bool) -> str:
+        """提交结果说明：区分新任务、合并到进行中的任务与复用已缓存的结果"""
+        if reused:
+            return "已复用最近的分析结果，将推送到当前会话" if notify else "已复用最近的分析结果，可直接查询任务结果"
+        if shared:
+            suffix = "完成后将推送到当前会话" if notify else "完成后可查询任务结果"
+            return f"已合并到进行中的相同分析任务，{suffix}"
+        return "分析任务已提交，将异步执行并推送通知"
+    
+    @property
+    def flight(self) -> SingleFlight:
+        """获取或创建重复请求合并器"""
+        if self._flight is None:
+            from src.config import get_config
+            self._flight = SingleFlight(result_ttl=get_config().analysis_coalesce_ttl)
+        return self._flight
+    
+    @staticmethod
+    def _coalesce_key(code: str, report_type: ReportType) -> Tuple[str, str, str]:
+        """合并 key：(股票代码, 报告类型, 交易日)"""
+        return (code.strip().upper(), report_type.value, _trading_date().isoformat())
     
     def get_task_status(self, task_id: str) -> Optional[Dict[str, Any]]:
         """获取任务状态"""
@@ -226,6 +299,73 @@ class AnalysisService:
         tasks.sort(key=lambda x: x.get('start_time', ''), reverse=True)
         return tasks[:limit]
 
+    def iter_task_events(
+        self,
+        task_id: str,
+        timeout: float = 600.0,
+        heartbeat: float = 15.0
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        按顺序产出任务的增量事件（供 SSE 推送）
+
+        事件类型：
+            partial: 流式分析已完成字段的快照（每次有新字段时产出最新快照）
+            result:  分析完成，数据同任务状态中的 result
+            error:   任务失败、不存在或等待超时
+            ping:    heartbeat 秒内无变化时产出，用于保持连接
+        """
+        deadline = time.monotonic() + timeout
+        seen_version = 0
+        while True:
+            # 只在锁内复制任务状态；yield（SSE 写入可能很慢）必须在释放锁之后，
+            # 否则慢客户端会阻塞提交、部分结果回调与完成回调
+            with self._tasks_changed:
+                task = self._tasks.get(task_id)
+                if task is not None:
+                    if task["status"] == "running" and task.get("partial_version", 0) == seen_version:
+                        self._tasks_changed.wait(min(heartbeat, max(0.0, deadline - time.monotonic())))
+                    task = dict(task)
+            if task is None:
+                yield "error", {"task_id": task_id, "error": f"任务不存在: {task_id}"}
+                return
+
+            version = task.get("partial_version", 0)
+            if version != seen_version:
+                seen_version = version
+                yield "partial", {
+                    "task_id": task_id,
+                    "partial": task.get("partial"),
+                    "elapsed": task.get("partial_elapsed"),
+                }
+            elif task["status"] == "running" and time.monotonic() < deadline:
+                yield "ping", {}
+            if task["status"] == "completed":
+                yield "result", {"task_id": task_id, "result": task.get("result")}
+                return
+            if task["status"] == "failed":
+                yield "error", {"task_id": task_id, "error": task.get("error")}
+                return
+            if time.monotonic() >= deadline:
+                yield "error", {"task_id": task_id, "error": "等待分析结果超时"}
+                return
+
+    def _record_partial(self, task_id: str, update: Dict[str, Any]) -> None:
+        """
+        流式分析回调：把已完成字段快照写入任务状态（/task 轮询与 SSE 均可读取）
+
+        执行分析的任务与合并到它上面的任务共享同一次 LLM 调用，快照写入其中每一个任务。
+        """
+        with self._tasks_changed:
+            task_ids = next((ids for ids in self._flight_tasks.values() if task_id in ids), [task_id])
+            for attached_id in task_ids:
+                task = self._tasks.get(attached_id)
+                if task is None:
+                    continue
+                task["partial"] = update.get("partial")
+                task["partial_elapsed"] = update.get("elapsed")
+                task["partial_version"] = task.get("partial_version", 0) + 1
+            self._tasks_changed.notify_all()
+
     def get_analysis_history(
         self,
         code: Optional[str] = None,
@@ -247,97 +387,129 @@ class AnalysisService:
         report_type: ReportType = ReportType.SIMPLE,
         source_message: Optional[BotMessage] = None,
         save_context_snapshot: Optional[bool] = None
-    ) -> Dict[str, Any]:
+    ) -> Optional[AnalysisResult]:
         """
         执行单只股票分析
         
-        内部方法，在线程池中运行
+        内部方法，在线程池中运行；任务状态由 _on_analysis_done 更新
         
         Args:
             code: 股票代码
             task_id: 任务ID
             report_type: 报告类型枚举
         """
-        # 初始化任务状态
-        with self._tasks_lock:
-            self._tasks[task_id] = {
-                "task_id": task_id,
-                "code": code,
-                "status": "running",
-                "start_time": datetime.now().isoformat(),
-                "result": None,
-                "error": None,
-                "report_type": report_type.value
-            }
+        # 延迟导入避免循环依赖
+        from src.config import get_config
+        from main import StockAnalysisPipeline
         
+        logger.info(f"[AnalysisService] 开始分析股票: {code}")
+        
+        # 创建分析管道
+        config = get_config()
+        pipeline = StockAnalysisPipeline(
+            config=config,
+            max_workers=1,
+            source_message=source_message,
+            query_id=task_id,
+            query_source="web",
+            save_context_snapshot=save_context_snapshot,
+            on_partial=(lambda update: self._record_partial(task_id, update)) if config.llm_stream_enabled else None
+        )
+        
+        # 执行单只股票分析（启用单股推送）
+        return pipeline.process_single_stock(
+            code=code,
+            skip_analysis=False,
+            single_stock_notify=True,
+            report_type=report_type
+        )
+    
+    def _on_analysis_done(
+        self,
+        task_id: str,
+        code: str,
+        report_type: ReportType,
+        future: Future,
+        notify_message: Optional[BotMessage] = None,
+        flight_key: Optional[Tuple[str, str, str]] = None
+    ) -> None:
+        """分析完成回调：更新任务状态，合并的请求另行推送到来源会话"""
+        with self._tasks_lock:
+            siblings = self._flight_tasks.get(flight_key, [])
+            if task_id in siblings:
+                siblings.remove(task_id)
+            if not siblings:
+                self._flight_tasks.pop(flight_key, None)
+
+        error_msg = None
+        result = None
         try:
-            # 延迟导入避免循环依赖
-            from src.config import get_config
-            from main import StockAnalysisPipeline
-            
-            logger.info(f"[AnalysisService] 开始分析股票: {code}")
-            
-            # 创建分析管道
-            config = get_config()
-            pipeline = StockAnalysisPipeline(
-                config=config,
-                max_workers=1,
-                source_message=source_message,
-                query_id=task_id,
-                query_source="web",
-                save_context_snapshot=save_context_snapshot
-            )
-            
-            # 执行单只股票分析（启用单股推送）
-            result = pipeline.process_single_stock(
-                code=code,
-                skip_analysis=False,
-                single_stock_notify=True,
-                report_type=report_type
-            )
-            
-            if result:
-                result_data = {
-                    "code": result.code,
-                    "name": result.name,
-                    "sentiment_score": result.sentiment_score,
-                    "operation_advice": result.operation_advice,
-                    "trend_prediction": result.trend_prediction,
-                    "analysis_summary": result.analysis_summary,
-                }
-                
-                with self._tasks_lock:
-                    self._tasks[task_id].update({
-                        "status": "completed",
-                        "end_time": datetime.now().isoformat(),
-                        "result": result_data
-                    })
-                
-                logger.info(f"[AnalysisService] 股票 {code} 分析完成: {result.operation_advice}")
-                return {"success": True, "task_id": task_id, "result": result_data}
-            else:
-                with self._tasks_lock:
-                    self._tasks[task_id].update({
-                        "status": "failed",
-                        "end_time": datetime.now().isoformat(),
-                        "error": "分析返回空结果"
-                    })
-                
-                logger.warning(f"[AnalysisService] 股票 {code} 分析失败: 返回空结果")
-                return {"success": False, "task_id": task_id, "error": "分析返回空结果"}
-                
+            result = future.result()
         except Exception as e:
             error_msg = str(e)
             logger.error(f"[AnalysisService] 股票 {code} 分析异常: {error_msg}")
-            
-            with self._tasks_lock:
+        
+        if result is None:
+            if error_msg is None:
+                error_msg = "分析返回空结果"
+                logger.warning(f"[AnalysisService] 股票 {code} 分析失败: 返回空结果")
+            with self._tasks_changed:
                 self._tasks[task_id].update({
                     "status": "failed",
                     "end_time": datetime.now().isoformat(),
                     "error": error_msg
                 })
-            
-            return {"success": False, "task_id": task_id, "error": error_msg}
+                self._tasks_changed.notify_all()
+            return
+        
+        if notify_message is not None:
+            # 推送可能较慢，避免阻塞完成回调所在线程（缓存命中时为提交方线程）
+            self.executor.submit(self._notify_source, result, report_type, notify_message)
+        
+        result_data = {
+            "code": result.code,
+            "name": result.name,
+            "sentiment_score": result.sentiment_score,
+            "operation_advice": result.operation_advice,
+            "trend_prediction": result.trend_prediction,
+            "analysis_summary": result.analysis_summary,
+        }
+        with self._tasks_changed:
+            self._tasks[task_id].update({
+                "status": "completed",
+                "end_time": datetime.now().isoformat(),
+                "result": result_data
+            })
+            self._tasks_changed.notify_all()
+        logger.info(f"[AnalysisService] 股票 {code} 分析完成: {result.operation_advice}")
+    
+    @staticmethod
+    def _notify_source(
+        result: AnalysisResult,
+        report_type: ReportType,
+        source_message: BotMessage
+    ) -> None:
+        """将共享的分析结果推送到合并请求的来源会话"""
+        from src.notification import NotificationService
+        
+        notifier = NotificationService(source_message=source_message)
+        try:
+            if report_type == ReportType.FULL:
+                content = notifier.generate_dashboard_report([result])
+            else:
+                content = notifier.generate_single_stock_report(result)
+            if not notifier.send(content):
+                logger.warning(f"[AnalysisService] 股票 {result.code} 合并请求推送失败")
+        except Exception as e:
+            logger.error(f"[AnalysisService] 股票 {result.code} 合并请求推送异常: {e}")
+
+
+def _trading_date(now: Optional[datetime] = None) -> date:
+    """当前对应的交易日（周末归到上一个周五，节假日不做区分）"""
+    day = (now or datetime.now()).date()
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day
 
 
 # ============================================================